@@ -0,0 +1,74 @@
+"""Microbenchmark of building chat requests with the builders and with a request template.
+
+Each round builds a request whose query, user and conversation vary, and prepares it the way the
+transport does before sending: URL, headers and encoded body.
+
+    python benchmarks/request_build.py [--number N]
+"""
+
+import argparse
+import json
+import timeit
+
+from dify_oapi.api.chat.v1.model.chat_request import ChatRequest
+from dify_oapi.api.chat.v1.model.chat_request_body import ChatRequestBody
+from dify_oapi.core.http.transport._misc import _build_header, _build_url
+from dify_oapi.core.json import JSON
+from dify_oapi.core.model.request_option import RequestOption
+from dify_oapi.core.model.request_template import RequestTemplate
+
+DOMAIN = "https://api.dify.ai"
+INPUTS = {"lang": "en", "persona": "support", "product": "dify-oapi"}
+OPTION = RequestOption.builder().api_key("app-benchmark").build()
+
+
+def _send(request: ChatRequest) -> bytes:
+    _build_url(DOMAIN, request.uri, request.paths)
+    _build_header(request, OPTION)
+    if request.content is not None:
+        return request.content
+    return json.dumps(json.loads(JSON.marshal(request.body))).encode()
+
+
+def with_builders(i: int) -> bytes:
+    body = (
+        ChatRequestBody.builder()
+        .query(f"question {i}")
+        .inputs(INPUTS)
+        .response_mode("streaming")
+        .user(f"user-{i % 100}")
+        .conversation_id(f"conv-{i % 10}")
+        .build()
+    )
+    return _send(ChatRequest.builder().request_body(body).build())
+
+
+TEMPLATE = RequestTemplate(
+    ChatRequest.builder()
+    .request_body(ChatRequestBody.builder().inputs(INPUTS).response_mode("streaming").build())
+    .build(),
+    vary=("query", "user", "conversation_id"),
+)
+
+
+def with_template(i: int) -> bytes:
+    return _send(TEMPLATE.clone(query=f"question {i}", user=f"user-{i % 100}", conversation_id=f"conv-{i % 10}"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=50_000)
+    args = parser.parse_args()
+
+    assert json.loads(with_builders(7)) == json.loads(with_template(7))
+    results = {}
+    for name, build in (("builders", with_builders), ("template", with_template)):
+        counter = iter(range(args.number * 10))
+        seconds = min(timeit.repeat(lambda: build(next(counter)), number=args.number, repeat=3))  # noqa: B023
+        results[name] = args.number / seconds
+        print(f"{name:>10}: {results[name]:>10,.0f} requests/s")
+    print(f"{'speedup':>10}: {results['template'] / results['builders']:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
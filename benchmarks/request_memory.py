@@ -0,0 +1,68 @@
+"""Memory held by requests queued for batch processing, in bytes per request.
+
+Each request is built with the builders and kept in a list, as a batch job does before sending. Chat requests
+carry a short query and shared inputs; segment requests carry a few segments of a document.
+
+    python benchmarks/request_memory.py [--number N]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable
+
+from dify_oapi.api.chat.v1.model.chat_request import ChatRequest
+from dify_oapi.api.chat.v1.model.chat_request_body import ChatRequestBody
+from dify_oapi.api.knowledge.v1.model.create_segment_request import CreateSegmentRequest
+from dify_oapi.api.knowledge.v1.model.create_segment_request_body import CreateSegmentRequestBody
+from dify_oapi.api.knowledge.v1.model.segment_content import SegmentContent
+from dify_oapi.core.model.base_request import BaseRequest
+
+INPUTS = {"lang": "en", "persona": "support", "product": "dify-oapi"}
+
+
+def chat(i: int) -> ChatRequest:
+    body = (
+        ChatRequestBody.builder()
+        .query(f"question {i}")
+        .inputs(INPUTS)
+        .response_mode("blocking")
+        .user(f"user-{i % 100}")
+        .build()
+    )
+    return ChatRequest.builder().request_body(body).build()
+
+
+def segments(i: int) -> CreateSegmentRequest:
+    contents = [SegmentContent(content=f"segment {i}-{n}", keywords=["dify", f"k{n}"]) for n in range(3)]
+    return (
+        CreateSegmentRequest.builder()
+        .dataset_id("dataset")
+        .document_id(f"document-{i % 10}")
+        .request_body(CreateSegmentRequestBody(segments=contents))
+        .build()
+    )
+
+
+def measure(build: Callable[[int], BaseRequest], number: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    queue = [build(i) for i in range(number)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del queue
+    return (after - before) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for name, build in (("chat", chat), ("segments", segments)):
+        print(f"{name:>10}: {measure(build, args.number):>8,.0f} bytes/request")
+
+
+if __name__ == "__main__":
+    main()
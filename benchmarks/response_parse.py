@@ -0,0 +1,250 @@
+"""Throughput of parsing large list responses across the six API packages.
+
+The payloads follow the examples of the Dify API reference, with pages of `--items` items. Each response is
+parsed the way the transport did before, decoding the JSON text into dicts (twice) and validating the models
+from them, and the way it does now, validating the models straight from the JSON bytes in pydantic-core. Both
+must give the same models.
+
+The last columns measure validating lazily, as an opt-in mode for trusted servers would: the JSON is decoded
+and list items are only validated once accessed, when one item or all of them are read. The decoding alone
+costs about as much as validating from the bytes, so it is at best 1.0x-1.4x faster when a single item is
+read and about 0.5x when all are, which is why the transport has no such mode.
+
+    python benchmarks/response_parse.py [--items N] [--number N]
+"""
+
+import argparse
+import json
+import timeit
+import typing
+from collections.abc import Callable
+from typing import Any
+
+from dify_oapi.api.chat.v1.model.message_history_response import GetMessageHistoryResponse
+from dify_oapi.api.chatflow.v1.model.get_conversation_messages_response import GetConversationMessagesResponse
+from dify_oapi.api.completion.v1.model.annotation.list_annotations_response import ListAnnotationsResponse
+from dify_oapi.api.dify.v1.model.get_feedbacks_response import GetFeedbacksResponse
+from dify_oapi.api.knowledge.v1.model.list_segments_response import ListSegmentsResponse
+from dify_oapi.api.knowledge.v1.model.retrieve_from_dataset_response import RetrieveFromDatasetResponse
+from dify_oapi.api.workflow.v1.model.get_workflow_logs_response import GetWorkflowLogsResponse
+from dify_oapi.core.http.transport._misc import _handle_json_response
+from dify_oapi.core.json import JSON
+
+ANSWER = "Dify is an open-source platform for building LLM applications. " * 4
+
+
+def _resource(i: int) -> dict[str, Any]:
+    return {
+        "position": i + 1,
+        "dataset_id": "101b4c97-fc2e-463c-90b1-5261a4cdcafb",
+        "dataset_name": "iPhone",
+        "document_id": "8dd1ad74-0b5f-4175-b735-7d98bbbb4e00",
+        "document_name": "iPhone List",
+        "segment_id": f"ed599c7f-2766-4294-9d1d-e5235a61270a-{i}",
+        "score": 0.98457545 - i / 100,
+        "content": '"Model","Release Date","Display Size","Resolution","Processor","RAM","Storage","Camera"',
+    }
+
+
+def _message(i: int, chatflow: bool = False) -> dict[str, Any]:
+    message: dict[str, Any] = {
+        "id": f"a076a87f-31e5-48dc-b452-0061adbbc922-{i}",
+        "conversation_id": "cd78daf6-f9e4-4463-9ff2-54257230a0ce",
+        "inputs": {"name": "dify"},
+        "query": f"iphone 13 pro {i}",
+        "answer": ANSWER,
+        "message_files": [
+            {"id": f"file-{i}", "type": "image", "url": "https://upload.dify.ai/files/image.png", "belongs_to": "user"}
+        ],
+        "feedback": {"rating": "like"},
+        "retriever_resources": [_resource(n) for n in range(3)],
+        "created_at": 1705569239,
+    }
+    if not chatflow:
+        message["agent_thoughts"] = [
+            {
+                "id": f"thought-{i}-{n}",
+                "message_id": message["id"],
+                "position": n + 1,
+                "thought": "I should search the dataset.",
+                "observation": "Found 3 documents.",
+                "tool": "dataset_retrieval",
+                "tool_input": '{"dataset_retrieval": {"query": "iphone"}}',
+                "message_files": [],
+                "created_at": 1705569239,
+            }
+            for n in range(2)
+        ]
+    return message
+
+
+def chat(items: int) -> dict[str, Any]:
+    return {"limit": items, "has_more": False, "data": [_message(i) for i in range(items)]}
+
+
+def chatflow(items: int) -> dict[str, Any]:
+    return {"limit": items, "has_more": False, "data": [_message(i, chatflow=True) for i in range(items)]}
+
+
+def completion(items: int) -> dict[str, Any]:
+    annotations = [
+        {
+            "id": f"69d48372-ad81-4c75-9c46-2ce197b4d402-{i}",
+            "question": "What is your name?",
+            "answer": "I am Dify.",
+            "hit_count": i,
+            "created_at": 1735625869,
+        }
+        for i in range(items)
+    ]
+    return {"data": annotations, "has_more": False, "limit": items, "total": items, "page": 1}
+
+
+def dify(items: int) -> dict[str, Any]:
+    feedbacks = [
+        {
+            "id": f"feedback-{i}",
+            "username": f"user-{i}",
+            "phone": "",
+            "avatar": "https://cloud.dify.ai/avatar.png",
+            "display_name": f"User {i}",
+            "timestamp": 1735625869,
+            "rating": "like",
+            "content": "Helpful answer.",
+        }
+        for i in range(items)
+    ]
+    return {"data": feedbacks, "has_more": False, "limit": items, "page": 1, "total": items}
+
+
+def workflow(items: int) -> dict[str, Any]:
+    logs = [
+        {
+            "id": f"log-{i}",
+            "workflow_run": {
+                "id": f"run-{i}",
+                "version": "2025-01-01 00:00:00.000000",
+                "status": "succeeded",
+                "error": None,
+                "elapsed_time": 1.25,
+                "total_tokens": 1024,
+                "total_steps": 5,
+                "created_at": 1735625869,
+                "finished_at": 1735625870,
+            },
+            "created_from": "service-api",
+            "created_by_role": "end_user",
+            "created_by_account": None,
+            "created_by_end_user": {"id": "eu-1", "type": "service_api", "is_anonymous": False, "session_id": "abc"},
+            "created_at": 1735625869,
+        }
+        for i in range(items)
+    ]
+    return {"page": 1, "limit": items, "total": items, "has_more": False, "data": logs}
+
+
+def knowledge(items: int) -> dict[str, Any]:
+    segments = [
+        {
+            "id": f"segment-{i}",
+            "position": i + 1,
+            "document_id": "document",
+            "content": ANSWER,
+            "answer": None,
+            "word_count": 256,
+            "tokens": 64,
+            "keywords": ["dify", "platform", "llm"],
+            "index_node_id": f"node-{i}",
+            "index_node_hash": "abc123",
+            "hit_count": 0,
+            "enabled": True,
+            "disabled_at": None,
+            "disabled_by": None,
+            "status": "completed",
+            "created_by": "account",
+            "created_at": 1695312007,
+            "indexing_at": 1695312007,
+            "completed_at": 1695312007,
+            "error": None,
+            "stopped_at": None,
+        }
+        for i in range(items)
+    ]
+    return {"data": segments, "has_more": False, "limit": items, "total": items, "page": 1}
+
+
+def retrieval(items: int) -> dict[str, Any]:
+    records = [
+        {
+            "segment": {
+                "id": f"segment-{i}",
+                "content": ANSWER,
+                "document": {"id": "document", "data_source_type": "upload_file", "name": "dify.md"},
+            },
+            "score": 3.730463140527718e-05,
+        }
+        for i in range(items)
+    ]
+    return {"query": {"content": "What is Dify?"}, "records": records}
+
+
+RESPONSES: list[tuple[str, Callable[[int], dict[str, Any]], type, str]] = [
+    ("chat", chat, GetMessageHistoryResponse, "data"),
+    ("chatflow", chatflow, GetConversationMessagesResponse, "data"),
+    ("completion", completion, ListAnnotationsResponse, "data"),
+    ("dify", dify, GetFeedbacksResponse, "data"),
+    ("workflow", workflow, GetWorkflowLogsResponse, "data"),
+    ("knowledge", knowledge, ListSegmentsResponse, "data"),
+    ("retrieval", retrieval, RetrieveFromDatasetResponse, "records"),
+]
+
+
+def from_dicts(content: bytes, cls: type) -> Any:
+    text = str(content, "utf-8")
+    json.loads(text)  # Type of the top-level value
+    return JSON.unmarshal(text, cls)
+
+
+def lazily(content: bytes, cls: type, items: str, read: int | None) -> Any:
+    """Build the response without validation and validate the first `read` items, all of them if None."""
+    parsed = json.loads(content)
+    (item_type,) = typing.get_args(
+        next(arg for arg in typing.get_args(cls.model_fields[items].annotation) if arg is not type(None))
+    )
+    response = cls.model_construct(**{name: value for name, value in parsed.items() if name != items})
+    return response, [item_type.model_validate(item) for item in parsed[items][:read]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    print(
+        f"{'':>10}  {'from dicts':>12}  {'from JSON':>12}  {'speedup':>7}  {'lazy, 1 read':>12}  {'lazy, all':>9}"
+        "  (responses/s, lazy relative to from JSON)"
+    )
+    for name, payload, cls, items in RESPONSES:
+        content = json.dumps(payload(args.items)).encode()
+        validated = _handle_json_response(content, cls)
+        assert validated.model_dump() == from_dicts(content, cls).model_dump(), name
+        assert lazily(content, cls, items, None)[1] == getattr(validated, items), name
+
+        rates = []
+        for parse in (
+            from_dicts,
+            _handle_json_response,
+            lambda content, cls: lazily(content, cls, items, 1),  # noqa: B023
+            lambda content, cls: lazily(content, cls, items, None),  # noqa: B023
+        ):
+            seconds = min(timeit.repeat(lambda: parse(content, cls), number=args.number, repeat=3))  # noqa: B023
+            rates.append(args.number / seconds)
+        print(
+            f"{name:>10}  {rates[0]:>12,.0f}  {rates[1]:>12,.0f}  {rates[1] / rates[0]:>6.1f}x"
+            f"  {rates[2] / rates[1]:>11.1f}x  {rates[3] / rates[1]:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
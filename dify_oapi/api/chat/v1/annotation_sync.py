@@ -0,0 +1,273 @@
+"""Bulk annotation synchronisation, import/export and annotation-reply job polling."""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from dify_oapi.core.log import logger
+from dify_oapi.core.model.base_response import BaseResponse
+from dify_oapi.core.model.request_option import RequestOption
+
+from .model.annotation_info import AnnotationInfo
+from .model.chat_types import AnnotationAction
+from .model.configure_annotation_reply_request import ConfigureAnnotationReplyRequest
+from .model.configure_annotation_reply_request_body import ConfigureAnnotationReplyRequestBody
+from .model.create_annotation_request import CreateAnnotationRequest
+from .model.create_annotation_request_body import CreateAnnotationRequestBody
+from .model.delete_annotation_request import DeleteAnnotationRequest
+from .model.get_annotation_reply_status_request import GetAnnotationReplyStatusRequest
+from .model.get_annotation_reply_status_response import GetAnnotationReplyStatusResponse
+from .model.list_annotations_request import ListAnnotationsRequest
+from .model.update_annotation_request import UpdateAnnotationRequest
+from .model.update_annotation_request_body import UpdateAnnotationRequestBody
+from .resource.annotation import Annotation
+
+CSV_FIELDS = ("id", "question", "answer")
+
+# Annotation-reply job states after which a job is no longer polled
+TERMINAL_JOB_STATUSES = frozenset({"completed", "failed"})
+
+
+def read_annotations(path: str) -> Iterator[AnnotationInfo]:
+    """Stream annotations from a CSV file (`question`, `answer` and optional `id` columns) or a JSONL file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield AnnotationInfo(id=row.get("id") or None, question=row["question"], answer=row["answer"])
+            return
+        for line in f:
+            if line.strip():
+                yield AnnotationInfo.model_validate_json(line)
+
+
+def write_annotations(path: str, annotations: Iterable[AnnotationInfo]) -> int:
+    """Stream annotations to a CSV or JSONL file, depending on the extension, and return how many were written."""
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore") if path.endswith(".csv") else None
+        if writer is not None:
+            writer.writeheader()
+        for annotation in annotations:
+            if writer is not None:
+                writer.writerow(annotation.model_dump(include=set(CSV_FIELDS)))
+            else:
+                f.write(annotation.model_dump_json(exclude_none=True) + "\n")
+            count += 1
+    return count
+
+
+@dataclass
+class AnnotationSyncReport:
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+
+
+class AnnotationSync:
+    """Makes the annotations of an app match a desired set with concurrent create, update and delete calls.
+
+    The existing annotations are paged once from `list` and indexed by id and by question. A desired
+    annotation with a known id, or else the same question, is updated when its question or answer differs;
+    other desired annotations are created. With `delete_missing`, existing annotations that no desired
+    annotation matched are deleted afterwards.
+
+    Chat, chatflow and completion apps serve the same annotation endpoints, so one `Annotation` resource
+    works for any app; the request option selects the app through its API key. To migrate between apps,
+    run the sync of the target app on `AnnotationSync(annotation, source_option).existing()`.
+    """
+
+    def __init__(
+        self,
+        annotation: Annotation,
+        request_option: RequestOption,
+        *,
+        max_concurrency: int = 8,
+        delete_missing: bool = False,
+        page_size: int = 100,
+    ) -> None:
+        self.annotation = annotation
+        self.request_option = request_option
+        self.max_concurrency = max_concurrency
+        self.delete_missing = delete_missing
+        self.page_size = page_size
+
+    def existing(self) -> Iterator[AnnotationInfo]:
+        """Page through the annotations of the app."""
+        page = 1
+        while True:
+            request = ListAnnotationsRequest.builder().page(page).limit(self.page_size).build()
+            response = self.annotation.list(request, self.request_option)
+            if not response.success:
+                raise RuntimeError(f"failed to list annotations: {response.msg}")
+            yield from response.data
+            if not response.has_more or not response.data:
+                return
+            page += 1
+
+    def export(self, path: str) -> int:
+        """Write every annotation of the app to a CSV or JSONL file."""
+        return write_annotations(path, self.existing())
+
+    def run(self, desired: Iterable[AnnotationInfo] | str) -> AnnotationSyncReport:
+        """Sync the app to the desired annotations; a path streams them from a CSV or JSONL file."""
+        if isinstance(desired, str):
+            desired = read_annotations(desired)
+        by_id: dict[str, AnnotationInfo] = {}
+        by_question: dict[str, str] = {}
+        for annotation in self.existing():
+            if annotation.id:
+                by_id[annotation.id] = annotation
+                by_question.setdefault(annotation.question or "", annotation.id)
+        unmatched = set(by_id)
+
+        report = AnnotationSyncReport()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            inflight: dict[Future, tuple[str, str]] = {}
+
+            def submit(action: str, key: str, future: Future) -> None:
+                while len(inflight) >= self.max_concurrency * 2:
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for finished in done:
+                        self._apply(*inflight.pop(finished), finished, report)
+                inflight[future] = (action, key)
+
+            for annotation in desired:
+                match_id = annotation.id if annotation.id in by_id else by_question.get(annotation.question or "")
+                current = by_id.get(match_id) if match_id else None
+                if current is None:
+                    submit("create", annotation.question or "", executor.submit(self._create, annotation))
+                    continue
+                unmatched.discard(current.id or "")
+                if (current.question, current.answer) == (annotation.question, annotation.answer):
+                    report.unchanged += 1
+                    continue
+                submit("update", current.id or "", executor.submit(self._update, current.id or "", annotation))
+
+            if self.delete_missing:
+                for annotation_id in unmatched:
+                    submit("delete", annotation_id, executor.submit(self._delete, annotation_id))
+
+            for future in list(inflight):
+                self._apply(*inflight.pop(future), future, report)
+        return report
+
+    @staticmethod
+    def _apply(action: str, key: str, future: Future, report: AnnotationSyncReport) -> None:
+        try:
+            response = future.result()
+            error = None if response.success else (response.msg or response.code or "unknown error")
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+        if error is not None:
+            logger.warning(f"annotation {action} of {key} failed: {error}")
+            report.failures[f"{action}:{key}"] = error
+        elif action == "create":
+            report.created += 1
+        elif action == "update":
+            report.updated += 1
+        else:
+            report.deleted += 1
+
+    def _create(self, annotation: AnnotationInfo) -> BaseResponse:
+        body = CreateAnnotationRequestBody(question=annotation.question or "", answer=annotation.answer or "")
+        request = CreateAnnotationRequest.builder().request_body(body).build()
+        return self.annotation.create(request, self.request_option)
+
+    def _update(self, annotation_id: str, annotation: AnnotationInfo) -> BaseResponse:
+        body = UpdateAnnotationRequestBody(question=annotation.question or "", answer=annotation.answer or "")
+        request = UpdateAnnotationRequest.builder().annotation_id(annotation_id).request_body(body).build()
+        return self.annotation.update(request, self.request_option)
+
+    def _delete(self, annotation_id: str) -> BaseResponse:
+        request = DeleteAnnotationRequest.builder().annotation_id(annotation_id).build()
+        return self.annotation.delete(request, self.request_option)
+
+
+class AnnotationJobWatcher:
+    """Polls annotation-reply jobs with exponential backoff until they complete or fail.
+
+    Raises `TimeoutError` when a job is still running after `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        annotation: Annotation,
+        request_option: RequestOption,
+        *,
+        min_interval: float = 0.5,
+        max_interval: float = 10.0,
+        backoff: float = 1.5,
+        timeout: float | None = 300.0,
+    ) -> None:
+        self.annotation = annotation
+        self.request_option = request_option
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def configure(
+        self, action: AnnotationAction, request_body: ConfigureAnnotationReplyRequestBody
+    ) -> GetAnnotationReplyStatusResponse:
+        """Enable or disable annotation reply and wait for the job to finish."""
+        request = ConfigureAnnotationReplyRequest.builder().action(action).request_body(request_body).build()
+        response = self.annotation.configure(request, self.request_option)
+        if not response.success or not response.job_id:
+            raise RuntimeError(f"failed to {action} annotation reply: {response.msg}")
+        return self.wait(action, response.job_id)
+
+    async def aconfigure(
+        self, action: AnnotationAction, request_body: ConfigureAnnotationReplyRequestBody
+    ) -> GetAnnotationReplyStatusResponse:
+        """Async version of configure."""
+        request = ConfigureAnnotationReplyRequest.builder().action(action).request_body(request_body).build()
+        response = await self.annotation.aconfigure(request, self.request_option)
+        if not response.success or not response.job_id:
+            raise RuntimeError(f"failed to {action} annotation reply: {response.msg}")
+        return await self.await_job(action, response.job_id)
+
+    def wait(self, action: AnnotationAction, job_id: str) -> GetAnnotationReplyStatusResponse:
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        interval = self.min_interval
+        while True:
+            response = self.annotation.status(self._status_request(action, job_id), self.request_option)
+            if self._finished(response):
+                return response
+            time.sleep(self._bounded(interval, deadline, job_id))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    async def await_job(self, action: AnnotationAction, job_id: str) -> GetAnnotationReplyStatusResponse:
+        """Async version of wait."""
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        interval = self.min_interval
+        while True:
+            response = await self.annotation.astatus(self._status_request(action, job_id), self.request_option)
+            if self._finished(response):
+                return response
+            await asyncio.sleep(self._bounded(interval, deadline, job_id))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    @staticmethod
+    def _status_request(action: AnnotationAction, job_id: str) -> GetAnnotationReplyStatusRequest:
+        return GetAnnotationReplyStatusRequest.builder().action(action).job_id(job_id).build()
+
+    @staticmethod
+    def _finished(response: GetAnnotationReplyStatusResponse) -> bool:
+        if not response.success:
+            raise RuntimeError(f"failed to get annotation reply job status: {response.msg}")
+        return response.job_status in TERMINAL_JOB_STATUSES
+
+    def _bounded(self, interval: float, deadline: float | None, job_id: str) -> float:
+        if deadline is None:
+            return interval
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"annotation reply job {job_id} did not finish in {self.timeout}s")
+        return min(interval, remaining)
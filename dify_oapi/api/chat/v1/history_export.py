@@ -0,0 +1,260 @@
+"""Sharded export of conversations and message histories to NDJSON."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import IO, Any
+
+from dify_oapi.core.log import logger
+from dify_oapi.core.model.request_option import RequestOption
+
+from .model.conversation_info import ConversationInfo
+from .model.get_conversation_list_request import GetConversationsListRequest
+from .model.message_history_request import GetMessageHistoryRequest
+from .model.message_info import MessageInfo
+from .resource.conversation import Conversation
+
+
+@dataclass
+class HistoryExportReport:
+    """Counters of an export run; `skipped_messages` counts messages exported by a previous run."""
+
+    users: int = 0
+    conversations: int = 0
+    messages: int = 0
+    skipped_messages: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+
+
+class HistoryExportState:
+    """SQLite state of a history export: per-user `updated_at` watermarks, exported message ids and the
+    conversations whose history was exported to the end."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS users (app TEXT NOT NULL, user TEXT NOT NULL, updated_at INTEGER, "
+            "PRIMARY KEY (app, user))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS messages (id TEXT PRIMARY KEY)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations (app TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (app, id))"
+        )
+        self._conn.commit()
+
+    def watermark(self, app: str, user: str) -> int | None:
+        with self._lock:
+            row = self._conn.execute("SELECT updated_at FROM users WHERE app = ? AND user = ?", (app, user)).fetchone()
+        return row[0] if row else None
+
+    def complete_user(self, app: str, user: str, updated_at: int | None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO users (app, user, updated_at) VALUES (?, ?, ?)", (app, user, updated_at)
+            )
+            self._conn.commit()
+
+    def exported(self, message_ids: list[str]) -> set[str]:
+        if not message_ids:
+            return set()
+        placeholders = ",".join("?" * len(message_ids))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id FROM messages WHERE id IN ({placeholders})", message_ids).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_exported(self, message_ids: list[str]) -> None:
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO messages (id) VALUES (?)", [(i,) for i in message_ids])
+            self._conn.commit()
+
+    def conversation_complete(self, app: str, conversation_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM conversations WHERE app = ? AND id = ?", (app, conversation_id)
+            ).fetchone()
+        return row is not None
+
+    def complete_conversation(self, app: str, conversation_id: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO conversations (app, id) VALUES (?, ?)", (app, conversation_id))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class HistoryExporter:
+    """Crawls the conversations and message histories of many users of many apps concurrently.
+
+    `apps` maps an app name to the request option carrying its API key; chatflow apps serve the same
+    `/v1/conversations` and `/v1/messages` endpoints and are exported the same way. Each (app, user) pair is
+    one task; its records are appended, page by page, to one of `shards` NDJSON files in `output_dir`.
+
+    Every line is `{"type": "conversation" | "message", "app": ..., "user": ..., "data": {...}}`. Once a user
+    is done, the newest conversation `updated_at` is checkpointed; a rerun only crawls conversations updated
+    since then (or since `updated_after`) and skips message ids that were already exported.
+    """
+
+    def __init__(
+        self,
+        conversation: Conversation,
+        apps: Mapping[str, RequestOption],
+        output_dir: str,
+        *,
+        updated_after: int | None = None,
+        shards: int = 16,
+        max_concurrency: int = 8,
+        page_size: int = 100,
+        state_path: str | None = None,
+    ) -> None:
+        self.conversation = conversation
+        self.apps = dict(apps)
+        self.output_dir = output_dir
+        self.updated_after = updated_after
+        self.shards = shards
+        self.max_concurrency = max_concurrency
+        self.page_size = page_size
+        os.makedirs(output_dir, exist_ok=True)
+        self.state = HistoryExportState(state_path or os.path.join(output_dir, "state.db"))
+        self._files: dict[int, IO[str]] = {}
+        self._shard_locks = [threading.Lock() for _ in range(shards)]
+        self._files_lock = threading.Lock()
+
+    def run(self, users: Iterable[str]) -> HistoryExportReport:
+        report = HistoryExportReport()
+        report_lock = threading.Lock()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                inflight: dict[Future, str] = {}
+                for app, user in self._tasks(users):
+                    while len(inflight) >= self.max_concurrency * 2:
+                        done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._finished(inflight.pop(future), future, report)
+                    inflight[executor.submit(self._export_user, app, user, report, report_lock)] = f"{app}:{user}"
+                for future in list(inflight):
+                    future.exception()
+                    self._finished(inflight.pop(future), future, report)
+        finally:
+            with self._files_lock:
+                for f in self._files.values():
+                    f.close()
+                self._files.clear()
+        return report
+
+    def close(self) -> None:
+        self.state.close()
+
+    def _tasks(self, users: Iterable[str]) -> Iterator[tuple[str, str]]:
+        for user in users:
+            for app in self.apps:
+                yield app, user
+
+    @staticmethod
+    def _finished(task: str, future: Future, report: HistoryExportReport) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"history export of {task} failed: {error}")
+            report.failures[task] = f"{error.__class__.__name__}: {error}"
+        else:
+            report.users += 1
+
+    def _export_user(self, app: str, user: str, report: HistoryExportReport, report_lock: threading.Lock) -> None:
+        request_option = self.apps[app]
+        watermark = self.state.watermark(app, user)
+        since = max(filter(None, (watermark, self.updated_after)), default=None)
+        newest = watermark
+        shard = zlib.crc32(f"{app}:{user}".encode()) % self.shards
+        for conversation in self._conversations(app, user, request_option, since):
+            self._write(shard, [_record("conversation", app, user, conversation)])
+            messages, skipped = self._export_messages(app, user, conversation.id or "", request_option, shard)
+            if conversation.updated_at is not None and (newest is None or conversation.updated_at > newest):
+                newest = conversation.updated_at
+            with report_lock:
+                report.conversations += 1
+                report.messages += messages
+                report.skipped_messages += skipped
+        self.state.complete_user(app, user, newest)
+
+    def _conversations(
+        self, app: str, user: str, request_option: RequestOption, since: int | None
+    ) -> Iterator[ConversationInfo]:
+        last_id = None
+        while True:
+            builder = GetConversationsListRequest.builder().user(user).limit(self.page_size).sort_by("-updated_at")
+            if last_id:
+                builder.last_id(last_id)
+            response = self.conversation.list(builder.build(), request_option)
+            if not response.success:
+                raise RuntimeError(f"failed to list conversations of {app}:{user}: {response.msg}")
+            conversations = response.data or []
+            for conversation in conversations:
+                # Newest first, so everything after this was already exported
+                if since is not None and conversation.updated_at is not None and conversation.updated_at <= since:
+                    return
+                yield conversation
+            if not response.has_more or not conversations:
+                return
+            last_id = conversations[-1].id
+
+    def _export_messages(
+        self, app: str, user: str, conversation_id: str, request_option: RequestOption, shard: int
+    ) -> tuple[int, int]:
+        written = skipped = 0
+        first_id = None
+        complete = self.state.conversation_complete(app, conversation_id)
+        while True:
+            builder = (
+                GetMessageHistoryRequest.builder().conversation_id(conversation_id).user(user).limit(self.page_size)
+            )
+            if first_id:
+                builder.first_id(first_id)
+            response = self.conversation.history(builder.build(), request_option)
+            if not response.success:
+                raise RuntimeError(f"failed to fetch messages of conversation {conversation_id}: {response.msg}")
+            messages: list[MessageInfo] = response.data or []
+            ids = [message.id for message in messages if message.id]
+            known = self.state.exported(ids)
+            fresh = [message for message in messages if message.id not in known]
+            if fresh:
+                self._write(shard, [_record("message", app, user, message) for message in fresh])
+                self.state.mark_exported([message.id for message in fresh if message.id])
+            written += len(fresh)
+            skipped += len(messages) - len(fresh)
+            if not response.has_more or not messages:
+                self.state.complete_conversation(app, conversation_id)
+                return written, skipped
+            # Pages go back in time; once a run got to the end of the conversation, a page without new
+            # messages means the older ones were exported before
+            if complete and not fresh:
+                return written, skipped
+            first_id = messages[0].id
+
+    def _write(self, shard: int, lines: list[str]) -> None:
+        with self._shard_locks[shard]:
+            f = self._shard_file(shard)
+            f.write("".join(lines))
+            f.flush()
+
+    def _shard_file(self, shard: int) -> IO[str]:
+        with self._files_lock:
+            f = self._files.get(shard)
+            if f is None:
+                path = os.path.join(self.output_dir, f"history-{shard:05d}.ndjson")
+                f = self._files[shard] = open(path, "a", encoding="utf-8")
+            return f
+
+
+def _record(type_: str, app: str, user: str, item: Any) -> str:
+    data = item.model_dump(mode="json", exclude_none=True)
+    return json.dumps({"type": type_, "app": app, "user": user, "data": data}, ensure_ascii=False) + "\n"
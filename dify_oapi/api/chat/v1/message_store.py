@@ -0,0 +1,366 @@
+"""Local mirror of conversation message histories."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
+from dataclasses import dataclass, field
+from typing import Any
+
+from dify_oapi.core.cache import CacheStats, DiskCache
+
+from .model.chat_request import ChatRequest
+from .model.chat_response import ChatResponse
+from .model.message_history_request import GetMessageHistoryRequest
+from .model.message_history_response import GetMessageHistoryResponse
+from .model.message_info import MessageInfo
+
+# Page size of /v1/messages when no limit is given
+DEFAULT_LIMIT = 20
+
+_HistoryPlan = Generator[GetMessageHistoryRequest, GetMessageHistoryResponse, GetMessageHistoryResponse]
+
+
+@dataclass
+class _StoredConversation:
+    user: str
+    messages: list[dict[str, Any]]  # Oldest first
+    complete: bool  # The first message of the conversation is stored
+    synced_at: float | None = None
+    size: int = 0
+    ids: dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.ids = {message["id"]: i for i, message in enumerate(self.messages) if message.get("id")}
+        self.size = sum(_message_size(message) for message in self.messages)
+
+
+class MessageStore:
+    """Caches message histories per conversation and serves `Conversation.history` pages locally.
+
+    Reading the newest page fetches only the messages newer than the last stored one, at most once per
+    `refresh_after` seconds; older pages are served from the store and fetched only where it has a gap.
+    Messages of chats sent through the same client, streaming or blocking, are appended as they finish,
+    which also counts as a refresh.
+
+    Conversations are evicted least recently used first once there are more than `max_conversations`
+    or they hold more than `max_bytes` of encoded messages. With `path`, histories are also persisted to
+    a SQLite file and reloaded after restarts; reloaded conversations are refreshed on first read.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_conversations: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        path: str | None = None,
+        refresh_after: float | None = 30.0,
+        page_size: int = 100,
+    ) -> None:
+        self.max_conversations = max_conversations
+        self.max_bytes = max_bytes
+        self.refresh_after = refresh_after
+        self.page_size = page_size
+        self.stats = CacheStats()
+        self._disk = DiskCache(path, max_entries=max(max_conversations, 100_000), ttl=None) if path else None
+        self._conversations: OrderedDict[str, _StoredConversation] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    @property
+    def size(self) -> int:
+        """Encoded size in bytes of the messages held in memory."""
+        return self._bytes
+
+    def history(
+        self,
+        request: GetMessageHistoryRequest,
+        fetch: Callable[[GetMessageHistoryRequest], GetMessageHistoryResponse],
+    ) -> GetMessageHistoryResponse:
+        """Serve a history page, calling `fetch` only for messages the store does not have."""
+        plan = self._plan(request)
+        fetched = 0
+        try:
+            page_request = next(plan)
+            while True:
+                fetched += 1
+                page_request = plan.send(fetch(page_request))
+        except StopIteration as stop:
+            self._count(fetched)
+            response: GetMessageHistoryResponse = stop.value
+            return response
+
+    async def ahistory(
+        self,
+        request: GetMessageHistoryRequest,
+        fetch: Callable[[GetMessageHistoryRequest], Awaitable[GetMessageHistoryResponse]],
+    ) -> GetMessageHistoryResponse:
+        """Async version of history."""
+        plan = self._plan(request)
+        fetched = 0
+        try:
+            page_request = next(plan)
+            while True:
+                fetched += 1
+                page_request = plan.send(await fetch(page_request))
+        except StopIteration as stop:
+            self._count(fetched)
+            response: GetMessageHistoryResponse = stop.value
+            return response
+
+    def observe(self, request: ChatRequest, stream: Generator[bytes, None, None]) -> Generator[bytes, None, None]:
+        """Pass a streaming chat through and store its message once `message_end` was received."""
+        recorder = _StreamRecorder()
+        for chunk in stream:
+            recorder.feed(chunk)
+            yield chunk
+        self._record_stream(request, recorder)
+
+    async def aobserve(self, request: ChatRequest, stream: AsyncGenerator[bytes, None]) -> AsyncGenerator[bytes, None]:
+        """Async version of observe."""
+        recorder = _StreamRecorder()
+        async for chunk in stream:
+            recorder.feed(chunk)
+            yield chunk
+        self._record_stream(request, recorder)
+
+    def record_chat(self, request: ChatRequest, response: ChatResponse) -> None:
+        """Store the message of a blocking chat response."""
+        if not response.success or not (response.message_id or response.id) or not response.conversation_id:
+            return
+        message: dict[str, Any] = {
+            "id": response.message_id or response.id,
+            "conversation_id": response.conversation_id,
+            "answer": response.answer,
+            "created_at": response.created_at,
+        }
+        if response.metadata is not None and response.metadata.retriever_resources:
+            message["retriever_resources"] = [
+                resource.model_dump(mode="json", exclude_none=True)
+                for resource in response.metadata.retriever_resources
+            ]
+        self._record(request, message)
+
+    def invalidate(self, conversation_id: str) -> None:
+        with self._lock:
+            stored = self._conversations.pop(conversation_id, None)
+            if stored is not None:
+                self._bytes -= stored.size
+                self.stats.invalidations += 1
+        if self._disk is not None:
+            self._disk.delete(conversation_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conversations.clear()
+            self._bytes = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+    def _count(self, fetched: int) -> None:
+        with self._lock:
+            if fetched:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+
+    def _plan(self, request: GetMessageHistoryRequest) -> _HistoryPlan:
+        """Yield the requests to send and receive their responses; return the page to serve."""
+        conversation_id, user = request.conversation_id, request.user
+        if not conversation_id or not user:
+            return (yield request)
+        limit = request.limit or DEFAULT_LIMIT
+        stored = self._get(conversation_id, user)
+
+        if request.first_id is None and (stored is None or self._stale(stored)):
+            pages: list[list[dict[str, Any]]] = []
+            newest_id = stored.messages[-1].get("id") if stored is not None and stored.messages else None
+            cursor = None
+            while True:
+                response = yield self._page_request(conversation_id, user, cursor, max(limit, self.page_size))
+                if not response.success:
+                    return response
+                page = [_dump(message) for message in response.data or []]
+                pages.append(page)
+                if stored is None or not page or not response.has_more:
+                    break
+                # Stop going back once the newest stored message is reached
+                if any(message.get("id") == newest_id for message in page):
+                    break
+                cursor = page[0].get("id")
+            stored = self._merge_newest(conversation_id, user, stored, pages, complete=not response.has_more)
+        elif stored is None or (request.first_id is not None and request.first_id not in stored.ids):
+            return (yield request)
+
+        while True:
+            served = self._serve(stored, request.first_id, limit)
+            if served is not None:
+                return served
+            oldest_id = stored.messages[0]["id"]
+            response = yield self._page_request(conversation_id, user, oldest_id, max(limit, self.page_size))
+            if not response.success:
+                return response
+            page = [_dump(message) for message in response.data or []]
+            stored = self._merge_older(conversation_id, stored, page, complete=not response.has_more)
+
+    def _serve(self, stored: _StoredConversation, first_id: str | None, limit: int) -> GetMessageHistoryResponse | None:
+        end = len(stored.messages) if first_id is None else stored.ids[first_id]
+        start = max(0, end - limit)
+        if start == 0 and end < limit and not stored.complete and stored.messages:
+            return None
+        data = [MessageInfo.model_validate(message) for message in stored.messages[start:end]]
+        return GetMessageHistoryResponse(limit=limit, has_more=start > 0 or not stored.complete, data=data)
+
+    def _stale(self, stored: _StoredConversation) -> bool:
+        if stored.synced_at is None:
+            return True
+        return self.refresh_after is not None and time.monotonic() - stored.synced_at >= self.refresh_after
+
+    @staticmethod
+    def _page_request(conversation_id: str, user: str, first_id: str | None, limit: int) -> GetMessageHistoryRequest:
+        builder = GetMessageHistoryRequest.builder().conversation_id(conversation_id).user(user).limit(limit)
+        if first_id:
+            builder.first_id(first_id)
+        return builder.build()
+
+    def _merge_newest(
+        self,
+        conversation_id: str,
+        user: str,
+        stored: _StoredConversation | None,
+        pages: list[list[dict[str, Any]]],
+        *,
+        complete: bool,
+    ) -> _StoredConversation:
+        # Pages were fetched newest first, each page is in chronological order
+        fetched = [message for page in reversed(pages) for message in page]
+        if stored is None or not any(message.get("id") in stored.ids for message in fetched):
+            return self._put(conversation_id, _StoredConversation(user, fetched, complete, time.monotonic()))
+
+        messages = list(stored.messages)
+        for message in fetched:
+            index = stored.ids.get(message.get("id", ""))
+            if index is None:
+                messages.append(message)
+            else:
+                messages[index] = message
+        return self._put(conversation_id, _StoredConversation(user, messages, stored.complete, time.monotonic()))
+
+    def _merge_older(
+        self, conversation_id: str, stored: _StoredConversation, page: list[dict[str, Any]], *, complete: bool
+    ) -> _StoredConversation:
+        older = [message for message in page if message.get("id") not in stored.ids]
+        # A page without unknown messages reached the start of the conversation
+        complete = complete or not older
+        updated = _StoredConversation(stored.user, older + stored.messages, complete, stored.synced_at)
+        return self._put(conversation_id, updated)
+
+    def _record_stream(self, request: ChatRequest, recorder: _StreamRecorder) -> None:
+        if recorder.message is not None:
+            self._record(request, recorder.message)
+
+    def _record(self, request: ChatRequest, message: dict[str, Any]) -> None:
+        body = request.request_body
+        if body is None or not body.user:
+            return
+        message = {"query": body.query, "inputs": body.inputs, **message}
+        message = {key: value for key, value in message.items() if value is not None}
+        conversation_id = message["conversation_id"]
+        if not body.conversation_id:
+            # A new conversation: its whole history is this message
+            self._put(conversation_id, _StoredConversation(body.user, [message], True, time.monotonic()))
+            return
+        stored = self._get(conversation_id, body.user)
+        if stored is None or message["id"] in stored.ids:
+            return
+        updated = _StoredConversation(body.user, [*stored.messages, message], stored.complete, time.monotonic())
+        self._put(conversation_id, updated)
+
+    def _get(self, conversation_id: str, user: str) -> _StoredConversation | None:
+        with self._lock:
+            stored = self._conversations.get(conversation_id)
+            if stored is not None:
+                self._conversations.move_to_end(conversation_id)
+        if stored is None and self._disk is not None:
+            payload = self._disk.get(conversation_id)
+            if payload is not None:
+                stored = _StoredConversation(payload["user"], payload["messages"], payload["complete"])
+                self._put(conversation_id, stored, persist=False)
+        # Never serve a conversation to another user
+        if stored is None or stored.user != user:
+            return None
+        return stored
+
+    def _put(self, conversation_id: str, stored: _StoredConversation, *, persist: bool = True) -> _StoredConversation:
+        with self._lock:
+            previous = self._conversations.pop(conversation_id, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._conversations[conversation_id] = stored
+            self._bytes += stored.size
+            while len(self._conversations) > 1 and (
+                len(self._conversations) > self.max_conversations or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._conversations.popitem(last=False)
+                self._bytes -= evicted.size
+                self.stats.evictions += 1
+        if persist and self._disk is not None:
+            payload = {"user": stored.user, "messages": stored.messages, "complete": stored.complete}
+            self._disk.set(conversation_id, payload)
+        return stored
+
+
+class _StreamRecorder:
+    """Rebuilds the message of a streaming chat from its server-sent events."""
+
+    def __init__(self) -> None:
+        self.message: dict[str, Any] | None = None
+        self._buffer = b""
+        self._answer: list[str] = []
+        self._fields: dict[str, Any] = {}
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue
+            try:
+                event = json.loads(line[5:])
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                self._handle(event)
+
+    def _handle(self, event: dict[str, Any]) -> None:
+        kind = event.get("event")
+        for key in ("conversation_id", "created_at"):
+            if event.get(key) is not None:
+                self._fields.setdefault(key, event[key])
+        if kind in ("message", "agent_message"):
+            self._answer.append(event.get("answer") or "")
+        elif kind == "message_replace":
+            self._answer = [event.get("answer") or ""]
+        elif kind == "message_end":
+            message_id = event.get("message_id") or event.get("id")
+            if not message_id or "conversation_id" not in self._fields:
+                return
+            self.message = {"id": message_id, "answer": "".join(self._answer), **self._fields}
+            resources = (event.get("metadata") or {}).get("retriever_resources")
+            if resources:
+                self.message["retriever_resources"] = resources
+
+
+def _dump(message: MessageInfo) -> dict[str, Any]:
+    return message.model_dump(mode="json", exclude_none=True)
+
+
+def _message_size(message: dict[str, Any]) -> int:
+    return len(json.dumps(message, ensure_ascii=False).encode())
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 
 from .chat_types import FileType, TransferMethod
 
@@ -12,6 +12,8 @@ class ChatFile(BaseModel):
     transfer_method: TransferMethod | None = None
     url: HttpUrl | None = None
     upload_file_id: str | None = None
+    # Local file uploaded, or reused from the upload cache, by `Chat.chat` before the request is sent
+    path: str | None = Field(default=None, exclude=True)
 
     @classmethod
     def builder(cls) -> ChatFileBuilder:
@@ -44,10 +46,20 @@ class ChatFileBuilder:
         self._chat_file.upload_file_id = upload_file_id
         return self
 
+    def local_path(self, path: str) -> ChatFileBuilder:
+        """Set a local file to upload when the chat message is sent."""
+        self._chat_file.transfer_method = "local_file"
+        self._chat_file.path = path
+        return self
+
     def build(self) -> ChatFile:
         """Build the ChatFile instance."""
         if self._chat_file.transfer_method == "remote_url" and self._chat_file.url is None:
             raise ValueError("URL is required when transfer_method is 'remote_url'")
-        if self._chat_file.transfer_method == "local_file" and self._chat_file.upload_file_id is None:
-            raise ValueError("upload_file_id is required when transfer_method is 'local_file'")
+        if (
+            self._chat_file.transfer_method == "local_file"
+            and self._chat_file.upload_file_id is None
+            and self._chat_file.path is None
+        ):
+            raise ValueError("upload_file_id or local_path is required when transfer_method is 'local_file'")
         return self._chat_file
@@ -7,6 +7,8 @@ from .chat_request_body import ChatRequestBody
 
 
 class ChatRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: ChatRequestBody | None = None
@@ -25,7 +27,7 @@ class ChatRequestBuilder:
 
     def request_body(self, request_body: ChatRequestBody) -> ChatRequestBuilder:
         self._chat_request.request_body = request_body
-        self._chat_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._chat_request.body = request_body
         return self
 
     def build(self) -> ChatRequest:
@@ -6,6 +6,8 @@ from .configure_annotation_reply_request_body import ConfigureAnnotationReplyReq
 
 
 class ConfigureAnnotationReplyRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: ConfigureAnnotationReplyRequestBody | None = None
@@ -30,7 +32,7 @@ class ConfigureAnnotationReplyRequestBuilder:
         self, request_body: ConfigureAnnotationReplyRequestBody
     ) -> "ConfigureAnnotationReplyRequestBuilder":
         self._configure_annotation_reply_request.request_body = request_body
-        self._configure_annotation_reply_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._configure_annotation_reply_request.body = request_body
         return self
 
     def build(self) -> ConfigureAnnotationReplyRequest:
@@ -5,6 +5,8 @@ from .create_annotation_request_body import CreateAnnotationRequestBody
 
 
 class CreateAnnotationRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: CreateAnnotationRequestBody | None = None
@@ -23,7 +25,7 @@ class CreateAnnotationRequestBuilder:
 
     def request_body(self, request_body: CreateAnnotationRequestBody) -> "CreateAnnotationRequestBuilder":
         self._create_annotation_request.request_body = request_body
-        self._create_annotation_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._create_annotation_request.body = request_body
         return self
 
     def build(self) -> CreateAnnotationRequest:
@@ -3,6 +3,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class DeleteAnnotationRequest(BaseRequest):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__()
 
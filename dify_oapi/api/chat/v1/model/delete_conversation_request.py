@@ -7,6 +7,8 @@ from .delete_conversation_request_body import DeleteConversationRequestBody
 
 
 class DeleteConversationRequest(BaseRequest):
+    __slots__ = ("conversation_id", "request_body")
+
     def __init__(self):
         super().__init__()
         self.conversation_id: str | None = None
@@ -26,7 +28,7 @@ class DeleteConversationRequestBuilder:
 
     def request_body(self, request_body: DeleteConversationRequestBody) -> DeleteConversationRequestBuilder:
         self._delete_conversation_request.request_body = request_body
-        self._delete_conversation_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._delete_conversation_request.body = request_body
         return self
 
     def conversation_id(self, conversation_id: str) -> DeleteConversationRequestBuilder:
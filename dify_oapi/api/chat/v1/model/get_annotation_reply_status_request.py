@@ -5,6 +5,8 @@ from .chat_types import AnnotationAction
 
 
 class GetAnnotationReplyStatusRequest(BaseRequest):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__()
 
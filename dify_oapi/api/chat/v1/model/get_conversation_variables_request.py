@@ -5,6 +5,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetConversationVariablesRequest(BaseRequest):
+    __slots__ = ("conversation_id", "user", "last_id", "limit", "variable_name")
+
     def __init__(self):
         super().__init__()
         self.conversation_id: str | None = None
@@ -6,6 +6,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetConversationsRequest(BaseRequest):
+    __slots__ = ("user", "last_id", "limit", "sort_by")
+
     def __init__(self):
         super().__init__()
         self.user: str | None = None
@@ -5,6 +5,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetSuggestedQuestionsRequest(BaseRequest):
+    __slots__ = ("message_id", "user")
+
     def __init__(self) -> None:
         super().__init__()
         self.message_id: str | None = None
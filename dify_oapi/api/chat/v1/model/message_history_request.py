@@ -5,6 +5,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetMessageHistoryRequest(BaseRequest):
+    __slots__ = ("conversation_id", "user", "first_id", "limit")
+
     def __init__(self):
         super().__init__()
         self.conversation_id: str | None = None
@@ -7,6 +7,8 @@ from .rename_conversation_request_body import RenameConversationRequestBody
 
 
 class RenameConversationRequest(BaseRequest):
+    __slots__ = ("conversation_id", "request_body")
+
     def __init__(self):
         super().__init__()
         self.conversation_id: str | None = None
@@ -29,7 +31,7 @@ class RenameConversationRequestBuilder:
 
     def request_body(self, request_body: RenameConversationRequestBody) -> RenameConversationRequestBuilder:
         self._rename_conversation_request.request_body = request_body
-        self._rename_conversation_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._rename_conversation_request.body = request_body
         return self
 
     def conversation_id(self, conversation_id: str) -> RenameConversationRequestBuilder:
@@ -7,6 +7,8 @@ from .stop_chat_request_body import StopChatRequestBody
 
 
 class StopChatRequest(BaseRequest):
+    __slots__ = ("task_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.task_id: str | None = None
@@ -31,7 +33,7 @@ class StopChatRequestBuilder:
 
     def request_body(self, request_body: StopChatRequestBody) -> StopChatRequestBuilder:
         self._stop_chat_request.request_body = request_body
-        self._stop_chat_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._stop_chat_request.body = request_body
         return self
 
     def build(self) -> StopChatRequest:
@@ -5,6 +5,8 @@ from .update_annotation_request_body import UpdateAnnotationRequestBody
 
 
 class UpdateAnnotationRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: UpdateAnnotationRequestBody | None = None
@@ -27,7 +29,7 @@ class UpdateAnnotationRequestBuilder:
 
     def request_body(self, request_body: UpdateAnnotationRequestBody) -> "UpdateAnnotationRequestBuilder":
         self._update_annotation_request.request_body = request_body
-        self._update_annotation_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_annotation_request.body = request_body
         return self
 
     def build(self) -> UpdateAnnotationRequest:
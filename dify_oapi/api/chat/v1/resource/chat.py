@@ -1,11 +1,18 @@
+import asyncio
+import copy
 from collections.abc import AsyncGenerator, Generator
 from typing import Literal, overload
 
+from dify_oapi.api.dify.v1.model.upload_file_response import UploadFileResponse
+from dify_oapi.api.dify.v1.resource.file import File
 from dify_oapi.core.http.transport import ATransport, Transport
 from dify_oapi.core.model.config import Config
 from dify_oapi.core.model.request_option import RequestOption
 
+from ..message_store import MessageStore
+from ..model.chat_file import ChatFile
 from ..model.chat_request import ChatRequest
+from ..model.chat_request_body import ChatRequestBody
 from ..model.chat_response import ChatResponse
 from ..model.get_suggested_questions_request import GetSuggestedQuestionsRequest
 from ..model.get_suggested_questions_response import GetSuggestedQuestionsResponse
@@ -39,9 +46,15 @@ class Chat:
         request_option: RequestOption,
         stream: bool = False,
     ) -> ChatResponse | Generator[bytes, None, None]:
+        request = self._upload_local_files(request, request_option)
+        store: MessageStore | None = getattr(self.config, "message_store", None)
         if stream:
-            return Transport.execute(self.config, request, stream=True, option=request_option)
-        return Transport.execute(self.config, request, unmarshal_as=ChatResponse, option=request_option)
+            chunks = Transport.execute(self.config, request, stream=True, option=request_option)
+            return store.observe(request, chunks) if store is not None else chunks
+        response = Transport.execute(self.config, request, unmarshal_as=ChatResponse, option=request_option)
+        if store is not None:
+            store.record_chat(request, response)
+        return response
 
     @overload
     async def achat(
@@ -65,9 +78,35 @@ class Chat:
         request_option: RequestOption,
         stream: bool = False,
     ) -> ChatResponse | AsyncGenerator[bytes, None]:
+        request = await self._aupload_local_files(request, request_option)
+        store: MessageStore | None = getattr(self.config, "message_store", None)
         if stream:
-            return await ATransport.aexecute(self.config, request, stream=True, option=request_option)
-        return await ATransport.aexecute(self.config, request, unmarshal_as=ChatResponse, option=request_option)
+            chunks = await ATransport.aexecute(self.config, request, stream=True, option=request_option)
+            return store.aobserve(request, chunks) if store is not None else chunks
+        response = await ATransport.aexecute(self.config, request, unmarshal_as=ChatResponse, option=request_option)
+        if store is not None:
+            store.record_chat(request, response)
+        return response
+
+    def _upload_local_files(self, request: ChatRequest, request_option: RequestOption) -> ChatRequest:
+        body = request.request_body
+        pending = _pending_files(body)
+        if body is None or not pending:
+            return request
+        file_ids = [
+            _uploaded_id(File(self.config).upload_path(f.path or "", body.user, request_option)) for f in pending
+        ]
+        return _with_file_ids(request, body, pending, file_ids)
+
+    async def _aupload_local_files(self, request: ChatRequest, request_option: RequestOption) -> ChatRequest:
+        body = request.request_body
+        pending = _pending_files(body)
+        if body is None or not pending:
+            return request
+        responses = await asyncio.gather(
+            *(File(self.config).aupload_path(f.path or "", body.user, request_option) for f in pending)
+        )
+        return _with_file_ids(request, body, pending, [_uploaded_id(response) for response in responses])
 
     def stop(self, request: StopChatRequest, request_option: RequestOption) -> StopChatResponse:
         return Transport.execute(self.config, request, unmarshal_as=StopChatResponse, option=request_option)
@@ -88,3 +127,30 @@ class Chat:
         return await ATransport.aexecute(
             self.config, request, unmarshal_as=GetSuggestedQuestionsResponse, option=request_option
         )
+
+
+def _uploaded_id(response: UploadFileResponse) -> str:
+    if not response.success or not response.id:
+        raise RuntimeError(f"failed to upload chat file: {response.msg}")
+    return response.id
+
+
+def _pending_files(body: ChatRequestBody | None) -> list[ChatFile]:
+    return [f for f in (body.files or []) if f.path and not f.upload_file_id] if body else []
+
+
+def _with_file_ids(
+    request: ChatRequest, body: ChatRequestBody, pending: list[ChatFile], file_ids: list[str]
+) -> ChatRequest:
+    """Copy of the request sending the uploaded ids; the caller's files keep their path, so each send resolves
+    them again through the upload cache"""
+    uploaded = {id(f): file_id for f, file_id in zip(pending, file_ids, strict=True)}
+    files = [
+        f.model_copy(update={"upload_file_id": uploaded[id(f)]}) if id(f) in uploaded else f for f in body.files or []
+    ]
+    sent = copy.copy(request)
+    sent.request_body = body.model_copy(update={"files": files})
+    sent.body = sent.request_body
+    # Content pre-encoded by a request template no longer matches the body
+    sent.content = None
+    return sent
@@ -2,6 +2,7 @@ from dify_oapi.core.http.transport import ATransport, Transport
 from dify_oapi.core.model.config import Config
 from dify_oapi.core.model.request_option import RequestOption
 
+from ..message_store import MessageStore
 from ..model.delete_conversation_request import DeleteConversationRequest
 from ..model.delete_conversation_response import DeleteConversationResponse
 from ..model.get_conversation_list_request import GetConversationsListRequest
@@ -29,14 +30,22 @@ class Conversation:
         )
 
     def history(self, request: GetMessageHistoryRequest, request_option: RequestOption) -> GetMessageHistoryResponse:
-        return Transport.execute(self.config, request, unmarshal_as=GetMessageHistoryResponse, option=request_option)
+        def fetch(req: GetMessageHistoryRequest) -> GetMessageHistoryResponse:
+            return Transport.execute(self.config, req, unmarshal_as=GetMessageHistoryResponse, option=request_option)
+
+        store: MessageStore | None = getattr(self.config, "message_store", None)
+        return store.history(request, fetch) if store is not None else fetch(request)
 
     async def ahistory(
         self, request: GetMessageHistoryRequest, request_option: RequestOption
     ) -> GetMessageHistoryResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=GetMessageHistoryResponse, option=request_option
-        )
+        async def fetch(req: GetMessageHistoryRequest) -> GetMessageHistoryResponse:
+            return await ATransport.aexecute(
+                self.config, req, unmarshal_as=GetMessageHistoryResponse, option=request_option
+            )
+
+        store: MessageStore | None = getattr(self.config, "message_store", None)
+        return await store.ahistory(request, fetch) if store is not None else await fetch(request)
 
     def variables(
         self, request: GetConversationVariablesRequest, request_option: RequestOption
@@ -53,14 +62,20 @@ class Conversation:
         )
 
     def delete(self, request: DeleteConversationRequest, request_option: RequestOption) -> DeleteConversationResponse:
-        return Transport.execute(self.config, request, unmarshal_as=DeleteConversationResponse, option=request_option)
+        response = Transport.execute(
+            self.config, request, unmarshal_as=DeleteConversationResponse, option=request_option
+        )
+        self._forget(request)
+        return response
 
     async def adelete(
         self, request: DeleteConversationRequest, request_option: RequestOption
     ) -> DeleteConversationResponse:
-        return await ATransport.aexecute(
+        response = await ATransport.aexecute(
             self.config, request, unmarshal_as=DeleteConversationResponse, option=request_option
         )
+        self._forget(request)
+        return response
 
     def rename(self, request: RenameConversationRequest, request_option: RequestOption) -> RenameConversationResponse:
         return Transport.execute(self.config, request, unmarshal_as=RenameConversationResponse, option=request_option)
@@ -71,3 +86,8 @@ class Conversation:
         return await ATransport.aexecute(
             self.config, request, unmarshal_as=RenameConversationResponse, option=request_option
         )
+
+    def _forget(self, request: DeleteConversationRequest) -> None:
+        store: MessageStore | None = getattr(self.config, "message_store", None)
+        if store is not None and request.conversation_id:
+            store.invalidate(request.conversation_id)
@@ -6,6 +6,8 @@ from .chatflow_types import AnnotationAction
 
 
 class AnnotationReplySettingsRequest(BaseRequest):
+    __slots__ = ("request_body", "action")
+
     def __init__(self):
         super().__init__()
         self.request_body: AnnotationReplySettingsRequestBody | None = None
@@ -33,5 +35,5 @@ class AnnotationReplySettingsRequestBuilder:
 
     def request_body(self, request_body: AnnotationReplySettingsRequestBody) -> "AnnotationReplySettingsRequestBuilder":
         self._annotation_reply_settings_request.request_body = request_body
-        self._annotation_reply_settings_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._annotation_reply_settings_request.body = request_body
         return self
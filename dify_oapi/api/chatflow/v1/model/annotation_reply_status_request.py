@@ -5,6 +5,8 @@ from .chatflow_types import AnnotationAction
 
 
 class AnnotationReplyStatusRequest(BaseRequest):
+    __slots__ = ("action", "job_id")
+
     def __init__(self):
         super().__init__()
         self.action: AnnotationAction | None = None
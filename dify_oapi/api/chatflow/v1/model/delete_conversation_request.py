@@ -5,6 +5,8 @@ from .delete_conversation_request_body import DeleteConversationRequestBody
 
 
 class DeleteConversationRequest(BaseRequest):
+    __slots__ = ("request_body", "conversation_id")
+
     def __init__(self):
         super().__init__()
         self.request_body: DeleteConversationRequestBody | None = None
@@ -32,5 +34,5 @@ class DeleteConversationRequestBuilder:
 
     def request_body(self, request_body: DeleteConversationRequestBody) -> "DeleteConversationRequestBuilder":
         self._delete_conversation_request.request_body = request_body
-        self._delete_conversation_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._delete_conversation_request.body = request_body
         return self
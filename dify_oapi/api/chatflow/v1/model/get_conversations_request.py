@@ -5,6 +5,8 @@ from .chatflow_types import SortBy
 
 
 class GetConversationsRequest(BaseRequest):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
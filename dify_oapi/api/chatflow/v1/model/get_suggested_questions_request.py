@@ -3,6 +3,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetSuggestedQuestionsRequest(BaseRequest):
+    __slots__ = ("message_id",)
+
     def __init__(self):
         super().__init__()
         self.message_id: str | None = None
@@ -5,6 +5,8 @@ from .rename_conversation_request_body import RenameConversationRequestBody
 
 
 class RenameConversationRequest(BaseRequest):
+    __slots__ = ("request_body", "conversation_id")
+
     def __init__(self):
         super().__init__()
         self.request_body: RenameConversationRequestBody | None = None
@@ -32,5 +34,5 @@ class RenameConversationRequestBuilder:
 
     def request_body(self, request_body: RenameConversationRequestBody) -> "RenameConversationRequestBuilder":
         self._rename_conversation_request.request_body = request_body
-        self._rename_conversation_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._rename_conversation_request.body = request_body
         return self
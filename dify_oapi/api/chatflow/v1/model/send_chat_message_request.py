@@ -5,6 +5,8 @@ from .send_chat_message_request_body import SendChatMessageRequestBody
 
 
 class SendChatMessageRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self):
         super().__init__()
         self.request_body: SendChatMessageRequestBody | None = None
@@ -26,5 +28,5 @@ class SendChatMessageRequestBuilder:
 
     def request_body(self, request_body: SendChatMessageRequestBody) -> "SendChatMessageRequestBuilder":
         self._send_chat_message_request.request_body = request_body
-        self._send_chat_message_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._send_chat_message_request.body = request_body
         return self
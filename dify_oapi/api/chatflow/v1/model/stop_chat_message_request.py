@@ -5,6 +5,8 @@ from .stop_chat_message_request_body import StopChatMessageRequestBody
 
 
 class StopChatMessageRequest(BaseRequest):
+    __slots__ = ("request_body", "task_id")
+
     def __init__(self):
         super().__init__()
         self.request_body: StopChatMessageRequestBody | None = None
@@ -32,5 +34,5 @@ class StopChatMessageRequestBuilder:
 
     def request_body(self, request_body: StopChatMessageRequestBody) -> "StopChatMessageRequestBuilder":
         self._stop_chat_message_request.request_body = request_body
-        self._stop_chat_message_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._stop_chat_message_request.body = request_body
         return self
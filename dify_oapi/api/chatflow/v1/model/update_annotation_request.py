@@ -5,6 +5,8 @@ from .update_annotation_request_body import UpdateAnnotationRequestBody
 
 
 class UpdateAnnotationRequest(BaseRequest):
+    __slots__ = ("request_body", "annotation_id")
+
     def __init__(self):
         super().__init__()
         self.request_body: UpdateAnnotationRequestBody | None = None
@@ -32,5 +34,5 @@ class UpdateAnnotationRequestBuilder:
 
     def request_body(self, request_body: UpdateAnnotationRequestBody) -> "UpdateAnnotationRequestBuilder":
         self._update_annotation_request.request_body = request_body
-        self._update_annotation_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_annotation_request.body = request_body
         return self
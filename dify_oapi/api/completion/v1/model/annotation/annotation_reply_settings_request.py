@@ -8,6 +8,8 @@ from .annotation_reply_settings_request_body import AnnotationReplySettingsReque
 
 
 class AnnotationReplySettingsRequest(BaseRequest):
+    __slots__ = ("action", "request_body")
+
     def __init__(self):
         super().__init__()
         self.action: AnnotationAction | None = None
@@ -35,5 +37,5 @@ class AnnotationReplySettingsRequestBuilder:
 
     def request_body(self, request_body: AnnotationReplySettingsRequestBody) -> AnnotationReplySettingsRequestBuilder:
         self._annotation_reply_settings_request.request_body = request_body
-        self._annotation_reply_settings_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._annotation_reply_settings_request.body = request_body
         return self
@@ -5,6 +5,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class DeleteAnnotationRequest(BaseRequest):
+    __slots__ = ("annotation_id",)
+
     def __init__(self):
         super().__init__()
         self.annotation_id: str | None = None
@@ -7,6 +7,8 @@ from ..completion.completion_types import AnnotationAction
 
 
 class QueryAnnotationReplyStatusRequest(BaseRequest):
+    __slots__ = ("action", "job_id")
+
     def __init__(self):
         super().__init__()
         self.action: AnnotationAction | None = None
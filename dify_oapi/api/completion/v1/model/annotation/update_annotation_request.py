@@ -7,6 +7,8 @@ from .update_annotation_request_body import UpdateAnnotationRequestBody
 
 
 class UpdateAnnotationRequest(BaseRequest):
+    __slots__ = ("annotation_id", "request_body")
+
     def __init__(self):
         super().__init__()
         self.annotation_id: str | None = None
@@ -34,5 +36,5 @@ class UpdateAnnotationRequestBuilder:
 
     def request_body(self, request_body: UpdateAnnotationRequestBody) -> UpdateAnnotationRequestBuilder:
         self._update_annotation_request.request_body = request_body
-        self._update_annotation_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_annotation_request.body = request_body
         return self
@@ -7,6 +7,8 @@ from .send_message_request_body import SendMessageRequestBody
 
 
 class SendMessageRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: SendMessageRequestBody | None = None
@@ -25,7 +27,7 @@ class SendMessageRequestBuilder:
 
     def request_body(self, request_body: SendMessageRequestBody) -> SendMessageRequestBuilder:
         self._send_message_request.request_body = request_body
-        self._send_message_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._send_message_request.body = request_body
         return self
 
     def build(self) -> SendMessageRequest:
@@ -7,6 +7,8 @@ from .stop_response_request_body import StopResponseRequestBody
 
 
 class StopResponseRequest(BaseRequest):
+    __slots__ = ("request_body", "task_id")
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: StopResponseRequestBody | None = None
@@ -29,7 +31,7 @@ class StopResponseRequestBuilder:
 
     def request_body(self, request_body: StopResponseRequestBody) -> StopResponseRequestBuilder:
         self._stop_response_request.request_body = request_body
-        self._stop_response_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._stop_response_request.body = request_body
         return self
 
     def task_id(self, task_id: str) -> StopResponseRequestBuilder:
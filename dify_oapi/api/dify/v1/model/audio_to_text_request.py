@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-from io import BytesIO
-
 from dify_oapi.core.enum import HttpMethod
+from dify_oapi.core.http.multipart import FileSource, default_file_name
 from dify_oapi.core.model.base_request import BaseRequest
 
 from .audio_to_text_request_body import AudioToTextRequestBody
 
 
 class AudioToTextRequest(BaseRequest):
+    __slots__ = ("file", "request_body")
+
     def __init__(self):
         super().__init__()
-        self.file: BytesIO | None = None
+        self.file: FileSource | None = None
         self.request_body: AudioToTextRequestBody | None = None
 
     @staticmethod
@@ -31,10 +32,11 @@ class AudioToTextRequestBuilder:
 
     def request_body(self, request_body: AudioToTextRequestBody) -> AudioToTextRequestBuilder:
         self._audio_to_text_request.request_body = request_body
-        self._audio_to_text_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._audio_to_text_request.body = request_body
         return self
 
-    def file(self, file: BytesIO, file_name: str) -> AudioToTextRequestBuilder:
+    def file(self, file: FileSource, file_name: str | None = None) -> AudioToTextRequestBuilder:
+        """Set the file to stream: a path, a binary file, bytes, a memoryview or an iterator of byte chunks."""
         self._audio_to_text_request.file = file
-        self._audio_to_text_request.files = {"file": (file_name, file)}
+        self._audio_to_text_request.files = {"file": (default_file_name(file, file_name), file)}
         return self
@@ -5,6 +5,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetMetaRequest(BaseRequest):
+    __slots__ = ("user",)
+
     def __init__(self):
         super().__init__()
         self.user: str | None = None
@@ -5,6 +5,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetParametersRequest(BaseRequest):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -5,6 +5,8 @@ from .submit_feedback_request_body import SubmitFeedbackRequestBody
 
 
 class SubmitFeedbackRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: SubmitFeedbackRequestBody | None = None
@@ -27,7 +29,7 @@ class SubmitFeedbackRequestBuilder:
 
     def request_body(self, request_body: SubmitFeedbackRequestBody) -> "SubmitFeedbackRequestBuilder":
         self._submit_feedback_request.request_body = request_body
-        self._submit_feedback_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._submit_feedback_request.body = request_body
         return self
 
     def build(self) -> SubmitFeedbackRequest:
@@ -7,6 +7,8 @@ from .text_to_audio_request_body import TextToAudioRequestBody
 
 
 class TextToAudioRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self):
         super().__init__()
         self.request_body: TextToAudioRequestBody | None = None
@@ -28,5 +30,5 @@ class TextToAudioRequestBuilder:
 
     def request_body(self, request_body: TextToAudioRequestBody) -> TextToAudioRequestBuilder:
         self._text_to_audio_request.request_body = request_body
-        self._text_to_audio_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._text_to_audio_request.body = request_body
         return self
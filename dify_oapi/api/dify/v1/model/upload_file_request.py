@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-from io import BytesIO
-
 from dify_oapi.core.enum import HttpMethod
+from dify_oapi.core.http.multipart import FileSource, default_file_name
 from dify_oapi.core.model.base_request import BaseRequest
 
 from .upload_file_body import UploadFileBody
 
 
 class UploadFileRequest(BaseRequest):
+    __slots__ = ("file", "request_body")
+
     def __init__(self):
         super().__init__()
-        self.file: BytesIO | None = None
+        self.file: FileSource | None = None
         self.request_body: UploadFileBody | None = None
 
     @staticmethod
@@ -29,14 +30,13 @@ class UploadFileRequestBuilder:
     def build(self) -> UploadFileRequest:
         return self._upload_file_request
 
-    def file(self, file: BytesIO, file_name: str | None = None) -> UploadFileRequestBuilder:
+    def file(self, file: FileSource, file_name: str | None = None) -> UploadFileRequestBuilder:
+        """Set the file to stream: a path, a binary file, bytes, a memoryview or an iterator of byte chunks."""
         self._upload_file_request.file = file
-        if file_name is None:
-            file_name = "upload"
-        self._upload_file_request.files = {"file": (file_name, file)}
+        self._upload_file_request.files = {"file": (default_file_name(file, file_name), file)}
         return self
 
     def request_body(self, request_body: UploadFileBody) -> UploadFileRequestBuilder:
         self._upload_file_request.request_body = request_body
-        self._upload_file_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._upload_file_request.body = request_body
         return self
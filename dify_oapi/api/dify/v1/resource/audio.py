@@ -1,3 +1,6 @@
+from typing import Literal, overload
+
+from dify_oapi.core.http.binary_stream import AsyncBinaryStream, BinaryStream
 from dify_oapi.core.http.transport import ATransport, Transport
 from dify_oapi.core.model.config import Config
 from dify_oapi.core.model.request_option import RequestOption
@@ -20,10 +23,38 @@ class Audio:
         """Convert audio to text (speech-to-text) - async version"""
         return await ATransport.aexecute(self.config, request, unmarshal_as=AudioToTextResponse, option=option)
 
-    def from_text(self, request: TextToAudioRequest, option: RequestOption | None = None) -> TextToAudioResponse:
-        """Convert text to audio (text-to-speech)"""
+    @overload
+    def from_text(
+        self, request: TextToAudioRequest, option: RequestOption | None = None, *, stream: Literal[True]
+    ) -> BinaryStream: ...
+
+    @overload
+    def from_text(
+        self, request: TextToAudioRequest, option: RequestOption | None = None, *, stream: Literal[False] = False
+    ) -> TextToAudioResponse: ...
+
+    def from_text(
+        self, request: TextToAudioRequest, option: RequestOption | None = None, *, stream: bool = False
+    ) -> TextToAudioResponse | BinaryStream:
+        """Convert text to audio (text-to-speech); with `stream`, the audio is read as it arrives"""
+        if stream:
+            return Transport.open(self.config, request, option=option)
         return Transport.execute(self.config, request, unmarshal_as=TextToAudioResponse, option=option)
 
-    async def afrom_text(self, request: TextToAudioRequest, option: RequestOption | None = None) -> TextToAudioResponse:
+    @overload
+    async def afrom_text(
+        self, request: TextToAudioRequest, option: RequestOption | None = None, *, stream: Literal[True]
+    ) -> AsyncBinaryStream: ...
+
+    @overload
+    async def afrom_text(
+        self, request: TextToAudioRequest, option: RequestOption | None = None, *, stream: Literal[False] = False
+    ) -> TextToAudioResponse: ...
+
+    async def afrom_text(
+        self, request: TextToAudioRequest, option: RequestOption | None = None, *, stream: bool = False
+    ) -> TextToAudioResponse | AsyncBinaryStream:
         """Convert text to audio (text-to-speech) - async version"""
+        if stream:
+            return await ATransport.aopen(self.config, request, option=option)
         return await ATransport.aexecute(self.config, request, unmarshal_as=TextToAudioResponse, option=option)
@@ -1,3 +1,4 @@
+from dify_oapi.core.background import AsyncBackgroundWriter, BackgroundWriter
 from dify_oapi.core.http.transport import ATransport, Transport
 from dify_oapi.core.model.config import Config
 from dify_oapi.core.model.request_option import RequestOption
@@ -22,6 +23,19 @@ class Feedback:
         """Submit feedback for a message - async version"""
         return await ATransport.aexecute(self.config, request, unmarshal_as=SubmitFeedbackResponse, option=option)
 
+    def submit_background(
+        self,
+        request: SubmitFeedbackRequest,
+        writer: BackgroundWriter | AsyncBackgroundWriter,
+        option: RequestOption | None = None,
+    ) -> bool:
+        """Queue feedback on a background writer; repeated ratings of a message by a user collapse into the latest"""
+        user = request.request_body.user if request.request_body is not None else ""
+        key = f"feedback:{request.paths.get('message_id', '')}:{user}"
+        if isinstance(writer, AsyncBackgroundWriter):
+            return writer.submit(key, self.asubmit, request, option)
+        return writer.submit(key, self.submit, request, option)
+
     def list(self, request: GetFeedbacksRequest, option: RequestOption | None = None) -> GetFeedbacksResponse:
         """Get list of feedbacks"""
         return Transport.execute(self.config, request, unmarshal_as=GetFeedbacksResponse, option=option)
@@ -1,9 +1,13 @@
+import asyncio
+
 from dify_oapi.core.http.transport import ATransport, Transport
 from dify_oapi.core.model.config import Config
 from dify_oapi.core.model.request_option import RequestOption
 
+from ..model.upload_file_body import UploadFileBody
 from ..model.upload_file_request import UploadFileRequest
 from ..model.upload_file_response import UploadFileResponse
+from ..upload_cache import UploadCache
 
 
 class File:
@@ -15,3 +19,34 @@ class File:
 
     async def aupload(self, request: UploadFileRequest, option: RequestOption | None = None) -> UploadFileResponse:
         return await ATransport.aexecute(self.config, request, unmarshal_as=UploadFileResponse, option=option)
+
+    def upload_path(
+        self, path: str, user: str | None = None, option: RequestOption | None = None
+    ) -> UploadFileResponse:
+        """Upload a local file, streamed from disk, reusing a cached upload of the same content"""
+
+        def upload() -> UploadFileResponse:
+            return self.upload(_upload_request(path, user), option)
+
+        cache: UploadCache | None = getattr(self.config, "upload_cache", None)
+        if cache is None:
+            return upload()
+        return cache.get_or_upload(cache.key(path, option, self.config.domain), upload)
+
+    async def aupload_path(
+        self, path: str, user: str | None = None, option: RequestOption | None = None
+    ) -> UploadFileResponse:
+        """Upload a local file, streamed from disk, reusing a cached upload of the same content - async version"""
+
+        async def upload() -> UploadFileResponse:
+            return await self.aupload(_upload_request(path, user), option)
+
+        cache: UploadCache | None = getattr(self.config, "upload_cache", None)
+        if cache is None:
+            return await upload()
+        key = await asyncio.to_thread(cache.key, path, option, self.config.domain)
+        return await cache.aget_or_upload(key, upload)
+
+
+def _upload_request(path: str, user: str | None) -> UploadFileRequest:
+    return UploadFileRequest.builder().file(path).request_body(UploadFileBody(user=user)).build()
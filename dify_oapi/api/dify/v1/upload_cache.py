@@ -0,0 +1,114 @@
+"""Content-addressed cache of uploaded files."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+
+from dify_oapi.core.cache import CacheBackend, CacheStats, MemoryCache, credential_scope
+from dify_oapi.core.model.request_option import RequestOption
+
+from .model.upload_file_response import UploadFileResponse
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Lifetime of a cached upload; keep it below the retention of uploaded files on the server
+DEFAULT_UPLOAD_TTL = 24 * 3600.0
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's content, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """Reuses the `upload_file_id` of a file with the same content, uploaded to the same app.
+
+    Entries are keyed on a hash of the domain and the API key or key pool, the SHA-256 of the content and the file extension, and
+    expire after `DEFAULT_UPLOAD_TTL` with the default backend. Concurrent uploads of the same content are
+    coalesced into one request.
+    """
+
+    def __init__(self, backend: CacheBackend | None = None) -> None:
+        self.backend: CacheBackend = (
+            backend if backend is not None else MemoryCache(max_entries=4096, ttl=DEFAULT_UPLOAD_TTL)
+        )
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._ainflight: dict[str, asyncio.Future] = {}
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.backend.stats
+
+    @staticmethod
+    def key(path: str, option: RequestOption | None, domain: str | None = None) -> str:
+        namespace = credential_scope(option, domain)[:16]
+        extension = os.path.splitext(path)[1].lower()
+        return f"{namespace}:{hash_file(path)}{extension}"
+
+    def get(self, key: str) -> UploadFileResponse | None:
+        payload = self.backend.get(key)
+        return UploadFileResponse.model_validate(payload) if payload is not None else None
+
+    def put(self, key: str, response: UploadFileResponse) -> None:
+        if not response.success or not response.id:
+            return
+        payload = response.model_dump(mode="json", exclude={"raw"}, exclude_none=True)
+        self.backend.set(key, payload, namespace=key.split(":", 1)[0])
+
+    def get_or_upload(self, key: str, upload: Callable[[], UploadFileResponse]) -> UploadFileResponse:
+        """Return the cached upload of `key`, or run `upload` once for all concurrent callers."""
+        if (cached := self.get(key)) is not None:
+            return cached
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if future is None:
+                future = self._inflight[key] = Future()
+        if not owner:
+            response: UploadFileResponse = future.result()
+            return response
+        try:
+            response = upload()
+            self.put(key, response)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_upload(self, key: str, upload: Callable[[], Awaitable[UploadFileResponse]]) -> UploadFileResponse:
+        """Async version of get_or_upload."""
+        if (cached := self.get(key)) is not None:
+            return cached
+        future = self._ainflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await upload()
+            self.put(key, response)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            # Only retrieved by coalesced callers
+            future.exception()
+            raise
+        finally:
+            self._ainflight.pop(key, None)
+
+    def clear(self) -> None:
+        self.backend.clear()
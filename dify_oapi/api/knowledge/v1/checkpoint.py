@@ -0,0 +1,36 @@
+"""Append-only JSONL checkpoints of long-running knowledge jobs."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any
+
+
+class JsonlCheckpoint:
+    """Append-only JSONL log of entries, replayed through `_load` when an interrupted run is resumed."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._load(json.loads(line))
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self, entry: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._load(entry)
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
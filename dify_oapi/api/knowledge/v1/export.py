@@ -0,0 +1,273 @@
+"""Streaming export of datasets, documents, segments and child chunks to JSONL."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import shutil
+import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import IO, Any
+
+from dify_oapi.core.log import logger
+from dify_oapi.core.model.base_response import BaseResponse
+from dify_oapi.core.model.request_option import RequestOption
+
+from .checkpoint import JsonlCheckpoint
+from .model.list_child_chunks_request import ListChildChunksRequest
+from .model.list_datasets_request import ListDatasetsRequest
+from .model.list_documents_request import ListDocumentsRequest
+from .model.list_segments_request import ListSegmentsRequest
+from .version import V1
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ExportReport:
+    """Counters of an export run; `skipped` counts documents already exported by a previous run."""
+
+    datasets: int = 0
+    documents: int = 0
+    segments: int = 0
+    child_chunks: int = 0
+    skipped: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+
+
+class ExportCheckpoint(JsonlCheckpoint):
+    """Append-only JSONL log of the units appended to an export output and of the output size after each."""
+
+    def __init__(self, path: str) -> None:
+        self.completed: set[str] = set()
+        self.offset = 0
+        super().__init__(path)
+
+    def _load(self, entry: dict[str, Any]) -> None:
+        self.completed.add(entry["unit"])
+        self.offset = max(self.offset, int(entry["offset"]))
+
+    def record(self, unit: str, offset: int) -> None:
+        self._append({"unit": unit, "offset": offset})
+
+
+class DatasetExporter:
+    """Walks datasets → documents → segments → child chunks and streams every record to one JSONL file.
+
+    Each line is `{"type": ..., <parent ids>, "data": {...}}`. Records are written as pages arrive: every
+    document is exported into its own part file by a worker and then appended to the output, so memory
+    stays bounded by one page per worker. An output path ending in `.gz` (or `compress=True`) writes one
+    gzip member per document.
+
+    Completed documents and their end offset in the output are recorded in a checkpoint; an interrupted
+    run is resumed by truncating the output to the last checkpointed offset and skipping those documents.
+    """
+
+    def __init__(
+        self,
+        knowledge: V1,
+        request_option: RequestOption,
+        output_path: str,
+        *,
+        checkpoint_path: str | None = None,
+        dataset_ids: list[str] | None = None,
+        include_child_chunks: bool = True,
+        compress: bool | None = None,
+        max_concurrency: int = 4,
+        page_size: int = 100,
+    ) -> None:
+        self.knowledge = knowledge
+        self.request_option = request_option
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+        self.dataset_ids = set(dataset_ids) if dataset_ids is not None else None
+        self.include_child_chunks = include_child_chunks
+        self.compress = output_path.endswith(".gz") if compress is None else compress
+        self.max_concurrency = max_concurrency
+        self.page_size = page_size
+        self._parts_dir = output_path + ".parts"
+
+    def run(self) -> ExportReport:
+        checkpoint = self._prepare()
+        report = ExportReport()
+        try:
+            with open(self.output_path, "ab") as out, ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                inflight: dict[Future, str] = {}
+                for dataset in self._datasets():
+                    dataset_id = dataset["id"]
+                    unit = f"dataset:{dataset_id}"
+                    if unit not in checkpoint.completed:
+                        part = self._part_path()
+                        with open(part, "w", encoding="utf-8") as f:
+                            _write_record(f, "dataset", dataset, dataset_id=dataset_id)
+                        self._append(out, part, checkpoint, unit)
+                        report.datasets += 1
+
+                    for document in self._documents(dataset_id):
+                        unit = f"document:{dataset_id}:{document['id']}"
+                        if unit in checkpoint.completed:
+                            report.skipped += 1
+                            continue
+                        while len(inflight) >= self.max_concurrency:
+                            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                self._exported(out, inflight.pop(future), future, checkpoint, report)
+                        inflight[executor.submit(self._export_document, dataset_id, document)] = unit
+
+                for future in list(inflight):
+                    future.exception()
+                    self._exported(out, inflight.pop(future), future, checkpoint, report)
+        finally:
+            checkpoint.close()
+        return report
+
+    def _prepare(self) -> ExportCheckpoint:
+        # The output is only trusted up to the end of the last checkpointed unit
+        if not os.path.exists(self.output_path) and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        checkpoint = ExportCheckpoint(self.checkpoint_path)
+        if os.path.exists(self.output_path):
+            os.truncate(self.output_path, checkpoint.offset)
+        shutil.rmtree(self._parts_dir, ignore_errors=True)
+        os.makedirs(self._parts_dir)
+        return checkpoint
+
+    def _part_path(self) -> str:
+        return os.path.join(self._parts_dir, f"{uuid.uuid4().hex}.jsonl")
+
+    def _append(self, out: IO[bytes], part: str, checkpoint: ExportCheckpoint, unit: str) -> None:
+        with open(part, "rb") as f:
+            if self.compress:
+                with gzip.GzipFile(fileobj=out, mode="wb") as gz:
+                    shutil.copyfileobj(f, gz, COPY_CHUNK_SIZE)
+            else:
+                shutil.copyfileobj(f, out, COPY_CHUNK_SIZE)
+        out.flush()
+        os.remove(part)
+        checkpoint.record(unit, out.tell())
+
+    def _exported(
+        self, out: IO[bytes], unit: str, future: Future, checkpoint: ExportCheckpoint, report: ExportReport
+    ) -> None:
+        try:
+            part, segments, child_chunks = future.result()
+        except Exception as e:
+            logger.warning(f"export of {unit} failed: {e}")
+            report.failures[unit] = f"{e.__class__.__name__}: {e}"
+            return
+        self._append(out, part, checkpoint, unit)
+        report.documents += 1
+        report.segments += segments
+        report.child_chunks += child_chunks
+
+    def _export_document(self, dataset_id: str, document: dict[str, Any]) -> tuple[str, int, int]:
+        document_id = document["id"]
+        with_child_chunks = self.include_child_chunks and document.get("doc_form") in (None, "hierarchical_model")
+        part = self._part_path()
+        segments = child_chunks = 0
+        try:
+            with open(part, "w", encoding="utf-8") as f:
+                _write_record(f, "document", document, dataset_id=dataset_id, document_id=document_id)
+                for segment in self._segments(dataset_id, document_id):
+                    _write_record(
+                        f, "segment", segment, dataset_id=dataset_id, document_id=document_id, segment_id=segment["id"]
+                    )
+                    segments += 1
+                    if not with_child_chunks:
+                        continue
+                    for chunk in self._child_chunks(dataset_id, document_id, segment["id"]):
+                        _write_record(
+                            f,
+                            "child_chunk",
+                            chunk,
+                            dataset_id=dataset_id,
+                            document_id=document_id,
+                            segment_id=segment["id"],
+                        )
+                        child_chunks += 1
+        except BaseException:
+            os.remove(part)
+            raise
+        return part, segments, child_chunks
+
+    def _datasets(self) -> Iterator[dict[str, Any]]:
+        def fetch(page: int) -> BaseResponse:
+            request = ListDatasetsRequest.builder().page(page).limit(self.page_size).build()
+            return self.knowledge.dataset.list(request, self.request_option)
+
+        for dataset in _records(fetch, "datasets"):
+            if self.dataset_ids is None or dataset.get("id") in self.dataset_ids:
+                yield dataset
+
+    def _documents(self, dataset_id: str) -> Iterator[dict[str, Any]]:
+        def fetch(page: int) -> BaseResponse:
+            request = ListDocumentsRequest.builder().dataset_id(dataset_id).page(page).limit(self.page_size).build()
+            return self.knowledge.document.list(request, self.request_option)
+
+        return _records(fetch, f"documents of dataset {dataset_id}")
+
+    def _segments(self, dataset_id: str, document_id: str) -> Iterator[dict[str, Any]]:
+        def fetch(page: int) -> BaseResponse:
+            request = (
+                ListSegmentsRequest.builder()
+                .dataset_id(dataset_id)
+                .document_id(document_id)
+                .page(page)
+                .limit(self.page_size)
+                .build()
+            )
+            return self.knowledge.segment.list(request, self.request_option)
+
+        return _records(fetch, f"segments of document {document_id}")
+
+    def _child_chunks(self, dataset_id: str, document_id: str, segment_id: str) -> Iterator[dict[str, Any]]:
+        def fetch(page: int) -> BaseResponse:
+            request = (
+                ListChildChunksRequest.builder()
+                .dataset_id(dataset_id)
+                .document_id(document_id)
+                .segment_id(segment_id)
+                .page(page)
+                .limit(self.page_size)
+                .build()
+            )
+            return self.knowledge.chunk.list(request, self.request_option)
+
+        return _records(fetch, f"child chunks of segment {segment_id}")
+
+
+def _records(fetch: Callable[[int], BaseResponse], what: str) -> Iterator[dict[str, Any]]:
+    """Yield the records of every page, one page at a time."""
+    page = 1
+    while True:
+        response = fetch(page)
+        if not response.success:
+            raise RuntimeError(f"failed to list {what}: {response.msg}")
+        records = _page_records(response)
+        yield from records
+        has_more = getattr(response, "has_more", None)
+        if has_more is None:
+            total_pages = getattr(response, "total_pages", None)
+            has_more = total_pages is not None and page < total_pages
+        if not has_more or not records:
+            return
+        page += 1
+
+
+def _page_records(response: BaseResponse) -> list[dict[str, Any]]:
+    # The items as sent, with nulls and the fields unknown to the models, so that a backup restores faithfully
+    raw = response.raw
+    if raw is not None and raw.content:
+        payload = json.loads(raw.content)
+        data = payload.get("data") if isinstance(payload, dict) else None
+        if isinstance(data, list):
+            return data
+    # The body is not kept by lean responses
+    return [item.model_dump(mode="json") for item in getattr(response, "data", None) or []]
+
+
+def _write_record(f: IO[str], type_: str, data: dict[str, Any], **ids: str) -> None:
+    f.write(json.dumps({"type": type_, **ids, "data": data}, ensure_ascii=False) + "\n")
@@ -0,0 +1,293 @@
+"""Multiplexed polling of document indexing status."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from dify_oapi.core.log import logger
+from dify_oapi.core.model.request_option import RequestOption
+
+from .model.get_batch_indexing_status_request import GetBatchIndexingStatusRequest
+from .model.get_batch_indexing_status_response import GetBatchIndexingStatusResponse
+from .resource.document import Document
+from .retrieval_cache import RetrievalCache
+
+# Indexing states after which a batch is no longer polled
+TERMINAL_STATUSES = frozenset({"completed", "error", "paused", "stopped"})
+
+
+@dataclass
+class IndexingResult:
+    """Final indexing state of a batch."""
+
+    dataset_id: str
+    batch: str
+    status: str
+    error: str | None = None
+    response: GetBatchIndexingStatusResponse | None = None
+
+    @property
+    def success(self) -> bool:
+        return self.status == "completed"
+
+
+@dataclass
+class _WatchedBatch:
+    dataset_id: str
+    batch: str
+    request_option: RequestOption
+    interval: float
+    next_poll_at: float
+    future: Future = field(default_factory=Future, repr=False)
+    status: str | None = None
+    completed_segments: int | None = None
+    observed_at: float | None = None
+    failures: int = 0
+    last_response: GetBatchIndexingStatusResponse | None = field(default=None, repr=False)
+
+
+class IndexingWatcher:
+    """Tracks many outstanding indexing batches, across datasets, in one polling scheduler.
+
+    Each batch is polled on its own schedule. While segments are being indexed the next poll is planned
+    at a fraction of the estimated remaining time, derived from the observed `completed_segments` rate;
+    without progress the interval grows by `backoff`. Intervals are clamped to
+    [`min_interval`, `max_interval`] and `max_polls_per_second` caps the request rate of all batches
+    together.
+
+    `add` returns a future resolved with an `IndexingResult` once the batch completes or fails; cached
+    retrievals of its dataset are dropped at that point, as they may predate the indexed content. The watcher
+    is driven by `wait`, by a background thread (`start`/`stop`), or from asyncio via `watch`/`await_all`.
+    """
+
+    def __init__(
+        self,
+        document: Document,
+        *,
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+        backoff: float = 1.5,
+        eta_fraction: float = 0.5,
+        max_polls_per_second: float | None = 10.0,
+        max_poll_failures: int = 5,
+    ) -> None:
+        self.document = document
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.eta_fraction = eta_fraction
+        self.max_polls_per_second = max_polls_per_second
+        self.max_poll_failures = max_poll_failures
+        self._batches: dict[tuple[str, str], _WatchedBatch] = {}
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._driver: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._batches)
+
+    def add(self, dataset_id: str, batch: str, request_option: RequestOption) -> Future:
+        """Watch a batch and return a future resolved with its `IndexingResult`."""
+        key = (dataset_id, batch)
+        with self._lock:
+            watched = self._batches.get(key)
+            if watched is None:
+                watched = _WatchedBatch(
+                    dataset_id, batch, request_option, self.min_interval, time.monotonic() + self.min_interval
+                )
+                self._batches[key] = watched
+        self._wakeup.set()
+        return watched.future
+
+    def next_poll_in(self) -> float | None:
+        """Seconds until the next poll may be issued, or None when nothing is watched."""
+        with self._lock:
+            if not self._batches:
+                return None
+            due = min(watched.next_poll_at for watched in self._batches.values())
+        if due == float("inf"):
+            # Every batch has a poll in flight on another driver
+            return self.min_interval
+        return max(0.0, max(due, self._next_slot) - time.monotonic())
+
+    def poll_due(self) -> list[IndexingResult]:
+        """Poll due batches within the rate ceiling and return those that reached a terminal state."""
+        finished: list[IndexingResult] = []
+        for watched in self._take_due():
+            request = self._status_request(watched)
+            try:
+                response = self.document.get_batch_status(request, watched.request_option)
+            except Exception as e:
+                result = self._observe(watched, None, f"{e.__class__.__name__}: {e}")
+            else:
+                result = self._observe(watched, response, None)
+            if result is not None:
+                finished.append(result)
+        return finished
+
+    async def apoll_due(self) -> list[IndexingResult]:
+        """Async version of poll_due; due batches are polled concurrently."""
+        due = self._take_due()
+
+        async def _poll(watched: _WatchedBatch) -> IndexingResult | None:
+            request = self._status_request(watched)
+            try:
+                response = await self.document.aget_batch_status(request, watched.request_option)
+            except Exception as e:
+                return self._observe(watched, None, f"{e.__class__.__name__}: {e}")
+            return self._observe(watched, response, None)
+
+        results = await asyncio.gather(*(_poll(watched) for watched in due))
+        return [result for result in results if result is not None]
+
+    def wait(self, timeout: float | None = None) -> list[IndexingResult]:
+        """Block until every watched batch finished or `timeout` elapsed."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        finished: list[IndexingResult] = []
+        while self._batches:
+            delay = self.next_poll_in() or 0.0
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                delay = min(delay, remaining)
+            time.sleep(delay)
+            finished.extend(self.poll_due())
+        return finished
+
+    async def await_all(self, timeout: float | None = None) -> list[IndexingResult]:
+        """Async version of wait."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        finished: list[IndexingResult] = []
+        while self._batches:
+            delay = self.next_poll_in() or 0.0
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                delay = min(delay, remaining)
+            await asyncio.sleep(delay)
+            finished.extend(await self.apoll_due())
+        return finished
+
+    async def watch(self, dataset_id: str, batch: str, request_option: RequestOption) -> IndexingResult:
+        """Watch a batch from asyncio and return once it completes or fails.
+
+        Concurrent calls share one polling task on the running event loop.
+        """
+        future = self.add(dataset_id, batch, request_option)
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.ensure_future(self.await_all())
+        return await asyncio.wrap_future(future)
+
+    def start(self) -> None:
+        """Poll in a background thread so that futures returned by `add` resolve on their own."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="dify-indexing-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            delay = self.next_poll_in()
+            if delay is None or delay > 0:
+                self._wakeup.wait(delay)
+                continue
+            self.poll_due()
+
+    def _take_due(self) -> list[_WatchedBatch]:
+        now = time.monotonic()
+        with self._lock:
+            due = sorted(
+                (watched for watched in self._batches.values() if watched.next_poll_at <= now),
+                key=lambda watched: watched.next_poll_at,
+            )
+            if self.max_polls_per_second:
+                spacing = 1.0 / self.max_polls_per_second
+                allowed = 0
+                slot = max(self._next_slot, now)
+                while allowed < len(due) and slot <= now:
+                    allowed += 1
+                    slot += spacing
+                self._next_slot = slot
+                due = due[:allowed]
+            # Defer the next poll until the response is observed
+            for watched in due:
+                watched.next_poll_at = float("inf")
+        return due
+
+    @staticmethod
+    def _status_request(watched: _WatchedBatch) -> GetBatchIndexingStatusRequest:
+        return GetBatchIndexingStatusRequest.builder().dataset_id(watched.dataset_id).batch(watched.batch).build()
+
+    def _observe(
+        self, watched: _WatchedBatch, response: GetBatchIndexingStatusResponse | None, error: str | None
+    ) -> IndexingResult | None:
+        now = time.monotonic()
+        if response is not None and not response.success:
+            error = response.msg or response.code or "unknown error"
+        if error is not None or response is None:
+            watched.failures += 1
+            logger.info(f"indexing status poll failed for batch {watched.batch} ({watched.failures}): {error}")
+            if watched.failures >= self.max_poll_failures:
+                return self._finish(watched, IndexingResult(watched.dataset_id, watched.batch, "error", error))
+            watched.interval = min(watched.interval * self.backoff, self.max_interval)
+            watched.next_poll_at = now + watched.interval
+            return None
+
+        watched.failures = 0
+        watched.last_response = response
+        status = response.indexing_status or ""
+        if status in TERMINAL_STATUSES:
+            result = IndexingResult(watched.dataset_id, watched.batch, status, response.error, response)
+            return self._finish(watched, result)
+
+        watched.interval = self._next_interval(watched, response, status, now)
+        watched.status = status
+        watched.completed_segments = response.completed_segments
+        watched.observed_at = now
+        watched.next_poll_at = now + watched.interval
+        return None
+
+    def _next_interval(
+        self, watched: _WatchedBatch, response: GetBatchIndexingStatusResponse, status: str, now: float
+    ) -> float:
+        completed, total = response.completed_segments, response.total_segments
+        if status != watched.status:
+            return self.min_interval
+        if completed is None or watched.completed_segments is None or completed <= watched.completed_segments:
+            return min(watched.interval * self.backoff, self.max_interval)
+
+        # Plan the next poll from the observed indexing rate
+        elapsed = now - (watched.observed_at or now)
+        rate = (completed - watched.completed_segments) / elapsed if elapsed > 0 else 0.0
+        if not rate or not total:
+            return self.min_interval
+        eta = max(total - completed, 0) / rate
+        return min(max(eta * self.eta_fraction, self.min_interval), self.max_interval)
+
+    def _finish(self, watched: _WatchedBatch, result: IndexingResult) -> IndexingResult:
+        with self._lock:
+            self._batches.pop((watched.dataset_id, watched.batch), None)
+        cache: RetrievalCache | None = getattr(self.document.config, "retrieval_cache", None)
+        if cache is not None:
+            cache.invalidate(watched.dataset_id)
+        if not watched.future.done():
+            watched.future.set_result(result)
+        return result
@@ -0,0 +1,262 @@
+"""Bulk document ingestion into a knowledge dataset."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dify_oapi.core.log import logger
+from dify_oapi.core.model.base_response import BaseResponse
+from dify_oapi.core.model.request_option import RequestOption
+
+from .checkpoint import JsonlCheckpoint
+from .indexing_watcher import IndexingResult, IndexingWatcher
+from .model.create_document_by_file_request import CreateDocumentByFileRequest
+from .model.create_document_by_file_request_body import CreateDocumentByFileRequestBody
+from .model.create_document_by_file_request_body_data import CreateDocumentByFileRequestBodyData
+from .model.create_document_by_text_request import CreateDocumentByTextRequest
+from .model.create_document_by_text_request_body import CreateDocumentByTextRequestBody
+from .resource.document import Document
+
+# Checkpoint states
+UPLOADED = "uploaded"
+COMPLETED = "completed"
+ERROR = "error"
+FAILED = "failed"
+
+
+@dataclass
+class IngestionSource:
+    """A document to ingest, either a file streamed from disk or inline text.
+
+    `source_id` must be stable across runs; it keys the checkpoint.
+    """
+
+    source_id: str
+    name: str
+    path: str | None = None
+    text: str | None = None
+
+    @staticmethod
+    def from_directory(directory: str, pattern: str = "**/*") -> Iterator[IngestionSource]:
+        root = Path(directory)
+        for path in sorted(root.glob(pattern)):
+            if path.is_file():
+                yield IngestionSource(source_id=path.relative_to(root).as_posix(), name=path.name, path=str(path))
+
+
+@dataclass
+class IngestionReport:
+    """Progress counters of an ingestion run."""
+
+    submitted: int = 0
+    uploaded: int = 0
+    completed: int = 0
+    skipped: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> int:
+        return len(self.failures)
+
+
+class IngestionCheckpoint(JsonlCheckpoint):
+    """Append-only JSONL log of per-source ingestion state, used to resume interrupted runs."""
+
+    def __init__(self, path: str) -> None:
+        self.entries: dict[str, dict] = {}
+        super().__init__(path)
+
+    def _load(self, entry: dict) -> None:
+        self.entries[entry["source_id"]] = entry
+
+    def record(self, source_id: str, status: str, **fields: str | int | None) -> None:
+        self._append({"source_id": source_id, "status": status, **fields})
+
+
+def create_document(
+    document: Document,
+    dataset_id: str,
+    source: IngestionSource,
+    request_option: RequestOption,
+    *,
+    file_data: CreateDocumentByFileRequestBodyData,
+    text_body: CreateDocumentByTextRequestBody,
+) -> BaseResponse:
+    """Create a document from a source, streaming file sources from disk."""
+    if source.path is not None:
+        data = file_data.model_copy(update={"name": source.name})
+        body = CreateDocumentByFileRequestBody.builder().data(data).build()
+        with open(source.path, "rb") as f:
+            file_request = (
+                CreateDocumentByFileRequest.builder()
+                .dataset_id(dataset_id)
+                .request_body(body)
+                .file(f, source.name)
+                .build()
+            )
+            return document.create_by_file(file_request, request_option)
+
+    text_request_body = text_body.model_copy(update={"name": source.name, "text": source.text or ""})
+    text_request = CreateDocumentByTextRequest.builder().dataset_id(dataset_id).request_body(text_request_body).build()
+    return document.create_by_text(text_request, request_option)
+
+
+class IngestionPipeline:
+    """Uploads many documents with bounded concurrency and waits for them to be indexed.
+
+    Files are streamed from disk instead of being loaded into memory, indexing status of all outstanding
+    batches is polled by one `IndexingWatcher`, and every state change is written to an optional
+    checkpoint file so that a rerun skips finished sources and only resumes polling for pending batches.
+    """
+
+    def __init__(
+        self,
+        document: Document,
+        dataset_id: str,
+        request_option: RequestOption,
+        *,
+        file_data: CreateDocumentByFileRequestBodyData | None = None,
+        text_body: CreateDocumentByTextRequestBody | None = None,
+        max_concurrency: int = 4,
+        checkpoint_path: str | None = None,
+        wait_for_indexing: bool = True,
+        watcher: IndexingWatcher | None = None,
+        on_progress: Callable[[IngestionReport], None] | None = None,
+    ) -> None:
+        self.document = document
+        self.dataset_id = dataset_id
+        self.request_option = request_option
+        self.file_data = file_data or CreateDocumentByFileRequestBodyData(indexing_technique="high_quality")
+        self.text_body = text_body or CreateDocumentByTextRequestBody(indexing_technique="high_quality")
+        self.max_concurrency = max_concurrency
+        self.checkpoint_path = checkpoint_path
+        self.wait_for_indexing = wait_for_indexing
+        self.watcher = watcher if watcher is not None else IndexingWatcher(document)
+        self.on_progress = on_progress
+
+    def run(self, sources: Iterable[IngestionSource] | str) -> IngestionReport:
+        """Ingest every source; a directory path ingests all files below it."""
+        if isinstance(sources, str):
+            sources = IngestionSource.from_directory(sources)
+        checkpoint = IngestionCheckpoint(self.checkpoint_path) if self.checkpoint_path else None
+        report = IngestionReport()
+        batches: dict[str, str] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                inflight: dict[Future, IngestionSource] = {}
+                pending_sources = iter(sources)
+                exhausted = False
+                while True:
+                    while not exhausted and len(inflight) < self.max_concurrency * 2:
+                        source = next(pending_sources, None)
+                        if source is None:
+                            exhausted = True
+                            break
+                        if self._resume(source, checkpoint, report, batches):
+                            continue
+                        inflight[executor.submit(self._upload, source)] = source
+                        report.submitted += 1
+
+                    if exhausted and not inflight and (not self.wait_for_indexing or not len(self.watcher)):
+                        break
+
+                    timeout = self.watcher.next_poll_in() if self.wait_for_indexing else None
+                    if inflight:
+                        done, _ = wait(inflight, timeout=timeout, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._uploaded(inflight.pop(future), future, checkpoint, report, batches)
+                    elif timeout:
+                        time.sleep(timeout)
+
+                    if self.wait_for_indexing:
+                        for result in self.watcher.poll_due():
+                            self._indexed(result, checkpoint, report, batches)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+        return report
+
+    def _resume(
+        self,
+        source: IngestionSource,
+        checkpoint: IngestionCheckpoint | None,
+        report: IngestionReport,
+        batches: dict[str, str],
+    ) -> bool:
+        entry = checkpoint.entries.get(source.source_id) if checkpoint else None
+        if entry is None or entry["status"] == FAILED:
+            return False
+        if entry["status"] == UPLOADED and self.wait_for_indexing and entry.get("batch"):
+            batches[entry["batch"]] = source.source_id
+            self.watcher.add(self.dataset_id, entry["batch"], self.request_option)
+        report.skipped += 1
+        return True
+
+    def _upload(self, source: IngestionSource) -> BaseResponse:
+        return create_document(
+            self.document,
+            self.dataset_id,
+            source,
+            self.request_option,
+            file_data=self.file_data,
+            text_body=self.text_body,
+        )
+
+    def _uploaded(
+        self,
+        source: IngestionSource,
+        future: Future,
+        checkpoint: IngestionCheckpoint | None,
+        report: IngestionReport,
+        batches: dict[str, str],
+    ) -> None:
+        try:
+            response = future.result()
+            error = None if response.success else (response.msg or response.code or "unknown error")
+        except Exception as e:
+            response, error = None, f"{e.__class__.__name__}: {e}"
+
+        if error is not None:
+            logger.warning(f"ingestion of {source.source_id} failed: {error}")
+            report.failures[source.source_id] = error
+            if checkpoint:
+                checkpoint.record(source.source_id, FAILED, error=error)
+        else:
+            document_id = response.document.id if response.document else None
+            batch = response.batch
+            report.uploaded += 1
+            if checkpoint:
+                checkpoint.record(source.source_id, UPLOADED, document_id=document_id, batch=batch)
+            if self.wait_for_indexing and batch:
+                batches[batch] = source.source_id
+                self.watcher.add(self.dataset_id, batch, self.request_option)
+        self._notify(report)
+
+    def _indexed(
+        self,
+        result: IndexingResult,
+        checkpoint: IngestionCheckpoint | None,
+        report: IngestionReport,
+        batches: dict[str, str],
+    ) -> None:
+        source_id = batches.pop(result.batch, None)
+        if source_id is None:
+            return
+        if result.success:
+            report.completed += 1
+            if checkpoint:
+                checkpoint.record(source_id, COMPLETED, batch=result.batch)
+        else:
+            error = result.error or result.status
+            report.failures[source_id] = error
+            if checkpoint:
+                checkpoint.record(source_id, ERROR, batch=result.batch, error=error)
+        self._notify(report)
+
+    def _notify(self, report: IngestionReport) -> None:
+        if self.on_progress is not None:
+            self.on_progress(report)
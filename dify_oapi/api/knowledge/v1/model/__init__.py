@@ -163,6 +163,7 @@ from .retrieve_from_dataset_request_body import (
     RetrieveFromDatasetRequestBodyBuilder as RetrieveFromDatasetRequestBodyBuilder,
 )
 from .retrieve_from_dataset_response import RetrieveFromDatasetResponse as RetrieveFromDatasetResponse
+from .retrieve_from_datasets_response import RetrieveFromDatasetsResponse as RetrieveFromDatasetsResponse
 from .segment_content import SegmentContent as SegmentContent
 from .segment_content import SegmentContentBuilder as SegmentContentBuilder
 from .segment_document_info import SegmentDocumentInfo as SegmentDocumentInfo
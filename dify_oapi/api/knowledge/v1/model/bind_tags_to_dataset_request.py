@@ -5,6 +5,8 @@ from .bind_tags_to_dataset_request_body import BindTagsToDatasetRequestBody
 
 
 class BindTagsToDatasetRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self):
         super().__init__()
         self.request_body: BindTagsToDatasetRequestBody | None = None
@@ -26,5 +28,5 @@ class BindTagsToDatasetRequestBuilder:
 
     def request_body(self, request_body: BindTagsToDatasetRequestBody) -> "BindTagsToDatasetRequestBuilder":
         self._bind_tags_to_dataset_request.request_body = request_body
-        self._bind_tags_to_dataset_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._bind_tags_to_dataset_request.body = request_body
         return self
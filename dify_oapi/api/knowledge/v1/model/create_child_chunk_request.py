@@ -11,6 +11,8 @@ from .create_child_chunk_request_body import CreateChildChunkRequestBody
 class CreateChildChunkRequest(BaseRequest):
     """Request model for create child chunk API."""
 
+    __slots__ = ("dataset_id", "document_id", "segment_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -54,5 +56,5 @@ class CreateChildChunkRequestBuilder:
 
     def request_body(self, request_body: CreateChildChunkRequestBody) -> CreateChildChunkRequestBuilder:
         self._create_child_chunk_request.request_body = request_body
-        self._create_child_chunk_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._create_child_chunk_request.body = request_body
         return self
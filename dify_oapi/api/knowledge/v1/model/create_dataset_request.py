@@ -5,6 +5,8 @@ from .create_dataset_request_body import CreateDatasetRequestBody
 
 
 class CreateDatasetRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: CreateDatasetRequestBody | None = None
@@ -26,5 +28,5 @@ class CreateDatasetRequestBuilder:
 
     def request_body(self, request_body: CreateDatasetRequestBody) -> "CreateDatasetRequestBuilder":
         self._create_dataset_request.request_body = request_body
-        self._create_dataset_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._create_dataset_request.body = request_body
         return self
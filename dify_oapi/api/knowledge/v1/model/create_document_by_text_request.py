@@ -11,6 +11,8 @@ from .create_document_by_text_request_body import CreateDocumentByTextRequestBod
 class CreateDocumentByTextRequest(BaseRequest):
     """Request model for create document by text API."""
 
+    __slots__ = ("dataset_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -40,5 +42,5 @@ class CreateDocumentByTextRequestBuilder:
 
     def request_body(self, request_body: CreateDocumentByTextRequestBody) -> CreateDocumentByTextRequestBuilder:
         self._create_document_by_text_request.request_body = request_body
-        self._create_document_by_text_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._create_document_by_text_request.body = request_body
         return self
@@ -11,6 +11,8 @@ from .create_segment_request_body import CreateSegmentRequestBody
 class CreateSegmentRequest(BaseRequest):
     """Request model for create segment API."""
 
+    __slots__ = ("dataset_id", "document_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -46,5 +48,5 @@ class CreateSegmentRequestBuilder:
 
     def request_body(self, request_body: CreateSegmentRequestBody) -> CreateSegmentRequestBuilder:
         self._create_segment_request.request_body = request_body
-        self._create_segment_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._create_segment_request.body = request_body
         return self
@@ -5,6 +5,8 @@ from .create_tag_request_body import CreateTagRequestBody
 
 
 class CreateTagRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self):
         super().__init__()
         self.request_body: CreateTagRequestBody | None = None
@@ -26,5 +28,5 @@ class CreateTagRequestBuilder:
 
     def request_body(self, request_body: CreateTagRequestBody) -> "CreateTagRequestBuilder":
         self._create_tag_request.request_body = request_body
-        self._create_tag_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._create_tag_request.body = request_body
         return self
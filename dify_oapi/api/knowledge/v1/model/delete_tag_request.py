@@ -5,6 +5,8 @@ from .delete_tag_request_body import DeleteTagRequestBody
 
 
 class DeleteTagRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self):
         super().__init__()
         self.request_body: DeleteTagRequestBody | None = None
@@ -26,5 +28,5 @@ class DeleteTagRequestBuilder:
 
     def request_body(self, request_body: DeleteTagRequestBody) -> "DeleteTagRequestBuilder":
         self._delete_tag_request.request_body = request_body
-        self._delete_tag_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._delete_tag_request.body = request_body
         return self
@@ -9,6 +9,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 class GetBatchIndexingStatusRequest(BaseRequest):
     """Request model for get batch indexing status API."""
 
+    __slots__ = ("dataset_id", "batch")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -3,6 +3,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetDatasetTagsRequest(BaseRequest):
+    __slots__ = ("dataset_id",)
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -9,6 +9,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 class GetDocumentRequest(BaseRequest):
     """Request model for get document API."""
 
+    __slots__ = ("dataset_id", "document_id")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
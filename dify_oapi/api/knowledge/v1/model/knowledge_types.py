@@ -98,3 +98,6 @@ QueryContentType = Literal["text", "structured"]
 
 # Retrieval record score type
 RetrievalScoreType = Literal["cosine", "dot_product", "euclidean"]
+
+# Multi-dataset retrieval merge strategies
+RetrievalMergeStrategy = Literal["score", "rrf"]
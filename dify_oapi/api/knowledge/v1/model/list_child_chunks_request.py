@@ -9,6 +9,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 class ListChildChunksRequest(BaseRequest):
     """Request model for list child chunks API."""
 
+    __slots__ = ("dataset_id", "document_id", "segment_id")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
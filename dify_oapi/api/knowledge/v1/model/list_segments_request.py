@@ -11,6 +11,8 @@ from .knowledge_types import SegmentStatus
 class ListSegmentsRequest(BaseRequest):
     """Request model for list segments API."""
 
+    __slots__ = ("dataset_id", "document_id")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
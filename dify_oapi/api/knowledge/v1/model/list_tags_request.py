@@ -5,6 +5,8 @@ from .knowledge_types import TagType
 
 
 class ListTagsRequest(BaseRequest):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
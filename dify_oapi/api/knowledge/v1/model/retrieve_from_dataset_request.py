@@ -5,6 +5,8 @@ from .retrieve_from_dataset_request_body import RetrieveFromDatasetRequestBody
 
 
 class RetrieveFromDatasetRequest(BaseRequest):
+    __slots__ = ("dataset_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -32,5 +34,5 @@ class RetrieveFromDatasetRequestBuilder:
 
     def request_body(self, request_body: RetrieveFromDatasetRequestBody) -> "RetrieveFromDatasetRequestBuilder":
         self._retrieve_from_dataset_request.request_body = request_body
-        self._retrieve_from_dataset_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._retrieve_from_dataset_request.body = request_body
         return self
@@ -0,0 +1,21 @@
+"""Retrieve from multiple datasets response model."""
+
+from pydantic import Field
+
+from dify_oapi.core.model.base_response import BaseResponse
+
+from .query_info import QueryInfo
+from .retrieval_record import RetrievalRecord
+
+
+class RetrieveFromDatasetsResponse(BaseResponse):
+    """Merged result of a multi-dataset retrieval.
+
+    Datasets that missed the deadline or failed are listed separately so partial results stay usable.
+    """
+
+    query: QueryInfo | None = None
+    records: list[RetrievalRecord] = Field(default_factory=list)
+    completed_datasets: list[str] = Field(default_factory=list)
+    timed_out_datasets: list[str] = Field(default_factory=list)
+    failed_datasets: dict[str, str] = Field(default_factory=dict)
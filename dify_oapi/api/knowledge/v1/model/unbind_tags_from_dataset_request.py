@@ -5,6 +5,8 @@ from .unbind_tags_from_dataset_request_body import UnbindTagsFromDatasetRequestB
 
 
 class UnbindTagsFromDatasetRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self):
         super().__init__()
         self.request_body: UnbindTagsFromDatasetRequestBody | None = None
@@ -26,5 +28,5 @@ class UnbindTagsFromDatasetRequestBuilder:
 
     def request_body(self, request_body: UnbindTagsFromDatasetRequestBody) -> "UnbindTagsFromDatasetRequestBuilder":
         self._unbind_tags_from_dataset_request.request_body = request_body
-        self._unbind_tags_from_dataset_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._unbind_tags_from_dataset_request.body = request_body
         return self
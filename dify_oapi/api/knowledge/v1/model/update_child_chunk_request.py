@@ -11,6 +11,8 @@ from .update_child_chunk_request_body import UpdateChildChunkRequestBody
 class UpdateChildChunkRequest(BaseRequest):
     """Request model for update child chunk API."""
 
+    __slots__ = ("dataset_id", "document_id", "segment_id", "child_chunk_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -60,5 +62,5 @@ class UpdateChildChunkRequestBuilder:
 
     def request_body(self, request_body: UpdateChildChunkRequestBody) -> UpdateChildChunkRequestBuilder:
         self._update_child_chunk_request.request_body = request_body
-        self._update_child_chunk_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_child_chunk_request.body = request_body
         return self
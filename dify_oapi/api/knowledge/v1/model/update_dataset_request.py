@@ -5,6 +5,8 @@ from .update_dataset_request_body import UpdateDatasetRequestBody
 
 
 class UpdateDatasetRequest(BaseRequest):
+    __slots__ = ("dataset_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -32,5 +34,5 @@ class UpdateDatasetRequestBuilder:
 
     def request_body(self, request_body: UpdateDatasetRequestBody) -> "UpdateDatasetRequestBuilder":
         self._update_dataset_request.request_body = request_body
-        self._update_dataset_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_dataset_request.body = request_body
         return self
@@ -2,9 +2,8 @@
 
 from __future__ import annotations
 
-from io import BytesIO
-
 from dify_oapi.core.enum import HttpMethod
+from dify_oapi.core.http.multipart import FileSource, default_file_name
 from dify_oapi.core.model.base_request import BaseRequest
 
 from .update_document_by_file_request_body import UpdateDocumentByFileRequestBody
@@ -13,12 +12,14 @@ from .update_document_by_file_request_body import UpdateDocumentByFileRequestBod
 class UpdateDocumentByFileRequest(BaseRequest):
     """Request model for update document by file API."""
 
+    __slots__ = ("dataset_id", "document_id", "request_body", "file")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
         self.document_id: str | None = None
         self.request_body: UpdateDocumentByFileRequestBody | None = None
-        self.file: BytesIO | None = None
+        self.file: FileSource | None = None
 
     @staticmethod
     def builder() -> UpdateDocumentByFileRequestBuilder:
@@ -49,11 +50,11 @@ class UpdateDocumentByFileRequestBuilder:
 
     def request_body(self, request_body: UpdateDocumentByFileRequestBody) -> UpdateDocumentByFileRequestBuilder:
         self._update_document_by_file_request.request_body = request_body
-        self._update_document_by_file_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_document_by_file_request.body = request_body
         return self
 
-    def file(self, file: BytesIO, file_name: str | None = None) -> UpdateDocumentByFileRequestBuilder:
+    def file(self, file: FileSource, file_name: str | None = None) -> UpdateDocumentByFileRequestBuilder:
+        """Set the file to stream: a path, a binary file, bytes, a memoryview or an iterator of byte chunks."""
         self._update_document_by_file_request.file = file
-        file_name = file_name or "upload"
-        self._update_document_by_file_request.files = {"file": (file_name, file)}
+        self._update_document_by_file_request.files = {"file": (default_file_name(file, file_name), file)}
         return self
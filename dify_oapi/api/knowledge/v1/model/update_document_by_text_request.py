@@ -11,6 +11,8 @@ from .update_document_by_text_request_body import UpdateDocumentByTextRequestBod
 class UpdateDocumentByTextRequest(BaseRequest):
     """Request model for update document by text API."""
 
+    __slots__ = ("dataset_id", "document_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -46,5 +48,5 @@ class UpdateDocumentByTextRequestBuilder:
 
     def request_body(self, request_body: UpdateDocumentByTextRequestBody) -> UpdateDocumentByTextRequestBuilder:
         self._update_document_by_text_request.request_body = request_body
-        self._update_document_by_text_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_document_by_text_request.body = request_body
         return self
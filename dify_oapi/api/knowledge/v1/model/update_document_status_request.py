@@ -12,6 +12,8 @@ from .update_document_status_request_body import UpdateDocumentStatusRequestBody
 class UpdateDocumentStatusRequest(BaseRequest):
     """Request model for update document status API."""
 
+    __slots__ = ("dataset_id", "action", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -47,5 +49,5 @@ class UpdateDocumentStatusRequestBuilder:
 
     def request_body(self, request_body: UpdateDocumentStatusRequestBody) -> UpdateDocumentStatusRequestBuilder:
         self._update_document_status_request.request_body = request_body
-        self._update_document_status_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_document_status_request.body = request_body
         return self
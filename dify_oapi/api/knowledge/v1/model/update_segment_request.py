@@ -11,6 +11,8 @@ from .update_segment_request_body import UpdateSegmentRequestBody
 class UpdateSegmentRequest(BaseRequest):
     """Request model for update segment API."""
 
+    __slots__ = ("dataset_id", "document_id", "segment_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.dataset_id: str | None = None
@@ -52,5 +54,5 @@ class UpdateSegmentRequestBuilder:
 
     def request_body(self, request_body: UpdateSegmentRequestBody) -> UpdateSegmentRequestBuilder:
         self._update_segment_request.request_body = request_body
-        self._update_segment_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_segment_request.body = request_body
         return self
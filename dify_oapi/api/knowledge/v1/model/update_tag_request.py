@@ -5,6 +5,8 @@ from .update_tag_request_body import UpdateTagRequestBody
 
 
 class UpdateTagRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self):
         super().__init__()
         self.request_body: UpdateTagRequestBody | None = None
@@ -26,5 +28,5 @@ class UpdateTagRequestBuilder:
 
     def request_body(self, request_body: UpdateTagRequestBody) -> "UpdateTagRequestBuilder":
         self._update_tag_request.request_body = request_body
-        self._update_tag_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._update_tag_request.body = request_body
         return self
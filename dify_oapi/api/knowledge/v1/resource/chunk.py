@@ -10,6 +10,7 @@ from ..model.list_child_chunks_request import ListChildChunksRequest
 from ..model.list_child_chunks_response import ListChildChunksResponse
 from ..model.update_child_chunk_request import UpdateChildChunkRequest
 from ..model.update_child_chunk_response import UpdateChildChunkResponse
+from ..retrieval_cache import invalidate_retrieval_cache
 
 
 class Chunk:
@@ -25,31 +26,49 @@ class Chunk:
         )
 
     def create(self, request: CreateChildChunkRequest, request_option: RequestOption) -> CreateChildChunkResponse:
-        return Transport.execute(self.config, request, unmarshal_as=CreateChildChunkResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=CreateChildChunkResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def acreate(
         self, request: CreateChildChunkRequest, request_option: RequestOption
     ) -> CreateChildChunkResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=CreateChildChunkResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=CreateChildChunkResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def update(self, request: UpdateChildChunkRequest, request_option: RequestOption) -> UpdateChildChunkResponse:
-        return Transport.execute(self.config, request, unmarshal_as=UpdateChildChunkResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=UpdateChildChunkResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def aupdate(
         self, request: UpdateChildChunkRequest, request_option: RequestOption
     ) -> UpdateChildChunkResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=UpdateChildChunkResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=UpdateChildChunkResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def delete(self, request: DeleteChildChunkRequest, request_option: RequestOption) -> DeleteChildChunkResponse:
-        return Transport.execute(self.config, request, unmarshal_as=DeleteChildChunkResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=DeleteChildChunkResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def adelete(
         self, request: DeleteChildChunkRequest, request_option: RequestOption
     ) -> DeleteChildChunkResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=DeleteChildChunkResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=DeleteChildChunkResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
@@ -1,3 +1,7 @@
+import asyncio
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
 from dify_oapi.core.http.transport import ATransport, Transport
 from dify_oapi.core.model.config import Config
 from dify_oapi.core.model.request_option import RequestOption
@@ -8,12 +12,17 @@ from ..model.delete_dataset_request import DeleteDatasetRequest
 from ..model.delete_dataset_response import DeleteDatasetResponse
 from ..model.get_dataset_request import GetDatasetRequest
 from ..model.get_dataset_response import GetDatasetResponse
+from ..model.knowledge_types import RetrievalMergeStrategy
 from ..model.list_datasets_request import ListDatasetsRequest
 from ..model.list_datasets_response import ListDatasetsResponse
 from ..model.retrieve_from_dataset_request import RetrieveFromDatasetRequest
+from ..model.retrieve_from_dataset_request_body import RetrieveFromDatasetRequestBody
 from ..model.retrieve_from_dataset_response import RetrieveFromDatasetResponse
+from ..model.retrieve_from_datasets_response import RetrieveFromDatasetsResponse
 from ..model.update_dataset_request import UpdateDatasetRequest
 from ..model.update_dataset_response import UpdateDatasetResponse
+from ..retrieval_cache import RetrievalCache, invalidate_retrieval_cache
+from ..retrieval_merge import merge_retrieval_records
 
 
 class Dataset:
@@ -41,29 +50,171 @@ class Dataset:
         return await ATransport.aexecute(self.config, request, unmarshal_as=GetDatasetResponse, option=request_option)
 
     def update(self, request: UpdateDatasetRequest, request_option: RequestOption) -> UpdateDatasetResponse:
-        return Transport.execute(self.config, request, unmarshal_as=UpdateDatasetResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=UpdateDatasetResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def aupdate(self, request: UpdateDatasetRequest, request_option: RequestOption) -> UpdateDatasetResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=UpdateDatasetResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=UpdateDatasetResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def delete(self, request: DeleteDatasetRequest, request_option: RequestOption) -> DeleteDatasetResponse:
-        return Transport.execute(self.config, request, unmarshal_as=DeleteDatasetResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=DeleteDatasetResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def adelete(self, request: DeleteDatasetRequest, request_option: RequestOption) -> DeleteDatasetResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=DeleteDatasetResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=DeleteDatasetResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def retrieve(
         self, request: RetrieveFromDatasetRequest, request_option: RequestOption
     ) -> RetrieveFromDatasetResponse:
-        return Transport.execute(self.config, request, unmarshal_as=RetrieveFromDatasetResponse, option=request_option)
+        cache: RetrievalCache | None = getattr(self.config, "retrieval_cache", None)
+        if cache is not None and (cached := cache.get(request, request_option, self.config.domain)) is not None:
+            return cached
+        generation = cache.generation(request) if cache is not None else None
+        response = Transport.execute(
+            self.config, request, unmarshal_as=RetrieveFromDatasetResponse, option=request_option
+        )
+        if cache is not None:
+            cache.put(request, response, request_option, self.config.domain, generation)
+        return response
 
     async def aretrieve(
         self, request: RetrieveFromDatasetRequest, request_option: RequestOption
     ) -> RetrieveFromDatasetResponse:
-        return await ATransport.aexecute(
+        cache: RetrievalCache | None = getattr(self.config, "retrieval_cache", None)
+        if cache is not None and (cached := cache.get(request, request_option, self.config.domain)) is not None:
+            return cached
+        generation = cache.generation(request) if cache is not None else None
+        response = await ATransport.aexecute(
             self.config, request, unmarshal_as=RetrieveFromDatasetResponse, option=request_option
         )
+        if cache is not None:
+            cache.put(request, response, request_option, self.config.domain, generation)
+        return response
+
+    def retrieve_many(
+        self,
+        dataset_ids: Sequence[str],
+        request_body: RetrieveFromDatasetRequestBody,
+        request_option: RequestOption,
+        *,
+        top_k: int | None = None,
+        strategy: RetrievalMergeStrategy = "score",
+        timeout: float | None = None,
+        max_concurrency: int | None = None,
+    ) -> RetrieveFromDatasetsResponse:
+        """Retrieve from several datasets concurrently and merge the records into a global top_k.
+
+        Datasets that do not answer within `timeout` seconds are reported in `timed_out_datasets`.
+        """
+        unique_ids = [*dict.fromkeys(dataset_ids)]
+        responses: dict[str, RetrieveFromDatasetResponse] = {}
+        failed: dict[str, str] = {}
+        if not unique_ids:
+            return _merge_responses(unique_ids, responses, failed, request_body, top_k, strategy)
+
+        executor = ThreadPoolExecutor(max_workers=min(len(unique_ids), max_concurrency or len(unique_ids)))
+        futures: dict[Future, str] = {
+            executor.submit(self.retrieve, _retrieve_request(dataset_id, request_body), request_option): dataset_id
+            for dataset_id in unique_ids
+        }
+        done, pending = wait(futures, timeout=timeout)
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for future in done:
+            dataset_id = futures[future]
+            try:
+                responses[dataset_id] = future.result()
+            except Exception as e:
+                failed[dataset_id] = f"{e.__class__.__name__}: {e}"
+        return _merge_responses(unique_ids, responses, failed, request_body, top_k, strategy)
+
+    async def aretrieve_many(
+        self,
+        dataset_ids: Sequence[str],
+        request_body: RetrieveFromDatasetRequestBody,
+        request_option: RequestOption,
+        *,
+        top_k: int | None = None,
+        strategy: RetrievalMergeStrategy = "score",
+        timeout: float | None = None,
+        max_concurrency: int | None = None,
+    ) -> RetrieveFromDatasetsResponse:
+        unique_ids = [*dict.fromkeys(dataset_ids)]
+        responses: dict[str, RetrieveFromDatasetResponse] = {}
+        failed: dict[str, str] = {}
+        if not unique_ids:
+            return _merge_responses(unique_ids, responses, failed, request_body, top_k, strategy)
+
+        semaphore = asyncio.Semaphore(max_concurrency or len(unique_ids))
+
+        async def _retrieve(dataset_id: str) -> RetrieveFromDatasetResponse:
+            async with semaphore:
+                return await self.aretrieve(_retrieve_request(dataset_id, request_body), request_option)
+
+        tasks: dict[asyncio.Future, str] = {
+            asyncio.ensure_future(_retrieve(dataset_id)): dataset_id for dataset_id in unique_ids
+        }
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+        for task in done:
+            dataset_id = tasks[task]
+            if (exc := task.exception()) is not None:
+                failed[dataset_id] = f"{exc.__class__.__name__}: {exc}"
+            else:
+                responses[dataset_id] = task.result()
+        return _merge_responses(unique_ids, responses, failed, request_body, top_k, strategy)
+
+
+def _retrieve_request(dataset_id: str, request_body: RetrieveFromDatasetRequestBody) -> RetrieveFromDatasetRequest:
+    return RetrieveFromDatasetRequest.builder().dataset_id(dataset_id).request_body(request_body).build()
+
+
+def _merge_responses(
+    dataset_ids: Sequence[str],
+    responses: dict[str, RetrieveFromDatasetResponse],
+    failed: dict[str, str],
+    request_body: RetrieveFromDatasetRequestBody,
+    top_k: int | None,
+    strategy: RetrievalMergeStrategy,
+) -> RetrieveFromDatasetsResponse:
+    completed: list[str] = []
+    for dataset_id in dataset_ids:
+        response = responses.get(dataset_id)
+        if response is None:
+            continue
+        if response.success:
+            completed.append(dataset_id)
+        else:
+            failed[dataset_id] = response.msg or response.code or "unknown error"
+
+    records = merge_retrieval_records(
+        (responses[dataset_id].records or [] for dataset_id in completed),
+        top_k=top_k if top_k is not None else request_body.top_k,
+        strategy=strategy,
+    )
+    query = next((responses[dataset_id].query for dataset_id in completed), None)
+    return RetrieveFromDatasetsResponse(
+        query=query,
+        records=records,
+        completed_datasets=completed,
+        timed_out_datasets=[d for d in dataset_ids if d not in responses and d not in failed],
+        failed_datasets={d: failed[d] for d in dataset_ids if d in failed},
+    )
@@ -22,6 +22,7 @@ from ..model.update_document_by_text_request import UpdateDocumentByTextRequest
 from ..model.update_document_by_text_response import UpdateDocumentByTextResponse
 from ..model.update_document_status_request import UpdateDocumentStatusRequest
 from ..model.update_document_status_response import UpdateDocumentStatusResponse
+from ..retrieval_cache import invalidate_retrieval_cache
 
 
 class Document:
@@ -31,26 +32,42 @@ class Document:
     def create_by_file(
         self, request: CreateDocumentByFileRequest, request_option: RequestOption
     ) -> CreateDocumentByFileResponse:
-        return Transport.execute(self.config, request, unmarshal_as=CreateDocumentByFileResponse, option=request_option)
+        try:
+            return Transport.execute(
+                self.config, request, unmarshal_as=CreateDocumentByFileResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def acreate_by_file(
         self, request: CreateDocumentByFileRequest, request_option: RequestOption
     ) -> CreateDocumentByFileResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=CreateDocumentByFileResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=CreateDocumentByFileResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def create_by_text(
         self, request: CreateDocumentByTextRequest, request_option: RequestOption
     ) -> CreateDocumentByTextResponse:
-        return Transport.execute(self.config, request, unmarshal_as=CreateDocumentByTextResponse, option=request_option)
+        try:
+            return Transport.execute(
+                self.config, request, unmarshal_as=CreateDocumentByTextResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def acreate_by_text(
         self, request: CreateDocumentByTextRequest, request_option: RequestOption
     ) -> CreateDocumentByTextResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=CreateDocumentByTextResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=CreateDocumentByTextResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def list(self, request: ListDocumentsRequest, request_option: RequestOption) -> ListDocumentsResponse:
         return Transport.execute(self.config, request, unmarshal_as=ListDocumentsResponse, option=request_option)
@@ -69,34 +86,56 @@ class Document:
     def update_by_file(
         self, request: UpdateDocumentByFileRequest, request_option: RequestOption
     ) -> UpdateDocumentByFileResponse:
-        return Transport.execute(self.config, request, unmarshal_as=UpdateDocumentByFileResponse, option=request_option)
+        try:
+            return Transport.execute(
+                self.config, request, unmarshal_as=UpdateDocumentByFileResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def aupdate_by_file(
         self, request: UpdateDocumentByFileRequest, request_option: RequestOption
     ) -> UpdateDocumentByFileResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=UpdateDocumentByFileResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=UpdateDocumentByFileResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def update_by_text(
         self, request: UpdateDocumentByTextRequest, request_option: RequestOption
     ) -> UpdateDocumentByTextResponse:
-        return Transport.execute(self.config, request, unmarshal_as=UpdateDocumentByTextResponse, option=request_option)
+        try:
+            return Transport.execute(
+                self.config, request, unmarshal_as=UpdateDocumentByTextResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def aupdate_by_text(
         self, request: UpdateDocumentByTextRequest, request_option: RequestOption
     ) -> UpdateDocumentByTextResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=UpdateDocumentByTextResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=UpdateDocumentByTextResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def delete(self, request: DeleteDocumentRequest, request_option: RequestOption) -> DeleteDocumentResponse:
-        return Transport.execute(self.config, request, unmarshal_as=DeleteDocumentResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=DeleteDocumentResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def adelete(self, request: DeleteDocumentRequest, request_option: RequestOption) -> DeleteDocumentResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=DeleteDocumentResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=DeleteDocumentResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def file_info(self, request: GetUploadFileInfoRequest, request_option: RequestOption) -> GetUploadFileInfoResponse:
         return Transport.execute(self.config, request, unmarshal_as=GetUploadFileInfoResponse, option=request_option)
@@ -111,14 +150,22 @@ class Document:
     def update_status(
         self, request: UpdateDocumentStatusRequest, request_option: RequestOption
     ) -> UpdateDocumentStatusResponse:
-        return Transport.execute(self.config, request, unmarshal_as=UpdateDocumentStatusResponse, option=request_option)
+        try:
+            return Transport.execute(
+                self.config, request, unmarshal_as=UpdateDocumentStatusResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def aupdate_status(
         self, request: UpdateDocumentStatusRequest, request_option: RequestOption
     ) -> UpdateDocumentStatusResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=UpdateDocumentStatusResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=UpdateDocumentStatusResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def get_batch_status(
         self, request: GetBatchIndexingStatusRequest, request_option: RequestOption
@@ -12,6 +12,7 @@ from ..model.list_segments_request import ListSegmentsRequest
 from ..model.list_segments_response import ListSegmentsResponse
 from ..model.update_segment_request import UpdateSegmentRequest
 from ..model.update_segment_response import UpdateSegmentResponse
+from ..retrieval_cache import invalidate_retrieval_cache
 
 
 class Segment:
@@ -25,12 +26,18 @@ class Segment:
         return await ATransport.aexecute(self.config, request, unmarshal_as=ListSegmentsResponse, option=request_option)
 
     def create(self, request: CreateSegmentRequest, request_option: RequestOption) -> CreateSegmentResponse:
-        return Transport.execute(self.config, request, unmarshal_as=CreateSegmentResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=CreateSegmentResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def acreate(self, request: CreateSegmentRequest, request_option: RequestOption) -> CreateSegmentResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=CreateSegmentResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=CreateSegmentResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def get(self, request: GetSegmentRequest, request_option: RequestOption) -> GetSegmentResponse:
         return Transport.execute(self.config, request, unmarshal_as=GetSegmentResponse, option=request_option)
@@ -39,17 +46,29 @@ class Segment:
         return await ATransport.aexecute(self.config, request, unmarshal_as=GetSegmentResponse, option=request_option)
 
     def update(self, request: UpdateSegmentRequest, request_option: RequestOption) -> UpdateSegmentResponse:
-        return Transport.execute(self.config, request, unmarshal_as=UpdateSegmentResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=UpdateSegmentResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def aupdate(self, request: UpdateSegmentRequest, request_option: RequestOption) -> UpdateSegmentResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=UpdateSegmentResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=UpdateSegmentResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     def delete(self, request: DeleteSegmentRequest, request_option: RequestOption) -> DeleteSegmentResponse:
-        return Transport.execute(self.config, request, unmarshal_as=DeleteSegmentResponse, option=request_option)
+        try:
+            return Transport.execute(self.config, request, unmarshal_as=DeleteSegmentResponse, option=request_option)
+        finally:
+            invalidate_retrieval_cache(self.config, request)
 
     async def adelete(self, request: DeleteSegmentRequest, request_option: RequestOption) -> DeleteSegmentResponse:
-        return await ATransport.aexecute(
-            self.config, request, unmarshal_as=DeleteSegmentResponse, option=request_option
-        )
+        try:
+            return await ATransport.aexecute(
+                self.config, request, unmarshal_as=DeleteSegmentResponse, option=request_option
+            )
+        finally:
+            invalidate_retrieval_cache(self.config, request)
@@ -0,0 +1,124 @@
+"""Client-side cache for knowledge base retrieval results."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import unicodedata
+from typing import Any
+
+from dify_oapi.core.cache import CacheBackend, CacheStats, MemoryCache, credential_scope
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.request_option import RequestOption
+
+from .model.retrieve_from_dataset_request import RetrieveFromDatasetRequest
+from .model.retrieve_from_dataset_response import RetrieveFromDatasetResponse
+
+
+class RetrievalCache:
+    """Caches `Dataset.retrieve` results per dataset.
+
+    Entries are keyed on the dataset id, the normalized query, `retrieval_model`, `top_k`,
+    `score_threshold` and a hash of the domain and API key, so that a cache shared by clients never returns
+    the results of another tenant. Mutations of a dataset made through the same client drop its entries,
+    and `IndexingWatcher` drops them again once indexing completes, as Dify indexes asynchronously.
+
+    Every invalidation bumps a per-dataset generation; a result is only stored when the generation read
+    before the retrieval was sent is still current, so a retrieval racing a mutation cannot write back
+    a stale result.
+    """
+
+    def __init__(self, backend: CacheBackend | None = None, *, case_sensitive: bool = False) -> None:
+        self.backend: CacheBackend = backend if backend is not None else MemoryCache()
+        self.case_sensitive = case_sensitive
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.backend.stats
+
+    def normalize_query(self, query: str) -> str:
+        query = " ".join(unicodedata.normalize("NFKC", query).split())
+        return query if self.case_sensitive else query.casefold()
+
+    def key(
+        self, request: RetrieveFromDatasetRequest, option: RequestOption | None = None, domain: str | None = None
+    ) -> str | None:
+        """Return the cache key of the request sent to `domain` with `option`, or None when it cannot be cached."""
+        dataset_id = self._dataset_id(request)
+        body = request.request_body
+        if not dataset_id or body is None or body.query is None:
+            return None
+        material = {
+            "scope": credential_scope(option, domain),
+            "query": self.normalize_query(body.query),
+            "retrieval_model": body.retrieval_model.model_dump(exclude_none=True, mode="json")
+            if body.retrieval_model
+            else None,
+            "top_k": body.top_k,
+            "score_threshold": body.score_threshold,
+        }
+        digest = hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        return f"{dataset_id}:{digest}"
+
+    def get(
+        self, request: RetrieveFromDatasetRequest, option: RequestOption | None = None, domain: str | None = None
+    ) -> RetrieveFromDatasetResponse | None:
+        key = self.key(request, option, domain)
+        if key is None:
+            return None
+        payload = self.backend.get(key)
+        if payload is None:
+            return None
+        return RetrieveFromDatasetResponse.model_validate(payload)
+
+    def put(
+        self,
+        request: RetrieveFromDatasetRequest,
+        response: RetrieveFromDatasetResponse,
+        option: RequestOption | None = None,
+        domain: str | None = None,
+        generation: int | None = None,
+    ) -> None:
+        """Store a result, unless the dataset was invalidated since `generation` was read."""
+        key = self.key(request, option, domain)
+        if key is None or not response.success:
+            return
+        if response.raw is not None and response.raw.status_code != 200:
+            return
+        payload: dict[str, Any] = response.model_dump(mode="json", exclude={"raw"}, exclude_none=True)
+        dataset_id = key.split(":", 1)[0]
+        with self._lock:
+            if generation is not None and generation != self._generations.get(dataset_id, 0):
+                return
+            self.backend.set(key, payload, namespace=dataset_id)
+
+    def generation(self, request: RetrieveFromDatasetRequest) -> int:
+        """Return the current generation of the dataset targeted by `request`, to be passed to `put`."""
+        with self._lock:
+            return self._generations.get(self._dataset_id(request) or "", 0)
+
+    def invalidate(self, dataset_id: str) -> int:
+        with self._lock:
+            self._generations[dataset_id] = self._generations.get(dataset_id, 0) + 1
+            return self.backend.invalidate(dataset_id)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    @staticmethod
+    def _dataset_id(request: RetrieveFromDatasetRequest) -> str | None:
+        return request.dataset_id or request.paths.get("dataset_id")
+
+
+def invalidate_retrieval_cache(config: Config, request: BaseRequest) -> None:
+    """Drop cached retrievals of the dataset targeted by a mutating request."""
+    cache: RetrievalCache | None = getattr(config, "retrieval_cache", None)
+    if cache is None:
+        return
+    dataset_id = request.paths.get("dataset_id")
+    if dataset_id:
+        cache.invalidate(dataset_id)
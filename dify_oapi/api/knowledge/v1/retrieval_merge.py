@@ -0,0 +1,51 @@
+"""Client-side merging of retrieval results from several datasets."""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable
+
+from .model.knowledge_types import RetrievalMergeStrategy
+from .model.retrieval_record import RetrievalRecord
+
+# Damping constant of reciprocal-rank fusion, as in the original RRF paper
+RRF_K = 60
+
+
+def _segment_key(record: RetrievalRecord, position: int) -> str | int:
+    # Records without a segment id are never deduplicated
+    if record.segment is not None and record.segment.id:
+        return record.segment.id
+    return position
+
+
+def merge_retrieval_records(
+    results: Iterable[list[RetrievalRecord]],
+    top_k: int | None = None,
+    strategy: RetrievalMergeStrategy = "score",
+    rrf_k: int = RRF_K,
+) -> list[RetrievalRecord]:
+    """Merge per-dataset record lists into one ranked list, deduplicated by segment id.
+
+    `score` ranks by the server-side score and keeps the best-scored copy of a segment.
+    `rrf` ranks by reciprocal-rank fusion, which is robust when datasets score on different scales.
+    """
+    best: dict[str | int, RetrievalRecord] = {}
+    ranking: dict[str | int, float] = {}
+    position = 0
+    for records in results:
+        ordered = records if strategy == "score" else sorted(records, key=lambda r: r.score or 0.0, reverse=True)
+        for rank, record in enumerate(ordered, start=1):
+            key = _segment_key(record, position)
+            position += 1
+            current = best.get(key)
+            if current is None or (record.score or 0.0) > (current.score or 0.0):
+                best[key] = record
+            if strategy == "rrf":
+                ranking[key] = ranking.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            else:
+                ranking[key] = best[key].score or 0.0
+
+    limit = top_k if top_k is not None else len(best)
+    keys = heapq.nlargest(limit, ranking, key=ranking.__getitem__)
+    return [best[key] for key in keys]
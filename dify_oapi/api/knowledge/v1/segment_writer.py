@@ -0,0 +1,206 @@
+"""Size-aware batching of segment creation."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import httpx
+
+from dify_oapi.core.const import APPLICATION_JSON, CONTENT_TYPE
+from dify_oapi.core.log import logger
+from dify_oapi.core.model.request_option import RequestOption
+
+from .model.create_segment_request import CreateSegmentRequest
+from .model.create_segment_response import CreateSegmentResponse
+from .model.segment_content import SegmentContent
+from .model.segment_info import SegmentInfo
+from .resource.segment import Segment
+
+_BODY_PREFIX = b'{"segments":['
+_BODY_SUFFIX = b"]}"
+
+# Failures after which no segment was created, so that the batch can be sent again in halves
+_SPLIT_STATUS_CODES = frozenset({413})
+_UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+@dataclass
+class _Batch:
+    indices: list[int] = field(default_factory=list)
+    parts: list[bytes] = field(default_factory=list)
+    size: int = len(_BODY_PREFIX) + len(_BODY_SUFFIX)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def add(self, index: int, part: bytes) -> None:
+        self.size += len(part) + (1 if self.parts else 0)
+        self.indices.append(index)
+        self.parts.append(part)
+
+    def split(self) -> tuple[_Batch, _Batch]:
+        middle = len(self) // 2
+        halves = (_Batch(), _Batch())
+        for half, indices, parts in (
+            (halves[0], self.indices[:middle], self.parts[:middle]),
+            (halves[1], self.indices[middle:], self.parts[middle:]),
+        ):
+            for index, part in zip(indices, parts, strict=True):
+                half.add(index, part)
+        return halves
+
+    def body(self) -> bytes:
+        return _BODY_PREFIX + b",".join(self.parts) + _BODY_SUFFIX
+
+
+@dataclass
+class SegmentWriteResult:
+    """Created segments in input order; entries of failed segments are None and listed in `errors`."""
+
+    segments: list[SegmentInfo | None] = field(default_factory=list)
+    errors: dict[int, str] = field(default_factory=dict)
+    requests: int = 0
+
+    @property
+    def success(self) -> bool:
+        return not self.errors
+
+
+class SegmentWriter:
+    """Packs an arbitrarily long stream of segments into `Segment.create` requests.
+
+    Each segment is JSON-encoded exactly once; batches are filled up to `max_count` segments and
+    `max_bytes` of request body, and the pre-encoded body is sent as is. Batches are sent concurrently
+    up to `max_concurrency`.
+
+    Creating segments is not idempotent, so only a batch rejected with 413, or that failed to connect before
+    being sent, is split in halves and retried until single segments fail. Any other failure, including 5xx
+    responses, timeouts and responses with fewer segments than sent, is recorded for every segment of the batch.
+    """
+
+    def __init__(
+        self,
+        segment: Segment,
+        dataset_id: str,
+        document_id: str,
+        request_option: RequestOption,
+        *,
+        max_count: int = 100,
+        max_bytes: int = 1024 * 1024,
+        max_concurrency: int = 4,
+    ) -> None:
+        self.segment = segment
+        self.dataset_id = dataset_id
+        self.document_id = document_id
+        self.request_option = request_option
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_concurrency = max_concurrency
+
+    def write(self, segments: Iterable[SegmentContent]) -> SegmentWriteResult:
+        created: dict[int, SegmentInfo] = {}
+        result = SegmentWriteResult()
+        batches = self._pack(segments)
+        retries: deque[_Batch] = deque()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pending: dict[Future, _Batch] = {}
+            while True:
+                while len(pending) < self.max_concurrency:
+                    batch = retries.popleft() if retries else next(batches, None)
+                    if batch is None:
+                        break
+                    pending[executor.submit(self.segment.create, self._request(batch), self.request_option)] = batch
+                    result.requests += 1
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = pending.pop(future)
+                    try:
+                        response, exc = future.result(), None
+                    except Exception as e:
+                        response, exc = None, e
+                    self._collect(batch, response, exc, created, result, retries)
+        return self._finish(created, result)
+
+    async def awrite(self, segments: Iterable[SegmentContent]) -> SegmentWriteResult:
+        created: dict[int, SegmentInfo] = {}
+        result = SegmentWriteResult()
+        batches = self._pack(segments)
+        retries: deque[_Batch] = deque()
+        pending: dict[asyncio.Future, _Batch] = {}
+        while True:
+            while len(pending) < self.max_concurrency:
+                batch = retries.popleft() if retries else next(batches, None)
+                if batch is None:
+                    break
+                task = asyncio.ensure_future(self.segment.acreate(self._request(batch), self.request_option))
+                pending[task] = batch
+                result.requests += 1
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                batch = pending.pop(task)
+                exc = task.exception()
+                response = task.result() if exc is None else None
+                self._collect(batch, response, exc, created, result, retries)
+        return self._finish(created, result)
+
+    def _pack(self, segments: Iterable[SegmentContent]) -> Iterator[_Batch]:
+        batch = _Batch()
+        for index, segment in enumerate(segments):
+            part = segment.model_dump_json(exclude_none=True).encode()
+            if batch.indices and (len(batch) >= self.max_count or batch.size + len(part) + 1 > self.max_bytes):
+                yield batch
+                batch = _Batch()
+            batch.add(index, part)
+        if batch.indices:
+            yield batch
+
+    def _request(self, batch: _Batch) -> CreateSegmentRequest:
+        request = CreateSegmentRequest.builder().dataset_id(self.dataset_id).document_id(self.document_id).build()
+        request.headers[CONTENT_TYPE] = APPLICATION_JSON
+        request.content = batch.body()
+        return request
+
+    def _collect(
+        self,
+        batch: _Batch,
+        response: CreateSegmentResponse | None,
+        exc: BaseException | None,
+        created: dict[int, SegmentInfo],
+        result: SegmentWriteResult,
+        retries: deque[_Batch],
+    ) -> None:
+        if response is None:
+            error = f"{exc.__class__.__name__}: {exc}"
+            splittable = isinstance(exc, _UNSENT_ERRORS)
+        elif not response.success:
+            error = response.msg or response.code or "unknown error"
+            status_code = response.raw.status_code if response.raw is not None else None
+            splittable = status_code in _SPLIT_STATUS_CODES
+        elif len(response.data or []) != len(batch):
+            # Some segments may have been created: sending them again would duplicate them
+            error = f"expected {len(batch)} segments, got {len(response.data or [])}"
+            splittable = False
+        else:
+            created.update(zip(batch.indices, response.data or [], strict=True))
+            return
+
+        if splittable and len(batch) > 1:
+            logger.info(f"segment batch of {len(batch)} failed, retrying in halves: {error}")
+            retries.extend(batch.split())
+            return
+        for index in batch.indices:
+            result.errors[index] = error
+
+    @staticmethod
+    def _finish(created: dict[int, SegmentInfo], result: SegmentWriteResult) -> SegmentWriteResult:
+        total = max([*created, *result.errors], default=-1) + 1
+        result.segments = [created.get(index) for index in range(total)]
+        return result
@@ -0,0 +1,294 @@
+"""Content-hash based incremental synchronisation of documents into a dataset."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from dify_oapi.core.log import logger
+from dify_oapi.core.model.base_response import BaseResponse
+from dify_oapi.core.model.request_option import RequestOption
+
+from .indexing_watcher import IndexingWatcher
+from .ingestion import IngestionSource, create_document
+from .model.create_document_by_file_request_body_data import CreateDocumentByFileRequestBodyData
+from .model.create_document_by_text_request_body import CreateDocumentByTextRequestBody
+from .model.delete_document_request import DeleteDocumentRequest
+from .model.list_documents_request import ListDocumentsRequest
+from .model.update_document_by_file_request import UpdateDocumentByFileRequest
+from .model.update_document_by_file_request_body import UpdateDocumentByFileRequestBody
+from .model.update_document_by_file_request_body_data import UpdateDocumentByFileRequestBodyData
+from .model.update_document_by_text_request import UpdateDocumentByTextRequest
+from .model.update_document_by_text_request_body import UpdateDocumentByTextRequestBody
+from .resource.document import Document
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ManifestEntry:
+    source_id: str
+    document_id: str
+    content_hash: str | None
+    size: int | None = None
+    mtime_ns: int | None = None
+
+
+class SyncManifest:
+    """SQLite manifest mapping source ids to content hashes and Dify document ids, per dataset."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "dataset_id TEXT NOT NULL, source_id TEXT NOT NULL, document_id TEXT NOT NULL, "
+            "content_hash TEXT, size INTEGER, mtime_ns INTEGER, PRIMARY KEY (dataset_id, source_id))"
+        )
+        self._conn.commit()
+
+    def entries(self, dataset_id: str) -> dict[str, ManifestEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_id, document_id, content_hash, size, mtime_ns FROM documents WHERE dataset_id = ?",
+                (dataset_id,),
+            ).fetchall()
+        return {row[0]: ManifestEntry(*row) for row in rows}
+
+    def put(self, dataset_id: str, entry: ManifestEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (dataset_id, source_id, document_id, content_hash, size, mtime_ns) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (dataset_id, entry.source_id, entry.document_id, entry.content_hash, entry.size, entry.mtime_ns),
+            )
+            self._conn.commit()
+
+    def remove(self, dataset_id: str, source_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE dataset_id = ? AND source_id = ?", (dataset_id, source_id))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class SyncPlan:
+    create: list[tuple[IngestionSource, ManifestEntry]] = field(default_factory=list)
+    update: list[tuple[IngestionSource, ManifestEntry]] = field(default_factory=list)
+    delete: list[ManifestEntry] = field(default_factory=list)
+    unchanged: int = 0
+
+
+@dataclass
+class SyncReport:
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    failures: dict[str, str] = field(default_factory=dict)
+
+
+def hash_source(source: IngestionSource) -> str:
+    """Hash the name and content of a source, streaming files in fixed-size chunks."""
+    digest = hashlib.sha256(source.name.encode())
+    digest.update(b"\0")
+    if source.path is not None:
+        with open(source.path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+    else:
+        digest.update((source.text or "").encode())
+    return digest.hexdigest()
+
+
+class DocumentSync:
+    """Creates, updates or deletes only the documents whose content changed since the last sync.
+
+    When the manifest has no entry for the dataset, existing documents are adopted from `Document.list`
+    by name. Adopted documents are re-uploaded once unless `trust_existing` is set, because their content
+    hash is unknown. Only documents tracked by the manifest are ever deleted.
+    """
+
+    def __init__(
+        self,
+        document: Document,
+        dataset_id: str,
+        request_option: RequestOption,
+        manifest: SyncManifest | str,
+        *,
+        file_data: CreateDocumentByFileRequestBodyData | None = None,
+        text_body: CreateDocumentByTextRequestBody | None = None,
+        max_concurrency: int = 4,
+        delete_missing: bool = True,
+        trust_existing: bool = False,
+        watcher: IndexingWatcher | None = None,
+    ) -> None:
+        self.document = document
+        self.dataset_id = dataset_id
+        self.request_option = request_option
+        self.manifest = SyncManifest(manifest) if isinstance(manifest, str) else manifest
+        self.file_data = file_data or CreateDocumentByFileRequestBodyData(indexing_technique="high_quality")
+        self.text_body = text_body or CreateDocumentByTextRequestBody(indexing_technique="high_quality")
+        self.max_concurrency = max_concurrency
+        self.delete_missing = delete_missing
+        self.trust_existing = trust_existing
+        self.watcher = watcher
+
+    def plan(self, sources: Iterable[IngestionSource] | str) -> SyncPlan:
+        if isinstance(sources, str):
+            sources = IngestionSource.from_directory(sources)
+        sources = list(sources)
+        known = self.manifest.entries(self.dataset_id) or self._reconcile(sources)
+
+        plan = SyncPlan()
+        seen: set[str] = set()
+        for source in sources:
+            seen.add(source.source_id)
+            entry = known.get(source.source_id)
+            size, mtime_ns = _stat(source)
+            if entry is not None and entry.content_hash and size is not None:
+                if (entry.size, entry.mtime_ns) == (size, mtime_ns):
+                    plan.unchanged += 1
+                    continue
+            content_hash = hash_source(source)
+            if entry is None:
+                plan.create.append((source, ManifestEntry(source.source_id, "", content_hash, size, mtime_ns)))
+            elif entry.content_hash == content_hash:
+                plan.unchanged += 1
+                if (entry.size, entry.mtime_ns) != (size, mtime_ns):
+                    entry.size, entry.mtime_ns = size, mtime_ns
+                    self.manifest.put(self.dataset_id, entry)
+            else:
+                plan.update.append(
+                    (source, ManifestEntry(source.source_id, entry.document_id, content_hash, size, mtime_ns))
+                )
+        if self.delete_missing:
+            plan.delete = [entry for source_id, entry in known.items() if source_id not in seen]
+        return plan
+
+    def run(self, sources: Iterable[IngestionSource] | str) -> SyncReport:
+        plan = self.plan(sources)
+        report = SyncReport(unchanged=plan.unchanged)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures: dict[Future, tuple[str, IngestionSource | None, ManifestEntry]] = {}
+            for source, entry in plan.create:
+                futures[executor.submit(self._create, source)] = ("create", source, entry)
+            for source, entry in plan.update:
+                futures[executor.submit(self._update, source, entry.document_id)] = ("update", source, entry)
+            for entry in plan.delete:
+                futures[executor.submit(self._delete, entry.document_id)] = ("delete", None, entry)
+
+            for future in as_completed(futures):
+                action, _, entry = futures[future]
+                self._apply(action, entry, future, report)
+
+        if self.watcher is not None:
+            self.watcher.wait()
+        return report
+
+    def _apply(self, action: str, entry: ManifestEntry, future: Future, report: SyncReport) -> None:
+        try:
+            response = future.result()
+            error = None if response.success else (response.msg or response.code or "unknown error")
+        except Exception as e:
+            response, error = None, f"{e.__class__.__name__}: {e}"
+        if error is not None:
+            logger.warning(f"sync {action} of {entry.source_id} failed: {error}")
+            report.failures[entry.source_id] = error
+            return
+
+        if action == "delete":
+            self.manifest.remove(self.dataset_id, entry.source_id)
+            report.deleted += 1
+            return
+        if response.document is not None and response.document.id:
+            entry.document_id = response.document.id
+        self.manifest.put(self.dataset_id, entry)
+        if action == "create":
+            report.created += 1
+        else:
+            report.updated += 1
+        if self.watcher is not None and response.batch:
+            self.watcher.add(self.dataset_id, response.batch, self.request_option)
+
+    def _reconcile(self, sources: list[IngestionSource]) -> dict[str, ManifestEntry]:
+        by_name: dict[str, list[IngestionSource]] = {}
+        for source in sources:
+            by_name.setdefault(source.name, []).append(source)
+
+        adopted: dict[str, ManifestEntry] = {}
+        page = 1
+        while True:
+            request = ListDocumentsRequest.builder().dataset_id(self.dataset_id).page(page).limit(100).build()
+            response = self.document.list(request, self.request_option)
+            if not response.success:
+                raise RuntimeError(f"failed to list documents of dataset {self.dataset_id}: {response.msg}")
+            for info in response.data or []:
+                matches = by_name.get(info.name or "", [])
+                if len(matches) != 1 or not info.id:
+                    continue
+                source = matches[0]
+                size, mtime_ns = _stat(source)
+                content_hash = hash_source(source) if self.trust_existing else None
+                entry = ManifestEntry(source.source_id, info.id, content_hash, size, mtime_ns)
+                self.manifest.put(self.dataset_id, entry)
+                adopted[source.source_id] = entry
+            if not response.has_more:
+                break
+            page += 1
+        return adopted
+
+    def _create(self, source: IngestionSource) -> BaseResponse:
+        return create_document(
+            self.document,
+            self.dataset_id,
+            source,
+            self.request_option,
+            file_data=self.file_data,
+            text_body=self.text_body,
+        )
+
+    def _update(self, source: IngestionSource, document_id: str) -> BaseResponse:
+        if source.path is not None:
+            data = UpdateDocumentByFileRequestBodyData(name=source.name)
+            body = UpdateDocumentByFileRequestBody.builder().data(data).build()
+            with open(source.path, "rb") as f:
+                file_request = (
+                    UpdateDocumentByFileRequest.builder()
+                    .dataset_id(self.dataset_id)
+                    .document_id(document_id)
+                    .request_body(body)
+                    .file(f, source.name)
+                    .build()
+                )
+                return self.document.update_by_file(file_request, self.request_option)
+
+        text_body = UpdateDocumentByTextRequestBody(name=source.name, text=source.text or "")
+        text_request = (
+            UpdateDocumentByTextRequest.builder()
+            .dataset_id(self.dataset_id)
+            .document_id(document_id)
+            .request_body(text_body)
+            .build()
+        )
+        return self.document.update_by_text(text_request, self.request_option)
+
+    def _delete(self, document_id: str) -> BaseResponse:
+        request = DeleteDocumentRequest.builder().dataset_id(self.dataset_id).document_id(document_id).build()
+        return self.document.delete(request, self.request_option)
+
+
+def _stat(source: IngestionSource) -> tuple[int | None, int | None]:
+    if source.path is None:
+        return None, None
+    stat = os.stat(source.path)
+    return stat.st_size, stat.st_mtime_ns
@@ -5,6 +5,8 @@ from dify_oapi.core.model.base_request import BaseRequest
 
 
 class GetWorkflowRunDetailRequest(BaseRequest):
+    __slots__ = ("workflow_run_id",)
+
     def __init__(self) -> None:
         super().__init__()
         self.workflow_run_id: str | None = None
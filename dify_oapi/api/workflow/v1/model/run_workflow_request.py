@@ -7,6 +7,8 @@ from .run_workflow_request_body import RunWorkflowRequestBody
 
 
 class RunWorkflowRequest(BaseRequest):
+    __slots__ = ("request_body",)
+
     def __init__(self) -> None:
         super().__init__()
         self.request_body: RunWorkflowRequestBody | None = None
@@ -28,5 +30,5 @@ class RunWorkflowRequestBuilder:
 
     def request_body(self, request_body: RunWorkflowRequestBody) -> RunWorkflowRequestBuilder:
         self._run_workflow_request.request_body = request_body
-        self._run_workflow_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._run_workflow_request.body = request_body
         return self
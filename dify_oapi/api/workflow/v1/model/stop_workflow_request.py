@@ -7,6 +7,8 @@ from .stop_workflow_request_body import StopWorkflowRequestBody
 
 
 class StopWorkflowRequest(BaseRequest):
+    __slots__ = ("task_id", "request_body")
+
     def __init__(self) -> None:
         super().__init__()
         self.task_id: str | None = None
@@ -34,5 +36,5 @@ class StopWorkflowRequestBuilder:
 
     def request_body(self, request_body: StopWorkflowRequestBody) -> StopWorkflowRequestBuilder:
         self._stop_workflow_request.request_body = request_body
-        self._stop_workflow_request.body = request_body.model_dump(exclude_none=True, mode="json")
+        self._stop_workflow_request.body = request_body
         return self
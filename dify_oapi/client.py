@@ -3,17 +3,26 @@ from __future__ import annotations
 import ssl
 
 from .api.chat.service import ChatService
+from .api.chat.v1.message_store import MessageStore
 from .api.chatflow.service import ChatflowService
 from .api.completion.service import CompletionService
 from .api.dify.service import DifyService
+from .api.dify.v1.upload_cache import UploadCache
 from .api.knowledge.service import KnowledgeService
+from .api.knowledge.v1.retrieval_cache import RetrievalCache
 from .api.workflow.service import WorkflowService
-from .core.enum import LogLevel
+from .core.concurrency import AdaptiveConcurrencyLimiter
+from .core.enum import BalancingStrategy, LogLevel
+from .core.hedging import RequestHedger
 from .core.http.transport import Transport
 from .core.http.transport.connection_pool import connection_pool
+from .core.load_balancer import LoadBalancer
 from .core.log import logger
 from .core.model.base_request import BaseRequest
 from .core.model.config import Config
+from .core.model.lean_responses import LeanResponses
+from .core.rate_limit import RateLimiter
+from .core.scheduler import RequestScheduler
 
 
 class Client:
@@ -89,6 +98,16 @@ class ClientBuilder:
         self._config.domain = domain
         return self
 
+    def domains(self, domains: list[str], strategy: BalancingStrategy = BalancingStrategy.ROUND_ROBIN) -> ClientBuilder:
+        """Balance requests over replicas of the API, skipping replicas that fail."""
+        return self.load_balancer(LoadBalancer(domains, strategy=strategy))
+
+    def load_balancer(self, balancer: LoadBalancer) -> ClientBuilder:
+        """Balance requests over the replicas of a configured LoadBalancer."""
+        self._config.domain = balancer.domains[0]
+        self._config.load_balancer = balancer
+        return self
+
     def log_level(self, level: LogLevel) -> ClientBuilder:
         self._config.log_level = level
         return self
@@ -122,6 +141,46 @@ class ClientBuilder:
         self._config.verify_ssl = verify
         return self
 
+    def retrieval_cache(self, cache: RetrievalCache) -> ClientBuilder:
+        """Cache knowledge retrieval results, invalidated by dataset mutations made through this client."""
+        self._config.retrieval_cache = cache
+        return self
+
+    def message_store(self, store: MessageStore) -> ClientBuilder:
+        """Mirror chat message histories locally, updated from chats sent through this client."""
+        self._config.message_store = store
+        return self
+
+    def upload_cache(self, cache: UploadCache) -> ClientBuilder:
+        """Reuse uploads of files with the same content, for uploads of local paths and `ChatFile.local_path`."""
+        self._config.upload_cache = cache
+        return self
+
+    def rate_limiter(self, limiter: RateLimiter) -> ClientBuilder:
+        """Queue requests locally to stay under per-API-key rate limits; overridable per RequestOption."""
+        self._config.rate_limiter = limiter
+        return self
+
+    def concurrency_limiter(self, limiter: AdaptiveConcurrencyLimiter) -> ClientBuilder:
+        """Adapt the number of requests in flight to the latency and errors of the server."""
+        self._config.concurrency_limiter = limiter
+        return self
+
+    def scheduler(self, scheduler: RequestScheduler) -> ClientBuilder:
+        """Admit requests by the priority of their RequestOption, ahead of the connection pool."""
+        self._config.scheduler = scheduler
+        return self
+
+    def hedger(self, hedger: RequestHedger) -> ClientBuilder:
+        """Send a duplicate of GET requests that are slower than usual and take the first response."""
+        self._config.hedger = hedger
+        return self
+
+    def lean_responses(self, lean_responses: LeanResponses | None = None) -> ClientBuilder:
+        """Keep only the status and some headers of the raw response of parsed responses; overridable per RequestOption."""
+        self._config.lean_responses = lean_responses or LeanResponses()
+        return self
+
     def build(self) -> Client:
         client: Client = Client()
         client._config = self._config
@@ -0,0 +1,292 @@
+"""Fire-and-forget execution of non-critical writes."""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from .log import logger
+from .model.base_response import BaseResponse
+
+# HTTP status codes of responses that are worth retrying
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+@dataclass
+class BackgroundStats:
+    """Counters of a background writer."""
+
+    submitted: int = 0
+    collapsed: int = 0
+    dropped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    retried: int = 0
+
+
+class _PendingWrites:
+    """Writes waiting for a worker, keyed so that a newer write replaces a pending one with the same key."""
+
+    def __init__(self, max_pending: int, stats: BackgroundStats) -> None:
+        self.max_pending = max_pending
+        self.stats = stats
+        self.running = 0
+        self._writes: OrderedDict[str, Callable[[], Any]] = OrderedDict()
+        self._anonymous = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def put(self, key: str | None, call: Callable[[], Any]) -> bool:
+        key = key if key is not None else f"\0{next(self._anonymous)}"
+        if key in self._writes:
+            # Keep the queue position of the first write but only send the latest one
+            self._writes[key] = call
+            self.stats.collapsed += 1
+            return True
+        if len(self._writes) >= self.max_pending:
+            self.stats.dropped += 1
+            logger.warning(f"background write queue is full, dropped write {key!r}")
+            return False
+        self._writes[key] = call
+        self.stats.submitted += 1
+        return True
+
+    def take(self) -> tuple[str, Callable[[], Any]] | None:
+        if not self._writes:
+            return None
+        self.running += 1
+        return self._writes.popitem(last=False)
+
+    @property
+    def idle(self) -> bool:
+        return not self._writes and not self.running
+
+
+class _RetryPolicy:
+    def __init__(self, max_retries: int, retry_backoff: float) -> None:
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    @staticmethod
+    def should_retry(result: Any, error: BaseException | None) -> bool:
+        if error is not None:
+            return True
+        if isinstance(result, BaseResponse) and not result.success:
+            return result.raw is not None and result.raw.status_code in RETRYABLE_STATUS_CODES
+        return False
+
+    def delay(self, attempt: int) -> float:
+        return self.retry_backoff * (1 << attempt)
+
+
+def _record(stats: BackgroundStats, key: str, result: Any, error: BaseException | None) -> None:
+    if error is None and not (isinstance(result, BaseResponse) and not result.success):
+        stats.succeeded += 1
+        return
+    stats.failed += 1
+    detail = f"{error.__class__.__name__}: {error}" if error is not None else result.msg
+    logger.warning(f"background write {key!r} failed: {detail}")
+
+
+class BackgroundWriter:
+    """Runs non-critical writes, such as feedback or conversation renames, on a pool of worker threads.
+
+    `submit` returns immediately. Writes submitted with the same key while an earlier one is still queued
+    collapse into the latest one, so rapid repeated ratings of a message send a single request. When
+    `max_pending` writes are queued, new writes are dropped and counted in `stats.dropped`. Failed writes
+    are retried with exponential backoff when the error is transient. Queued writes are flushed by `close`,
+    which is also registered to run at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        max_pending: int = 1000,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        flush_on_exit: bool = True,
+    ) -> None:
+        self.stats = BackgroundStats()
+        self._pending = _PendingWrites(max_pending, self.stats)
+        self._retry = _RetryPolicy(max_retries, retry_backoff)
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"dify-background-writer-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        if flush_on_exit:
+            atexit.register(self.close)
+
+    def __enter__(self) -> BackgroundWriter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, key: str | None, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """Queue `fn(*args, **kwargs)`; return False when the write was dropped."""
+        with self._condition:
+            if self._closed:
+                self.stats.dropped += 1
+                return False
+            queued = self._pending.put(key, lambda: fn(*args, **kwargs))
+            self._condition.notify()
+            return queued
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued write finished; return False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending.idle, timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Flush queued writes and stop the workers."""
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._pending) or self._closed)
+                write = self._pending.take()
+                if write is None:
+                    return
+            key, call = write
+            try:
+                self._run(key, call)
+            finally:
+                with self._condition:
+                    self._pending.running -= 1
+                    self._condition.notify_all()
+
+    def _run(self, key: str, call: Callable[[], Any]) -> None:
+        for attempt in range(self._retry.max_retries + 1):
+            result, error = None, None
+            try:
+                result = call()
+            except Exception as e:
+                error = e
+            if attempt == self._retry.max_retries or not self._retry.should_retry(result, error):
+                break
+            self.stats.retried += 1
+            time.sleep(self._retry.delay(attempt))
+        _record(self.stats, key, result, error)
+
+
+class AsyncBackgroundWriter:
+    """Asyncio version of BackgroundWriter; `fn` returns an awaitable and workers are tasks.
+
+    Workers are started on the running loop by the first `submit`; `aclose` flushes and stops them.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        max_pending: int = 1000,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+    ) -> None:
+        self.workers = workers
+        self.stats = BackgroundStats()
+        self._pending = _PendingWrites(max_pending, self.stats)
+        self._retry = _RetryPolicy(max_retries, retry_backoff)
+        self._condition: asyncio.Condition | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, key: str | None, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> bool:
+        """Queue `await fn(*args, **kwargs)`; return False when the write was dropped."""
+        if self._closed:
+            self.stats.dropped += 1
+            return False
+        condition = self._start()
+        queued = self._pending.put(key, lambda: fn(*args, **kwargs))
+        asyncio.ensure_future(self._notify(condition))
+        return queued
+
+    async def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued write finished; return False on timeout."""
+        if self._condition is None:
+            return True
+        condition = self._condition
+
+        async def idle() -> None:
+            async with condition:
+                await condition.wait_for(lambda: self._pending.idle)
+
+        # asyncio.wait reports a timeout without raising, whose exception type differs before Python 3.11
+        waiter = asyncio.ensure_future(idle())
+        done, _ = await asyncio.wait({waiter}, timeout=timeout)
+        if not done:
+            waiter.cancel()
+        return bool(done)
+
+    async def aclose(self, timeout: float | None = None) -> None:
+        """Flush queued writes and stop the workers."""
+        await self.flush(timeout)
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def _start(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+            self._tasks = [asyncio.ensure_future(self._work(self._condition)) for _ in range(self.workers)]
+        return self._condition
+
+    @staticmethod
+    async def _notify(condition: asyncio.Condition) -> None:
+        async with condition:
+            condition.notify()
+
+    async def _work(self, condition: asyncio.Condition) -> None:
+        while True:
+            async with condition:
+                await condition.wait_for(lambda: len(self._pending) > 0)
+                write = self._pending.take()
+            if write is None:
+                continue
+            key, call = write
+            try:
+                await self._run(key, call)
+            finally:
+                async with condition:
+                    self._pending.running -= 1
+                    condition.notify_all()
+
+    async def _run(self, key: str, call: Callable[[], Awaitable[Any]]) -> None:
+        for attempt in range(self._retry.max_retries + 1):
+            result, error = None, None
+            try:
+                result = await call()
+            except Exception as e:
+                error = e
+            if attempt == self._retry.max_retries or not self._retry.should_retry(result, error):
+                break
+            self.stats.retried += 1
+            await asyncio.sleep(self._retry.delay(attempt))
+        _record(self.stats, key, result, error)
@@ -0,0 +1,219 @@
+"""Pluggable key-value caches with LRU and TTL eviction."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from dify_oapi.core.model.request_option import RequestOption
+
+
+@dataclass
+class CacheStats:
+    """Counters describing cache effectiveness."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def credential_scope(option: "RequestOption | None", domain: str | None) -> str:
+    """Hash of the domain and credentials a request is sent with, to keep cached entries of apps apart; the keys
+    of a pool all belong to one app."""
+    pool = getattr(option, "key_pool", None)
+    credential = "\n".join(sorted(pool.keys)) if pool is not None else getattr(option, "api_key", None) or ""
+    return hashlib.sha256(f"{domain or ''}\n{credential}".encode()).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Base class for cache backends.
+
+    Entries are grouped by namespace so that related entries can be dropped together.
+    """
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def get(self, key: str) -> Any | None: ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, namespace: str = "") -> None: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def invalidate(self, namespace: str) -> int:
+        """Drop every entry of the namespace and return how many were removed."""
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+
+class MemoryCache(CacheBackend):
+    """Thread-safe in-memory LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = 300.0) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[str, float | None, Any]] = OrderedDict()
+        self._namespaces: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            _, expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, namespace: str = "") -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (namespace, expires_at, value)
+            self._namespaces.setdefault(namespace, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, namespace: str) -> int:
+        with self._lock:
+            keys = self._namespaces.pop(namespace, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self.stats.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        namespace, _, _ = self._entries.pop(key)
+        keys = self._namespaces.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespaces[namespace]
+
+
+class DiskCache(CacheBackend):
+    """SQLite-backed cache persisted on local disk.
+
+    Values must be JSON serializable. Expiry uses wall-clock time so entries survive process restarts.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl: float | None = 3600.0) -> None:
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_namespace ON cache (namespace)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self._size = int(self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0])
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._delete(key)
+                self.stats.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, namespace: str = "") -> None:
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone() is None:
+                self._size += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, namespace, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, encoded, expires_at, now),
+            )
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                removed = self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)", (overflow,)
+                ).rowcount
+                self._size -= removed
+                self.stats.evictions += removed
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._delete(key)
+
+    def invalidate(self, namespace: str) -> int:
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,)).rowcount
+            self._size -= removed
+            self.stats.invalidations += removed
+            return int(removed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _delete(self, key: str) -> None:
+        self._size -= self._conn.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
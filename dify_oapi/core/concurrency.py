@@ -0,0 +1,199 @@
+"""Adaptive limit of the requests in flight per domain."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from dify_oapi.core.waiter import Waiter
+
+# Response statuses that mean the server is overloaded
+OVERLOAD_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+@dataclass
+class ConcurrencyStats:
+    """Current state of the limit of a domain."""
+
+    limit: int
+    inflight: int
+    queued: int
+
+
+class _DomainLimit:
+    def __init__(self, limit: float, window: int) -> None:
+        self.limit = limit
+        self.inflight = 0
+        self.waiters: deque[Waiter] = deque()
+        self.window = window
+        # Recent latencies per endpoint, since a blocking chat is not slow next to a lookup
+        self.latencies: dict[str, deque[float]] = {}
+
+    def endpoint_latencies(self, endpoint: str) -> deque[float]:
+        latencies = self.latencies.get(endpoint)
+        if latencies is None:
+            latencies = self.latencies[endpoint] = deque(maxlen=self.window)
+        return latencies
+
+
+class Slot:
+    """A request admitted by the limiter; report its status with `observe` and release it on exit.
+
+    The latency is measured up to `observe`, so streamed responses are judged on their time to the first
+    byte while they keep the slot until the stream is closed. A slot left by an exception counts as failed.
+    """
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter | None, domain: str, endpoint: str = "") -> None:
+        self.limiter = limiter
+        self.domain = domain
+        self.endpoint = endpoint
+        self.start = time.monotonic()
+        self.latency: float | None = None
+        self.failed = False
+
+    def observe(self, status_code: int) -> None:
+        self.latency = time.monotonic() - self.start
+        self.failed = status_code in OVERLOAD_STATUS_CODES or status_code >= 500
+
+    def __enter__(self) -> Slot:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        self._release(exc_type)
+
+    async def __aenter__(self) -> Slot:
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        self._release(exc_type)
+
+    def _release(self, exc_type: type[BaseException] | None) -> None:
+        if self.limiter is None:
+            return
+        if self.latency is None:
+            self.latency = time.monotonic() - self.start
+            # A request cancelled by the caller says nothing about the server
+            self.failed = exc_type is not None and not issubclass(exc_type, GeneratorExit | asyncio.CancelledError)
+        self.limiter.release(self.domain, self.latency, self.failed, self.endpoint)
+        self.limiter = None
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits the requests in flight per domain with additive increase, multiplicative decrease (AIMD).
+
+    While requests succeed with a latency below `latency_tolerance` times the lowest latency of the last
+    `window` requests to the same endpoint (method and URI template) and the limit is in use, it grows by
+    one per limit's worth of requests. An error, an overload status (429, 5xx) or a slow response shrinks
+    it by `backoff`. Requests over the limit queue in FIFO order, shared by the sync and async clients, and
+    raise `TimeoutError` after `max_wait` seconds. With a `LoadBalancer`, each replica has its own limit.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff: float = 0.9,
+        latency_tolerance: float = 2.0,
+        window: int = 100,
+        max_wait: float | None = 30.0,
+    ) -> None:
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.window = window
+        self.max_wait = max_wait
+        self._domains: dict[str, _DomainLimit] = {}
+        self._lock = threading.Lock()
+
+    def stats(self, domain: str) -> ConcurrencyStats:
+        with self._lock:
+            state = self._domain(domain)
+            return ConcurrencyStats(limit=int(state.limit), inflight=state.inflight, queued=len(state.waiters))
+
+    def slot(self, domain: str, endpoint: str = "") -> Slot:
+        """Wait for a slot for a request to `endpoint` of `domain`."""
+        with self._lock:
+            state = self._domain(domain)
+            if self._admit(state):
+                return Slot(self, domain, endpoint)
+            waiter = Waiter()
+            state.waiters.append(waiter)
+        if not waiter.wait(self.max_wait):
+            self._abandon(state, waiter, domain)
+        return Slot(self, domain, endpoint)
+
+    def try_slot(self, domain: str, endpoint: str = "") -> Slot | None:
+        """A slot for a request to `endpoint` of `domain` if one is free now, without queueing; None otherwise."""
+        with self._lock:
+            return Slot(self, domain, endpoint) if self._admit(self._domain(domain)) else None
+
+    async def aslot(self, domain: str, endpoint: str = "") -> Slot:
+        """Async version of slot."""
+        with self._lock:
+            state = self._domain(domain)
+            if self._admit(state):
+                return Slot(self, domain, endpoint)
+            waiter = Waiter(asyncio.get_running_loop())
+            state.waiters.append(waiter)
+        assert waiter.future is not None
+        try:
+            done, _ = await asyncio.wait({waiter.future}, timeout=self.max_wait)
+        except asyncio.CancelledError:
+            self._abandon(state, waiter, domain, cancelled=True)
+            raise
+        if not done:
+            self._abandon(state, waiter, domain)
+        return Slot(self, domain, endpoint)
+
+    def release(self, domain: str, latency: float, failed: bool, endpoint: str = "") -> None:
+        with self._lock:
+            state = self._domain(domain)
+            busy = state.inflight * 2 >= state.limit
+            state.inflight -= 1
+            latencies = state.endpoint_latencies(endpoint)
+            latencies.append(latency)
+            slow = latency > min(latencies) * self.latency_tolerance
+            if failed or slow:
+                state.limit = max(float(self.min_limit), state.limit * self.backoff)
+            elif busy:
+                state.limit = min(float(self.max_limit), state.limit + 1 / state.limit)
+            self._grant(state)
+
+    def _domain(self, domain: str) -> _DomainLimit:
+        state = self._domains.get(domain)
+        if state is None:
+            state = self._domains[domain] = _DomainLimit(float(self.initial_limit), self.window)
+        return state
+
+    @staticmethod
+    def _admit(state: _DomainLimit) -> bool:
+        if state.waiters or state.inflight >= int(state.limit):
+            return False
+        state.inflight += 1
+        return True
+
+    @staticmethod
+    def _grant(state: _DomainLimit) -> None:
+        while state.waiters and state.inflight < int(state.limit):
+            state.inflight += 1
+            state.waiters.popleft().wake()
+
+    def _abandon(self, state: _DomainLimit, waiter: Waiter, domain: str, cancelled: bool = False) -> None:
+        with self._lock:
+            if not waiter.granted:
+                state.waiters.remove(waiter)
+                if cancelled:
+                    return
+                raise TimeoutError(f"no request slot for {domain} within {self.max_wait}s")
+            if not cancelled:
+                return
+            # Granted while being cancelled: hand the slot to the next waiter
+            state.inflight -= 1
+            self._grant(state)
@@ -19,3 +19,15 @@ class LogLevel(Enum):
     WARNING = 30
     ERROR = 40
     CRITICAL = 50
+
+
+class Priority(Enum):
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+class BalancingStrategy(Enum):
+    ROUND_ROBIN = auto()
+    LEAST_OUTSTANDING = auto()
+    EWMA = auto()  # Lowest moving average latency weighted by outstanding requests
@@ -0,0 +1,266 @@
+"""Hedging of idempotent requests against slow server workers."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+import httpx
+
+from dify_oapi.core.concurrency import Slot
+from dify_oapi.core.scheduler import Ticket
+
+# Methods that are safe to send twice
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+@dataclass
+class HedgeStats:
+    """Counters of a hedger."""
+
+    requests: int = 0
+    hedged: int = 0
+    won: int = 0  # Hedges that answered before the original request
+
+
+class HedgeAdmission:
+    """The scheduler ticket and concurrency slot held by a hedge, reporting its status and latency on exit."""
+
+    def __init__(self, ticket: Ticket | None = None, slot: Slot | None = None, endpoint: str | None = None) -> None:
+        self.ticket = ticket
+        self.slot = slot
+        self.endpoint = endpoint  # Key of the hedge's latency, when sent elsewhere than the original request
+
+    def observe(self, status_code: int) -> None:
+        if self.slot is not None:
+            self.slot.observe(status_code)
+
+    def __enter__(self) -> HedgeAdmission:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        self.release(exc_type)
+
+    def release(self, exc_type: type[BaseException] | None = None) -> None:
+        """Release the places of the hedge once; a hedge cancelled before it answered counts as not failed."""
+        if self.slot is not None:
+            self.slot.__exit__(exc_type)
+        if self.ticket is not None:
+            self.ticket.release()
+
+
+class RequestHedger:
+    """Sends a duplicate of an idempotent request that gets no response within a latency percentile.
+
+    The hedge delay of an endpoint is the `percentile` of the latencies of its last `window` responses, at
+    least `min_delay`; endpoints with fewer than `min_samples` responses are not hedged. The transports key
+    endpoints by the replica the request is sent to, along with its method and URI. The first successful
+    response wins and the other request is cancelled, or closed when it can no longer be. Each request earns
+    `budget` of a hedge, up to `max_burst` saved, so hedges add at most that fraction of extra load. With
+    `admit`, a hedge also takes a place in the client's scheduler and concurrency limiter, and is not sent
+    when none is free. The latency of a request that lost the race is recorded up to its cancellation.
+
+    The sync client runs requests on a pool of `max_workers` threads while there is budget for a hedge, the
+    async client as tasks; other requests are sent inline.
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 0.95,
+        min_delay: float = 0.01,
+        min_samples: int = 20,
+        window: int = 200,
+        budget: float = 0.05,
+        max_burst: float = 10.0,
+        methods: frozenset[str] = IDEMPOTENT_METHODS,
+        max_workers: int = 64,
+    ) -> None:
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.budget = budget
+        self.max_burst = max_burst
+        self.methods = methods
+        self.max_workers = max_workers
+        self.stats = HedgeStats()
+        self._latencies: dict[str, deque[float]] = {}
+        self._credit = 0.0
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def delay(self, endpoint: str) -> float | None:
+        """Seconds to wait for a response before hedging a request to `endpoint`; None while unknown."""
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile))])
+
+    def send(
+        self,
+        endpoint: str,
+        send: Callable[[], httpx.Response],
+        admit: Callable[[], HedgeAdmission | None] | None = None,
+    ) -> httpx.Response:
+        """Send a request with `send`, hedging it once after the delay of `endpoint` if `admit` lets it."""
+        delay = self._start(endpoint)
+        # Without budget for a hedge, the request is sent inline rather than through the pool
+        if delay is None or not self._has_credit():
+            return self._timed(endpoint, send)
+        executor = self._pool()
+        original = executor.submit(self._timed, endpoint, send)
+        if wait([original], timeout=delay).done:
+            return original.result()
+        admission = self._admit(admit)
+        if admission is None:
+            return original.result()
+        hedge = executor.submit(self._hedged, endpoint, send, admission)
+        pending: set[Future[httpx.Response]] = {original, hedge}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    error = future.exception()
+                    if error is None:
+                        self._won(future is hedge)
+                        return future.result()
+            assert error is not None
+            raise error
+        finally:
+            for future in pending:
+                if not future.cancel():
+                    future.add_done_callback(_close_response)
+                elif future is hedge:
+                    # Never sent; a hedge already running releases its places when it completes
+                    admission.release()
+
+    async def asend(
+        self,
+        endpoint: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        admit: Callable[[], HedgeAdmission | None] | None = None,
+    ) -> httpx.Response:
+        """Async version of send."""
+        delay = self._start(endpoint)
+        if delay is None or not self._has_credit():
+            return await self._atimed(endpoint, send)
+        original = asyncio.ensure_future(self._atimed(endpoint, send))
+        pending: set[asyncio.Future[httpx.Response]] = {original}
+        admission: HedgeAdmission | None = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return await original
+            admission = self._admit(admit)
+            if admission is None:
+                return await original
+            hedge = asyncio.ensure_future(self._ahedged(endpoint, send, admission))
+            pending.add(hedge)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        self._won(task is hedge)
+                        return task.result()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if admission is not None:
+                admission.release()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _start(self, endpoint: str) -> float | None:
+        delay = self.delay(endpoint)
+        with self._lock:
+            self.stats.requests += 1
+            self._credit = min(self.max_burst, self._credit + self.budget)
+        return delay
+
+    def _admit(self, admit: Callable[[], HedgeAdmission | None] | None) -> HedgeAdmission | None:
+        admission = admit() if admit is not None else HedgeAdmission()
+        if admission is not None and not self._take_hedge():
+            admission.release()
+            return None
+        return admission
+
+    def _has_credit(self) -> bool:
+        with self._lock:
+            return self._credit >= 1
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._credit < 1:
+                return False
+            self._credit -= 1
+            self.stats.hedged += 1
+            return True
+
+    def _won(self, hedge: bool) -> None:
+        if hedge:
+            with self._lock:
+                self.stats.won += 1
+
+    def _record(self, endpoint: str, latency: float) -> None:
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = deque(maxlen=self.window)
+            latencies.append(latency)
+
+    def _timed(self, endpoint: str, send: Callable[[], httpx.Response]) -> httpx.Response:
+        start = time.monotonic()
+        response = send()
+        self._record(endpoint, time.monotonic() - start)
+        return response
+
+    async def _atimed(self, endpoint: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        start = time.monotonic()
+        try:
+            response = await send()
+        except asyncio.CancelledError:
+            self._record(endpoint, time.monotonic() - start)
+            raise
+        self._record(endpoint, time.monotonic() - start)
+        return response
+
+    def _hedged(self, endpoint: str, send: Callable[[], httpx.Response], admission: HedgeAdmission) -> httpx.Response:
+        with admission:
+            response = self._timed(admission.endpoint or endpoint, send)
+            admission.observe(response.status_code)
+            return response
+
+    async def _ahedged(
+        self, endpoint: str, send: Callable[[], Awaitable[httpx.Response]], admission: HedgeAdmission
+    ) -> httpx.Response:
+        with admission:
+            response = await self._atimed(admission.endpoint or endpoint, send)
+            admission.observe(response.status_code)
+            return response
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="dify-hedge")
+            return self._executor
+
+
+def _close_response(future: Future[httpx.Response]) -> None:
+    """Close the response of a request that lost the race."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
@@ -0,0 +1,166 @@
+"""Binary response bodies streamed from the network instead of being buffered."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from typing import BinaryIO
+
+import httpx
+
+from dify_oapi.core.const import CONTENT_TYPE
+from dify_oapi.core.model.base_response import BaseResponse
+
+from .multipart import CONTENT_LENGTH
+
+# Size of the chunks read from the network and written to sinks
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# A path to write to, or any object with a `write(bytes)` method such as a file or `socket.makefile("wb")`
+BinarySink = str | os.PathLike[str] | BinaryIO
+
+
+class _StreamBase:
+    """Headers, counters and error state shared by the sync and async streams."""
+
+    def __init__(self, response: httpx.Response, error: BaseResponse | None) -> None:
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = dict(response.headers)
+        if error is not None and error.code is None:
+            error.code = str(response.status_code)
+        self.error = error
+        self.bytes_read = 0
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    @property
+    def code(self) -> str | None:
+        return self.error.code if self.error is not None else None
+
+    @property
+    def msg(self) -> str | None:
+        return self.error.msg if self.error is not None else None
+
+    @property
+    def content_type(self) -> str | None:
+        content_type: str | None = self._response.headers.get(CONTENT_TYPE)
+        return content_type
+
+    @property
+    def content_length(self) -> int | None:
+        """Length announced by the server, None when the body is sent chunked."""
+        length = self._response.headers.get(CONTENT_LENGTH)
+        return int(length) if length is not None and length.isdigit() else None
+
+    def _check(self) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"request failed with status {self.status_code}: {self.msg}")
+
+
+class BinaryStream(_StreamBase):
+    """A binary response whose body is read chunk by chunk, e.g. to start audio playback on the first chunk.
+
+    The response headers are available at once; the body is only read by iterating the stream or by
+    `write_to`, which counts the bytes in `bytes_read`. An error response is read in full on open and
+    exposed through `success`, `code` and `msg`; iterating it raises. Close the stream, or use it as a
+    context manager, to release the connection when the body is not read to the end; the request keeps its
+    place in the client's concurrency limiter, scheduler and key pool until then.
+    """
+
+    def __init__(
+        self, response: httpx.Response, error: BaseResponse | None, on_close: Callable[[], None] | None = None
+    ) -> None:
+        super().__init__(response, error)
+        self._on_close = on_close
+
+    def __enter__(self) -> BinaryStream:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_bytes()
+
+    def iter_bytes(self, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        self._check()
+        try:
+            for chunk in self._response.iter_bytes(chunk_size):
+                self.bytes_read += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def write_to(self, sink: BinarySink, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """Write the body to a path or a writable binary object as it arrives; return the bytes written."""
+        if isinstance(sink, str | os.PathLike):
+            with open(sink, "wb") as f:
+                return self.write_to(f, chunk_size)
+        start = self.bytes_read
+        for chunk in self.iter_bytes(chunk_size):
+            sink.write(chunk)
+        return self.bytes_read - start
+
+    def close(self) -> None:
+        try:
+            self._response.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class AsyncBinaryStream(_StreamBase):
+    """Async version of BinaryStream; writes to sinks run in a worker thread."""
+
+    def __init__(
+        self,
+        response: httpx.Response,
+        error: BaseResponse | None,
+        on_close: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        super().__init__(response, error)
+        self._on_close = on_close
+
+    async def __aenter__(self) -> AsyncBinaryStream:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self.aiter_bytes()
+
+    async def aiter_bytes(self, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        self._check()
+        try:
+            async for chunk in self._response.aiter_bytes(chunk_size):
+                self.bytes_read += len(chunk)
+                yield chunk
+        finally:
+            await self.aclose()
+
+    async def awrite_to(self, sink: BinarySink, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """Write the body to a path or a writable binary object as it arrives; return the bytes written."""
+        if isinstance(sink, str | os.PathLike):
+            f = await asyncio.to_thread(open, sink, "wb")
+            try:
+                return await self.awrite_to(f, chunk_size)
+            finally:
+                await asyncio.to_thread(f.close)
+        start = self.bytes_read
+        async for chunk in self.aiter_bytes(chunk_size):
+            await asyncio.to_thread(sink.write, chunk)
+        return self.bytes_read - start
+
+    async def aclose(self) -> None:
+        try:
+            await self._response.aclose()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                await on_close()
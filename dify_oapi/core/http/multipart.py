@@ -0,0 +1,238 @@
+"""Streaming multipart/form-data encoding of file uploads."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import mimetypes
+import os
+import re
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Mapping
+from typing import Any, BinaryIO
+
+from dify_oapi.core.const import CONTENT_TYPE
+
+# Files are read and sent in chunks of this size, which bounds the memory used by an upload
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+CONTENT_LENGTH = "Content-Length"
+
+# A path, an open binary file, a bytes-like object, or an iterator of byte chunks
+FileSource = str | os.PathLike[str] | BinaryIO | bytes | bytearray | memoryview | Iterable[bytes] | AsyncIterable[bytes]
+
+# Body passed to httpx as `content`
+RequestContent = bytes | Iterable[bytes] | AsyncIterable[bytes]
+
+# Same escaping as the HTML5 form encoding used by httpx
+_PARAM_REPLACEMENTS = {'"': "%22", "\\": "\\\\", **{chr(c): f"%{c:02X}" for c in range(0x20) if c != 0x1B}}
+_PARAM_RE = re.compile("|".join(re.escape(c) for c in _PARAM_REPLACEMENTS))
+
+
+def _param(name: str, value: str) -> str:
+    return f'{name}="{_PARAM_RE.sub(lambda m: _PARAM_REPLACEMENTS[m.group(0)], value)}"'
+
+
+def _field_value(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if value is True:
+        return b"true"
+    if value is False:
+        return b"false"
+    return b"" if value is None else str(value).encode()
+
+
+def _next_chunk(iterator: Iterator[bytes]) -> bytes | None:
+    return next(iterator, None)
+
+
+def default_file_name(source: FileSource, file_name: str | None) -> str:
+    """The given file name, or else the base name of a path or of an open file's name."""
+    if file_name:
+        return file_name
+    path = source if isinstance(source, str | os.PathLike) else getattr(source, "name", None)
+    return os.path.basename(os.fspath(path)) if isinstance(path, str | os.PathLike) else "upload"
+
+
+class _FilePart:
+    """One file of a multipart body; seekable sources are rewound so that the body can be sent again on retry."""
+
+    def __init__(self, header: bytes, source: FileSource, chunk_size: int) -> None:
+        self.header = header
+        self.source = source
+        self.chunk_size = chunk_size
+        self._start: int | None = None
+        self._consumed = False
+        if hasattr(source, "read"):
+            try:
+                self._start = source.tell() if source.seekable() else None  # type: ignore[union-attr]
+            except (AttributeError, OSError):
+                self._start = None
+
+    def size(self) -> int | None:
+        source = self.source
+        if isinstance(source, bytes | bytearray | memoryview):
+            return memoryview(source).nbytes
+        if isinstance(source, str | os.PathLike):
+            return os.path.getsize(source)
+        if self._start is not None:
+            try:
+                return os.fstat(source.fileno()).st_size - self._start  # type: ignore[union-attr]
+            except (AttributeError, OSError):
+                end = source.seek(0, io.SEEK_END)  # type: ignore[union-attr]
+                source.seek(self._start)  # type: ignore[union-attr]
+                return int(end) - self._start
+        return None
+
+    def _claim(self) -> None:
+        if self._consumed:
+            raise RuntimeError("upload source can only be read once; pass a path, bytes or a seekable file to retry")
+        self._consumed = True
+
+    def chunks(self) -> Iterator[bytes]:
+        source = self.source
+        if isinstance(source, bytes | bytearray | memoryview):
+            yield from self._slices(memoryview(source).cast("B"))
+        elif isinstance(source, str | os.PathLike):
+            with open(source, "rb") as f:
+                while chunk := f.read(self.chunk_size):
+                    yield chunk
+        elif hasattr(source, "read"):
+            if self._start is None:
+                self._claim()
+            else:
+                source.seek(self._start)  # type: ignore[union-attr]
+            while chunk := source.read(self.chunk_size):  # type: ignore[union-attr]
+                yield chunk
+        elif isinstance(source, Iterable):
+            self._claim()
+            for chunk in source:
+                yield from self._slices(memoryview(chunk).cast("B"))
+        else:
+            raise TypeError("async iterable upload sources can only be sent with the async client")
+
+    async def achunks(self) -> AsyncIterator[bytes]:
+        source = self.source
+        if isinstance(source, bytes | bytearray | memoryview):
+            for chunk in self._slices(memoryview(source).cast("B")):
+                yield chunk
+        elif isinstance(source, str | os.PathLike):
+            f = await asyncio.to_thread(open, source, "rb")
+            try:
+                while chunk := await asyncio.to_thread(f.read, self.chunk_size):
+                    yield chunk
+            finally:
+                await asyncio.to_thread(f.close)
+        elif hasattr(source, "read"):
+            if self._start is None:
+                self._claim()
+            else:
+                await asyncio.to_thread(source.seek, self._start)  # type: ignore[union-attr]
+            while chunk := await asyncio.to_thread(source.read, self.chunk_size):  # type: ignore[union-attr]
+                yield chunk
+        elif isinstance(source, AsyncIterable):
+            self._claim()
+            async for chunk in source:
+                for piece in self._slices(memoryview(chunk).cast("B")):
+                    yield piece
+        else:
+            self._claim()
+            iterator = iter(source)
+            while (pending := await asyncio.to_thread(_next_chunk, iterator)) is not None:
+                for piece in self._slices(memoryview(pending).cast("B")):
+                    yield piece
+
+    def _slices(self, view: memoryview) -> Iterator[bytes]:
+        for offset in range(0, view.nbytes, self.chunk_size):
+            yield view[offset : offset + self.chunk_size].tobytes()
+
+
+class MultipartEncoder:
+    """A multipart/form-data body that streams its files in `chunk_size` chunks instead of loading them.
+
+    `files` maps field names to `(file_name, source)` or `(file_name, source, content_type)` tuples, as the
+    request builders store them. The body has a `Content-Length` when the size of every source is known,
+    and is sent chunked otherwise. Iterating the encoder yields the body; `aiter()` yields it for the async
+    client, with file reads run in a worker thread so the event loop is never blocked.
+    """
+
+    def __init__(
+        self,
+        data: Mapping[str, Any] | None,
+        files: Mapping[str, Any],
+        *,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+        boundary: bytes | None = None,
+    ) -> None:
+        self.boundary = boundary or os.urandom(16).hex().encode()
+        self.chunk_size = chunk_size
+        self._fields: list[bytes] = []
+        for name, value in (data or {}).items():
+            for item in value if isinstance(value, list | tuple) else [value]:
+                header = f"Content-Disposition: form-data; {_param('name', name)}\r\n\r\n".encode()
+                self._fields.append(self._delimiter + header + _field_value(item) + b"\r\n")
+        self._files: list[_FilePart] = []
+        for name, value in files.items():
+            file_name, source, *rest = value if isinstance(value, tuple) else (None, value)
+            file_name = default_file_name(source, file_name)
+            content_type = rest[0] if rest else mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+            header = (
+                f"Content-Disposition: form-data; {_param('name', name)}; {_param('filename', file_name)}\r\n"
+                f"Content-Type: {content_type}\r\n\r\n"
+            ).encode()
+            self._files.append(_FilePart(self._delimiter + header, source, chunk_size))
+
+    @property
+    def _delimiter(self) -> bytes:
+        return b"--" + self.boundary + b"\r\n"
+
+    @property
+    def _closing(self) -> bytes:
+        return b"--" + self.boundary + b"--\r\n"
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary.decode()}"
+
+    @property
+    def content_length(self) -> int | None:
+        sizes = [part.size() for part in self._files]
+        if any(size is None for size in sizes):
+            return None
+        headers = sum(len(part.header) + 2 for part in self._files)
+        return sum(map(len, self._fields)) + headers + sum(s or 0 for s in sizes) + len(self._closing)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {CONTENT_TYPE: self.content_type}
+        if (length := self.content_length) is not None:
+            headers[CONTENT_LENGTH] = str(length)
+        return headers
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield b"".join(self._fields)
+        for part in self._files:
+            yield part.header
+            yield from part.chunks()
+            yield b"\r\n"
+        yield self._closing
+
+    def aiter(self) -> AsyncIterable[bytes]:
+        return _AsyncBody(self)
+
+
+class _AsyncBody:
+    """Async view of a MultipartEncoder; it has no `__iter__`, so httpx accepts it for the async client."""
+
+    def __init__(self, encoder: MultipartEncoder) -> None:
+        self.encoder = encoder
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        encoder = self.encoder
+        yield b"".join(encoder._fields)
+        for part in encoder._files:
+            yield part.header
+            async for chunk in part.achunks():
+                yield chunk
+            yield b"\r\n"
+        yield encoder._closing
@@ -1,12 +1,33 @@
+import functools
+import re
+from collections.abc import Callable, MutableMapping
+
+from dify_oapi.core.concurrency import Slot
 from dify_oapi.core.const import APPLICATION_JSON, AUTHORIZATION, SLEEP_BASE_TIME, UTF_8
-from dify_oapi.core.json import JSON
+from dify_oapi.core.enum import Priority
+from dify_oapi.core.hedging import HedgeAdmission, RequestHedger
+from dify_oapi.core.key_pool import KeyLease
+from dify_oapi.core.load_balancer import ReplicaPicks
 from dify_oapi.core.log import logger
 from dify_oapi.core.misc import HiddenText
 from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.lean_responses import LeanResponses
 from dify_oapi.core.model.raw_response import RawResponse
 from dify_oapi.core.model.request_option import RequestOption
+from dify_oapi.core.rate_limit import RateLimiter
+from dify_oapi.core.scheduler import Ticket
 from dify_oapi.core.type import T
 
+# Path parameters of URI templates, like `:dataset_id`
+_PATH_PARAM = re.compile(r":(\w+)")
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_uri(uri: str) -> tuple[str, ...]:
+    """Split a URI template into literal parts at even and parameter names at odd positions."""
+    return tuple(_PATH_PARAM.split(uri))
+
 
 def _build_url(domain: str | None, uri: str | None, paths: dict[str, str] | None) -> str:
     if not domain:
@@ -14,12 +35,14 @@ def _build_url(domain: str | None, uri: str | None, paths: dict[str, str] | None
     if not uri:
         raise RuntimeError("uri is required")
 
-    # Replace path parameters
-    for key, value in (paths or {}).items():
-        uri = uri.replace(f":{key}", value)
+    # Fill in path parameters; unknown ones are left as they are
+    parts = _compile_uri(uri)
+    if len(parts) > 1:
+        paths = paths or {}
+        uri = "".join(part if i % 2 == 0 else paths.get(part, f":{part}") for i, part in enumerate(parts))
 
     # Normalize URL joining
-    return f"{domain.rstrip('/')}{uri}" if not uri.startswith("/") else f"{domain.rstrip('/')}{uri}"
+    return f"{domain.rstrip('/')}{uri}"
 
 
 def _build_header(request: BaseRequest, option: RequestOption) -> dict[str, str]:
@@ -31,12 +54,146 @@ def _build_header(request: BaseRequest, option: RequestOption) -> dict[str, str]
 
     # Add authorization header
     if option.api_key:
-        hidden_text = HiddenText(f"Bearer {option.api_key}", redacted="****")
-        headers[AUTHORIZATION] = hidden_text.secret
+        headers[AUTHORIZATION] = _authorization(option.api_key)
 
     return headers
 
 
+@functools.lru_cache(maxsize=256)
+def _authorization(api_key: str) -> str:
+    secret: str = HiddenText(f"Bearer {api_key}", redacted="****").secret
+    return secret
+
+
+def _key_lease(
+    option: RequestOption, headers: MutableMapping[str, str], limiter: RateLimiter | None, uri: str | None
+) -> KeyLease:
+    """Pick a key of the option's key pool for an attempt, authorize `headers` with it and wait for a token of
+    the rate limiter for the key; the lease is released if the wait fails."""
+    pool = getattr(option, "key_pool", None)
+    if pool is None:
+        lease = KeyLease(None, None, option.api_key)
+    else:
+        lease = pool.lease()
+        assert lease.key is not None
+        headers[AUTHORIZATION] = lease.key.authorization
+    if limiter is not None:
+        try:
+            limiter.acquire(lease.api_key, uri)
+        except BaseException:
+            lease.release()
+            raise
+    return lease
+
+
+async def _akey_lease(
+    option: RequestOption, headers: MutableMapping[str, str], limiter: RateLimiter | None, uri: str | None
+) -> KeyLease:
+    """Async version of _key_lease."""
+    pool = getattr(option, "key_pool", None)
+    if pool is None:
+        lease = KeyLease(None, None, option.api_key)
+    else:
+        lease = await pool.alease()
+        assert lease.key is not None
+        headers[AUTHORIZATION] = lease.key.authorization
+    if limiter is not None:
+        try:
+            await limiter.aacquire(lease.api_key, uri)
+        except BaseException:
+            lease.release()
+            raise
+    return lease
+
+
+def _rate_limiter(conf: Config, option: RequestOption) -> RateLimiter | None:
+    """Rate limiter of the request option, or else of the client."""
+    limiter: RateLimiter | None = getattr(option, "rate_limiter", None) or getattr(conf, "rate_limiter", None)
+    return limiter
+
+
+def _endpoint(req: BaseRequest) -> str:
+    """Method and URI template of a request, under which its latencies are compared."""
+    return f"{req.http_method.name if req.http_method else ''} {req.uri}"
+
+
+def _replica_picks(conf: Config) -> ReplicaPicks:
+    """Replicas of the client's load balancer for the sends of an attempt, picked ahead to key its slots."""
+    return ReplicaPicks(getattr(conf, "load_balancer", None), (conf.domain or "").rstrip("/"))
+
+
+def _concurrency_slot(conf: Config, req: BaseRequest, domain: str) -> Slot:
+    """Wait for a slot of the client's concurrency limiter for the replica `domain`; a no-op slot without one."""
+    limiter = getattr(conf, "concurrency_limiter", None)
+    return limiter.slot(domain, _endpoint(req)) if limiter is not None else Slot(None, "")
+
+
+async def _aconcurrency_slot(conf: Config, req: BaseRequest, domain: str) -> Slot:
+    """Async version of _concurrency_slot."""
+    limiter = getattr(conf, "concurrency_limiter", None)
+    return await limiter.aslot(domain, _endpoint(req)) if limiter is not None else Slot(None, "")
+
+
+def _hedger(conf: Config, req: BaseRequest) -> RequestHedger | None:
+    """Hedger of the client when the request may be sent twice."""
+    hedger: RequestHedger | None = getattr(conf, "hedger", None)
+    if hedger is None or req.http_method is None or req.http_method.name not in hedger.methods:
+        return None
+    return hedger if req.content is None and not req.files else None
+
+
+def _hedge_admission(
+    conf: Config, req: BaseRequest, option: RequestOption, picks: ReplicaPicks
+) -> Callable[[], HedgeAdmission | None]:
+    """Admission of a hedge by the client's scheduler and by the concurrency limiter of the replica it is sent
+    to, None when either has no free slot; a replica picked for a hedge not sent is released with `picks`."""
+
+    def admit() -> HedgeAdmission | None:
+        scheduler = getattr(conf, "scheduler", None)
+        ticket = scheduler.try_ticket(getattr(option, "priority", Priority.NORMAL)) if scheduler is not None else None
+        if scheduler is not None and ticket is None:
+            return None
+        domain = picks.pick()
+        limiter = getattr(conf, "concurrency_limiter", None)
+        slot = limiter.try_slot(domain, _endpoint(req)) if limiter is not None else None
+        if limiter is not None and slot is None:
+            if ticket is not None:
+                ticket.release()
+            return None
+        return HedgeAdmission(ticket, slot, _hedge_key(domain, req))
+
+    return admit
+
+
+def _hedge_key(domain: str, req: BaseRequest) -> str:
+    """Key of the hedger's latencies of a request sent to the replica `domain`."""
+    return f"{domain} {_endpoint(req)}"
+
+
+def _lean_responses(conf: Config, option: RequestOption) -> LeanResponses | None:
+    """Lean mode of the request: the option's, True for the defaults or False for none, else the client's."""
+    lean: LeanResponses | bool | None = getattr(option, "lean_responses", None)
+    if lean is None:
+        return getattr(conf, "lean_responses", None)
+    if isinstance(lean, bool):
+        return LeanResponses() if lean else None
+    return lean
+
+
+def _scheduler_ticket(conf: Config, option: RequestOption) -> Ticket:
+    """Wait for the client's scheduler to admit a request of the option's priority; a no-op ticket without one."""
+    scheduler = getattr(conf, "scheduler", None)
+    priority = getattr(option, "priority", Priority.NORMAL)
+    return scheduler.ticket(priority) if scheduler is not None else Ticket(None, priority)
+
+
+async def _ascheduler_ticket(conf: Config, option: RequestOption) -> Ticket:
+    """Async version of _scheduler_ticket."""
+    scheduler = getattr(conf, "scheduler", None)
+    priority = getattr(option, "priority", Priority.NORMAL)
+    return await scheduler.aticket(priority) if scheduler is not None else Ticket(None, priority)
+
+
 def _merge_dicts(*dicts: dict | None) -> dict:
     """Merge multiple dictionaries, ignoring None values."""
     result: dict = {}
@@ -68,16 +225,21 @@ def _create_no_content_response(unmarshal_as: type[T]) -> T:
         return resp
 
 
-def _handle_json_response(content: str, unmarshal_as: type[T]) -> T:
+def _handle_json_response(content: bytes | str, unmarshal_as: type[T]) -> T:
     """Handle JSON response content."""
     import json
 
+    # Objects are parsed and validated in one pass by pydantic-core, without building the dicts in Python first
+    # Skipping or deferring validation is not faster than this, see benchmarks/response_parse.py
+    if content.lstrip()[:1] in (b"{", "{"):
+        return unmarshal_as.model_validate_json(content)
+
     parsed_json = json.loads(content)
 
     if isinstance(parsed_json, list):
         return _handle_array_response(parsed_json, unmarshal_as)
     elif isinstance(parsed_json, dict):
-        return JSON.unmarshal(content, unmarshal_as)
+        return unmarshal_as(**parsed_json)
     else:
         return _handle_primitive_response(parsed_json, unmarshal_as)
 
@@ -149,8 +311,8 @@ def _set_raw_response(resp: T, raw_resp: RawResponse) -> T:
     return resp
 
 
-def _unmarshaller(raw_resp: RawResponse, unmarshal_as: type[T]) -> T:
-    """Unmarshal raw response to typed response object."""
+def _unmarshaller(raw_resp: RawResponse, unmarshal_as: type[T], lean: LeanResponses | None = None) -> T:
+    """Unmarshal raw response to typed response object, trimming its raw response in lean mode."""
     if not raw_resp.status_code:
         raise RuntimeError("status_code is required")
     if raw_resp.content is None:
@@ -161,12 +323,11 @@ def _unmarshaller(raw_resp: RawResponse, unmarshal_as: type[T]) -> T:
         resp = _create_no_content_response(unmarshal_as)
     # Handle JSON content
     elif raw_resp.content_type and raw_resp.content_type.startswith(APPLICATION_JSON):
-        content = str(raw_resp.content, UTF_8)
-        if content:
+        if raw_resp.content:
             try:
-                resp = _handle_json_response(content, unmarshal_as)
+                resp = _handle_json_response(raw_resp.content, unmarshal_as)
             except Exception as e:
-                logger.error(f"Failed to unmarshal to {unmarshal_as} from {content}")
+                logger.error(f"Failed to unmarshal to {unmarshal_as} from {str(raw_resp.content, UTF_8, 'replace')}")
                 raise e
         else:
             resp = unmarshal_as()
@@ -177,6 +338,8 @@ def _unmarshaller(raw_resp: RawResponse, unmarshal_as: type[T]) -> T:
         except Exception:
             resp = unmarshal_as.__new__(unmarshal_as)
 
+    if lean is not None and raw_resp.status_code < 400 and getattr(resp, "code", None) is None:
+        raw_resp = lean.trim(raw_resp)
     return _set_raw_response(resp, raw_resp)
 
 
@@ -1,6 +1,8 @@
 import asyncio
+import functools
 import json
 from collections.abc import AsyncGenerator, Coroutine
+from contextlib import AsyncExitStack
 from typing import Literal, overload
 
 import httpx
@@ -13,9 +15,27 @@ from dify_oapi.core.model.base_response import BaseResponse
 from dify_oapi.core.model.config import Config
 from dify_oapi.core.model.raw_response import RawResponse
 from dify_oapi.core.model.request_option import RequestOption
+from dify_oapi.core.rate_limit import TOO_MANY_REQUESTS, retry_after
 from dify_oapi.core.type import T
 
-from ._misc import _build_header, _build_url, _get_sleep_time, _merge_dicts, _unmarshaller
+from ..binary_stream import AsyncBinaryStream
+from ..multipart import MultipartEncoder, RequestContent
+from ._misc import (
+    _aconcurrency_slot,
+    _akey_lease,
+    _ascheduler_ticket,
+    _build_header,
+    _build_url,
+    _get_sleep_time,
+    _hedge_admission,
+    _hedge_key,
+    _hedger,
+    _lean_responses,
+    _merge_dicts,
+    _rate_limiter,
+    _replica_picks,
+    _unmarshaller,
+)
 from .connection_pool import connection_pool
 
 
@@ -60,10 +80,14 @@ async def _async_stream_generator(
     json_: dict | None,
     data: dict | None,
     files: dict | None,
+    content: RequestContent | None = None,
     http_method: HttpMethod,
+    option: RequestOption | None = None,
 ):
     method_name = http_method.name
     body_data = _merge_dicts(json_, files, data)
+    option = option or RequestOption()
+    limiter = _rate_limiter(conf, option)
 
     # Use connection pool for async streaming requests
     client = connection_pool.get_async_client(
@@ -73,6 +97,7 @@ async def _async_stream_generator(
         getattr(conf, "max_connections", 100),
         getattr(conf, "keepalive_expiry", 30.0),
         getattr(conf, "verify_ssl", True),
+        getattr(conf, "load_balancer", None),
     )
 
     for retry in range(conf.max_retry_count + 1):
@@ -81,21 +106,41 @@ async def _async_stream_generator(
             logger.info(f"in-request: sleep {sleep_time}s")
             await asyncio.sleep(sleep_time)
 
+        lease = await _akey_lease(option, headers, limiter, req.uri)
+
+        picks = _replica_picks(conf)
         try:
-            async with client.stream(
-                method_name,
-                url,
-                headers=headers,
-                params=tuple(req.queries),
-                json=json_,
-                data=data,
-                files=files,
-                timeout=conf.timeout,
-            ) as response:
+            async with (
+                picks,
+                lease,
+                await _ascheduler_ticket(conf, option),
+                await _aconcurrency_slot(conf, req, picks.pick()) as slot,
+                client.stream(
+                    method_name,
+                    url,
+                    headers=headers,
+                    params=tuple(req.queries),
+                    json=json_,
+                    data=data,
+                    files=files,
+                    content=content,
+                    timeout=conf.timeout,
+                    extensions=picks.extensions,
+                ) as response,
+            ):
                 logger.debug(
                     f"{_format_log_details(method_name, url, headers, req.queries, body_data)}, stream response"
                 )
 
+                slot.observe(response.status_code)
+                lease.observe(response.status_code, retry_after(response.headers))
+                if limiter is not None:
+                    limiter.observe(lease.api_key, req.uri, response.status_code, retry_after(response.headers))
+                # Rate-limited streams are retried with another key of the pool
+                if response.status_code == TOO_MANY_REQUESTS and lease.rotates and retry < conf.max_retry_count:
+                    logger.info(f"in-request: rate limited, retrying ({retry + 1}/{conf.max_retry_count}) {url}")
+                    continue
+
                 if response.status_code != 200:
                     yield await _handle_async_stream_error(response)
                     return
@@ -172,22 +217,41 @@ class ATransport:
 
         # Prepare request body
         json_, files, data = None, None, None
-        if req.files:
-            files = req.files
-            if req.body is not None:
-                data = json.loads(JSON.marshal(req.body))
-                _update_response_mode(data, stream)
-        elif req.body is not None:
-            json_ = json.loads(JSON.marshal(req.body))
+        content: RequestContent | None = None
+        # Read once: a body set from a model is dumped on each access
+        body = req.body if req.content is None else None
+        if req.content is not None:
+            content = req.content
+        elif req.files:
+            fields = None
+            if body is not None:
+                fields = json.loads(JSON.marshal(body))
+                _update_response_mode(fields, stream)
+            # Stream files from their source instead of letting httpx load them
+            multipart = MultipartEncoder(fields, req.files)
+            headers.update(multipart.headers)
+            content = multipart.aiter()
+        elif body is not None:
+            json_ = json.loads(JSON.marshal(body))
             _update_response_mode(json_, stream)
 
         if stream:
             return _async_stream_generator(
-                conf, req, url=url, headers=headers, json_=json_, data=data, files=files, http_method=req.http_method
+                conf,
+                req,
+                url=url,
+                headers=headers,
+                json_=json_,
+                data=data,
+                files=files,
+                content=content,
+                http_method=req.http_method,
+                option=option,
             )
 
         method_name = req.http_method.name
         body_data = _merge_dicts(json_, files, data)
+        limiter = _rate_limiter(conf, option)
 
         # Use connection pool for async regular requests
         client = connection_pool.get_async_client(
@@ -197,7 +261,21 @@ class ATransport:
             getattr(conf, "max_connections", 100),
             getattr(conf, "keepalive_expiry", 30.0),
             getattr(conf, "verify_ssl", True),
+            getattr(conf, "load_balancer", None),
+        )
+        send = functools.partial(
+            client.request,
+            method_name,
+            url,
+            headers=headers,
+            params=tuple(req.queries),
+            json=json_,
+            data=data,
+            files=files,
+            content=content,
+            timeout=conf.timeout,
         )
+        hedger = _hedger(conf, req)
 
         for retry in range(conf.max_retry_count + 1):
             if retry > 0:
@@ -205,18 +283,25 @@ class ATransport:
                 logger.info(f"in-request: sleep {sleep_time}s")
                 await asyncio.sleep(sleep_time)
 
+            lease = await _akey_lease(option, headers, limiter, req.uri)
+
+            picks = _replica_picks(conf)
+            domain = picks.pick()
             try:
-                response = await client.request(
-                    method_name,
-                    url,
-                    headers=headers,
-                    params=tuple(req.queries),
-                    json=json_,
-                    data=data,
-                    files=files,
-                    timeout=conf.timeout,
-                )
-                break
+                async with (
+                    picks,
+                    lease,
+                    await _ascheduler_ticket(conf, option),
+                    await _aconcurrency_slot(conf, req, domain) as slot,
+                ):
+                    attempt = functools.partial(send, extensions=picks.extensions)
+                    if hedger is not None:
+                        admit = _hedge_admission(conf, req, option, picks)
+                        response = await hedger.asend(_hedge_key(domain, req), attempt, admit)
+                    else:
+                        response = await attempt()
+                    slot.observe(response.status_code)
+                    lease.observe(response.status_code, retry_after(response.headers))
             except httpx.RequestError as e:
                 err_msg = f"{e.__class__.__name__}: {e!r}"
                 log_details = _format_log_details(method_name, url, headers, req.queries, body_data)
@@ -231,10 +316,118 @@ class ATransport:
                 )
                 raise
 
+            if limiter is not None:
+                limiter.observe(lease.api_key, req.uri, response.status_code, retry_after(response.headers))
+            # Rate-limited requests wait for a token again, or switch to another key of the pool, instead of failing
+            if (
+                response.status_code == TOO_MANY_REQUESTS
+                and (limiter is not None or lease.rotates)
+                and retry < conf.max_retry_count
+            ):
+                logger.info(f"in-request: rate limited, retrying ({retry + 1}/{conf.max_retry_count}) {url}")
+                continue
+            break
+
         logger.debug(f"{_format_log_details(method_name, url, headers, req.queries, body_data)} {response.status_code}")
 
         raw_resp = RawResponse()
         raw_resp.status_code = response.status_code
         raw_resp.headers = dict(response.headers)
         raw_resp.content = response.content
-        return _unmarshaller(raw_resp, unmarshal_as)
+        return _unmarshaller(raw_resp, unmarshal_as, _lean_responses(conf, option))
+
+    @staticmethod
+    async def aopen(conf: Config, req: BaseRequest, *, option: RequestOption | None = None) -> AsyncBinaryStream:
+        """Send a JSON or raw-content request and return its response with the body unread, to be streamed"""
+        option = option or RequestOption()
+
+        if req.http_method is None:
+            raise RuntimeError("HTTP method is required")
+
+        url = _build_url(conf.domain, req.uri, req.paths)
+        headers = _build_header(req, option)
+        # Read once: a body set from a model is dumped on each access
+        body = req.body if req.content is None else None
+        json_ = json.loads(JSON.marshal(body)) if body else None
+        method_name = req.http_method.name
+        limiter = _rate_limiter(conf, option)
+
+        client = connection_pool.get_async_client(
+            conf.domain or "",
+            conf.timeout,
+            getattr(conf, "max_keepalive_connections", 20),
+            getattr(conf, "max_connections", 100),
+            getattr(conf, "keepalive_expiry", 30.0),
+            getattr(conf, "verify_ssl", True),
+            getattr(conf, "load_balancer", None),
+        )
+        request = client.build_request(
+            method_name,
+            url,
+            headers=headers,
+            params=tuple(req.queries),
+            json=json_,
+            content=req.content,
+            timeout=conf.timeout,
+        )
+
+        for retry in range(conf.max_retry_count + 1):
+            if retry > 0:
+                sleep_time = _get_sleep_time(retry)
+                logger.info(f"in-request: sleep {sleep_time}s")
+                await asyncio.sleep(sleep_time)
+
+            lease = await _akey_lease(option, request.headers, limiter, req.uri)
+
+            picks = _replica_picks(conf)
+            request.extensions.update(picks.extensions)
+            try:
+                async with AsyncExitStack() as stack:
+                    await stack.enter_async_context(picks)
+                    await stack.enter_async_context(lease)
+                    await stack.enter_async_context(await _ascheduler_ticket(conf, option))
+                    slot = await stack.enter_async_context(await _aconcurrency_slot(conf, req, picks.pick()))
+                    response = await client.send(request, stream=True)
+                    slot.observe(response.status_code)
+                    lease.observe(response.status_code, retry_after(response.headers))
+                    # Rate-limited requests are retried with another key of the pool
+                    if response.status_code == TOO_MANY_REQUESTS and lease.rotates and retry < conf.max_retry_count:
+                        await response.aclose()
+                        continue
+                    # The key lease, scheduler ticket and concurrency slot are held until the stream is closed
+                    held = stack.pop_all()
+                break
+            except httpx.RequestError as e:
+                err_msg = f"{e.__class__.__name__}: {e!r}"
+                log_details = _format_log_details(method_name, url, headers, req.queries, json_)
+
+                if retry < conf.max_retry_count:
+                    logger.info(
+                        f"in-request: retrying ({retry + 1}/{conf.max_retry_count}) {log_details}, exp: {err_msg}"
+                    )
+                    continue
+                logger.info(
+                    f"in-request: request failed, retried ({retry}/{conf.max_retry_count}) {log_details}, exp: {err_msg}"
+                )
+                raise
+
+        logger.debug(
+            f"{_format_log_details(method_name, url, headers, req.queries, json_)} {response.status_code}, stream response"
+        )
+
+        if limiter is not None:
+            limiter.observe(lease.api_key, req.uri, response.status_code, retry_after(response.headers))
+
+        # Error responses are small; read them so that they are reported like regular responses
+        error = None
+        if not response.is_success:
+            try:
+                raw_resp = RawResponse()
+                raw_resp.status_code = response.status_code
+                raw_resp.headers = dict(response.headers)
+                raw_resp.content = await response.aread()
+                error = _unmarshaller(raw_resp, BaseResponse)
+            finally:
+                await response.aclose()
+                await held.aclose()
+        return AsyncBinaryStream(response, error, held.aclose)
@@ -5,6 +5,8 @@ from typing import Optional
 
 import httpx
 
+from dify_oapi.core.load_balancer import BalancedTransport, LoadBalancer
+
 
 class ConnectionPoolManager:
     """Manages HTTP connection pools to reduce TCP connection overhead."""
@@ -34,9 +36,12 @@ class ConnectionPoolManager:
         max_connections: int = 100,
         keepalive_expiry: float = 30.0,
         verify_ssl: bool = True,
+        balancer: LoadBalancer | None = None,
     ) -> httpx.Client:
-        """Get or create a sync HTTP client for the given domain."""
+        """Get or create a sync HTTP client for the given domain, or for the replicas of `balancer`."""
         client_key = f"{domain}:{timeout}:{max_keepalive}:{max_connections}:{keepalive_expiry}:{verify_ssl}"
+        if balancer is not None:
+            client_key += f":{id(balancer)}"
 
         with self._client_lock:
             if client_key not in self._sync_clients:
@@ -47,10 +52,17 @@ class ConnectionPoolManager:
                     keepalive_expiry=keepalive_expiry,
                 )
 
+                # Replicas share the limits and each keeps its own connections
+                transport = (
+                    BalancedTransport(balancer, httpx.HTTPTransport(limits=limits, verify=verify_ssl))
+                    if balancer is not None
+                    else None
+                )
                 self._sync_clients[client_key] = httpx.Client(
                     timeout=timeout,
                     limits=limits,
                     verify=verify_ssl,
+                    transport=transport,
                     # Note: HTTP/2 disabled to avoid h2 dependency requirement
                 )
 
@@ -64,9 +76,12 @@ class ConnectionPoolManager:
         max_connections: int = 100,
         keepalive_expiry: float = 30.0,
         verify_ssl: bool = True,
+        balancer: LoadBalancer | None = None,
     ) -> httpx.AsyncClient:
-        """Get or create an async HTTP client for the given domain."""
+        """Get or create an async HTTP client for the given domain, or for the replicas of `balancer`."""
         client_key = f"{domain}:{timeout}:{max_keepalive}:{max_connections}:{keepalive_expiry}:{verify_ssl}"
+        if balancer is not None:
+            client_key += f":{id(balancer)}"
 
         with self._client_lock:
             if client_key not in self._async_clients:
@@ -77,10 +92,16 @@ class ConnectionPoolManager:
                     keepalive_expiry=keepalive_expiry,
                 )
 
+                async_transport = (
+                    BalancedTransport(balancer, httpx.AsyncHTTPTransport(limits=limits, verify=verify_ssl))
+                    if balancer is not None
+                    else None
+                )
                 self._async_clients[client_key] = httpx.AsyncClient(
                     timeout=timeout,
                     limits=limits,
                     verify=verify_ssl,
+                    transport=async_transport,
                     # Note: HTTP/2 disabled to avoid h2 dependency requirement
                 )
 
@@ -1,7 +1,9 @@
+import functools
 import json
 import os
 import time
 from collections.abc import Generator
+from contextlib import ExitStack
 from typing import Literal, overload
 
 import httpx
@@ -14,9 +16,27 @@ from dify_oapi.core.model.base_response import BaseResponse
 from dify_oapi.core.model.config import Config
 from dify_oapi.core.model.raw_response import RawResponse
 from dify_oapi.core.model.request_option import RequestOption
+from dify_oapi.core.rate_limit import TOO_MANY_REQUESTS, retry_after
 from dify_oapi.core.type import T
 
-from ._misc import _build_header, _build_url, _get_sleep_time, _merge_dicts, _unmarshaller
+from ..binary_stream import BinaryStream
+from ..multipart import MultipartEncoder, RequestContent
+from ._misc import (
+    _build_header,
+    _build_url,
+    _concurrency_slot,
+    _get_sleep_time,
+    _hedge_admission,
+    _hedge_key,
+    _hedger,
+    _key_lease,
+    _lean_responses,
+    _merge_dicts,
+    _rate_limiter,
+    _replica_picks,
+    _scheduler_ticket,
+    _unmarshaller,
+)
 from .connection_pool import connection_pool
 
 
@@ -61,10 +81,14 @@ def _stream_generator(
     json_: dict | None,
     data: dict | None,
     files: dict | None,
+    content: RequestContent | None = None,
     http_method: HttpMethod,
+    option: RequestOption | None = None,
 ) -> Generator[bytes, None, None]:
     method_name = http_method.name
     body_data = _merge_dicts(json_, files, data)
+    option = option or RequestOption()
+    limiter = _rate_limiter(conf, option)
 
     # Use connection pool for streaming requests
     client = connection_pool.get_sync_client(
@@ -74,6 +98,7 @@ def _stream_generator(
         getattr(conf, "max_connections", 100),
         getattr(conf, "keepalive_expiry", 30.0),
         getattr(conf, "verify_ssl", True),
+        getattr(conf, "load_balancer", None),
     )
 
     for retry in range(conf.max_retry_count + 1):
@@ -82,21 +107,41 @@ def _stream_generator(
             logger.info(f"in-request: sleep {sleep_time}s")
             time.sleep(sleep_time)
 
+        lease = _key_lease(option, headers, limiter, req.uri)
+
+        picks = _replica_picks(conf)
         try:
-            with client.stream(
-                method_name,
-                url,
-                headers=headers,
-                params=tuple(req.queries),
-                json=json_,
-                data=data,
-                files=files,
-                timeout=conf.timeout,
-            ) as response:
+            with (
+                picks,
+                lease,
+                _scheduler_ticket(conf, option),
+                _concurrency_slot(conf, req, picks.pick()) as slot,
+                client.stream(
+                    method_name,
+                    url,
+                    headers=headers,
+                    params=tuple(req.queries),
+                    json=json_,
+                    data=data,
+                    files=files,
+                    content=content,
+                    timeout=conf.timeout,
+                    extensions=picks.extensions,
+                ) as response,
+            ):
                 logger.debug(
                     f"{_format_log_details(method_name, url, headers, req.queries, body_data)}, stream response"
                 )
 
+                slot.observe(response.status_code)
+                lease.observe(response.status_code, retry_after(response.headers))
+                if limiter is not None:
+                    limiter.observe(lease.api_key, req.uri, response.status_code, retry_after(response.headers))
+                # Rate-limited streams are retried with another key of the pool
+                if response.status_code == TOO_MANY_REQUESTS and lease.rotates and retry < conf.max_retry_count:
+                    logger.info(f"in-request: rate limited, retrying ({retry + 1}/{conf.max_retry_count}) {url}")
+                    continue
+
                 if response.status_code != 200:
                     yield _handle_stream_error(response)
                     return
@@ -170,18 +215,36 @@ class Transport:
 
         # Prepare request body
         json_, files, data = None, None, None
-        if req.files:
-            files = req.files
-            if req.body is not None:
-                data = json.loads(JSON.marshal(req.body))
-                _update_response_mode(data, stream)
-        elif req.body is not None:
-            json_ = json.loads(JSON.marshal(req.body))
+        content: RequestContent | None = None
+        # Read once: a body set from a model is dumped on each access
+        body = req.body if req.content is None else None
+        if req.content is not None:
+            content = req.content
+        elif req.files:
+            fields = None
+            if body is not None:
+                fields = json.loads(JSON.marshal(body))
+                _update_response_mode(fields, stream)
+            # Stream files from their source instead of letting httpx load them
+            multipart = MultipartEncoder(fields, req.files)
+            headers.update(multipart.headers)
+            content = multipart
+        elif body is not None:
+            json_ = json.loads(JSON.marshal(body))
             _update_response_mode(json_, stream)
 
         if stream:
             return _stream_generator(
-                conf, req, url=url, headers=headers, json_=json_, data=data, files=files, http_method=req.http_method
+                conf,
+                req,
+                url=url,
+                headers=headers,
+                json_=json_,
+                data=data,
+                files=files,
+                content=content,
+                http_method=req.http_method,
+                option=option,
             )
 
         # Set local proxy
@@ -191,6 +254,7 @@ class Transport:
 
         method_name = req.http_method.name
         body_data = _merge_dicts(json_, files, data)
+        limiter = _rate_limiter(conf, option)
 
         # Use connection pool for regular requests
         client = connection_pool.get_sync_client(
@@ -200,7 +264,21 @@ class Transport:
             getattr(conf, "max_connections", 100),
             getattr(conf, "keepalive_expiry", 30.0),
             getattr(conf, "verify_ssl", True),
+            getattr(conf, "load_balancer", None),
+        )
+        send = functools.partial(
+            client.request,
+            method_name,
+            url,
+            headers=headers,
+            params=tuple(req.queries),
+            json=json_,
+            data=data,
+            files=files,
+            content=content,
+            timeout=conf.timeout,
         )
+        hedger = _hedger(conf, req)
 
         for retry in range(conf.max_retry_count + 1):
             if retry > 0:
@@ -208,18 +286,20 @@ class Transport:
                 logger.info(f"in-request: sleep {sleep_time}s")
                 time.sleep(sleep_time)
 
+            lease = _key_lease(option, headers, limiter, req.uri)
+
+            picks = _replica_picks(conf)
+            domain = picks.pick()
             try:
-                response = client.request(
-                    method_name,
-                    url,
-                    headers=headers,
-                    params=tuple(req.queries),
-                    json=json_,
-                    data=data,
-                    files=files,
-                    timeout=conf.timeout,
-                )
-                break
+                with picks, lease, _scheduler_ticket(conf, option), _concurrency_slot(conf, req, domain) as slot:
+                    attempt = functools.partial(send, extensions=picks.extensions)
+                    if hedger is not None:
+                        admit = _hedge_admission(conf, req, option, picks)
+                        response = hedger.send(_hedge_key(domain, req), attempt, admit)
+                    else:
+                        response = attempt()
+                    slot.observe(response.status_code)
+                    lease.observe(response.status_code, retry_after(response.headers))
             except httpx.RequestError as e:
                 err_msg = f"{e.__class__.__name__}: {e!r}"
                 log_details = _format_log_details(method_name, url, headers, req.queries, body_data)
@@ -234,10 +314,118 @@ class Transport:
                 )
                 raise
 
+            if limiter is not None:
+                limiter.observe(lease.api_key, req.uri, response.status_code, retry_after(response.headers))
+            # Rate-limited requests wait for a token again, or switch to another key of the pool, instead of failing
+            if (
+                response.status_code == TOO_MANY_REQUESTS
+                and (limiter is not None or lease.rotates)
+                and retry < conf.max_retry_count
+            ):
+                logger.info(f"in-request: rate limited, retrying ({retry + 1}/{conf.max_retry_count}) {url}")
+                continue
+            break
+
         logger.debug(f"{_format_log_details(method_name, url, headers, req.queries, body_data)} {response.status_code}")
 
         raw_resp = RawResponse()
         raw_resp.status_code = response.status_code
         raw_resp.headers = dict(response.headers)
         raw_resp.content = response.content
-        return _unmarshaller(raw_resp, unmarshal_as)
+        return _unmarshaller(raw_resp, unmarshal_as, _lean_responses(conf, option))
+
+    @staticmethod
+    def open(conf: Config, req: BaseRequest, *, option: RequestOption | None = None) -> BinaryStream:
+        """Send a JSON or raw-content request and return its response with the body unread, to be streamed"""
+        option = option or RequestOption()
+
+        if req.http_method is None:
+            raise RuntimeError("HTTP method is required")
+
+        url = _build_url(conf.domain, req.uri, req.paths)
+        headers = _build_header(req, option)
+        # Read once: a body set from a model is dumped on each access
+        body = req.body if req.content is None else None
+        json_ = json.loads(JSON.marshal(body)) if body else None
+        method_name = req.http_method.name
+        limiter = _rate_limiter(conf, option)
+
+        client = connection_pool.get_sync_client(
+            conf.domain or "",
+            conf.timeout,
+            getattr(conf, "max_keepalive_connections", 20),
+            getattr(conf, "max_connections", 100),
+            getattr(conf, "keepalive_expiry", 30.0),
+            getattr(conf, "verify_ssl", True),
+            getattr(conf, "load_balancer", None),
+        )
+        request = client.build_request(
+            method_name,
+            url,
+            headers=headers,
+            params=tuple(req.queries),
+            json=json_,
+            content=req.content,
+            timeout=conf.timeout,
+        )
+
+        for retry in range(conf.max_retry_count + 1):
+            if retry > 0:
+                sleep_time = _get_sleep_time(retry)
+                logger.info(f"in-request: sleep {sleep_time}s")
+                time.sleep(sleep_time)
+
+            lease = _key_lease(option, request.headers, limiter, req.uri)
+
+            picks = _replica_picks(conf)
+            request.extensions.update(picks.extensions)
+            try:
+                with ExitStack() as stack:
+                    stack.enter_context(picks)
+                    stack.enter_context(lease)
+                    stack.enter_context(_scheduler_ticket(conf, option))
+                    slot = stack.enter_context(_concurrency_slot(conf, req, picks.pick()))
+                    response = client.send(request, stream=True)
+                    slot.observe(response.status_code)
+                    lease.observe(response.status_code, retry_after(response.headers))
+                    # Rate-limited requests are retried with another key of the pool
+                    if response.status_code == TOO_MANY_REQUESTS and lease.rotates and retry < conf.max_retry_count:
+                        response.close()
+                        continue
+                    # The key lease, scheduler ticket and concurrency slot are held until the stream is closed
+                    held = stack.pop_all()
+                break
+            except httpx.RequestError as e:
+                err_msg = f"{e.__class__.__name__}: {e!r}"
+                log_details = _format_log_details(method_name, url, headers, req.queries, json_)
+
+                if retry < conf.max_retry_count:
+                    logger.info(
+                        f"in-request: retrying ({retry + 1}/{conf.max_retry_count}) {log_details}, exp: {err_msg}"
+                    )
+                    continue
+                logger.info(
+                    f"in-request: request failed, retried ({retry}/{conf.max_retry_count}) {log_details}, exp: {err_msg}"
+                )
+                raise
+
+        logger.debug(
+            f"{_format_log_details(method_name, url, headers, req.queries, json_)} {response.status_code}, stream response"
+        )
+
+        if limiter is not None:
+            limiter.observe(lease.api_key, req.uri, response.status_code, retry_after(response.headers))
+
+        # Error responses are small; read them so that they are reported like regular responses
+        error = None
+        if not response.is_success:
+            try:
+                raw_resp = RawResponse()
+                raw_resp.status_code = response.status_code
+                raw_resp.headers = dict(response.headers)
+                raw_resp.content = response.read()
+                error = _unmarshaller(raw_resp, BaseResponse)
+            finally:
+                response.close()
+                held.close()
+        return BinaryStream(response, error, held.close)
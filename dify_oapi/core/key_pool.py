@@ -0,0 +1,164 @@
+"""Pools of API keys of one app, spreading requests and rate limits over the keys."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from dify_oapi.core.misc import HiddenText
+from dify_oapi.core.rate_limit import TOO_MANY_REQUESTS
+
+
+@dataclass
+class KeyStats:
+    """Current state of a key of a pool."""
+
+    key: str  # Redacted
+    inflight: int
+    requests: int
+    throttled: int
+    cooldown: float  # Seconds until the key may be used again
+
+
+class _Key:
+    def __init__(self, key: str) -> None:
+        self.key = key
+        # Built once instead of on every request
+        self.authorization = HiddenText(f"Bearer {key}", redacted="****").secret
+        self.inflight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.strikes = 0  # Consecutive 429s
+        self.available_at = 0.0
+
+
+class KeyLease:
+    """The API key of one attempt of a request, counted in flight from its choice until exit."""
+
+    def __init__(self, pool: ApiKeyPool | None, key: _Key | None, api_key: str | None, delay: float = 0.0) -> None:
+        self.pool = pool
+        self.key = key
+        self.api_key = api_key
+        self.delay = delay  # Seconds to wait before the key comes out of its cooldown
+
+    @property
+    def rotates(self) -> bool:
+        """Whether a rate-limited attempt can be retried with a key of the pool."""
+        return self.pool is not None
+
+    def observe(self, status_code: int, retry_after: float | None = None) -> None:
+        if self.pool is not None and self.key is not None:
+            self.pool.observe(self.key, status_code, retry_after)
+
+    def __enter__(self) -> KeyLease:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.release()
+
+    async def __aenter__(self) -> KeyLease:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.release()
+
+    def release(self) -> None:
+        if self.pool is not None and self.key is not None:
+            self.pool.release(self.key)
+            self.key = None
+
+
+class ApiKeyPool:
+    """API keys of one app; each request uses the available key with the fewest requests in flight.
+
+    A key answered with 429 cools down for `Retry-After`, or else `cooldown` seconds doubling with each
+    consecutive 429 up to `max_cooldown`, and rate-limited requests are retried with another key. When every
+    key is cooling down, requests wait for the first one to come back.
+    """
+
+    def __init__(self, keys: Sequence[str], *, cooldown: float = 1.0, max_cooldown: float = 60.0) -> None:
+        if not keys:
+            raise ValueError("at least one API key is required")
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._keys = [_Key(key) for key in keys]
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def keys(self) -> list[str]:
+        return [key.key for key in self._keys]
+
+    def stats(self) -> list[KeyStats]:
+        with self._lock:
+            now = time.monotonic()
+            return [
+                KeyStats(
+                    key=f"****{key.key[-4:]}",
+                    inflight=key.inflight,
+                    requests=key.requests,
+                    throttled=key.throttled,
+                    cooldown=max(0.0, key.available_at - now),
+                )
+                for key in self._keys
+            ]
+
+    def choose(self) -> KeyLease:
+        """Pick a key without waiting; the lease tells how long its cooldown still lasts."""
+        with self._lock:
+            now = time.monotonic()
+            start = self._next
+            self._next = (self._next + 1) % len(self._keys)
+            rotated = self._keys[start:] + self._keys[:start]
+            available = [key for key in rotated if key.available_at <= now]
+            if available:
+                key = min(available, key=lambda k: k.inflight)
+            else:
+                key = min(rotated, key=lambda k: k.available_at)
+            key.requests += 1
+            key.inflight += 1
+            return KeyLease(self, key, key.key, max(0.0, key.available_at - now))
+
+    def lease(self) -> KeyLease:
+        """Pick a key, waiting for the end of its cooldown when all keys are cooling down."""
+        lease = self.choose()
+        if lease.delay:
+            try:
+                time.sleep(lease.delay)
+            except BaseException:
+                lease.release()
+                raise
+        return lease
+
+    async def alease(self) -> KeyLease:
+        """Async version of lease."""
+        lease = self.choose()
+        if lease.delay:
+            try:
+                await asyncio.sleep(lease.delay)
+            except BaseException:
+                lease.release()
+                raise
+        return lease
+
+    def observe(self, key: _Key, status_code: int, retry_after: float | None = None) -> None:
+        """Cool a key down after a 429; any other status ends its run of 429s."""
+        with self._lock:
+            if status_code != TOO_MANY_REQUESTS:
+                key.strikes = 0
+                return
+            key.throttled += 1
+            key.strikes += 1
+            if retry_after is None:
+                retry_after = min(self.max_cooldown, self.cooldown * 2 ** (key.strikes - 1))
+            key.available_at = max(key.available_at, time.monotonic() + retry_after)
+
+    def release(self, key: _Key) -> None:
+        with self._lock:
+            key.inflight -= 1
@@ -0,0 +1,342 @@
+"""Client-side load balancing of requests over several Dify API replicas."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass
+
+import httpx
+
+from dify_oapi.core.enum import BalancingStrategy
+from dify_oapi.core.log import logger
+
+# Request extension carrying the ReplicaPicks of a request to the BalancedTransport
+REPLICAS_EXTENSION = "dify_oapi.replicas"
+
+
+@dataclass
+class ReplicaStats:
+    """Current state of a replica."""
+
+    domain: str
+    healthy: bool
+    outstanding: int
+    latency: float | None  # Moving average of the time to response headers, in seconds
+    failures: int  # Consecutive failures
+
+
+class _Replica:
+    def __init__(self, domain: str) -> None:
+        self.domain = domain.rstrip("/")
+        self.healthy = True
+        self.outstanding = 0
+        self.latency: float | None = None
+        self.failures = 0
+        self.ejected_at = 0.0
+        self.probing = False
+
+
+class LoadBalancer:
+    """Spreads the requests of a client over replicas of the API with a `BalancingStrategy`.
+
+    Replicas are tracked passively: a replica failing `failure_threshold` requests in a row, by a transport
+    error or a 5xx response, is ejected and receives no requests until a health check against
+    `health_check_path` answers below 500 after `ejection_time` seconds. With `health_check_interval`, all
+    replicas are also checked periodically in a background thread. When no replica is healthy, requests
+    fail with `httpx.ConnectError`, which the transports retry like any connection failure.
+    """
+
+    def __init__(
+        self,
+        domains: list[str],
+        *,
+        strategy: BalancingStrategy = BalancingStrategy.ROUND_ROBIN,
+        failure_threshold: int = 3,
+        ejection_time: float = 10.0,
+        health_check_path: str = "/v1/info",
+        health_check_interval: float | None = None,
+        health_check_timeout: float = 5.0,
+        latency_decay: float = 0.3,
+    ) -> None:
+        if not domains:
+            raise ValueError("at least one domain is required")
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.health_check_path = health_check_path
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.latency_decay = latency_decay
+        self._replicas = [_Replica(domain) for domain in domains]
+        self._next = 0
+        self._lock = threading.Lock()
+        self._checker: threading.Thread | None = None
+        self._closed = threading.Event()
+
+    @property
+    def domains(self) -> list[str]:
+        return [replica.domain for replica in self._replicas]
+
+    def stats(self) -> list[ReplicaStats]:
+        with self._lock:
+            return [
+                ReplicaStats(replica.domain, replica.healthy, replica.outstanding, replica.latency, replica.failures)
+                for replica in self._replicas
+            ]
+
+    def pick(self) -> _Replica | None:
+        """Choose a healthy replica for a request and count it as outstanding; None when all are down."""
+        self._start_checker()
+        with self._lock:
+            now = time.monotonic()
+            for replica in self._replicas:
+                if not replica.healthy and not replica.probing and now - replica.ejected_at >= self.ejection_time:
+                    replica.probing = True
+                    threading.Thread(target=self._probe, args=(replica,), daemon=True).start()
+
+            start = self._next
+            self._next = (self._next + 1) % len(self._replicas)
+            rotated = self._replicas[start:] + self._replicas[:start]
+            candidates = [replica for replica in rotated if replica.healthy]
+            if not candidates:
+                return None
+            if self.strategy is BalancingStrategy.LEAST_OUTSTANDING:
+                replica = min(candidates, key=lambda r: r.outstanding)
+            elif self.strategy is BalancingStrategy.EWMA:
+                replica = min(candidates, key=lambda r: (r.latency or 0.0) * (r.outstanding + 1))
+            else:
+                replica = candidates[0]
+            replica.outstanding += 1
+            return replica
+
+    def observe(self, replica: _Replica, latency: float | None, failed: bool) -> None:
+        """Record the outcome of a request sent to `replica`."""
+        with self._lock:
+            if latency is not None:
+                if replica.latency is None:
+                    replica.latency = latency
+                else:
+                    replica.latency += self.latency_decay * (latency - replica.latency)
+            if not failed:
+                replica.failures = 0
+                return
+            replica.failures += 1
+            if replica.healthy and replica.failures >= self.failure_threshold:
+                self._eject(replica)
+
+    def release(self, replica: _Replica) -> None:
+        with self._lock:
+            replica.outstanding -= 1
+
+    def check(self, domain: str) -> bool:
+        """Whether a replica answers its health check; any status below 500 counts, even an auth error."""
+        try:
+            response = httpx.get(f"{domain}{self.health_check_path}", timeout=self.health_check_timeout)
+        except httpx.HTTPError:
+            return False
+        return response.status_code < 500
+
+    def check_all(self) -> None:
+        """Health check every replica now, ejecting and re-admitting them."""
+        for replica in self._replicas:
+            self._apply_check(replica, self.check(replica.domain))
+
+    def route(self, request: httpx.Request, replica: _Replica) -> None:
+        """Point a request built for the first domain at `replica`."""
+        primary, url = self._replicas[0].domain, str(request.url)
+        if replica is self._replicas[0] or not url.startswith(primary):
+            return
+        request.url = httpx.URL(replica.domain + url[len(primary) :])
+        request.headers["Host"] = request.url.netloc.decode("ascii")
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def _eject(self, replica: _Replica) -> None:
+        logger.warning(f"load balancer: ejecting {replica.domain} after {replica.failures} failures")
+        replica.healthy = False
+        replica.ejected_at = time.monotonic()
+
+    def _probe(self, replica: _Replica) -> None:
+        healthy = False
+        try:
+            healthy = self.check(replica.domain)
+        finally:
+            self._apply_check(replica, healthy)
+
+    def _apply_check(self, replica: _Replica, healthy: bool) -> None:
+        with self._lock:
+            replica.probing = False
+            if healthy and not replica.healthy:
+                logger.info(f"load balancer: re-admitting {replica.domain}")
+                replica.healthy = True
+                replica.failures = 0
+            elif not healthy and replica.healthy:
+                self._eject(replica)
+            elif not healthy:
+                replica.ejected_at = time.monotonic()
+
+    def _start_checker(self) -> None:
+        if self.health_check_interval is None or self._checker is not None:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._check_periodically, daemon=True)
+                self._checker.start()
+
+    def _check_periodically(self) -> None:
+        assert self.health_check_interval is not None
+        while not self._closed.wait(self.health_check_interval):
+            self.check_all()
+
+
+class _TrackedStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Response body that releases its replica when closed."""
+
+    def __init__(self, stream: httpx.SyncByteStream | httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release: Callable[[], None] | None = release
+
+    def __iter__(self) -> Iterator[bytes]:
+        assert isinstance(self._stream, httpx.SyncByteStream)
+        yield from self._stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        assert isinstance(self._stream, httpx.AsyncByteStream)
+        async for chunk in self._stream:
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            if isinstance(self._stream, httpx.SyncByteStream):
+                self._stream.close()
+        finally:
+            self._done()
+
+    async def aclose(self) -> None:
+        try:
+            if isinstance(self._stream, httpx.AsyncByteStream):
+                await self._stream.aclose()
+        finally:
+            self._done()
+
+    def _done(self) -> None:
+        if self._release is not None:
+            self._release()
+            self._release = None
+
+
+class ReplicaPicks:
+    """Replicas picked for the sends of a request attempt before it waits for its slots.
+
+    The concurrency limiter and the hedger key their state by the replica a request goes to, which the
+    `BalancedTransport` would otherwise only choose once the request is sent. Each send of the attempt
+    takes the next replica picked, or picks its own when none is left; replicas not taken are released on
+    exit. Without a balancer, or with no healthy replica, `pick` returns the client's domain.
+    """
+
+    def __init__(self, balancer: LoadBalancer | None, domain: str) -> None:
+        self.balancer = balancer
+        self.domain = domain
+        self._picked: deque[_Replica] = deque()
+
+    @property
+    def extensions(self) -> dict[str, ReplicaPicks]:
+        return {REPLICAS_EXTENSION: self}
+
+    def pick(self) -> str:
+        """Pick the replica of the next send; return its domain."""
+        replica = self.balancer.pick() if self.balancer is not None else None
+        if replica is None:
+            return self.domain
+        self._picked.append(replica)
+        return replica.domain
+
+    def take(self) -> _Replica | None:
+        try:
+            return self._picked.popleft()
+        except IndexError:
+            return None
+
+    def __enter__(self) -> ReplicaPicks:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.release()
+
+    async def __aenter__(self) -> ReplicaPicks:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.release()
+
+    def release(self) -> None:
+        while (replica := self.take()) is not None:
+            assert self.balancer is not None
+            self.balancer.release(replica)
+
+
+class BalancedTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """httpx transport that sends each request to a replica picked by a `LoadBalancer`."""
+
+    def __init__(self, balancer: LoadBalancer, transport: httpx.BaseTransport | httpx.AsyncBaseTransport) -> None:
+        self.balancer = balancer
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        assert isinstance(self.transport, httpx.BaseTransport)
+        replica = self._pick(request)
+        start = time.monotonic()
+        try:
+            response = self.transport.handle_request(request)
+        except BaseException as e:
+            self._failed(replica, e)
+            raise
+        return self._tracked(replica, response, time.monotonic() - start)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        assert isinstance(self.transport, httpx.AsyncBaseTransport)
+        replica = self._pick(request)
+        start = time.monotonic()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException as e:
+            self._failed(replica, e)
+            raise
+        return self._tracked(replica, response, time.monotonic() - start)
+
+    def close(self) -> None:
+        if isinstance(self.transport, httpx.BaseTransport):
+            self.transport.close()
+
+    async def aclose(self) -> None:
+        if isinstance(self.transport, httpx.AsyncBaseTransport):
+            await self.transport.aclose()
+
+    def _pick(self, request: httpx.Request) -> _Replica:
+        picks: ReplicaPicks | None = request.extensions.get(REPLICAS_EXTENSION)
+        replica = picks.take() if picks is not None else None
+        if replica is None:
+            replica = self.balancer.pick()
+        if replica is None:
+            raise httpx.ConnectError(f"no healthy replica among {self.balancer.domains}", request=request)
+        self.balancer.route(request, replica)
+        return replica
+
+    def _failed(self, replica: _Replica, error: BaseException) -> None:
+        self.balancer.release(replica)
+        # Requests cancelled by the caller say nothing about the replica
+        if isinstance(error, httpx.TransportError):
+            self.balancer.observe(replica, None, True)
+
+    def _tracked(self, replica: _Replica, response: httpx.Response, latency: float) -> httpx.Response:
+        self.balancer.observe(replica, latency, response.status_code >= 500)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, lambda: self.balancer.release(replica)),
+            extensions=response.extensions,
+        )
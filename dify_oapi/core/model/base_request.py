@@ -1,17 +1,38 @@
 from typing import Any
 
+from pydantic import BaseModel
+
 from dify_oapi.core.enum import HttpMethod
 
 
 class BaseRequest:
+    # Slots instead of a __dict__ per request, for the many requests a batch keeps queued; subclasses declare theirs
+    __slots__ = ("http_method", "uri", "paths", "queries", "headers", "_body", "_body_model", "files", "content")
+
     def __init__(self) -> None:
         self.http_method: HttpMethod | None = None
         self.uri: str | None = None
         self.paths: dict[str, str] = {}
         self.queries: list[tuple[str, str]] = []
         self.headers: dict[str, str] = {}
-        self.body: dict = {}
+        self._body: dict = {}
+        self._body_model: BaseModel | None = None
         self.files: dict | None = None
+        self.content: bytes | None = None  # Pre-encoded body, sent as is instead of `body`
+
+    @property
+    def body(self) -> dict:
+        """JSON body; when set from a model, it is dumped from the model on each access instead of being kept."""
+        if self._body_model is not None:
+            return self._body_model.model_dump(exclude_none=True, mode="json")
+        return self._body
+
+    @body.setter
+    def body(self, body: dict | BaseModel) -> None:
+        if isinstance(body, BaseModel):
+            self._body, self._body_model = {}, body
+        else:
+            self._body, self._body_model = body, None
 
     def add_query(self, k: str, v: Any) -> None:
         if isinstance(v, list | tuple):
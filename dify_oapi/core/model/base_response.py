@@ -18,7 +18,7 @@ class BaseResponse(BaseModel):
             return self.message_
 
         if self.raw is not None and self.raw.content is not None:
-            return self.raw.content.decode("utf-8")
+            return self.raw.content.decode("utf-8", errors="replace")
 
         return None
 
@@ -1,7 +1,21 @@
+from __future__ import annotations
+
 import ssl
+from typing import TYPE_CHECKING
 
 from dify_oapi.core.enum import LogLevel
 
+if TYPE_CHECKING:
+    from dify_oapi.api.chat.v1.message_store import MessageStore
+    from dify_oapi.api.dify.v1.upload_cache import UploadCache
+    from dify_oapi.api.knowledge.v1.retrieval_cache import RetrievalCache
+    from dify_oapi.core.concurrency import AdaptiveConcurrencyLimiter
+    from dify_oapi.core.hedging import RequestHedger
+    from dify_oapi.core.load_balancer import LoadBalancer
+    from dify_oapi.core.model.lean_responses import LeanResponses
+    from dify_oapi.core.rate_limit import RateLimiter
+    from dify_oapi.core.scheduler import RequestScheduler
+
 
 class Config:
     def __init__(self):
@@ -17,3 +31,30 @@ class Config:
 
         # SSL settings
         self.verify_ssl: ssl.SSLContext | str | bool = True  # SSL certificate verification
+
+        # Knowledge retrieval cache, disabled by default
+        self.retrieval_cache: RetrievalCache | None = None
+
+        # Local mirror of chat message histories, disabled by default
+        self.message_store: MessageStore | None = None
+
+        # Content-addressed cache of uploaded files, disabled by default
+        self.upload_cache: UploadCache | None = None
+
+        # Client-side rate limiter, disabled by default
+        self.rate_limiter: RateLimiter | None = None
+
+        # Adaptive limit of the requests in flight per domain, disabled by default
+        self.concurrency_limiter: AdaptiveConcurrencyLimiter | None = None
+
+        # Priority scheduler of the requests sent by this client, disabled by default
+        self.scheduler: RequestScheduler | None = None
+
+        # Hedging of slow idempotent requests, disabled by default
+        self.hedger: RequestHedger | None = None
+
+        # Load balancing over several replicas, whose first domain is `domain`; disabled by default
+        self.load_balancer: LoadBalancer | None = None
+
+        # Trimming of the raw response kept on parsed responses, disabled by default
+        self.lean_responses: LeanResponses | None = None
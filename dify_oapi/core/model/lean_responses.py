@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from dify_oapi.core.const import CONTENT_TYPE
+
+from .raw_response import RawResponse
+
+
+@dataclass(frozen=True)
+class LeanResponses:
+    """Trims the raw response attached to responses that were parsed successfully.
+
+    Only the status code, the `headers` listed and the first `max_content` bytes of the body are kept, so
+    that a parsed response does not also hold its whole body and headers; the default keeps no body. Error
+    responses are kept whole, since their message may be read from the body.
+    """
+
+    headers: tuple[str, ...] = (CONTENT_TYPE,)
+    max_content: int = 0
+
+    def trim(self, raw: RawResponse) -> RawResponse:
+        keep = {name.lower() for name in self.headers}
+        content = raw.content[: self.max_content] if raw.content and self.max_content > 0 else None
+        return RawResponse(
+            status_code=raw.status_code,
+            headers={name: value for name, value in raw.headers.items() if name.lower() in keep},
+            content=content,
+        )
@@ -1,10 +1,26 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+from dify_oapi.core.enum import Priority
+
+if TYPE_CHECKING:
+    from dify_oapi.core.key_pool import ApiKeyPool
+    from dify_oapi.core.model.lean_responses import LeanResponses
+    from dify_oapi.core.rate_limit import RateLimiter
+
 
 class RequestOption:
+    __slots__ = ("api_key", "key_pool", "headers", "rate_limiter", "priority", "lean_responses")
+
     def __init__(self):
         self.api_key: str | None = None
+        self.key_pool: ApiKeyPool | None = None  # Keys to pick from per attempt instead of api_key
         self.headers: dict[str, str] = {}
+        self.rate_limiter: RateLimiter | None = None  # Overrides the rate limiter of the client
+        self.priority: Priority = Priority.NORMAL  # Priority class in the request scheduler of the client
+        # Overrides the lean mode of the client: True for the defaults, False to keep the whole raw response
+        self.lean_responses: LeanResponses | bool | None = None
 
     @staticmethod
     def builder() -> RequestOptionBuilder:
@@ -19,9 +35,25 @@ class RequestOptionBuilder:
         self._request_option.api_key = api_key
         return self
 
+    def key_pool(self, key_pool: ApiKeyPool) -> RequestOptionBuilder:
+        self._request_option.key_pool = key_pool
+        return self
+
     def headers(self, headers: dict[str, str]) -> RequestOptionBuilder:
         self._request_option.headers = headers
         return self
 
+    def rate_limiter(self, rate_limiter: RateLimiter) -> RequestOptionBuilder:
+        self._request_option.rate_limiter = rate_limiter
+        return self
+
+    def priority(self, priority: Priority) -> RequestOptionBuilder:
+        self._request_option.priority = priority
+        return self
+
+    def lean_responses(self, lean_responses: LeanResponses | bool = True) -> RequestOptionBuilder:
+        self._request_option.lean_responses = lean_responses
+        return self
+
     def build(self) -> RequestOption:
         return self._request_option
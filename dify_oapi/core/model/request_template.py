@@ -0,0 +1,90 @@
+"""Reusable request templates, cloned cheaply for requests that differ in a few body fields."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable, Mapping
+from typing import Any, Generic, TypeVar
+
+from pydantic import BaseModel
+
+from dify_oapi.core.const import APPLICATION_JSON, CONTENT_TYPE
+from dify_oapi.core.model.base_request import BaseRequest
+
+R = TypeVar("R", bound=BaseRequest)
+
+
+# Created once: json.dumps with options builds a new encoder on every call
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode(value: Any) -> bytes:
+    return _ENCODER.encode(value).encode()
+
+
+# Set on each clone instead of being copied from the template
+_PER_CLONE = ("_body", "_body_model", "content", "headers")
+
+
+def _state(request: BaseRequest) -> dict[str, Any]:
+    """Attributes of a request, held in the slots of its classes and, for subclasses without slots, its __dict__."""
+    names = [name for cls in type(request).__mro__ for name in getattr(cls, "__slots__", ())]
+    state = {name: getattr(request, name) for name in names if hasattr(request, name)}
+    state.update(getattr(request, "__dict__", {}))
+    return state
+
+
+class RequestTemplate(Generic[R]):
+    """A request built once with the builders, whose clones only fill in path parameters and the `vary` body fields.
+
+    The static body fields are encoded to JSON once and each clone appends its own fields to them, so the
+    clone is sent as pre-encoded content instead of being dumped and encoded again. The method, URI, path
+    parameters, queries and headers are shared with the template, and a typed `request_body` is copied with
+    the new fields so that code reading it, like the chat message store, sees the clone's values.
+
+    The body is sent as encoded, so build the template with the `response_mode` its clones are sent with.
+    """
+
+    def __init__(self, request: R, vary: Iterable[str] = ()) -> None:
+        if request.files or request.content is not None:
+            raise ValueError("only requests with a JSON body can be templated")
+        self.request = request
+        self.vary = tuple(vary)
+        static = {key: value for key, value in request.body.items() if key not in self.vary and value is not None}
+        self._prefix = b"{" + b",".join(_encode(key) + b":" + _encode(value) for key, value in static.items())
+        self._separator = b"," if static else b""
+        self._keys = {key: _encode(key) + b":" for key in self.vary}
+        self._static_body = static
+        # Requests without a body, like GETs, only vary in their path parameters
+        self._json = bool(static or self.vary)
+        self._headers = {**request.headers, CONTENT_TYPE: APPLICATION_JSON} if self._json else dict(request.headers)
+        self._state = {key: value for key, value in _state(request).items() if key not in _PER_CLONE}
+
+    def clone(self, *, paths: Mapping[str, str] | None = None, **fields: Any) -> R:
+        """A request of the template with the given `vary` fields; fields left out or None are not sent."""
+        unknown = fields.keys() - self._keys.keys()
+        if unknown:
+            raise ValueError(f"fields not declared as varying: {', '.join(sorted(unknown))}")
+        request: R = object.__new__(type(self.request))
+        for key, value in self._state.items():
+            setattr(request, key, value)
+        if paths:
+            request.paths = {**request.paths, **paths}
+            # Keep the attributes set by the builders with the path parameters in line
+            for key, value in paths.items():
+                if key in self._state:
+                    setattr(request, key, value)
+        request.queries = list(request.queries)
+        request.headers = dict(self._headers)
+
+        sent = {key: value for key, value in fields.items() if value is not None}
+        request.body = {**self._static_body, **sent}
+        request.content = None
+        if self._json:
+            parts = [self._keys[key] + _encode(value) for key, value in sent.items()]
+            request.content = self._prefix + (self._separator if parts else b"") + b",".join(parts) + b"}"
+
+        request_body = self._state.get("request_body")
+        if isinstance(request_body, BaseModel):
+            request.request_body = request_body.model_copy(update=fields)  # type: ignore[attr-defined]
+        return request
@@ -0,0 +1,156 @@
+"""Client-side rate limiting of requests per API key and endpoint."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+# Status code of responses rejected by the server's rate limit
+TOO_MANY_REQUESTS = 429
+
+
+@dataclass
+class RateLimitStats:
+    """Counters of a rate limiter."""
+
+    acquired: int = 0
+    delayed: int = 0
+    waited: float = 0.0
+    throttled: int = 0
+
+
+class TokenBucket:
+    """A token bucket that hands out tokens in request order.
+
+    Each acquisition reserves the next token, letting the balance go negative, and waits until the
+    reservation is due, so waiting callers are served first come first served whether they block or await.
+    The refill rate drops by `backoff` when the server answers 429 and climbs back to `rate` by `recovery`
+    of it per successful response.
+    """
+
+    def __init__(
+        self, rate: float, burst: float, *, min_rate: float, backoff: float = 0.5, recovery: float = 0.05
+    ) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.backoff = backoff
+        self.recovery = recovery
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def throttled(self, retry_after: float | None = None) -> None:
+        """Slow down after a 429; no token is handed out before `retry_after` seconds."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            if retry_after:
+                self._tokens = min(self._tokens, -retry_after * self.rate)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """Token buckets keyed by API key, and by endpoint with `per_endpoint`, shared by the sync and async clients.
+
+    Requests wait locally for a token instead of being sent over the limit; when the server still answers
+    429, the bucket slows down, honours `Retry-After`, and the transport retries the request after waiting
+    again. `rate` is in requests per second and `burst` defaults to one second worth of requests.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        *,
+        per_endpoint: bool = False,
+        min_rate: float | None = None,
+        backoff: float = 0.5,
+        recovery: float = 0.05,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.per_endpoint = per_endpoint
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.backoff = backoff
+        self.recovery = recovery
+        self.stats = RateLimitStats()
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, api_key: str | None, uri: str | None) -> TokenBucket:
+        key = (api_key or "", (uri or "") if self.per_endpoint else "")
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(
+                    self.rate, self.burst, min_rate=self.min_rate, backoff=self.backoff, recovery=self.recovery
+                )
+            return bucket
+
+    def acquire(self, api_key: str | None, uri: str | None) -> float:
+        """Block until a request may be sent; return the time waited."""
+        delay = self._reserve(api_key, uri)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def aacquire(self, api_key: str | None, uri: str | None) -> float:
+        """Async version of acquire."""
+        delay = self._reserve(api_key, uri)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def observe(self, api_key: str | None, uri: str | None, status_code: int, retry_after: float | None = None) -> None:
+        """Adapt the bucket of a request to its response status."""
+        bucket = self.bucket(api_key, uri)
+        if status_code == TOO_MANY_REQUESTS:
+            self.stats.throttled += 1
+            bucket.throttled(retry_after)
+        else:
+            bucket.succeeded()
+
+    def _reserve(self, api_key: str | None, uri: str | None) -> float:
+        delay = self.bucket(api_key, uri).reserve()
+        self.stats.acquired += 1
+        if delay:
+            self.stats.delayed += 1
+            self.stats.waited += delay
+        return delay
+
+
+def retry_after(headers: Mapping[str, str]) -> float | None:
+    """Seconds from a `Retry-After` header given in seconds; HTTP dates are ignored."""
+    value = headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,208 @@
+"""Priority scheduling of the requests sent over the shared connection pool."""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from dify_oapi.core.enum import Priority
+from dify_oapi.core.waiter import Waiter
+
+
+@dataclass
+class PriorityClass:
+    """Share of a priority class: its `weight` under contention and an optional cap on its requests in flight."""
+
+    weight: float
+    max_inflight: int | None = None
+
+
+# Under contention interactive requests get 16 slots, normal ones 4 and background ones 1 out of 21
+DEFAULT_PRIORITY_CLASSES: dict[Priority, PriorityClass] = {
+    Priority.INTERACTIVE: PriorityClass(weight=16),
+    Priority.NORMAL: PriorityClass(weight=4),
+    Priority.BACKGROUND: PriorityClass(weight=1),
+}
+
+
+@dataclass
+class PriorityStats:
+    """Queueing counters of a priority class."""
+
+    inflight: int = 0
+    queued: int = 0
+    admitted: int = 0
+    timed_out: int = 0
+    waited: float = 0.0  # Total seconds spent in the queue by admitted requests
+    max_waited: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.waited / self.admitted if self.admitted else 0.0
+
+
+class _ClassQueue:
+    def __init__(self, priority_class: PriorityClass) -> None:
+        self.weight = priority_class.weight
+        self.max_inflight = priority_class.max_inflight
+        self.inflight = 0
+        self.waiters: deque[tuple[Waiter, float]] = deque()
+        self.pass_ = 0.0
+        self.stats = PriorityStats()
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.waiters) and (self.max_inflight is None or self.inflight < self.max_inflight)
+
+
+class Ticket:
+    """A request admitted by the scheduler, holding its slot until exit."""
+
+    def __init__(self, scheduler: RequestScheduler | None, priority: Priority, waited: float = 0.0) -> None:
+        self.scheduler = scheduler
+        self.priority = priority
+        self.waited = waited
+
+    def __enter__(self) -> Ticket:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.release()
+
+    async def __aenter__(self) -> Ticket:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.release()
+
+    def release(self) -> None:
+        if self.scheduler is not None:
+            self.scheduler.release(self.priority)
+            self.scheduler = None
+
+
+class RequestScheduler:
+    """Admits up to `max_inflight` requests at a time, serving queued priority classes by weight.
+
+    Classes are picked by stride scheduling: each grant advances the pass of a class by the inverse of its
+    weight and the ready class with the lowest pass goes next, ties going to the higher priority. A class
+    that starts queueing joins one stride behind the current pass, so the classes already waiting go first,
+    while a busy class cannot starve one with a lower weight. A class at its `max_inflight` is skipped
+    until one of its requests completes. The queue is shared by the sync and async clients; requests raise
+    `TimeoutError` after waiting `max_wait` seconds.
+
+    Keep `max_inflight` at or below `Config.max_connections` so requests queue here by priority rather than
+    in the connection pool in arrival order.
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = 100,
+        *,
+        classes: Mapping[Priority, PriorityClass] | None = None,
+        max_wait: float | None = None,
+    ) -> None:
+        self.max_inflight = max_inflight
+        self.max_wait = max_wait
+        self._queues = {
+            priority: _ClassQueue((classes or {}).get(priority, default))
+            for priority, default in DEFAULT_PRIORITY_CLASSES.items()
+        }
+        self._inflight = 0
+        self._pass = 0.0
+        self._lock = threading.Lock()
+
+    def stats(self, priority: Priority) -> PriorityStats:
+        with self._lock:
+            queue = self._queues[priority]
+            return dataclasses.replace(queue.stats, inflight=queue.inflight, queued=len(queue.waiters))
+
+    def ticket(self, priority: Priority = Priority.NORMAL) -> Ticket:
+        """Wait for a slot for a request of `priority`."""
+        waiter = Waiter()
+        queued_at = self._enqueue(priority, waiter)
+        if not waiter.granted and not waiter.wait(self.max_wait):
+            self._abandon(priority, waiter, queued_at)
+        return Ticket(self, priority, time.monotonic() - queued_at)
+
+    def try_ticket(self, priority: Priority = Priority.NORMAL) -> Ticket | None:
+        """A slot for a request of `priority` if one is free and no request is queued; None otherwise."""
+        with self._lock:
+            queue = self._queues[priority]
+            if self._inflight >= self.max_inflight or any(q.waiters for q in self._queues.values()):
+                return None
+            if queue.max_inflight is not None and queue.inflight >= queue.max_inflight:
+                return None
+            queue.inflight += 1
+            self._inflight += 1
+            queue.stats.admitted += 1
+        return Ticket(self, priority)
+
+    async def aticket(self, priority: Priority = Priority.NORMAL) -> Ticket:
+        """Async version of ticket."""
+        waiter = Waiter(asyncio.get_running_loop())
+        queued_at = self._enqueue(priority, waiter)
+        if not waiter.granted:
+            assert waiter.future is not None
+            try:
+                done, _ = await asyncio.wait({waiter.future}, timeout=self.max_wait)
+            except asyncio.CancelledError:
+                self._abandon(priority, waiter, queued_at, cancelled=True)
+                raise
+            if not done:
+                self._abandon(priority, waiter, queued_at)
+        return Ticket(self, priority, time.monotonic() - queued_at)
+
+    def release(self, priority: Priority) -> None:
+        with self._lock:
+            self._queues[priority].inflight -= 1
+            self._inflight -= 1
+            self._grant()
+
+    def _enqueue(self, priority: Priority, waiter: Waiter) -> float:
+        queued_at = time.monotonic()
+        with self._lock:
+            queue = self._queues[priority]
+            if not queue.waiters:
+                queue.pass_ = max(queue.pass_, self._pass + 1 / queue.weight)
+            queue.waiters.append((waiter, queued_at))
+            self._grant()
+        return queued_at
+
+    def _grant(self) -> None:
+        while self._inflight < self.max_inflight:
+            ready = [queue for queue in self._queues.values() if queue.ready]
+            if not ready:
+                return
+            queue = min(ready, key=lambda q: q.pass_)
+            self._pass = queue.pass_
+            queue.pass_ += 1 / queue.weight
+            queue.inflight += 1
+            self._inflight += 1
+            waiter, queued_at = queue.waiters.popleft()
+            waited = time.monotonic() - queued_at
+            queue.stats.admitted += 1
+            queue.stats.waited += waited
+            queue.stats.max_waited = max(queue.stats.max_waited, waited)
+            waiter.wake()
+
+    def _abandon(self, priority: Priority, waiter: Waiter, queued_at: float, cancelled: bool = False) -> None:
+        with self._lock:
+            queue = self._queues[priority]
+            if not waiter.granted:
+                queue.waiters.remove((waiter, queued_at))
+                if cancelled:
+                    return
+                queue.stats.timed_out += 1
+                raise TimeoutError(f"no {priority.name.lower()} request slot within {self.max_wait}s")
+            if not cancelled:
+                return
+            # Granted while being cancelled: hand the slot to the next waiter
+            queue.inflight -= 1
+            self._inflight -= 1
+            self._grant()
@@ -0,0 +1,109 @@
+"""Incremental decoding of the base64 audio of `tts_message` stream events."""
+
+from __future__ import annotations
+
+import binascii
+import json
+from collections.abc import AsyncGenerator, AsyncIterable, Generator, Iterable
+from typing import Any, BinaryIO
+
+TTS_MESSAGE = "tts_message"
+TTS_MESSAGE_END = "tts_message_end"
+
+_WHITESPACE = b" \t\r\n"
+
+
+class AudioSink:
+    """Decodes the audio fragments of `tts_message` events as they arrive.
+
+    Fragments are decoded as soon as they complete a base64 quantum; the remainder of a fragment that
+    does not end on a 4-character boundary is carried over to the next one. Decoded audio is written
+    to `file` when one is given, so playback or saving can start on the first event, and is otherwise
+    appended to `buffer`, a bytearray that `drain` empties for reuse.
+
+    Chat, chatflow, completion and workflow streams share the event format: wrap any of their streams
+    with `observe`/`aobserve`, or pass typed events such as `ChunkWorkflowEvent` to `feed_event`.
+    """
+
+    def __init__(self, file: BinaryIO | None = None) -> None:
+        self.file = file
+        self.buffer = bytearray()
+        self.bytes_written = 0
+        self.ended = False
+        self._pending = b""
+        self._lines = b""
+
+    def feed(self, fragment: str | bytes) -> int:
+        """Decode a base64 fragment; return the number of audio bytes it completed."""
+        data = fragment.encode("ascii") if isinstance(fragment, str) else fragment
+        if any(c in data for c in _WHITESPACE):
+            data = data.translate(None, _WHITESPACE)
+        if self._pending:
+            data = self._pending + data
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        return self._write(binascii.a2b_base64(data[:usable])) if usable else 0
+
+    def finish(self) -> int:
+        """Decode what is left of the last fragment, restoring its padding; return the audio bytes decoded."""
+        pending, self._pending = self._pending, b""
+        self.ended = True
+        if not pending:
+            return 0
+        if len(pending) % 4 == 1:
+            raise ValueError("truncated base64 audio")
+        return self._write(binascii.a2b_base64(pending + b"=" * (-len(pending) % 4)))
+
+    def feed_event(self, event: Any) -> bool:
+        """Feed a `tts_message` event, given as a dict or a typed event; return False for other events."""
+        kind = event.get("event") if isinstance(event, dict) else getattr(event, "event", None)
+        if kind == TTS_MESSAGE:
+            audio = event.get("audio") if isinstance(event, dict) else getattr(event, "audio", None)
+            if audio:
+                self.feed(audio)
+            return True
+        if kind == TTS_MESSAGE_END:
+            self.finish()
+            return True
+        return False
+
+    def feed_sse(self, chunk: bytes) -> None:
+        """Feed raw bytes of a server-sent event stream; only `tts_message` events are parsed."""
+        self._lines += chunk
+        *lines, self._lines = self._lines.split(b"\n")
+        for line in lines:
+            line = line.strip()
+            if not line.startswith(b"data:") or TTS_MESSAGE.encode() not in line:
+                continue
+            try:
+                event = json.loads(line[5:])
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                self.feed_event(event)
+
+    def observe(self, chunks: Iterable[bytes]) -> Generator[bytes, None, None]:
+        """Pass a streaming response through unchanged while decoding its audio."""
+        for chunk in chunks:
+            self.feed_sse(chunk)
+            yield chunk
+
+    async def aobserve(self, chunks: AsyncIterable[bytes]) -> AsyncGenerator[bytes, None]:
+        """Async version of observe."""
+        async for chunk in chunks:
+            self.feed_sse(chunk)
+            yield chunk
+
+    def drain(self) -> bytes:
+        """Return the buffered audio and empty the buffer."""
+        audio = bytes(self.buffer)
+        self.buffer.clear()
+        return audio
+
+    def _write(self, audio: bytes) -> int:
+        if self.file is not None:
+            self.file.write(audio)
+        else:
+            self.buffer += audio
+        self.bytes_written += len(audio)
+        return len(audio)
@@ -0,0 +1,31 @@
+"""Queued requests shared by the sync and async clients, woken from any thread."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+
+class Waiter:
+    """A queued request, woken by a thread event or by resolving a future on its event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None) -> None:
+        self.granted = False
+        self._loop = loop
+        self._event = threading.Event() if loop is None else None
+        self.future: asyncio.Future[None] | None = loop.create_future() if loop is not None else None
+
+    def wait(self, timeout: float | None) -> bool:
+        assert self._event is not None
+        return self._event.wait(timeout)
+
+    def wake(self) -> None:
+        self.granted = True
+        if self._event is not None:
+            self._event.set()
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if self.future is not None and not self.future.done():
+            self.future.set_result(None)
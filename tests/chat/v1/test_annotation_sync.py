@@ -0,0 +1,105 @@
+"""Bulk annotation sync tests."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from dify_oapi.api.chat.v1.annotation_sync import AnnotationJobWatcher, AnnotationSync, read_annotations
+from dify_oapi.api.chat.v1.model.annotation_info import AnnotationInfo
+from dify_oapi.api.chat.v1.model.configure_annotation_reply_request_body import ConfigureAnnotationReplyRequestBody
+from dify_oapi.api.chat.v1.model.configure_annotation_reply_response import ConfigureAnnotationReplyResponse
+from dify_oapi.api.chat.v1.model.create_annotation_response import CreateAnnotationResponse
+from dify_oapi.api.chat.v1.model.delete_annotation_response import DeleteAnnotationResponse
+from dify_oapi.api.chat.v1.model.get_annotation_reply_status_response import GetAnnotationReplyStatusResponse
+from dify_oapi.api.chat.v1.model.list_annotations_response import ListAnnotationsResponse
+from dify_oapi.api.chat.v1.model.update_annotation_response import UpdateAnnotationResponse
+
+
+def _pages(annotations, page_size):
+    def list_(request, option):
+        page = int(dict(request.queries)["page"])
+        data = annotations[(page - 1) * page_size : page * page_size]
+        return ListAnnotationsResponse(data=data, has_more=page * page_size < len(annotations), page=page)
+
+    return list_
+
+
+class TestAnnotationSync:
+    """Test AnnotationSync."""
+
+    @pytest.fixture
+    def annotation(self):
+        """Create mocked Annotation resource with three existing annotations."""
+        existing = [AnnotationInfo(id=f"a{i}", question=f"q{i}", answer=f"answer {i}") for i in range(3)]
+        annotation = MagicMock()
+        annotation.list.side_effect = _pages(existing, page_size=2)
+        annotation.create.return_value = CreateAnnotationResponse(id="new")
+        annotation.update.return_value = UpdateAnnotationResponse(id="a1")
+        annotation.delete.return_value = DeleteAnnotationResponse()
+        return annotation
+
+    def test_diff_against_existing(self, annotation, request_option, tmp_path):
+        """Test only changed annotations are sent and unmatched ones are deleted."""
+        source = tmp_path / "annotations.csv"
+        source.write_text("question,answer\nq0,answer 0\nq1,changed\nq9,new answer\n")
+
+        sync = AnnotationSync(annotation, request_option, delete_missing=True, page_size=2)
+        report = sync.run(str(source))
+
+        assert (report.created, report.updated, report.deleted, report.unchanged) == (1, 1, 1, 1)
+        assert annotation.update.call_args.args[0].paths == {"annotation_id": "a1"}
+        assert annotation.create.call_args.args[0].request_body.question == "q9"
+        assert annotation.delete.call_args.args[0].paths == {"annotation_id": "a2"}
+
+    def test_export_round_trip(self, annotation, request_option, tmp_path):
+        """Test every page is exported and can be read back."""
+        sync = AnnotationSync(annotation, request_option, page_size=2)
+        for name in ["out.jsonl", "out.csv"]:
+            assert sync.export(str(tmp_path / name)) == 3
+            assert [a.id for a in read_annotations(str(tmp_path / name))] == ["a0", "a1", "a2"]
+
+    def test_failures_are_reported(self, annotation, request_option):
+        """Test failed calls are reported per annotation."""
+        annotation.create.return_value = CreateAnnotationResponse(code="quota", msg="quota exceeded")
+        report = AnnotationSync(annotation, request_option).run([AnnotationInfo(question="q9", answer="x")])
+        assert report.failures == {"create:q9": "quota exceeded"}
+
+
+class TestAnnotationJobWatcher:
+    """Test AnnotationJobWatcher."""
+
+    def test_configure_waits_for_job(self, request_option):
+        """Test the job is polled until it reaches a terminal state."""
+        annotation = MagicMock()
+        annotation.configure.return_value = ConfigureAnnotationReplyResponse(job_id="job-1", job_status="waiting")
+        annotation.status.side_effect = [
+            GetAnnotationReplyStatusResponse(job_id="job-1", job_status="running"),
+            GetAnnotationReplyStatusResponse(job_id="job-1", job_status="completed"),
+        ]
+        watcher = AnnotationJobWatcher(annotation, request_option, min_interval=0.01)
+        result = watcher.configure("enable", ConfigureAnnotationReplyRequestBody(score_threshold=0.9))
+
+        assert result.job_status == "completed"
+        assert annotation.status.call_args.args[0].paths == {"action": "enable", "job_id": "job-1"}
+
+    def test_timeout(self, request_option):
+        """Test a job that never finishes raises TimeoutError."""
+        annotation = MagicMock()
+        annotation.status.return_value = GetAnnotationReplyStatusResponse(job_id="job-1", job_status="running")
+        watcher = AnnotationJobWatcher(annotation, request_option, min_interval=0.01, timeout=0.05)
+        with pytest.raises(TimeoutError):
+            watcher.wait("disable", "job-1")
+
+    @pytest.mark.asyncio
+    async def test_await_job(self, request_option):
+        """Test jobs can be awaited."""
+        annotation = MagicMock()
+        annotation.astatus = AsyncMock(
+            side_effect=[
+                GetAnnotationReplyStatusResponse(job_status="waiting"),
+                GetAnnotationReplyStatusResponse(job_status="failed", error_msg="no model"),
+            ]
+        )
+        watcher = AnnotationJobWatcher(annotation, request_option, min_interval=0.01)
+        result = await watcher.await_job("enable", "job-1")
+        assert result.error_msg == "no model"
@@ -0,0 +1,108 @@
+"""Conversation history export tests."""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from dify_oapi.api.chat.v1.history_export import HistoryExporter
+from dify_oapi.api.chat.v1.model.get_conversation_list_response import GetConversationsResponse
+from dify_oapi.api.chat.v1.model.message_history_response import GetMessageHistoryResponse
+from dify_oapi.core.model.request_option import RequestOption
+
+
+def _messages(conversation_id, *ids):
+    return [{"id": f"{conversation_id}-{i}", "conversation_id": conversation_id, "query": i} for i in ids]
+
+
+class TestHistoryExporter:
+    """Test HistoryExporter."""
+
+    @pytest.fixture
+    def conversation(self):
+        """Create mocked Conversation resource with two pages of history per conversation."""
+        conversation = MagicMock()
+        conversation.list.side_effect = lambda req, opt: GetConversationsResponse.model_validate(
+            {"data": [{"id": f"conv-{opt.api_key}-{dict(req.queries)['user']}", "updated_at": 100}], "has_more": False}
+        )
+
+        def history(req, opt):
+            conversation_id = dict(req.queries)["conversation_id"]
+            if ("first_id", f"{conversation_id}-m3") in req.queries:
+                messages = _messages(conversation_id, "m1", "m2")
+                return GetMessageHistoryResponse.model_validate({"data": messages, "has_more": False})
+            messages = _messages(conversation_id, "m3", "m4")
+            return GetMessageHistoryResponse.model_validate({"data": messages, "has_more": True})
+
+        conversation.history.side_effect = history
+        return conversation
+
+    def _lines(self, output_dir):
+        lines = []
+        for path in sorted(output_dir.glob("history-*.ndjson")):
+            lines.extend(json.loads(line) for line in path.read_text().splitlines())
+        return lines
+
+    def test_export_and_rerun(self, conversation, tmp_path):
+        """Test users of several apps are exported and a rerun skips what was already exported."""
+        apps = {
+            "chat": RequestOption.builder().api_key("k1").build(),
+            "flow": RequestOption.builder().api_key("k2").build(),
+        }
+        exporter = HistoryExporter(conversation, apps, str(tmp_path), shards=2)
+        report = exporter.run(["alice", "bob"])
+
+        assert (report.users, report.conversations, report.messages) == (4, 4, 16)
+        lines = self._lines(tmp_path)
+        assert {(line["app"], line["user"]) for line in lines} == {
+            ("chat", "alice"),
+            ("chat", "bob"),
+            ("flow", "alice"),
+            ("flow", "bob"),
+        }
+
+        # Nothing was updated since the checkpoint
+        assert exporter.run(["alice", "bob"]).conversations == 0
+
+        # Updated conversations are crawled again but known messages are not rewritten
+        rerun = HistoryExporter(conversation, apps, str(tmp_path), updated_after=None, shards=2)
+        rerun.state.complete_user("chat", "alice", 50)
+        report = rerun.run(["alice"])
+        assert (report.conversations, report.messages, report.skipped_messages) == (1, 0, 2)
+        assert len(self._lines(tmp_path)) == len(lines) + 1
+
+    def test_resume_after_crash_mid_conversation(self, conversation, tmp_path):
+        """Test a rerun pages past known messages to the end of a conversation a crashed run did not finish."""
+        history = conversation.history.side_effect
+
+        def crash_on_older_page(req, opt):
+            if any(key == "first_id" for key, _ in req.queries):
+                raise ConnectionError("crashed")
+            return history(req, opt)
+
+        conversation.history.side_effect = crash_on_older_page
+        apps = {"chat": RequestOption.builder().api_key("k1").build()}
+        first = HistoryExporter(conversation, apps, str(tmp_path)).run(["alice"])
+        assert "chat:alice" in first.failures
+
+        conversation.history.side_effect = history
+        report = HistoryExporter(conversation, apps, str(tmp_path)).run(["alice"])
+
+        assert (report.messages, report.skipped_messages) == (2, 2)
+        messages = [line["data"]["id"] for line in self._lines(tmp_path) if line["type"] == "message"]
+        assert sorted(messages) == [f"conv-k1-alice-m{i}" for i in range(1, 5)]
+
+        # Once finished, an updated conversation stops at the first page without new messages
+        rerun = HistoryExporter(conversation, apps, str(tmp_path))
+        rerun.state.complete_user("chat", "alice", 50)
+        assert rerun.run(["alice"]).skipped_messages == 2
+
+    def test_failures_are_reported(self, conversation, tmp_path):
+        """Test a failing user is reported and not checkpointed."""
+        conversation.list.side_effect = None
+        conversation.list.return_value = GetConversationsResponse(code="unauthorized", msg="invalid key")
+        exporter = HistoryExporter(conversation, {"chat": RequestOption()}, str(tmp_path))
+        report = exporter.run(["alice"])
+
+        assert "chat:alice" in report.failures
+        assert exporter.state.watermark("chat", "alice") is None
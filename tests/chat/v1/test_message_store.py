@@ -0,0 +1,176 @@
+"""Local message store tests."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from dify_oapi.api.chat.v1.message_store import MessageStore
+from dify_oapi.api.chat.v1.model.chat_request import ChatRequest
+from dify_oapi.api.chat.v1.model.chat_request_body import ChatRequestBody
+from dify_oapi.api.chat.v1.model.message_history_request import GetMessageHistoryRequest
+from dify_oapi.api.chat.v1.model.message_history_response import GetMessageHistoryResponse
+from dify_oapi.api.chat.v1.resource.conversation import Conversation
+from dify_oapi.core.model.config import Config
+
+
+class FakeServer:
+    """Serves /v1/messages pages from a list of message ids, oldest first."""
+
+    def __init__(self, count):
+        self.ids = [f"m{i:03d}" for i in range(count)]
+        self.requests = []
+
+    def fetch(self, request):
+        self.requests.append(request)
+        end = self.ids.index(request.first_id) if request.first_id else len(self.ids)
+        start = max(0, end - (request.limit or 20))
+        data = [{"id": i, "conversation_id": "c1", "answer": i} for i in self.ids[start:end]]
+        return GetMessageHistoryResponse.model_validate({"data": data, "has_more": start > 0, "limit": request.limit})
+
+
+def _history(first_id=None, limit=20, user="alice"):
+    builder = GetMessageHistoryRequest.builder().conversation_id("c1").user(user).limit(limit)
+    if first_id:
+        builder.first_id(first_id)
+    return builder.build()
+
+
+def _chat_request(conversation_id="c1"):
+    body = ChatRequestBody(query="hi", user="alice", conversation_id=conversation_id)
+    request = ChatRequest.builder().build()
+    request.request_body = body
+    return request
+
+
+class TestMessageStore:
+    """Test MessageStore."""
+
+    def test_pages_are_served_locally(self):
+        """Test older pages come from the store and a fresh newest page does not hit the server."""
+        server = FakeServer(150)
+        store = MessageStore(page_size=100)
+
+        newest = store.history(_history(), server.fetch)
+        assert [m.id for m in newest.data] == server.ids[-20:]
+        assert newest.has_more
+
+        older = store.history(_history(first_id=newest.data[0].id), server.fetch)
+        assert [m.id for m in older.data] == server.ids[110:130]
+        assert len(server.requests) == 1
+
+        # The store has 100 messages; the oldest page needs one more request, then the history is complete
+        oldest = store.history(_history(first_id="m050", limit=100), server.fetch)
+        assert [m.id for m in oldest.data] == server.ids[:50]
+        assert not oldest.has_more
+        assert len(server.requests) == 2
+
+        store.history(_history(), server.fetch)
+        assert len(server.requests) == 2
+        assert store.stats.hits == 2
+
+    def test_refresh_fetches_only_newer_messages(self):
+        """Test a stale conversation is refreshed back to the newest stored message."""
+        server = FakeServer(30)
+        store = MessageStore(refresh_after=0, page_size=10)
+        store.history(_history(limit=10), server.fetch)
+
+        server.ids += [f"n{i:03d}" for i in range(15)]
+        response = store.history(_history(limit=10), server.fetch)
+
+        assert [m.id for m in response.data] == server.ids[-10:]
+        assert [r.first_id for r in server.requests[1:]] == [None, "n005"]
+
+    def test_other_users_bypass_the_store(self):
+        """Test a conversation is never served to another user."""
+        server = FakeServer(5)
+        store = MessageStore()
+        store.history(_history(), server.fetch)
+        store.history(_history(user="mallory"), server.fetch)
+        assert len(server.requests) == 2
+
+    def test_stream_updates_store(self):
+        """Test the message of a streaming chat is appended from its events."""
+        server = FakeServer(3)
+        store = MessageStore()
+        store.history(_history(), server.fetch)
+
+        events = [
+            {"event": "message", "conversation_id": "c1", "message_id": "new", "answer": "Hel", "created_at": 9},
+            {"event": "message", "conversation_id": "c1", "message_id": "new", "answer": "lo"},
+            {"event": "message_end", "conversation_id": "c1", "message_id": "new", "metadata": {}},
+        ]
+        payload = b"".join(f"data: {json.dumps(e)}\n\n".encode() for e in events)
+        chunks = [payload[:17], payload[17:60], payload[60:]]
+        assert b"".join(store.observe(_chat_request(), iter(chunks))) == payload
+
+        response = store.history(_history(), server.fetch)
+        assert response.data[-1].id == "new"
+        assert (response.data[-1].answer, response.data[-1].query) == ("Hello", "hi")
+        assert len(server.requests) == 1
+
+    def test_eviction_by_count_and_bytes(self):
+        """Test least recently used conversations are evicted over either limit."""
+        store = MessageStore(max_conversations=2)
+        for conversation_id in ["a", "b", "c"]:
+            store.record_chat(
+                _chat_request(conversation_id=None),
+                MagicMock(
+                    success=True,
+                    message_id=f"m-{conversation_id}",
+                    conversation_id=conversation_id,
+                    answer="x" * 100,
+                    created_at=1,
+                    metadata=None,
+                ),
+            )
+        assert len(store) == 2
+        assert store.stats.evictions == 1
+
+        store.max_bytes = store.size // 2
+        store.record_chat(
+            _chat_request(conversation_id=None),
+            MagicMock(success=True, message_id="m-d", conversation_id="d", answer="y", created_at=1, metadata=None),
+        )
+        assert len(store) == 1
+
+    def test_conversation_resource_uses_store(self, request_option):
+        """Test Conversation.history goes through the configured store and delete drops it."""
+        server = FakeServer(5)
+        config = Config()
+        config.message_store = MessageStore()
+        conversation = Conversation(config)
+        with patch("dify_oapi.core.http.transport.Transport.execute") as execute:
+            execute.side_effect = lambda conf, req, **kwargs: server.fetch(req)
+            conversation.history(_history(), request_option)
+            conversation.history(_history(), request_option)
+            assert execute.call_count == 1
+
+            execute.side_effect = None
+            conversation.delete(MagicMock(conversation_id="c1"), request_option)
+        assert len(config.message_store) == 0
+
+    def test_persistence(self, tmp_path):
+        """Test histories are reloaded from the sqlite file and refreshed on first read."""
+        server = FakeServer(5)
+        path = str(tmp_path / "messages.db")
+        MessageStore(path=path).history(_history(), server.fetch)
+
+        reloaded = MessageStore(path=path)
+        response = reloaded.history(_history(first_id="m003"), server.fetch)
+        assert [m.id for m in response.data] == server.ids[:3]
+        assert len(server.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_ahistory(self):
+        """Test async history reads share the store."""
+        server = FakeServer(5)
+        store = MessageStore()
+
+        async def fetch(request):
+            return server.fetch(request)
+
+        response = await store.ahistory(_history(), fetch)
+        assert len(response.data) == 5
+        assert store.history(_history(), server.fetch).data == response.data
+        assert len(server.requests) == 1
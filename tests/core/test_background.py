@@ -0,0 +1,97 @@
+"""Background writer tests."""
+
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from dify_oapi.api.dify.v1.model.submit_feedback_request import SubmitFeedbackRequest
+from dify_oapi.api.dify.v1.model.submit_feedback_request_body import SubmitFeedbackRequestBody
+from dify_oapi.api.dify.v1.model.submit_feedback_response import SubmitFeedbackResponse
+from dify_oapi.api.dify.v1.resource.feedback import Feedback
+from dify_oapi.core.background import AsyncBackgroundWriter, BackgroundWriter
+from dify_oapi.core.model.raw_response import RawResponse
+
+
+def _feedback_request(rating):
+    body = SubmitFeedbackRequestBody(rating=rating, user="alice")
+    return SubmitFeedbackRequest.builder().message_id("m1").request_body(body).build()
+
+
+def _error(status_code):
+    response = SubmitFeedbackResponse(code="error", msg="failed")
+    response.raw = RawResponse()
+    response.raw.status_code = status_code
+    return response
+
+
+class TestBackgroundWriter:
+    """Test BackgroundWriter."""
+
+    def test_repeated_ratings_collapse(self):
+        """Test queued writes with the same key only send the latest one."""
+        gate = threading.Event()
+        calls = []
+        with BackgroundWriter(workers=1, flush_on_exit=False) as writer:
+            writer.submit(None, gate.wait)
+            for rating in ["like", "dislike", "like"]:
+                writer.submit("feedback:m1", calls.append, rating)
+            gate.set()
+            assert writer.flush(timeout=5)
+
+        assert calls == ["like"]
+        assert (writer.stats.submitted, writer.stats.collapsed, writer.stats.succeeded) == (2, 2, 2)
+
+    def test_overflow_is_dropped(self):
+        """Test writes beyond max_pending are dropped and counted."""
+        gate = threading.Event()
+        writer = BackgroundWriter(workers=1, max_pending=1, flush_on_exit=False)
+        writer.submit(None, gate.wait)
+        assert writer.flush(timeout=0.05) is False
+        assert writer.submit(None, print)
+        assert not writer.submit(None, print)
+        gate.set()
+        writer.close()
+        assert writer.stats.dropped == 1
+        assert not writer.submit(None, print)
+
+    def test_transient_failures_are_retried(self):
+        """Test retryable responses are retried and client errors are not."""
+        fn = MagicMock(side_effect=[_error(503), SubmitFeedbackResponse(result="success")])
+        bad_request = MagicMock(return_value=_error(400))
+        with BackgroundWriter(retry_backoff=0, flush_on_exit=False) as writer:
+            writer.submit("a", fn)
+            writer.submit("b", bad_request)
+
+        assert fn.call_count == 2
+        assert bad_request.call_count == 1
+        assert (writer.stats.retried, writer.stats.succeeded, writer.stats.failed) == (1, 1, 1)
+
+    def test_feedback_submit_background(self, mock_config, request_option):
+        """Test feedback is submitted through the writer with a per message and user key."""
+        feedback = Feedback(mock_config)
+        feedback.submit = MagicMock(return_value=SubmitFeedbackResponse(result="success"))
+        with BackgroundWriter(flush_on_exit=False) as writer:
+            assert feedback.submit_background(_feedback_request("like"), writer, request_option)
+
+        feedback.submit.assert_called_once()
+        assert feedback.submit.call_args.args[0].paths == {"message_id": "m1"}
+
+
+class TestAsyncBackgroundWriter:
+    """Test AsyncBackgroundWriter."""
+
+    @pytest.mark.asyncio
+    async def test_flush_and_collapse(self, mock_config, request_option):
+        """Test async writes are collapsed, retried and flushed."""
+        feedback = Feedback(mock_config)
+        feedback.asubmit = AsyncMock(side_effect=[_error(429), SubmitFeedbackResponse(result="success")])
+        writer = AsyncBackgroundWriter(workers=1, retry_backoff=0)
+        feedback.submit_background(_feedback_request("like"), writer, request_option)
+        feedback.submit_background(_feedback_request("dislike"), writer, request_option)
+
+        assert await writer.flush(timeout=5)
+        await writer.aclose()
+        assert feedback.asubmit.await_count == 2
+        assert feedback.asubmit.call_args.args[0].request_body.rating == "dislike"
+        assert writer.stats.collapsed == 1
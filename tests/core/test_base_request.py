@@ -0,0 +1,61 @@
+"""Base request tests."""
+
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.api.chat.v1.model.chat_request import ChatRequest
+from dify_oapi.api.chat.v1.model.chat_request_body import ChatRequestBody
+from dify_oapi.api.knowledge.v1.model.create_segment_request import CreateSegmentRequest
+from dify_oapi.core.http.transport import Transport
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.request_option import RequestOption
+
+
+def _chat_request():
+    body = ChatRequestBody(query="hi", inputs={}, response_mode="blocking", user="u1")
+    return ChatRequest.builder().request_body(body).build()
+
+
+class TestBaseRequest:
+    """Test BaseRequest."""
+
+    @pytest.mark.parametrize("cls", [BaseRequest, ChatRequest, CreateSegmentRequest, RequestOption])
+    def test_no_instance_dict(self, cls):
+        """Test requests and options keep their attributes in slots."""
+        assert not hasattr(cls(), "__dict__")
+
+    def test_body_dumped_from_model(self):
+        """Test a body set from a model is not kept as a dict and follows the model."""
+        request = _chat_request()
+        assert request._body == {}
+        assert request.body == {"query": "hi", "inputs": {}, "response_mode": "blocking", "user": "u1"}
+
+        request.request_body.conversation_id = "conv-1"
+        assert request.body["conversation_id"] == "conv-1"
+
+    def test_dict_body(self):
+        """Test a body set as a dict replaces the model and is kept as is."""
+        request = _chat_request()
+        request.body = {"query": "other"}
+        request.body["user"] = "u2"
+        assert request.body == {"query": "other", "user": "u2"}
+
+    def test_transport_sends_model_body(self, request_option):
+        """Test the transport sends the body dumped from the model."""
+        config = Config()
+        config.domain = "http://test"
+        sent = []
+
+        def handler(request):
+            sent.append(json.loads(request.content))
+            return httpx.Response(200, json={})
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            Transport.execute(config, _chat_request(), option=request_option)
+
+        assert sent == [{"query": "hi", "inputs": {}, "response_mode": "blocking", "user": "u1"}]
@@ -0,0 +1,142 @@
+"""Adaptive concurrency limiter tests."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.core.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyStats
+from dify_oapi.core.enum import HttpMethod
+from dify_oapi.core.http.transport import Transport
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+
+DOMAIN = "http://test"
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test AdaptiveConcurrencyLimiter."""
+
+    def test_additive_increase_under_load(self):
+        """Test a busy limit grows by about one per limit's worth of fast successful requests."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, latency_tolerance=1e9)
+        slots = []
+        for _ in range(40):
+            while limiter.stats(DOMAIN).inflight < limiter.stats(DOMAIN).limit:
+                slots.append(limiter.slot(DOMAIN))
+            with slots.pop(0) as slot:
+                slot.observe(200)
+
+        assert limiter.stats(DOMAIN).limit >= 8
+        assert limiter.stats(DOMAIN).inflight == len(slots)
+
+    def test_multiplicative_decrease_on_overload(self):
+        """Test overload statuses and exceptions shrink the limit down to min_limit."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=2, backoff=0.5)
+        with limiter.slot(DOMAIN) as slot:
+            slot.observe(503)
+        assert limiter.stats(DOMAIN).limit == 5
+
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectError), limiter.slot(DOMAIN):
+                raise httpx.ConnectError("refused")
+        assert limiter.stats(DOMAIN).limit == 2
+
+    def test_slow_responses_shrink_the_limit(self):
+        """Test a response much slower than the fastest recent one counts as overload."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff=0.5, latency_tolerance=2.0)
+        limiter.release(DOMAIN, 0.01, False)
+        limiter.slot(DOMAIN)
+        limiter.release(DOMAIN, 0.5, False)
+
+        assert limiter.stats(DOMAIN).limit == 5
+
+    def test_endpoints_have_their_own_latency_baseline(self):
+        """Test slow endpoints like blocking chats are not judged against fast lookups of the same domain."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff=0.5, latency_tolerance=2.0)
+        for _ in range(20):
+            for endpoint, latency in (("GET /v1/info", 0.01), ("POST /v1/chat-messages", 2.0)):
+                limiter.slot(DOMAIN, endpoint)
+                limiter.release(DOMAIN, latency, False, endpoint)
+        assert limiter.stats(DOMAIN).limit >= 10
+
+        limiter.slot(DOMAIN, "POST /v1/chat-messages")
+        limiter.release(DOMAIN, 5.0, False, "POST /v1/chat-messages")
+        assert limiter.stats(DOMAIN).limit < 10
+
+    def test_excess_requests_queue_and_time_out(self):
+        """Test requests over the limit queue FIFO and give up after max_wait."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1, max_wait=0.05)
+        held = limiter.slot(DOMAIN)
+        with pytest.raises(TimeoutError):
+            limiter.slot(DOMAIN)
+
+        limiter.max_wait = 5
+        order = []
+
+        def worker(name):
+            with limiter.slot(DOMAIN) as slot:
+                order.append(name)
+                slot.observe(200)
+
+        threads = []
+        for name in ("first", "second"):
+            threads.append(threading.Thread(target=worker, args=(name,)))
+            threads[-1].start()
+            while limiter.stats(DOMAIN).queued < len(threads):
+                time.sleep(0.001)
+
+        assert limiter.stats(DOMAIN).inflight == 1
+        with held:
+            held.observe(200)
+        for thread in threads:
+            thread.join()
+        assert order == ["first", "second"]
+
+    @pytest.mark.asyncio
+    async def test_async_waiter_is_woken_by_release(self):
+        """Test an awaiting request gets the slot released by another thread."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        held = limiter.slot(DOMAIN)
+        waiter = asyncio.ensure_future(limiter.aslot(DOMAIN))
+        await asyncio.sleep(0.01)
+        assert limiter.stats(DOMAIN).queued == 1
+
+        threading.Thread(target=held.__exit__, args=(None, None, None)).start()
+        async with await asyncio.wait_for(waiter, 1) as slot:
+            slot.observe(200)
+        assert limiter.stats(DOMAIN).inflight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        """Test a cancelled waiter does not keep a place or a slot."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        held = limiter.slot(DOMAIN)
+        waiter = asyncio.ensure_future(limiter.aslot(DOMAIN))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert limiter.stats(DOMAIN).queued == 0
+        held.__exit__(None, None, None)
+        assert limiter.stats(DOMAIN).inflight == 0
+
+    def test_transport_reports_to_limiter(self, request_option):
+        """Test the transport holds a slot per request and reports overloaded responses."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff=0.5)
+        config = Config()
+        config.domain = DOMAIN
+        config.concurrency_limiter = limiter
+        request = BaseRequest()
+        request.http_method = HttpMethod.GET
+        request.uri = "/v1/info"
+
+        client = httpx.Client(transport=httpx.MockTransport(lambda req: httpx.Response(503, json={})))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            Transport.execute(config, request, option=request_option)
+
+        assert limiter.stats(DOMAIN) == ConcurrencyStats(limit=5, inflight=0, queued=0)
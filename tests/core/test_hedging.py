@@ -0,0 +1,271 @@
+"""Request hedging tests."""
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.core.concurrency import AdaptiveConcurrencyLimiter
+from dify_oapi.core.enum import HttpMethod, Priority
+from dify_oapi.core.hedging import HedgeAdmission, RequestHedger
+from dify_oapi.core.http.transport import ATransport, Transport
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.scheduler import RequestScheduler
+
+ENDPOINT = "GET /v1/info"
+
+
+def _warm(hedger, latency=0.001, count=20, endpoint=ENDPOINT):
+    for _ in range(count):
+        hedger._record(endpoint, latency)
+
+
+def _slow_first(release, calls):
+    """Send function whose first call hangs until `release` is set."""
+
+    def send():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            release.wait(5)
+            return httpx.Response(200, text="slow")
+        return httpx.Response(200, text="fast")
+
+    return send
+
+
+class TestRequestHedger:
+    """Test RequestHedger."""
+
+    def test_delay_is_a_latency_percentile(self):
+        """Test the hedge delay follows the recorded latencies once there are enough of them."""
+        hedger = RequestHedger(percentile=0.9, min_samples=10, min_delay=0.0)
+        for i in range(9):
+            hedger._record(ENDPOINT, i / 100)
+        assert hedger.delay(ENDPOINT) is None
+
+        hedger._record(ENDPOINT, 1.0)
+        assert hedger.delay(ENDPOINT) == 1.0
+        assert hedger.delay("GET /v1/other") is None
+
+    def test_slow_request_is_hedged(self):
+        """Test a request slower than the delay gets a duplicate whose response wins."""
+        hedger = RequestHedger(budget=1.0)
+        _warm(hedger)
+        release, calls = threading.Event(), []
+        try:
+            response = hedger.send(ENDPOINT, _slow_first(release, calls))
+        finally:
+            release.set()
+            hedger.close()
+
+        assert response.text == "fast"
+        assert len(calls) == 2
+        assert (hedger.stats.requests, hedger.stats.hedged, hedger.stats.won) == (1, 1, 1)
+
+    def test_budget_caps_hedges(self):
+        """Test requests wait for the original response once the hedge budget is spent."""
+        hedger = RequestHedger(budget=0.5, max_burst=1.0, min_delay=0.001)
+        _warm(hedger)
+        for _ in range(2):
+            release, calls = threading.Event(), []
+            threading.Timer(0.05, release.set).start()
+            hedger.send(ENDPOINT, _slow_first(release, calls))
+        hedger.close()
+
+        assert hedger.stats.requests == 2
+        assert hedger.stats.hedged == 1
+
+    def test_request_without_budget_is_sent_inline(self):
+        """Test a request that cannot be hedged is sent on the calling thread, not through the pool."""
+        hedger = RequestHedger(budget=0.1)
+        _warm(hedger)
+        threads = []
+
+        def send():
+            threads.append(threading.current_thread())
+            return httpx.Response(200)
+
+        assert hedger.send(ENDPOINT, send).status_code == 200
+        assert threads == [threading.current_thread()]
+        assert hedger._executor is None
+
+    def test_failed_hedge_falls_back_to_original(self):
+        """Test an error of one copy is ignored while the other can still succeed."""
+        hedger = RequestHedger(budget=1.0)
+        _warm(hedger)
+        calls = []
+
+        def send():
+            calls.append(None)
+            if len(calls) == 2:
+                raise httpx.ConnectError("refused")
+            threading.Event().wait(0.05)
+            return httpx.Response(200)
+
+        assert hedger.send(ENDPOINT, send).status_code == 200
+        assert hedger.stats.won == 0
+        hedger.close()
+
+    @pytest.mark.asyncio
+    async def test_async_loser_is_cancelled(self):
+        """Test the slower async request is cancelled once the hedge answers."""
+        hedger = RequestHedger(budget=1.0)
+        _warm(hedger)
+        cancelled = asyncio.Event()
+        calls = []
+
+        async def send():
+            calls.append(None)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return httpx.Response(200, text=str(len(calls)))
+
+        response = await hedger.asend(ENDPOINT, send)
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+        assert response.text == "2"
+        assert hedger.stats.won == 1
+
+    def test_transport_hedges_only_idempotent_requests(self, request_option):
+        """Test the transport hedges GETs and never sends a POST twice."""
+        hedger = RequestHedger(budget=1.0)
+        config = Config()
+        config.domain = "http://test"
+        config.hedger = hedger
+        calls = []
+
+        def handler(request):
+            calls.append(request.method)
+            return httpx.Response(200, json={})
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            for method in (HttpMethod.GET, HttpMethod.POST):
+                request = BaseRequest()
+                request.http_method = method
+                request.uri = "/v1/info"
+                Transport.execute(config, request, option=request_option)
+
+        assert calls == ["GET", "POST"]
+        assert hedger.stats.requests == 1
+        assert hedger.delay(ENDPOINT) is None
+
+    @pytest.mark.asyncio
+    async def test_async_transport_hedges_slow_get(self, request_option):
+        """Test the async transport returns the response of the hedge of a slow GET."""
+        hedger = RequestHedger(budget=1.0)
+        _warm(hedger, endpoint=f"http://test {ENDPOINT}")
+        config = Config()
+        config.domain = "http://test"
+        config.hedger = hedger
+        request = BaseRequest()
+        request.http_method = HttpMethod.GET
+        request.uri = "/v1/info"
+        calls = []
+
+        async def handler(req):
+            calls.append(None)
+            if len(calls) == 1:
+                await asyncio.sleep(5)
+            return httpx.Response(200, json={"call": len(calls)})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            response = await asyncio.wait_for(ATransport.aexecute(config, request, option=request_option), 2)
+
+        assert response.success
+        assert hedger.stats.won == 1
+
+    def test_hedge_needs_a_free_slot(self, request_option):
+        """Test no duplicate is sent while the concurrency limiter has no free slot."""
+        hedger = RequestHedger(budget=1.0)
+        _warm(hedger, endpoint=f"http://test {ENDPOINT}")
+        config = Config()
+        config.domain = "http://test"
+        config.hedger = hedger
+        config.concurrency_limiter = limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        request = BaseRequest()
+        request.http_method = HttpMethod.GET
+        request.uri = "/v1/info"
+        calls = []
+
+        def handler(req):
+            calls.append(None)
+            threading.Event().wait(0.05)
+            return httpx.Response(200, json={})
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            assert Transport.execute(config, request, option=request_option).success
+        hedger.close()
+
+        assert len(calls) == 1
+        assert (hedger.stats.requests, hedger.stats.hedged) == (1, 0)
+        assert limiter.stats("http://test").inflight == 0
+
+    def test_hedge_holds_a_scheduler_ticket(self):
+        """Test a hedge takes a scheduler ticket, released once the request that lost completes."""
+        hedger = RequestHedger(budget=1.0)
+        _warm(hedger)
+        scheduler = RequestScheduler(max_inflight=2)
+        release, calls = threading.Event(), []
+        admitted = threading.Event()
+
+        def admit():
+            ticket = scheduler.try_ticket(Priority.NORMAL)
+            admitted.set()
+            return HedgeAdmission(ticket) if ticket is not None else None
+
+        try:
+            response = hedger.send(ENDPOINT, _slow_first(release, calls), admit)
+            assert admitted.is_set()
+        finally:
+            release.set()
+            hedger.close()
+
+        assert response.text == "fast"
+        assert scheduler.stats(Priority.NORMAL).inflight == 0
+        assert scheduler.stats(Priority.NORMAL).admitted == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_hedge_releases_its_slot(self):
+        """Test a hedge that loses is cancelled, frees its slot and has its latency recorded."""
+        hedger = RequestHedger(budget=1.0, window=100)
+        _warm(hedger)
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+        calls = []
+
+        async def send():
+            calls.append(None)
+            await asyncio.sleep(0.05 if len(calls) == 1 else 5)
+            return httpx.Response(200, text=str(len(calls)))
+
+        def admit():
+            slot = limiter.try_slot("http://test", ENDPOINT)
+            return HedgeAdmission(slot=slot) if slot is not None else None
+
+        response = await hedger.asend(ENDPOINT, send, admit)
+
+        assert response.text == "2"
+        assert hedger.stats.won == 0
+        assert limiter.stats("http://test").inflight == 0
+        await asyncio.sleep(0.01)
+        assert len(hedger._latencies[ENDPOINT]) == 22
+
+    def test_scheduler_admits_without_queueing(self):
+        """Test a ticket is only taken at once when the scheduler has room and nobody queues."""
+        scheduler = RequestScheduler(max_inflight=1)
+        ticket = scheduler.try_ticket()
+        assert ticket is not None
+        assert scheduler.try_ticket() is None
+        ticket.release()
+        assert scheduler.try_ticket(Priority.BACKGROUND) is not None
@@ -0,0 +1,158 @@
+"""API key pool tests."""
+
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.core.enum import HttpMethod
+from dify_oapi.core.http.transport import ATransport, Transport
+from dify_oapi.core.key_pool import ApiKeyPool
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.request_option import RequestOption
+from dify_oapi.core.rate_limit import RateLimiter
+
+
+def _request(method=HttpMethod.GET, uri="/v1/info"):
+    request = BaseRequest()
+    request.http_method = method
+    request.uri = uri
+    return request
+
+
+def _config():
+    config = Config()
+    config.domain = "http://test"
+    return config
+
+
+def _throttle(*keys):
+    """Handler answering 429 to requests authorized with `keys`."""
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers["Authorization"])
+        if request.headers["Authorization"] in {f"Bearer {key}" for key in keys}:
+            return httpx.Response(429, headers={"Retry-After": "30"}, json={"code": "too_many_requests"})
+        return httpx.Response(200, json={})
+
+    return handler, seen
+
+
+class TestApiKeyPool:
+    """Test ApiKeyPool."""
+
+    def test_least_loaded_key(self):
+        """Test the key with the fewest requests in flight is chosen."""
+        pool = ApiKeyPool(["key-1", "key-2", "key-3"])
+        held = [pool.lease(), pool.lease(), pool.lease()]
+        held[1].release()
+
+        assert [lease.api_key for lease in held] == ["key-1", "key-2", "key-3"]
+        assert pool.lease().api_key == "key-2"
+        assert [stats.inflight for stats in pool.stats()] == [1, 1, 1]
+
+    def test_throttled_key_cools_down(self):
+        """Test a 429 takes a key out of rotation for Retry-After seconds."""
+        pool = ApiKeyPool(["key-1", "key-2"])
+        with pool.lease() as lease:
+            lease.observe(429, retry_after=30)
+
+        assert {pool.lease().api_key for _ in range(4)} == {"key-2"}
+        stats = pool.stats()[0]
+        assert (stats.key, stats.throttled) == ("****ey-1", 1)
+        assert stats.cooldown == pytest.approx(30, abs=1)
+
+    def test_cooldown_doubles_and_waits(self):
+        """Test consecutive 429s without Retry-After double the cooldown and requests wait for it."""
+        pool = ApiKeyPool(["key-1"], cooldown=0.01, max_cooldown=0.03)
+        for _ in range(3):
+            lease = pool.choose()
+            lease.observe(429)
+            lease.release()
+        assert pool.choose().delay == pytest.approx(0.03, abs=0.01)
+
+        lease = pool.lease()
+        lease.observe(200)
+        lease.release()
+        assert pool.choose().delay == 0
+
+    def test_transport_rotates_on_rate_limit(self):
+        """Test a rate-limited request is retried with another key of the pool."""
+        pool = ApiKeyPool(["key-1", "key-2"])
+        option = RequestOption.builder().key_pool(pool).build()
+        handler, seen = _throttle("key-1")
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            first = Transport.execute(_config(), _request(), option=option)
+            second = Transport.execute(_config(), _request(), option=option)
+
+        assert first.success and second.success
+        assert seen == ["Bearer key-1", "Bearer key-2", "Bearer key-2"]
+        assert [stats.inflight for stats in pool.stats()] == [0, 0]
+
+    def test_pool_replaces_option_key(self, request_option):
+        """Test the key pool overrides the api_key of the option."""
+        pool = ApiKeyPool(["key-1"])
+        request_option.key_pool = pool
+        handler, seen = _throttle()
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            Transport.execute(_config(), _request(), option=request_option)
+
+        assert seen == ["Bearer key-1"]
+
+    @pytest.mark.asyncio
+    async def test_async_stream_rotates_on_rate_limit(self):
+        """Test the async transport retries a rate-limited stream with another key."""
+        pool = ApiKeyPool(["key-1", "key-2"])
+        option = RequestOption.builder().key_pool(pool).build()
+        handler, seen = _throttle("key-1")
+
+        async def ahandler(request):
+            response = handler(request)
+            if response.status_code != 200:
+                return response
+
+            async def body():
+                yield b'data: {"event": "message"}\n\n'
+
+            return httpx.Response(200, content=body())
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(ahandler))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            stream = await ATransport.aexecute(
+                _config(), _request(HttpMethod.POST, "/v1/chat-messages"), stream=True, option=option
+            )
+            chunks = [chunk async for chunk in stream]
+
+        assert chunks == [b'data: {"event": "message"}\n\n']
+        assert seen == ["Bearer key-1", "Bearer key-2"]
+        assert pool.stats()[0].throttled == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_rate_limit_wait_releases_key(self):
+        """Test a request cancelled while waiting for a rate limit token leaves no key in flight."""
+        pool = ApiKeyPool(["key-1"])
+        limiter = RateLimiter(rate=0.1, burst=1)
+        limiter.acquire("key-1", "/v1/info")
+        option = RequestOption.builder().key_pool(pool).rate_limiter(limiter).build()
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            task = asyncio.ensure_future(ATransport.aexecute(_config(), _request(), option=option))
+            await asyncio.sleep(0.05)
+            assert pool.stats()[0].inflight == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert pool.stats()[0].inflight == 0
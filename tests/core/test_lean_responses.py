@@ -0,0 +1,110 @@
+"""Lean response tests."""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.api.knowledge.v1.model.list_segments_response import ListSegmentsResponse
+from dify_oapi.client import Client
+from dify_oapi.core.enum import HttpMethod
+from dify_oapi.core.http.transport import ATransport, Transport
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.lean_responses import LeanResponses
+from dify_oapi.core.model.raw_response import RawResponse
+from dify_oapi.core.model.request_option import RequestOption
+
+SEGMENTS = {"data": [{"id": f"seg-{i}", "content": "x" * 100} for i in range(3)], "has_more": False}
+
+
+def _request():
+    request = BaseRequest()
+    request.http_method = HttpMethod.GET
+    request.uri = "/v1/datasets/ds/documents/doc/segments"
+    return request
+
+
+def _config(lean=None):
+    config = Config()
+    config.domain = "http://test"
+    config.lean_responses = lean
+    return config
+
+
+def _client(status_code=200, json=SEGMENTS):
+    def handler(request):
+        return httpx.Response(status_code, json=json, headers={"X-Version": "1.0"})
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+def _execute(config, option, client):
+    with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+        return Transport.execute(config, _request(), unmarshal_as=ListSegmentsResponse, option=option)
+
+
+class TestLeanResponses:
+    """Test LeanResponses."""
+
+    def test_trim(self):
+        """Test trimming keeps the status, the listed headers and the start of the body."""
+        raw = RawResponse(status_code=200, headers={"content-type": "text/plain", "x-a": "1"}, content=b"abcdef")
+        trimmed = LeanResponses(headers=("Content-Type",), max_content=3).trim(raw)
+
+        assert (trimmed.status_code, trimmed.headers, trimmed.content) == (200, {"content-type": "text/plain"}, b"abc")
+        assert LeanResponses().trim(raw).content is None
+
+    def test_client_lean_mode(self, request_option):
+        """Test parsed responses of a lean client keep no body, but their parsed data."""
+        response = _execute(_config(LeanResponses()), request_option, _client())
+
+        assert [segment.id for segment in response.data] == ["seg-0", "seg-1", "seg-2"]
+        assert response.raw.status_code == 200
+        assert response.raw.content is None
+        assert response.raw.headers == {"content-type": "application/json"}
+
+    def test_errors_kept_whole(self, request_option):
+        """Test error responses keep their body in lean mode."""
+        error = {"code": "not_found", "message": "Document not found"}
+        response = _execute(_config(LeanResponses()), request_option, _client(404, error))
+
+        assert not response.success
+        assert response.raw.content is not None
+        assert response.raw.headers["x-version"] == "1.0"
+
+    @pytest.mark.parametrize(
+        ("client_lean", "option_lean", "kept"),
+        [(None, True, False), (None, LeanResponses(max_content=4), True), (LeanResponses(), False, True)],
+    )
+    def test_option_overrides_client(self, client_lean, option_lean, kept):
+        """Test the request option turns lean mode on, customizes it or turns it off."""
+        option = RequestOption.builder().api_key("key").lean_responses(option_lean).build()
+        response = _execute(_config(client_lean), option, _client())
+
+        assert (response.raw.content is not None) == kept
+        if isinstance(option_lean, LeanResponses):
+            assert response.raw.content == b'{"da'
+
+    def test_builder(self):
+        """Test the client builder enables lean mode with the defaults."""
+        client = Client.builder().domain("http://test").lean_responses().build()
+        assert client._config.lean_responses == LeanResponses()
+
+    @pytest.mark.asyncio
+    async def test_async_lean_mode(self, request_option):
+        """Test the async transport trims parsed responses too."""
+
+        async def handler(request):
+            return httpx.Response(200, json=SEGMENTS)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            response = await ATransport.aexecute(
+                _config(LeanResponses()), _request(), unmarshal_as=ListSegmentsResponse, option=request_option
+            )
+
+        assert len(response.data) == 3
+        assert response.raw.content is None
@@ -0,0 +1,213 @@
+"""Load balancer tests."""
+
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.core.concurrency import AdaptiveConcurrencyLimiter
+from dify_oapi.core.enum import BalancingStrategy, HttpMethod
+from dify_oapi.core.http.transport import ATransport, Transport
+from dify_oapi.core.http.transport.connection_pool import connection_pool
+from dify_oapi.core.load_balancer import BalancedTransport, LoadBalancer
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+
+DOMAINS = ["http://a.test", "http://b.test/", "http://c.test"]
+
+
+def _client(balancer, handler):
+    return httpx.Client(transport=BalancedTransport(balancer, httpx.MockTransport(handler)))
+
+
+def _down(*hosts):
+    """Handler failing to connect to `hosts` and answering for the others."""
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.host)
+        if request.url.host in hosts:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"host": request.headers["Host"]})
+
+    return handler, seen
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 2
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return condition()
+
+
+class TestLoadBalancer:
+    """Test LoadBalancer."""
+
+    def test_round_robin_routes_requests(self):
+        """Test requests built for the first domain are spread over all replicas with their Host header."""
+        balancer = LoadBalancer(DOMAINS)
+        handler, seen = _down()
+        client = _client(balancer, handler)
+
+        hosts = [client.get("http://a.test/v1/info?x=1").json()["host"] for _ in range(4)]
+
+        assert hosts == ["a.test", "b.test", "c.test", "a.test"]
+        assert seen == hosts
+        assert all(stats.outstanding == 0 for stats in balancer.stats())
+
+    def test_least_outstanding(self):
+        """Test the replica with fewer requests in flight is preferred over the round robin order."""
+        balancer = LoadBalancer(DOMAINS[:2], strategy=BalancingStrategy.LEAST_OUTSTANDING)
+        held = balancer.pick()
+        balancer.release(balancer.pick())
+
+        assert held.domain == "http://a.test"
+        assert balancer.pick().domain == "http://b.test"
+
+    def test_ewma_prefers_fast_replica(self):
+        """Test the latency-weighted strategy sends requests to the fastest replica."""
+        balancer = LoadBalancer(DOMAINS, strategy=BalancingStrategy.EWMA)
+        for replica, latency in zip(balancer._replicas, (0.5, 0.01, 0.2), strict=True):
+            balancer.observe(replica, latency, False)
+
+        picked = {balancer.pick().domain for _ in range(3)}
+        assert picked == {"http://b.test"}
+
+    def test_failing_replica_is_ejected(self):
+        """Test consecutive failures eject a replica and no request is sent to it afterwards."""
+        balancer = LoadBalancer(DOMAINS[:2], failure_threshold=2, ejection_time=60)
+        handler, seen = _down("a.test")
+        client = _client(balancer, handler)
+
+        for _ in range(8):
+            try:
+                client.get("http://a.test/v1/info")
+            except httpx.ConnectError:
+                pass
+
+        assert seen.count("a.test") == 2
+        assert [stats.healthy for stats in balancer.stats()] == [False, True]
+
+    def test_ejected_replica_is_readmitted_after_probe(self):
+        """Test an ejected replica gets requests again once its health check passes."""
+        balancer = LoadBalancer(DOMAINS[:2], failure_threshold=1, ejection_time=0)
+        replica = balancer.pick()
+        balancer.release(replica)
+        balancer.observe(replica, None, True)
+        assert not balancer.stats()[0].healthy
+
+        with patch.object(balancer, "check", return_value=True) as check:
+            balancer.release(balancer.pick())
+            assert _wait_for(lambda: balancer.stats()[0].healthy)
+        check.assert_called_once_with("http://a.test")
+
+    def test_no_healthy_replica(self):
+        """Test requests fail to connect instead of being sent to replicas known to be down."""
+        balancer = LoadBalancer(DOMAINS[:1], failure_threshold=1, ejection_time=60)
+        handler, seen = _down("a.test")
+        client = _client(balancer, handler)
+
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                client.get("http://a.test/v1/info")
+        assert seen == ["a.test"]
+
+    def test_active_health_checks(self):
+        """Test check_all ejects replicas that fail their health check and re-admits recovered ones."""
+        balancer = LoadBalancer(DOMAINS)
+        with patch.object(balancer, "check", side_effect=lambda domain: domain != "http://b.test"):
+            balancer.check_all()
+        assert [stats.healthy for stats in balancer.stats()] == [True, False, True]
+
+        with patch.object(balancer, "check", return_value=True):
+            balancer.check_all()
+        assert all(stats.healthy for stats in balancer.stats())
+
+    def test_connection_pool_builds_balanced_clients(self):
+        """Test the pool gives a balanced client its own routing transport, separate from the plain client."""
+        balancer = LoadBalancer(DOMAINS)
+        balanced = connection_pool.get_sync_client(DOMAINS[0], balancer=balancer)
+
+        assert isinstance(balanced._transport, BalancedTransport)
+        assert connection_pool.get_sync_client(DOMAINS[0], balancer=balancer) is balanced
+        assert connection_pool.get_sync_client(DOMAINS[0]) is not balanced
+
+    def test_transport_retries_on_another_replica(self, request_option):
+        """Test a request retried after a connection failure goes to the next healthy replica."""
+        balancer = LoadBalancer(DOMAINS[:2], failure_threshold=1, ejection_time=60)
+        config = Config()
+        config.domain = DOMAINS[0]
+        config.load_balancer = balancer
+        request = BaseRequest()
+        request.http_method = HttpMethod.GET
+        request.uri = "/v1/info"
+        handler, seen = _down("a.test")
+
+        with patch(
+            "dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client",
+            return_value=_client(balancer, handler),
+        ):
+            response = Transport.execute(config, request, option=request_option)
+
+        assert response.success
+        assert seen == ["a.test", "b.test"]
+
+    def test_concurrency_limit_per_replica(self, request_option):
+        """Test the concurrency limiter keys its limits by the replica each request is sent to."""
+        balancer = LoadBalancer(DOMAINS[:2])
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff=0.5)
+        config = Config()
+        config.domain = DOMAINS[0]
+        config.load_balancer = balancer
+        config.concurrency_limiter = limiter
+        config.max_retry_count = 0
+        request = BaseRequest()
+        request.http_method = HttpMethod.GET
+        request.uri = "/v1/info"
+
+        def handler(req):
+            return httpx.Response(503 if req.url.host == "b.test" else 200, json={})
+
+        with patch(
+            "dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client",
+            return_value=_client(balancer, handler),
+        ):
+            for _ in range(2):
+                Transport.execute(config, request, option=request_option)
+
+        assert limiter.stats("http://a.test").limit == 10
+        assert limiter.stats("http://b.test").limit == 5
+        assert sum(s.outstanding for s in balancer.stats()) == 0
+
+    @pytest.mark.asyncio
+    async def test_async_transport_streams_and_releases(self, request_option):
+        """Test the async client is balanced and a replica is released when its stream is consumed."""
+        balancer = LoadBalancer(DOMAINS[:2])
+        config = Config()
+        config.domain = DOMAINS[0]
+        config.load_balancer = balancer
+        request = BaseRequest()
+        request.http_method = HttpMethod.POST
+        request.uri = "/v1/chat-messages"
+        hosts = []
+
+        async def handler(req):
+            hosts.append(req.url.host)
+
+            async def body():
+                yield b'data: {"event": "message"}\n\n'
+
+            return httpx.Response(200, content=body())
+
+        client = httpx.AsyncClient(transport=BalancedTransport(balancer, httpx.MockTransport(handler)))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            for _ in range(2):
+                stream = await ATransport.aexecute(config, request, stream=True, option=request_option)
+                outstanding = [sum(s.outstanding for s in balancer.stats()) async for _ in stream]
+                assert outstanding == [1]
+
+        assert hosts == ["a.test", "b.test"]
+        assert sum(s.outstanding for s in balancer.stats()) == 0
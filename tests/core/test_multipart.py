@@ -0,0 +1,152 @@
+"""Streaming multipart encoding tests."""
+
+import asyncio
+import io
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.api.dify.v1.model.upload_file_body import UploadFileBody
+from dify_oapi.api.dify.v1.model.upload_file_request import UploadFileRequest
+from dify_oapi.api.dify.v1.model.upload_file_response import UploadFileResponse
+from dify_oapi.core.http.multipart import MultipartEncoder
+from dify_oapi.core.http.transport import ATransport, Transport
+from dify_oapi.core.model.config import Config
+
+BOUNDARY = b"0123456789abcdef"
+CONTENT = bytes(range(256)) * 1000
+
+
+def _httpx_body(data, files):
+    """Encode the same form with httpx, which loads the file into memory."""
+    headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY.decode()}"}
+    return httpx.Request("POST", "http://test", data=data, files=files, headers=headers).read()
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "notes.pdf"
+    path.write_bytes(CONTENT)
+    return str(path)
+
+
+@pytest.fixture
+def config():
+    config = Config()
+    config.domain = "http://test"
+    config.max_retry_count = 0
+    return config
+
+
+class TestMultipartEncoder:
+    """Test MultipartEncoder."""
+
+    @pytest.mark.parametrize("source", ["path", "file", "bytes", "memoryview"])
+    def test_matches_httpx_encoding(self, document, source):
+        """Test each known-size source encodes like httpx, with a Content-Length and bounded chunks."""
+        value = {
+            "path": document,
+            "file": open(document, "rb"),
+            "bytes": CONTENT,
+            "memoryview": memoryview(CONTENT),
+        }[source]
+        data = {"user": "alice", "enabled": True}
+        encoder = MultipartEncoder(data, {"file": ("notes.pdf", value)}, chunk_size=4096, boundary=BOUNDARY)
+
+        chunks = list(encoder)
+        body = b"".join(chunks)
+        assert body == _httpx_body(data, {"file": ("notes.pdf", CONTENT)})
+        assert encoder.content_length == len(body)
+        assert max(map(len, chunks)) <= 4096
+        if source == "file":
+            value.close()
+
+    def test_iterator_source_is_chunked(self):
+        """Test an iterator of chunks has no Content-Length and cannot be replayed."""
+        encoder = MultipartEncoder(None, {"file": ("a.bin", iter([CONTENT[:10], CONTENT[10:]]))}, boundary=BOUNDARY)
+
+        assert "Content-Length" not in encoder.headers
+        assert b"".join(encoder) == _httpx_body({}, {"file": ("a.bin", CONTENT)})
+        with pytest.raises(RuntimeError):
+            b"".join(encoder)
+
+    def test_seekable_file_is_replayed_from_its_position(self):
+        """Test a seekable file is rewound to where it was when the body is sent again."""
+        f = io.BytesIO(b"skip" + CONTENT)
+        f.seek(4)
+        encoder = MultipartEncoder(None, {"file": ("a.bin", f)}, boundary=BOUNDARY)
+
+        assert b"".join(encoder) == b"".join(encoder) == _httpx_body({}, {"file": ("a.bin", CONTENT)})
+        assert encoder.content_length == len(b"".join(encoder))
+
+    @pytest.mark.asyncio
+    async def test_async_body_reads_off_the_event_loop(self, document):
+        """Test the async body streams a path through worker threads."""
+        encoder = MultipartEncoder({"user": "alice"}, {"file": (None, document)}, boundary=BOUNDARY)
+
+        with patch("dify_oapi.core.http.multipart.asyncio.to_thread", wraps=asyncio.to_thread) as spy:
+            body = b"".join([chunk async for chunk in encoder.aiter()])
+
+        assert body == _httpx_body({"user": "alice"}, {"file": ("notes.pdf", CONTENT)})
+        assert spy.call_count > 1
+
+    @pytest.mark.asyncio
+    async def test_async_iterable_source(self):
+        """Test an async iterator of chunks is streamed by the async body."""
+
+        async def chunks():
+            yield CONTENT[:100]
+            yield CONTENT[100:]
+
+        encoder = MultipartEncoder(None, {"file": ("a.bin", chunks())}, boundary=BOUNDARY)
+        body = b"".join([chunk async for chunk in encoder.aiter()])
+        assert body == _httpx_body({}, {"file": ("a.bin", CONTENT)})
+
+
+class TestStreamingUpload:
+    """Test uploads sent through the transports."""
+
+    @staticmethod
+    def _handler(received):
+        def handler(request):
+            received.append(request)
+            return httpx.Response(200, json={"id": "file-1", "name": "notes.pdf"})
+
+        return handler
+
+    def test_upload_from_path(self, config, document, request_option):
+        """Test an upload from a path is sent with a Content-Length and the file name of the path."""
+        received = []
+        client = httpx.Client(transport=httpx.MockTransport(self._handler(received)))
+        request = UploadFileRequest.builder().file(document).request_body(UploadFileBody(user="alice")).build()
+
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            response = Transport.execute(config, request, unmarshal_as=UploadFileResponse, option=request_option)
+
+        assert response.id == "file-1"
+        sent = received[0]
+        body = sent.read()
+        assert int(sent.headers["Content-Length"]) == len(body)
+        assert b'filename="notes.pdf"' in body and CONTENT in body and b"alice" in body
+
+    @pytest.mark.asyncio
+    async def test_async_upload_from_iterator(self, config, request_option):
+        """Test an async upload from an iterator of chunks is sent chunked."""
+        received = []
+        request = UploadFileRequest.builder().file(iter([CONTENT]), "notes.pdf").build()
+
+        async def read(request):
+            received.append(await request.aread())
+            return httpx.Response(200, json={"id": "file-1"})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(read))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            response = await ATransport.aexecute(
+                config, request, unmarshal_as=UploadFileResponse, option=request_option
+            )
+
+        assert response.id == "file-1"
+        assert CONTENT in received[0]
@@ -0,0 +1,123 @@
+"""Rate limiter tests."""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.core.enum import HttpMethod
+from dify_oapi.core.http.transport import ATransport, Transport
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.request_option import RequestOption
+from dify_oapi.core.rate_limit import RateLimiter, TokenBucket, retry_after
+
+
+def _request(uri="/v1/messages"):
+    request = BaseRequest()
+    request.http_method = HttpMethod.GET
+    request.uri = uri
+    return request
+
+
+def _config(limiter):
+    config = Config()
+    config.domain = "http://test"
+    config.max_retry_count = 2
+    config.rate_limiter = limiter
+    return config
+
+
+def _throttling_handler(calls, throttled=1):
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= throttled:
+            return httpx.Response(429, headers={"Retry-After": "0"}, json={"code": "too_many_requests"})
+        return httpx.Response(200, json={})
+
+    return handler
+
+
+class TestTokenBucket:
+    """Test TokenBucket."""
+
+    def test_reservations_are_served_in_order(self):
+        """Test callers beyond the burst are scheduled one token interval apart."""
+        bucket = TokenBucket(10, 2, min_rate=1)
+        delays = [bucket.reserve() for _ in range(5)]
+
+        assert delays[:2] == [0.0, 0.0]
+        assert delays[2:] == pytest.approx([0.1, 0.2, 0.3], abs=0.01)
+
+    def test_throttle_slows_down_and_recovers(self):
+        """Test a 429 halves the rate and honours Retry-After, and successes restore it."""
+        bucket = TokenBucket(10, 1, min_rate=1, recovery=0.5)
+        bucket.throttled(retry_after=2)
+
+        assert bucket.rate == 5
+        assert bucket.reserve() == pytest.approx(2.2, abs=0.01)
+        bucket.succeeded()
+        bucket.succeeded()
+        assert bucket.rate == 10
+
+
+class TestRateLimiter:
+    """Test RateLimiter."""
+
+    def test_buckets_per_key_and_endpoint(self):
+        """Test API keys always get separate buckets and endpoints only with per_endpoint."""
+        shared = RateLimiter(5)
+        assert shared.bucket("k1", "/a") is shared.bucket("k1", "/b")
+        assert shared.bucket("k1", "/a") is not shared.bucket("k2", "/a")
+
+        per_endpoint = RateLimiter(5, per_endpoint=True)
+        assert per_endpoint.bucket("k1", "/a") is not per_endpoint.bucket("k1", "/b")
+
+    def test_retry_after(self):
+        """Test Retry-After seconds are parsed and dates ignored."""
+        assert retry_after(httpx.Headers({"Retry-After": "3"})) == 3.0
+        assert retry_after(httpx.Headers({"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"})) is None
+        assert retry_after(httpx.Headers()) is None
+
+    def test_transport_retries_throttled_requests(self, request_option):
+        """Test a 429 is retried after waiting for a token and slows the bucket down."""
+        limiter = RateLimiter(100)
+        calls = []
+        client = httpx.Client(transport=httpx.MockTransport(_throttling_handler(calls)))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            response = Transport.execute(_config(limiter), _request(), option=request_option)
+
+        assert response.success
+        assert len(calls) == 2
+        assert limiter.stats.throttled == 1
+        assert limiter.stats.acquired == 2
+
+    def test_request_option_overrides_client_limiter(self):
+        """Test the limiter of a request option is used instead of the client's."""
+        client_limiter, option_limiter = RateLimiter(100), RateLimiter(100)
+        option = RequestOption.builder().api_key("k").rate_limiter(option_limiter).build()
+        client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            Transport.execute(_config(client_limiter), _request(), option=option)
+
+        assert (client_limiter.stats.acquired, option_limiter.stats.acquired) == (0, 1)
+
+    @pytest.mark.asyncio
+    async def test_async_transport_retries_throttled_requests(self, request_option):
+        """Test the async transport waits for tokens and retries 429s."""
+        limiter = RateLimiter(100)
+        calls = []
+        handler = _throttling_handler(calls)
+
+        async def ahandler(request):
+            return handler(request)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(ahandler))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            response = await ATransport.aexecute(_config(limiter), _request(), option=request_option)
+
+        assert response.success
+        assert len(calls) == 2
+        assert limiter.stats.throttled == 1
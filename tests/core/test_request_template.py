@@ -0,0 +1,87 @@
+"""Request template tests."""
+
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.api.chat.v1.model.chat_request import ChatRequest
+from dify_oapi.api.chat.v1.model.chat_request_body import ChatRequestBody
+from dify_oapi.api.knowledge.v1.model.get_document_request import GetDocumentRequest
+from dify_oapi.core.http.transport import Transport
+from dify_oapi.core.http.transport._misc import _build_url
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.request_template import RequestTemplate
+
+VARY = ("query", "user", "conversation_id")
+
+
+def _chat_request(**fields):
+    body = ChatRequestBody(inputs={"lang": "en"}, response_mode="blocking", **fields)
+    return ChatRequest.builder().request_body(body).build()
+
+
+class TestRequestTemplate:
+    """Test RequestTemplate."""
+
+    def test_clone_matches_builder(self):
+        """Test a clone sends the same body as a request built from scratch."""
+        template = RequestTemplate(_chat_request(), VARY)
+        clone = template.clone(query="hi", user="u1", conversation_id=None)
+        built = _chat_request(query="hi", user="u1")
+
+        assert json.loads(clone.content) == built.body
+        assert clone.body == built.body
+        assert (clone.http_method, clone.uri) == (built.http_method, built.uri)
+        assert clone.headers["Content-Type"] == "application/json"
+
+    def test_clones_are_independent(self):
+        """Test clones carry their own typed body and leave the template untouched."""
+        template = RequestTemplate(_chat_request(), VARY)
+        first, second = template.clone(query="a", user="u1"), template.clone(query="b", user="u2")
+        first.headers["X-Trace"] = "1"
+        first.add_query("k", "v")
+
+        assert isinstance(first, ChatRequest)
+        assert (first.request_body.query, second.request_body.query) == ("a", "b")
+        assert template.request.request_body.query is None
+        assert "X-Trace" not in second.headers
+        assert second.queries == []
+
+    def test_undeclared_field(self):
+        """Test only fields declared as varying can be set."""
+        template = RequestTemplate(_chat_request(), VARY)
+        with pytest.raises(ValueError, match="inputs"):
+            template.clone(inputs={})
+
+    def test_path_parameters(self):
+        """Test a bodiless GET template only varies its path parameters."""
+        request = GetDocumentRequest.builder().dataset_id("ds").document_id("doc-1").build()
+        clone = RequestTemplate(request).clone(paths={"document_id": "doc-2"})
+
+        assert clone.content is None
+        assert clone.document_id == "doc-2"
+        assert _build_url("http://test", clone.uri, clone.paths) == "http://test/v1/datasets/ds/documents/doc-2"
+
+    def test_build_url_fills_parameters_by_name(self):
+        """Test path parameters sharing a prefix are filled separately and unknown ones kept."""
+        uri = "/v1/:id/:id_x/:other"
+        assert _build_url("http://test/", uri, {"id": "1", "id_x": "2"}) == "http://test/v1/1/2/:other"
+
+    def test_transport_sends_encoded_content(self, request_option):
+        """Test the transport sends a clone's pre-encoded body."""
+        template = RequestTemplate(_chat_request(), VARY)
+        config = Config()
+        config.domain = "http://test"
+        sent = []
+
+        def handler(request):
+            sent.append((request.headers["Content-Type"], json.loads(request.content)))
+            return httpx.Response(200, json={})
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            Transport.execute(config, template.clone(query="hi", user="u1"), option=request_option)
+
+        assert sent == [("application/json", {**template.request.body, "query": "hi", "user": "u1"})]
@@ -0,0 +1,158 @@
+"""Priority request scheduler tests."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from dify_oapi.core.enum import HttpMethod, Priority
+from dify_oapi.core.http.transport import ATransport, Transport
+from dify_oapi.core.model.base_request import BaseRequest
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.request_option import RequestOption
+from dify_oapi.core.scheduler import PriorityClass, PriorityStats, RequestScheduler
+
+
+def _queue(scheduler, priorities, order):
+    """Start a thread per priority that records its admission order, once all of them are queued."""
+    threads = []
+    for i, priority in enumerate(priorities):
+
+        def worker(priority=priority, i=i):
+            with scheduler.ticket(priority):
+                order.append((priority, i))
+
+        threads.append(threading.Thread(target=worker))
+        threads[-1].start()
+        while sum(scheduler.stats(p).queued for p in Priority) < len(threads):
+            time.sleep(0.001)
+    return threads
+
+
+class TestRequestScheduler:
+    """Test RequestScheduler."""
+
+    def test_higher_priority_is_served_first(self):
+        """Test queued interactive requests go ahead of earlier background ones."""
+        scheduler = RequestScheduler(1)
+        held = scheduler.ticket(Priority.NORMAL)
+        order = []
+        threads = _queue(scheduler, [Priority.BACKGROUND, Priority.NORMAL, Priority.INTERACTIVE], order)
+
+        held.release()
+        for thread in threads:
+            thread.join()
+        assert [priority for priority, _ in order] == [Priority.INTERACTIVE, Priority.NORMAL, Priority.BACKGROUND]
+
+    def test_weighted_fairness(self):
+        """Test a backlog of interactive requests does not starve background requests."""
+        scheduler = RequestScheduler(
+            1,
+            classes={Priority.INTERACTIVE: PriorityClass(weight=3), Priority.BACKGROUND: PriorityClass(weight=1)},
+        )
+        held = scheduler.ticket(Priority.NORMAL)
+        order = []
+        threads = _queue(scheduler, [Priority.BACKGROUND] * 3 + [Priority.INTERACTIVE] * 9, order)
+
+        held.release()
+        for thread in threads:
+            thread.join()
+        served = [priority for priority, _ in order]
+        assert served[:8].count(Priority.BACKGROUND) == 2
+        assert [i for priority, i in order if priority == Priority.BACKGROUND] == [0, 1, 2]
+
+    def test_per_class_cap(self):
+        """Test a class at its cap queues while other classes are still admitted."""
+        scheduler = RequestScheduler(10, classes={Priority.BACKGROUND: PriorityClass(weight=1, max_inflight=1)})
+        held = scheduler.ticket(Priority.BACKGROUND)
+        order = []
+        (waiting,) = _queue(scheduler, [Priority.BACKGROUND], order)
+
+        with scheduler.ticket(Priority.INTERACTIVE):
+            assert scheduler.stats(Priority.BACKGROUND).queued == 1
+        held.release()
+        waiting.join()
+        assert order == [(Priority.BACKGROUND, 0)]
+        assert scheduler.stats(Priority.BACKGROUND).inflight == 0
+
+    def test_wait_times_are_recorded(self):
+        """Test the queue wait of each class is observable and timeouts are counted."""
+        scheduler = RequestScheduler(1, max_wait=0.05)
+        held = scheduler.ticket(Priority.INTERACTIVE)
+        with pytest.raises(TimeoutError):
+            scheduler.ticket(Priority.BACKGROUND)
+
+        scheduler.max_wait = None
+        threads = _queue(scheduler, [Priority.BACKGROUND], [])
+        time.sleep(0.05)
+        held.release()
+        threads[0].join()
+
+        stats = scheduler.stats(Priority.BACKGROUND)
+        assert (stats.admitted, stats.timed_out, stats.queued, stats.inflight) == (1, 1, 0, 0)
+        assert stats.mean_wait >= 0.05
+        assert scheduler.stats(Priority.INTERACTIVE).max_waited < 0.05
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        """Test a cancelled async waiter gives up its place."""
+        scheduler = RequestScheduler(1)
+        held = scheduler.ticket()
+        waiter = asyncio.ensure_future(scheduler.aticket(Priority.INTERACTIVE))
+        await asyncio.sleep(0.01)
+        assert scheduler.stats(Priority.INTERACTIVE).queued == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        held.release()
+        assert scheduler.stats(Priority.INTERACTIVE) == PriorityStats()
+
+    def test_transport_uses_option_priority(self):
+        """Test the transport admits requests by the priority of their request option."""
+        scheduler = RequestScheduler(4)
+        config = Config()
+        config.domain = "http://test"
+        config.scheduler = scheduler
+        request = BaseRequest()
+        request.http_method = HttpMethod.GET
+        request.uri = "/v1/info"
+        option = RequestOption.builder().api_key("k").priority(Priority.BACKGROUND).build()
+
+        client = httpx.Client(transport=httpx.MockTransport(lambda req: httpx.Response(200, json={})))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            Transport.execute(config, request, option=option)
+
+        assert scheduler.stats(Priority.BACKGROUND).admitted == 1
+        assert scheduler.stats(Priority.BACKGROUND).inflight == 0
+        assert scheduler.stats(Priority.NORMAL).admitted == 0
+
+    @pytest.mark.asyncio
+    async def test_async_transport_holds_ticket_for_stream(self, request_option):
+        """Test a streamed response keeps its ticket until the stream is consumed."""
+        scheduler = RequestScheduler(4)
+        config = Config()
+        config.domain = "http://test"
+        config.scheduler = scheduler
+        request = BaseRequest()
+        request.http_method = HttpMethod.POST
+        request.uri = "/v1/chat-messages"
+
+        async def handler(req):
+            async def body():
+                yield b'data: {"event": "message"}\n\n'
+
+            return httpx.Response(200, content=body())
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            stream = await ATransport.aexecute(config, request, stream=True, option=request_option)
+            inflight = [scheduler.stats(Priority.NORMAL).inflight async for _ in stream]
+
+        assert inflight == [1]
+        assert scheduler.stats(Priority.NORMAL).inflight == 0
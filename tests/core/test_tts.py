@@ -0,0 +1,91 @@
+"""TTS audio sink tests."""
+
+import base64
+import io
+import json
+
+import pytest
+
+from dify_oapi.api.workflow.v1.model.chunk_workflow_event import ChunkWorkflowEvent
+from dify_oapi.core.tts import AudioSink
+
+AUDIO = bytes(range(256)) * 40
+
+
+def _sse(*events):
+    return b"".join(b"data: " + json.dumps(event).encode() + b"\n\n" for event in events)
+
+
+class TestAudioSink:
+    """Test AudioSink."""
+
+    @pytest.mark.parametrize("size", [1, 3, 5, 7, 64])
+    def test_unaligned_fragments(self, size):
+        """Test fragments cut anywhere in one base64 string decode to the original audio."""
+        encoded = base64.b64encode(AUDIO[:-1]).decode()
+        sink = AudioSink()
+        for i in range(0, len(encoded), size):
+            sink.feed(encoded[i : i + size])
+        sink.finish()
+        assert sink.drain() == AUDIO[:-1]
+        assert sink.bytes_written == len(AUDIO) - 1
+
+    def test_independently_padded_fragments(self):
+        """Test fragments that are each encoded with their own padding."""
+        pieces = [AUDIO[:10], AUDIO[10:11], AUDIO[11:500]]
+        sink = AudioSink()
+        for piece in pieces:
+            sink.feed(base64.b64encode(piece))
+        sink.finish()
+        assert bytes(sink.buffer) == AUDIO[:500]
+
+    def test_unpadded_tail_is_restored(self):
+        """Test a final fragment without padding is decoded by finish."""
+        sink = AudioSink()
+        sink.feed(base64.b64encode(b"abcd").rstrip(b"="))
+        assert sink.finish() == 1
+        assert sink.drain() == b"abcd"
+
+    def test_writes_to_file(self):
+        """Test audio is written straight to a file-like object."""
+        out = io.BytesIO()
+        sink = AudioSink(out)
+        sink.feed(base64.b64encode(AUDIO))
+        assert out.getvalue() == AUDIO
+        assert not sink.buffer
+
+    def test_observe_stream(self):
+        """Test a raw event stream is passed through unchanged while its audio is decoded."""
+        encoded = base64.b64encode(AUDIO).decode()
+        stream = _sse(
+            {"event": "message", "answer": "hi"},
+            {"event": "tts_message", "audio": encoded[:1001]},
+            {"event": "tts_message", "audio": encoded[1001:]},
+            {"event": "tts_message_end", "audio": ""},
+        )
+        chunks = [stream[i : i + 37] for i in range(0, len(stream), 37)]
+        sink = AudioSink()
+
+        assert b"".join(sink.observe(chunks)) == stream
+        assert sink.drain() == AUDIO
+        assert sink.ended
+
+    @pytest.mark.asyncio
+    async def test_aobserve_stream(self):
+        """Test the async stream wrapper."""
+
+        async def chunks():
+            yield _sse({"event": "tts_message", "audio": base64.b64encode(AUDIO).decode()})
+
+        sink = AudioSink()
+        assert [chunk async for chunk in sink.aobserve(chunks())]
+        assert sink.drain() == AUDIO
+
+    def test_typed_events(self):
+        """Test typed workflow events are fed to the sink."""
+        sink = AudioSink()
+        event = ChunkWorkflowEvent(event="tts_message", audio=base64.b64encode(b"audio").decode())
+        assert sink.feed_event(event)
+        assert not sink.feed_event(ChunkWorkflowEvent(event="workflow_started"))
+        assert sink.feed_event(ChunkWorkflowEvent(event="tts_message_end"))
+        assert sink.drain() == b"audio"
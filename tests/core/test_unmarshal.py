@@ -0,0 +1,45 @@
+"""Response unmarshalling tests."""
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from dify_oapi.api.knowledge.v1.model.list_segments_response import ListSegmentsResponse
+from dify_oapi.api.knowledge.v1.model.segment_info import SegmentInfo
+from dify_oapi.core.http.transport._misc import _unmarshaller
+from dify_oapi.core.model.raw_response import RawResponse
+
+
+def _raw(content: bytes, status_code=200) -> RawResponse:
+    return RawResponse(status_code=status_code, headers={"content-type": "application/json"}, content=content)
+
+
+class TestUnmarshal:
+    """Test _unmarshaller."""
+
+    def test_object_validated_from_json(self):
+        """Test a JSON object is validated into nested models, as from its decoded dict."""
+        payload = {"data": [{"id": "seg-1", "keywords": ["a"], "created_at": 1695312007}], "has_more": False}
+        response = _unmarshaller(_raw(b"\n " + json.dumps(payload).encode()), ListSegmentsResponse)
+
+        assert response == ListSegmentsResponse(**payload, raw=response.raw)
+        assert isinstance(response.data[0], SegmentInfo)
+        assert response.data[0].created_at == 1695312007.0
+
+    def test_error_aliases(self):
+        """Test error fields sent under their aliases are read."""
+        response = _unmarshaller(_raw(b'{"code": "not_found", "message": "Not found"}', 404), ListSegmentsResponse)
+
+        assert not response.success
+        assert response.msg == "Not found"
+
+    def test_array(self):
+        """Test a top-level JSON array still fills the data field."""
+        response = _unmarshaller(_raw(b'[{"id": "seg-1"}]'), ListSegmentsResponse)
+        assert [segment.id for segment in response.data] == ["seg-1"]
+
+    def test_invalid(self):
+        """Test values that do not match the models still fail validation."""
+        with pytest.raises(ValidationError):
+            _unmarshaller(_raw(b'{"data": [{"position": "first"}]}'), ListSegmentsResponse)
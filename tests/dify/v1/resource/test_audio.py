@@ -2,9 +2,36 @@
 
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
+from dify_oapi.api.dify.v1.model.text_to_audio_request import TextToAudioRequest
+from dify_oapi.api.dify.v1.model.text_to_audio_request_body import TextToAudioRequestBody
 from dify_oapi.api.dify.v1.resource.audio import Audio
+from dify_oapi.core.concurrency import AdaptiveConcurrencyLimiter
+from dify_oapi.core.model.config import Config
+
+AUDIO = b"ID3" + bytes(range(256)) * 800
+
+
+def _config():
+    config = Config()
+    config.domain = "http://test"
+    config.max_retry_count = 0
+    return config
+
+
+def _tts_request():
+    body = TextToAudioRequestBody.builder().text("hello").user("alice").build()
+    return TextToAudioRequest.builder().request_body(body).build()
+
+
+def _audio_handler(request):
+    """Serve audio as a chunked body, or an error for empty text."""
+    if b'"text":""' in request.content:
+        return httpx.Response(400, json={"code": "invalid_param", "message": "text is required"})
+    chunks = [AUDIO[i : i + 1000] for i in range(0, len(AUDIO), 1000)]
+    return httpx.Response(200, headers={"Content-Type": "audio/mpeg"}, content=iter(chunks))
 
 
 class TestAudio:
@@ -28,3 +55,89 @@ class TestAudio:
             mock_execute.return_value = MagicMock(audio_url="http://example.com/audio.mp3")
             result = audio.from_text(MagicMock(), request_option)
             assert result.audio_url == "http://example.com/audio.mp3"
+
+    def test_from_text_stream_to_file(self, request_option, tmp_path):
+        """Test streamed text to audio is written to a file with its content type and byte count."""
+        client = httpx.Client(transport=httpx.MockTransport(_audio_handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            stream = Audio(_config()).from_text(_tts_request(), request_option, stream=True)
+
+        assert stream.success
+        assert stream.content_type == "audio/mpeg"
+        assert stream.content_length is None
+        assert stream.write_to(tmp_path / "out.mp3") == len(AUDIO) == stream.bytes_read
+        assert (tmp_path / "out.mp3").read_bytes() == AUDIO
+
+    def test_from_text_stream_error(self, request_option):
+        """Test an error response is exposed through success, code and msg."""
+        body = TextToAudioRequestBody.builder().text("").user("alice").build()
+        request = TextToAudioRequest.builder().request_body(body).build()
+        client = httpx.Client(transport=httpx.MockTransport(_audio_handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            stream = Audio(_config()).from_text(request, request_option, stream=True)
+
+        assert not stream.success
+        assert (stream.code, stream.msg) == ("invalid_param", "text is required")
+        with pytest.raises(RuntimeError):
+            list(stream)
+
+    @pytest.mark.asyncio
+    async def test_afrom_text_stream(self, request_option):
+        """Test async streamed text to audio yields chunks as they arrive."""
+
+        async def chunks():
+            for i in range(0, len(AUDIO), 1000):
+                yield AUDIO[i : i + 1000]
+
+        async def handler(request):
+            await request.aread()
+            return httpx.Response(200, headers={"Content-Type": "audio/mpeg"}, content=chunks())
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            async with await Audio(_config()).afrom_text(_tts_request(), request_option, stream=True) as stream:
+                chunks = [chunk async for chunk in stream.aiter_bytes(4096)]
+
+        assert b"".join(chunks) == AUDIO
+        assert max(map(len, chunks)) <= 4096
+        assert stream.bytes_read == len(AUDIO)
+
+    def test_stream_holds_its_slot_until_closed(self, request_option):
+        """Test a streamed response keeps its concurrency slot while the body is read, an error one does not."""
+        config = _config()
+        config.concurrency_limiter = limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+        client = httpx.Client(transport=httpx.MockTransport(_audio_handler))
+        with patch("dify_oapi.core.http.transport.sync_transport.connection_pool.get_sync_client", return_value=client):
+            with Audio(config).from_text(_tts_request(), request_option, stream=True) as stream:
+                assert limiter.stats(config.domain).inflight == 1
+                chunks = iter(stream)
+                next(chunks)
+                assert limiter.stats(config.domain).inflight == 1
+            assert limiter.stats(config.domain).inflight == 0
+
+            body = TextToAudioRequestBody.builder().text("").user("alice").build()
+            request = TextToAudioRequest.builder().request_body(body).build()
+            assert not Audio(config).from_text(request, request_option, stream=True).success
+            assert limiter.stats(config.domain).inflight == 0
+
+    @pytest.mark.asyncio
+    async def test_astream_holds_its_slot_until_closed(self, request_option):
+        """Test an async streamed response keeps its concurrency slot until it is closed."""
+
+        async def handler(request):
+            return httpx.Response(200, headers={"Content-Type": "audio/mpeg"}, content=AUDIO)
+
+        config = _config()
+        config.concurrency_limiter = limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch(
+            "dify_oapi.core.http.transport.async_transport.connection_pool.get_async_client", return_value=client
+        ):
+            stream = await Audio(config).afrom_text(_tts_request(), request_option, stream=True)
+            assert limiter.stats(config.domain).inflight == 1
+            await stream.aclose()
+            await stream.aclose()
+
+        assert limiter.stats(config.domain).inflight == 0
@@ -0,0 +1,224 @@
+"""Upload cache tests."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from dify_oapi.api.chat.v1.model.chat_file import ChatFile
+from dify_oapi.api.chat.v1.model.chat_request import ChatRequest
+from dify_oapi.api.chat.v1.model.chat_request_body import ChatRequestBody
+from dify_oapi.api.chat.v1.model.chat_response import ChatResponse
+from dify_oapi.api.chat.v1.resource.chat import Chat
+from dify_oapi.api.dify.v1.model.upload_file_response import UploadFileResponse
+from dify_oapi.api.dify.v1.resource.file import File
+from dify_oapi.api.dify.v1.upload_cache import UploadCache, hash_file
+from dify_oapi.core.key_pool import ApiKeyPool
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.request_option import RequestOption
+
+
+@pytest.fixture
+def config():
+    config = Config()
+    config.upload_cache = UploadCache()
+    return config
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF" + b"x" * 10000)
+    return str(path)
+
+
+class FakeUpload:
+    """Returns a new file id per upload and records the uploaded file names."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.names = []
+        self._lock = threading.Lock()
+
+    def __call__(self, config, request, unmarshal_as=None, option=None):
+        time.sleep(self.delay)
+        with self._lock:
+            self.names.append(request.files["file"][0])
+            file_id = f"file-{len(self.names)}"
+        return UploadFileResponse(id=file_id, name=request.files["file"][0])
+
+
+class TestUploadCache:
+    """Test UploadCache."""
+
+    def test_hash_file_streams_content(self, document):
+        """Test the content hash does not depend on the file name."""
+        with open(document, "rb") as f:
+            content = f.read()
+        copy = document.replace("report", "copy")
+        with open(copy, "wb") as f:
+            f.write(content)
+        assert hash_file(document) == hash_file(copy)
+
+    def test_same_content_and_key_reuses_upload(self, config, document, request_option):
+        """Test a second upload of the same content with the same API key is served from the cache."""
+        fake = FakeUpload()
+        with patch("dify_oapi.api.dify.v1.resource.file.Transport.execute", side_effect=fake):
+            first = File(config).upload_path(document, "alice", request_option)
+            second = File(config).upload_path(document, "bob", request_option)
+
+        assert first.id == second.id == "file-1"
+        assert fake.names == ["report.pdf"]
+
+    def test_other_api_key_uploads_again(self, config, document, request_option):
+        """Test uploads are not shared across API keys."""
+        fake = FakeUpload()
+        other = RequestOption.builder().api_key("other-key").build()
+        with patch("dify_oapi.api.dify.v1.resource.file.Transport.execute", side_effect=fake):
+            first = File(config).upload_path(document, "alice", request_option)
+            second = File(config).upload_path(document, "alice", other)
+
+        assert (first.id, second.id) == ("file-1", "file-2")
+
+    def test_key_pools_and_domains_are_kept_apart(self, config, document):
+        """Test apps authenticating with key pools, or served by other domains, do not share uploads."""
+        fake = FakeUpload()
+        pool_a = RequestOption.builder().key_pool(ApiKeyPool(["app-a-1", "app-a-2"])).build()
+        pool_b = RequestOption.builder().key_pool(ApiKeyPool(["app-b-1"])).build()
+        same_app = RequestOption.builder().key_pool(ApiKeyPool(["app-a-2", "app-a-1"])).build()
+        other_domain = Config()
+        other_domain.domain = "http://other.test"
+        other_domain.upload_cache = config.upload_cache
+        with patch("dify_oapi.api.dify.v1.resource.file.Transport.execute", side_effect=fake):
+            ids = [
+                File(config).upload_path(document, "alice", pool_a).id,
+                File(config).upload_path(document, "alice", pool_b).id,
+                File(config).upload_path(document, "alice", same_app).id,
+                File(other_domain).upload_path(document, "alice", pool_a).id,
+            ]
+
+        assert ids == ["file-1", "file-2", "file-1", "file-3"]
+
+    def test_failed_upload_is_not_cached(self, config, document, request_option):
+        """Test a failed upload is retried by the next caller."""
+        failed = UploadFileResponse(code="file_too_large", msg="too large")
+        with patch("dify_oapi.api.dify.v1.resource.file.Transport.execute", return_value=failed):
+            assert not File(config).upload_path(document, "alice", request_option).success
+        assert config.upload_cache.get(UploadCache.key(document, request_option)) is None
+
+    def test_concurrent_uploads_are_coalesced(self, config, document, request_option):
+        """Test concurrent uploads of the same content send one request."""
+        fake = FakeUpload(delay=0.2)
+        results = []
+        with patch("dify_oapi.api.dify.v1.resource.file.Transport.execute", side_effect=fake):
+            threads = [
+                threading.Thread(target=lambda: results.append(File(config).upload_path(document, "a", request_option)))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(fake.names) == 1
+        assert {r.id for r in results} == {"file-1"}
+
+    @pytest.mark.asyncio
+    async def test_async_concurrent_uploads_are_coalesced(self, config, document, request_option):
+        """Test concurrent async uploads of the same content send one request."""
+        calls = []
+
+        async def aexecute(config, request, unmarshal_as=None, option=None):
+            calls.append(request)
+            await asyncio.sleep(0.05)
+            return UploadFileResponse(id="file-1")
+
+        with patch("dify_oapi.api.dify.v1.resource.file.ATransport.aexecute", side_effect=aexecute):
+            results = await asyncio.gather(
+                *(File(config).aupload_path(document, "a", request_option) for _ in range(4))
+            )
+
+        assert len(calls) == 1
+        assert {r.id for r in results} == {"file-1"}
+
+
+class TestChatFileLocalPath:
+    """Test ChatFile built from a local path."""
+
+    def test_builder_requires_path_or_upload_id(self):
+        """Test a local_file ChatFile needs an upload id or a local path."""
+        with pytest.raises(ValueError):
+            ChatFile.builder().type("document").transfer_method("local_file").build()
+        chat_file = ChatFile.builder().type("document").local_path("/tmp/a.pdf").build()
+        assert chat_file.transfer_method == "local_file"
+        assert "path" not in chat_file.model_dump()
+
+    def test_chat_uploads_local_files_once(self, config, document, request_option):
+        """Test Chat.chat uploads a local ChatFile and sends its upload_file_id, reusing it later."""
+        fake = FakeUpload()
+        sent = []
+
+        def execute(config, request, unmarshal_as=None, option=None, **kwargs):
+            if request.uri == "/v1/files/upload":
+                return fake(config, request, unmarshal_as, option)
+            sent.append(request.body)
+            return ChatResponse(answer="ok")
+
+        for _ in range(2):
+            chat_file = ChatFile.builder().type("document").local_path(document).build()
+            body = ChatRequestBody.builder().query("summarize").user("alice").files([chat_file]).build()
+            request = ChatRequest.builder().request_body(body).build()
+            with patch("dify_oapi.core.http.transport.Transport.execute", side_effect=execute):
+                Chat(config).chat(request, request_option)
+
+        assert fake.names == ["report.pdf"]
+        assert [b["files"] for b in sent] == [
+            [{"type": "document", "transfer_method": "local_file", "upload_file_id": "file-1"}]
+        ] * 2
+
+    def test_caller_request_is_not_modified(self, document, request_option):
+        """Test a request sent again resolves its local file again, as it is not given the upload id."""
+        fake = FakeUpload()
+        sent = []
+
+        def execute(config, request, unmarshal_as=None, option=None, **kwargs):
+            if request.uri == "/v1/files/upload":
+                return fake(config, request, unmarshal_as, option)
+            sent.append(request.body["files"][0]["upload_file_id"])
+            return ChatResponse(answer="ok")
+
+        chat_file = ChatFile.builder().type("document").local_path(document).build()
+        body = ChatRequestBody.builder().query("summarize").user("alice").files([chat_file]).build()
+        request = ChatRequest.builder().request_body(body).build()
+        with patch("dify_oapi.core.http.transport.Transport.execute", side_effect=execute):
+            for _ in range(2):
+                Chat(Config()).chat(request, request_option)
+
+        assert sent == ["file-1", "file-2"]
+        assert chat_file.upload_file_id is None
+        assert request.body["files"] == [{"type": "document", "transfer_method": "local_file"}]
+
+    @pytest.mark.asyncio
+    async def test_async_caller_request_is_not_modified(self, config, document, request_option):
+        """Test Chat.achat sends the uploaded id on a copy of the request."""
+        fake = FakeUpload()
+        sent = []
+
+        async def aexecute(config, request, unmarshal_as=None, option=None, **kwargs):
+            if request.uri == "/v1/files/upload":
+                return fake(config, request, unmarshal_as, option)
+            sent.append(request.body["files"][0]["upload_file_id"])
+            return ChatResponse(answer="ok")
+
+        chat_file = ChatFile.builder().type("document").local_path(document).build()
+        body = ChatRequestBody.builder().query("summarize").user("alice").files([chat_file]).build()
+        request = ChatRequest.builder().request_body(body).build()
+        with patch("dify_oapi.core.http.transport.ATransport.aexecute", side_effect=aexecute):
+            for _ in range(2):
+                await Chat(config).achat(request, request_option)
+
+        assert sent == ["file-1", "file-1"]
+        assert fake.names == ["report.pdf"]
+        assert chat_file.upload_file_id is None
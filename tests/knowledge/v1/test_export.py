@@ -0,0 +1,89 @@
+"""Dataset export tests."""
+
+import gzip
+import json
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from dify_oapi.api.knowledge.v1.export import DatasetExporter, ExportCheckpoint
+from dify_oapi.api.knowledge.v1.model.list_child_chunks_response import ListChildChunksResponse
+from dify_oapi.api.knowledge.v1.model.list_datasets_response import ListDatasetsResponse
+from dify_oapi.api.knowledge.v1.model.list_documents_response import ListDocumentsResponse
+from dify_oapi.api.knowledge.v1.model.list_segments_response import ListSegmentsResponse
+from dify_oapi.core.model.raw_response import RawResponse
+
+
+def _segments(request, option):
+    if request.paths["document_id"] == "doc-2" and ("page", "2") in request.queries:
+        return ListSegmentsResponse.model_validate({"data": [{"id": "seg-3"}], "has_more": False})
+    if request.paths["document_id"] == "doc-2":
+        return ListSegmentsResponse.model_validate({"data": [{"id": "seg-2"}], "has_more": True})
+    return ListSegmentsResponse.model_validate({"data": [{"id": "seg-1"}], "has_more": False})
+
+
+class TestDatasetExporter:
+    """Test DatasetExporter."""
+
+    @pytest.fixture
+    def knowledge(self):
+        """Create mocked knowledge V1 resources."""
+        knowledge = MagicMock()
+        knowledge.dataset.list.return_value = ListDatasetsResponse.model_validate(
+            {"data": [{"id": "ds-1", "name": "docs"}], "has_more": False}
+        )
+        payload = {"data": [{"id": "doc-1", "doc_form": "text_model", "extra": 1, "error": None}, {"id": "doc-2"}]}
+        documents = ListDocumentsResponse.model_validate({**payload, "has_more": False})
+        # Raw items are exported as sent, with nulls and fields unknown to the models
+        documents.raw = RawResponse(status_code=200, content=json.dumps(payload).encode())
+        knowledge.document.list.return_value = documents
+        knowledge.segment.list.side_effect = _segments
+        knowledge.chunk.list.return_value = ListChildChunksResponse.model_validate(
+            {"data": [{"id": "chunk-1"}], "total_pages": 1}
+        )
+        return knowledge
+
+    def _read(self, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_export_hierarchy(self, knowledge, request_option, tmp_path):
+        """Test every level is streamed with its parent ids and child chunks only for hierarchical documents."""
+        output = str(tmp_path / "export.jsonl.gz")
+        report = DatasetExporter(knowledge, request_option, output).run()
+
+        assert (report.datasets, report.documents, report.segments, report.child_chunks) == (1, 2, 3, 2)
+        records = self._read(output)
+        assert [r["type"] for r in records].count("segment") == 3
+        doc_1 = next(r for r in records if r["type"] == "document" and r["document_id"] == "doc-1")
+        assert doc_1["data"] == {"id": "doc-1", "doc_form": "text_model", "extra": 1, "error": None}
+        chunks = [r for r in records if r["type"] == "child_chunk"]
+        assert {r["segment_id"] for r in chunks} == {"seg-2", "seg-3"}
+
+    def test_resume_after_failure(self, knowledge, request_option, tmp_path):
+        """Test a rerun only exports the documents that did not complete, without duplicates."""
+        output = str(tmp_path / "export.jsonl.gz")
+        knowledge.segment.list.side_effect = lambda req, opt: (
+            _segments(req, opt) if req.paths["document_id"] == "doc-1" else ListSegmentsResponse(code="timeout")
+        )
+        first = DatasetExporter(knowledge, request_option, output).run()
+        assert list(first.failures) == ["document:ds-1:doc-2"]
+
+        knowledge.segment.list.side_effect = _segments
+        second = DatasetExporter(knowledge, request_option, output).run()
+        assert (second.datasets, second.documents, second.skipped) == (0, 1, 1)
+
+        records = self._read(output)
+        assert [r["type"] for r in records].count("dataset") == 1
+        assert sorted(r["document_id"] for r in records if r["type"] == "document") == ["doc-1", "doc-2"]
+
+    def test_checkpoint_records_offset_and_units(self, knowledge, request_option, tmp_path):
+        """Test the checkpoint keeps the exported units and the output size after the last one."""
+        output = str(tmp_path / "export.jsonl")
+        DatasetExporter(knowledge, request_option, output).run()
+
+        checkpoint = ExportCheckpoint(output + ".checkpoint")
+        checkpoint.close()
+        assert checkpoint.completed == {"dataset:ds-1", "document:ds-1:doc-1", "document:ds-1:doc-2"}
+        assert checkpoint.offset == os.path.getsize(output)
@@ -0,0 +1,87 @@
+"""Indexing status watcher tests."""
+
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from dify_oapi.api.knowledge.v1.indexing_watcher import IndexingWatcher
+from dify_oapi.api.knowledge.v1.model.get_batch_indexing_status_response import GetBatchIndexingStatusResponse
+
+
+def _status(status: str, completed: int = 0, total: int = 10, error: str | None = None):
+    return GetBatchIndexingStatusResponse(
+        indexing_status=status, completed_segments=completed, total_segments=total, error=error
+    )
+
+
+class TestIndexingWatcher:
+    """Test IndexingWatcher."""
+
+    @pytest.fixture
+    def document(self):
+        """Create mocked Document resource."""
+        return MagicMock()
+
+    def test_futures_resolve_across_datasets(self, document, request_option):
+        """Test batches of several datasets are tracked and their futures resolved."""
+        responses = {
+            "b1": iter([_status("indexing", 1), _status("completed", 10)]),
+            "b2": iter([_status("error", error="embedding failed")]),
+        }
+        document.get_batch_status.side_effect = lambda req, opt: next(responses[req.paths["batch"]])
+        watcher = IndexingWatcher(document, min_interval=0, max_polls_per_second=None)
+        first = watcher.add("ds-1", "b1", request_option)
+        second = watcher.add("ds-2", "b2", request_option)
+
+        finished = watcher.wait(timeout=5)
+
+        assert len(finished) == 2
+        assert first.result().success
+        assert second.result().error == "embedding failed"
+        assert len(watcher) == 0
+
+    def test_rate_ceiling(self, document, request_option):
+        """Test polls of due batches are spread to respect the request-rate ceiling."""
+        document.get_batch_status.return_value = _status("indexing")
+        watcher = IndexingWatcher(document, min_interval=0, max_polls_per_second=2)
+        for batch in ["b1", "b2", "b3"]:
+            watcher.add("ds-1", batch, request_option)
+
+        assert document.get_batch_status.call_count == 0
+        watcher.poll_due()
+        assert document.get_batch_status.call_count == 1
+        assert watcher.next_poll_in() == pytest.approx(0.5, abs=0.05)
+
+    def test_interval_follows_indexing_rate(self, document, request_option):
+        """Test the next poll is planned from the estimated remaining indexing time."""
+        watcher = IndexingWatcher(document, min_interval=1, max_interval=30, eta_fraction=0.1)
+        watcher.add("ds-1", "b1", request_option)
+        watched = watcher._batches[("ds-1", "b1")]
+        watched.status, watched.completed_segments, watched.observed_at = "indexing", 10, time.monotonic() - 10
+
+        watcher._observe(watched, _status("indexing", completed=20, total=100), None)
+        assert watched.interval == pytest.approx(8, rel=0.01)
+
+        watcher._observe(watched, _status("indexing", completed=20, total=100), None)
+        assert watched.interval == pytest.approx(12, rel=0.01)
+
+    def test_background_thread(self, document, request_option):
+        """Test futures resolve on their own while the watcher runs in the background."""
+        document.get_batch_status.return_value = _status("completed", 10)
+        watcher = IndexingWatcher(document, min_interval=0)
+        watcher.start()
+        try:
+            future = watcher.add("ds-1", "b1", request_option)
+            assert future.result(timeout=5).status == "completed"
+        finally:
+            watcher.stop()
+
+    @pytest.mark.asyncio
+    async def test_async_watch(self, document, request_option):
+        """Test batches can be awaited from asyncio."""
+        document.aget_batch_status = AsyncMock(side_effect=[_status("indexing", 5), _status("completed", 10)])
+        watcher = IndexingWatcher(document, min_interval=0)
+        result = await watcher.watch("ds-1", "b1", request_option)
+        assert result.success
+        assert document.aget_batch_status.await_count == 2
@@ -0,0 +1,104 @@
+"""Bulk ingestion pipeline tests."""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from dify_oapi.api.knowledge.v1.indexing_watcher import IndexingWatcher
+from dify_oapi.api.knowledge.v1.ingestion import IngestionPipeline, IngestionSource
+from dify_oapi.api.knowledge.v1.model.create_document_by_file_response import CreateDocumentByFileResponse
+from dify_oapi.api.knowledge.v1.model.get_batch_indexing_status_response import GetBatchIndexingStatusResponse
+
+
+def _created(request, request_option):
+    name = request.files["file"][0]
+    assert request.files["file"][1].read() == b"content of " + name.encode()
+    if name == "bad.txt":
+        return CreateDocumentByFileResponse(code="invalid_param", msg="unsupported file")
+    return CreateDocumentByFileResponse.model_validate({"document": {"id": f"doc-{name}"}, "batch": f"batch-{name}"})
+
+
+def _status(request, request_option):
+    batch = request.paths["batch"]
+    if batch == "batch-broken.txt":
+        return GetBatchIndexingStatusResponse(indexing_status="error", error="embedding failed")
+    return GetBatchIndexingStatusResponse(indexing_status="completed", completed_segments=1, total_segments=1)
+
+
+class TestIngestionPipeline:
+    """Test IngestionPipeline."""
+
+    @pytest.fixture
+    def corpus(self, tmp_path):
+        """Create a directory of source files."""
+        for name in ["a.txt", "b.txt", "bad.txt", "broken.txt"]:
+            (tmp_path / "docs" / name).parent.mkdir(exist_ok=True)
+            (tmp_path / "docs" / name).write_bytes(b"content of " + name.encode())
+        return tmp_path
+
+    @pytest.fixture
+    def document(self):
+        """Create mocked Document resource."""
+        document = MagicMock()
+        document.create_by_file.side_effect = _created
+        document.get_batch_status.side_effect = _status
+        return document
+
+    def _pipeline(self, document, request_option, checkpoint):
+        watcher = IndexingWatcher(document, min_interval=0, max_interval=0)
+        return IngestionPipeline(
+            document, "ds-1", request_option, max_concurrency=2, checkpoint_path=checkpoint, watcher=watcher
+        )
+
+    def test_run_directory(self, corpus, document, request_option):
+        """Test a directory is uploaded, indexed and failures are reported per document."""
+        progress = []
+        pipeline = self._pipeline(document, request_option, str(corpus / "checkpoint.jsonl"))
+        pipeline.on_progress = lambda report: progress.append(report.uploaded)
+        report = pipeline.run(str(corpus / "docs"))
+
+        assert report.submitted == 4
+        assert report.uploaded == 3
+        assert report.completed == 2
+        assert report.failures == {"bad.txt": "unsupported file", "broken.txt": "embedding failed"}
+        assert progress
+
+        states = {}
+        with open(corpus / "checkpoint.jsonl") as f:
+            for line in f:
+                entry = json.loads(line)
+                states[entry["source_id"]] = entry["status"]
+        assert states == {"a.txt": "completed", "b.txt": "completed", "bad.txt": "failed", "broken.txt": "error"}
+
+    def test_resume_from_checkpoint(self, corpus, document, request_option):
+        """Test a rerun only retries failed uploads and resumes pending batches."""
+        checkpoint = corpus / "checkpoint.jsonl"
+        checkpoint.write_text(
+            "\n".join(
+                [
+                    json.dumps({"source_id": "a.txt", "status": "completed"}),
+                    json.dumps({"source_id": "b.txt", "status": "uploaded", "batch": "batch-b.txt"}),
+                    json.dumps({"source_id": "broken.txt", "status": "error", "error": "x"}),
+                    json.dumps({"source_id": "bad.txt", "status": "failed", "error": "x"}),
+                ]
+            )
+            + "\n"
+        )
+        report = self._pipeline(document, request_option, str(checkpoint)).run(str(corpus / "docs"))
+
+        assert document.create_by_file.call_count == 1
+        assert report.skipped == 3
+        assert report.completed == 1
+        assert document.get_batch_status.call_count == 1
+
+    def test_text_sources(self, document, request_option):
+        """Test inline text sources use create_by_text without waiting for indexing."""
+        document.create_by_text.return_value = MagicMock(success=True, document=MagicMock(id="doc-1"), batch="b-1")
+        pipeline = IngestionPipeline(document, "ds-1", request_option, wait_for_indexing=False)
+        report = pipeline.run([IngestionSource(source_id="t1", name="t1", text="hello")])
+
+        request = document.create_by_text.call_args.args[0]
+        assert request.request_body.text == "hello"
+        assert report.uploaded == 1
+        document.get_batch_status.assert_not_called()
@@ -0,0 +1,193 @@
+"""Knowledge retrieval cache tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from dify_oapi.api.knowledge.v1.indexing_watcher import IndexingWatcher
+from dify_oapi.api.knowledge.v1.model.create_segment_request import CreateSegmentRequest
+from dify_oapi.api.knowledge.v1.model.get_batch_indexing_status_response import GetBatchIndexingStatusResponse
+from dify_oapi.api.knowledge.v1.model.retrieve_from_dataset_request import RetrieveFromDatasetRequest
+from dify_oapi.api.knowledge.v1.model.retrieve_from_dataset_request_body import RetrieveFromDatasetRequestBody
+from dify_oapi.api.knowledge.v1.model.retrieve_from_dataset_response import RetrieveFromDatasetResponse
+from dify_oapi.api.knowledge.v1.resource.dataset import Dataset
+from dify_oapi.api.knowledge.v1.resource.segment import Segment
+from dify_oapi.api.knowledge.v1.retrieval_cache import RetrievalCache
+from dify_oapi.core.cache import CacheBackend, DiskCache, MemoryCache
+from dify_oapi.core.key_pool import ApiKeyPool
+from dify_oapi.core.model.config import Config
+from dify_oapi.core.model.request_option import RequestOption
+
+
+def _retrieve_request(query: str, dataset_id: str = "ds-1", top_k: int = 3) -> RetrieveFromDatasetRequest:
+    body = RetrieveFromDatasetRequestBody.builder().query(query).top_k(top_k).build()
+    return RetrieveFromDatasetRequest.builder().dataset_id(dataset_id).request_body(body).build()
+
+
+def _response() -> RetrieveFromDatasetResponse:
+    return RetrieveFromDatasetResponse.model_validate(
+        {"query": {"content": "q"}, "records": [{"segment": {"id": "seg-1", "content": "c"}, "score": 0.9}]}
+    )
+
+
+class TestRetrievalCache:
+    """Test RetrievalCache behaviour."""
+
+    @pytest.fixture
+    def config(self):
+        """Create config with retrieval cache enabled."""
+        config = Config()
+        config.retrieval_cache = RetrievalCache(MemoryCache(max_entries=8, ttl=60))
+        return config
+
+    def test_key_normalizes_query(self):
+        """Test whitespace and case differences map to the same key."""
+        cache = RetrievalCache()
+        assert cache.key(_retrieve_request("  Hello   World ")) == cache.key(_retrieve_request("hello world"))
+        assert cache.key(_retrieve_request("hello", top_k=3)) != cache.key(_retrieve_request("hello", top_k=5))
+        assert cache.key(_retrieve_request("hello", "ds-1")) != cache.key(_retrieve_request("hello", "ds-2"))
+
+    def test_key_is_scoped_to_domain_and_credentials(self):
+        """Test tenants sharing a cache never share entries."""
+        cache = RetrievalCache()
+        request = _retrieve_request("hello")
+        key_a = RequestOption.builder().api_key("key-a").build()
+        key_b = RequestOption.builder().api_key("key-b").build()
+        pool = RequestOption.builder().key_pool(ApiKeyPool(["key-b", "key-a"])).build()
+
+        assert cache.key(request, key_a, "http://a") != cache.key(request, key_b, "http://a")
+        assert cache.key(request, key_a, "http://a") != cache.key(request, key_a, "http://b")
+        assert cache.key(request, pool, "http://a") == cache.key(
+            request, RequestOption.builder().key_pool(ApiKeyPool(["key-a", "key-b"])).build(), "http://a"
+        )
+        assert "key-a" not in cache.key(request, key_a, "http://a")
+
+    def test_retrieve_hit_and_miss(self, config, request_option):
+        """Test repeated retrievals are served from the cache."""
+        dataset = Dataset(config)
+        with patch("dify_oapi.core.http.transport.Transport.execute") as mock_execute:
+            mock_execute.return_value = _response()
+            first = dataset.retrieve(_retrieve_request("hello"), request_option)
+            second = dataset.retrieve(_retrieve_request("HELLO"), request_option)
+
+        assert mock_execute.call_count == 1
+        assert second.records[0].segment.id == first.records[0].segment.id
+        assert config.retrieval_cache.stats.hits == 1
+        assert config.retrieval_cache.stats.misses == 1
+
+    def test_error_response_not_cached(self, config, request_option):
+        """Test failed retrievals are not cached."""
+        dataset = Dataset(config)
+        with patch("dify_oapi.core.http.transport.Transport.execute") as mock_execute:
+            mock_execute.return_value = RetrieveFromDatasetResponse(code="not_found")
+            dataset.retrieve(_retrieve_request("hello"), request_option)
+            dataset.retrieve(_retrieve_request("hello"), request_option)
+        assert mock_execute.call_count == 2
+
+    def test_mutation_invalidates_dataset(self, config, request_option):
+        """Test segment creation drops cached retrievals of the same dataset only."""
+        dataset = Dataset(config)
+        with patch("dify_oapi.core.http.transport.Transport.execute") as mock_execute:
+            mock_execute.return_value = _response()
+            dataset.retrieve(_retrieve_request("hello", "ds-1"), request_option)
+            dataset.retrieve(_retrieve_request("hello", "ds-2"), request_option)
+
+            create = CreateSegmentRequest.builder().dataset_id("ds-1").document_id("doc-1").build()
+            Segment(config).create(create, request_option)
+
+            dataset.retrieve(_retrieve_request("hello", "ds-1"), request_option)
+            dataset.retrieve(_retrieve_request("hello", "ds-2"), request_option)
+
+        # two initial misses, one segment create, one miss after invalidation
+        assert mock_execute.call_count == 4
+        assert config.retrieval_cache.stats.invalidations == 1
+
+    def test_failed_mutation_invalidates_dataset(self, config, request_option):
+        """Test a mutation that raises, possibly after the server applied it, still drops cached retrievals."""
+        dataset = Dataset(config)
+        with patch("dify_oapi.core.http.transport.Transport.execute") as mock_execute:
+            mock_execute.return_value = _response()
+            dataset.retrieve(_retrieve_request("hello"), request_option)
+
+            mock_execute.side_effect = TimeoutError("read timed out")
+            create = CreateSegmentRequest.builder().dataset_id("ds-1").document_id("doc-1").build()
+            with pytest.raises(TimeoutError):
+                Segment(config).create(create, request_option)
+
+        assert config.retrieval_cache.get(_retrieve_request("hello"), request_option) is None
+        assert config.retrieval_cache.stats.invalidations == 1
+
+    def test_retrieval_racing_invalidation_is_not_stored(self, config, request_option):
+        """Test a result fetched before an invalidation is returned but not written back to the cache."""
+        dataset = Dataset(config)
+
+        def _execute(*args, **kwargs):
+            config.retrieval_cache.invalidate("ds-1")
+            return _response()
+
+        with patch("dify_oapi.core.http.transport.Transport.execute") as mock_execute:
+            mock_execute.side_effect = _execute
+            assert dataset.retrieve(_retrieve_request("hello"), request_option).records
+            assert config.retrieval_cache.get(_retrieve_request("hello"), request_option) is None
+
+            mock_execute.side_effect = None
+            mock_execute.return_value = _response()
+            dataset.retrieve(_retrieve_request("hello"), request_option)
+            dataset.retrieve(_retrieve_request("hello"), request_option)
+
+        assert mock_execute.call_count == 2
+
+    def test_indexing_completion_invalidates_dataset(self, config, request_option):
+        """Test cached retrievals are dropped again once the watcher sees indexing finish."""
+        document = MagicMock(config=config)
+        document.get_batch_status.return_value = GetBatchIndexingStatusResponse(indexing_status="completed")
+        config.retrieval_cache.put(_retrieve_request("hello"), _response(), request_option)
+        watcher = IndexingWatcher(document, min_interval=0, max_polls_per_second=None)
+        watcher.add("ds-1", "b1", request_option)
+
+        watcher.wait(timeout=5)
+
+        assert config.retrieval_cache.get(_retrieve_request("hello"), request_option) is None
+        assert config.retrieval_cache.stats.invalidations == 1
+
+    @pytest.mark.asyncio
+    async def test_aretrieve_uses_cache(self, config, request_option):
+        """Test async retrieval shares the cache."""
+        dataset = Dataset(config)
+        with patch("dify_oapi.core.http.transport.ATransport.aexecute") as mock_execute:
+            mock_execute.return_value = _response()
+            await dataset.aretrieve(_retrieve_request("hello"), request_option)
+            await dataset.aretrieve(_retrieve_request("hello"), request_option)
+        assert mock_execute.call_count == 1
+
+    def test_disk_backend(self, tmp_path):
+        """Test the on-disk backend persists entries and evicts least recently used ones."""
+        path = str(tmp_path / "retrieval.db")
+        cache = RetrievalCache(DiskCache(path, max_entries=2))
+        cache.put(_retrieve_request("a"), _response())
+        cache.put(_retrieve_request("b"), _response())
+        assert cache.get(_retrieve_request("a")) is not None
+        cache.put(_retrieve_request("c"), _response())
+
+        reopened = RetrievalCache(DiskCache(path, max_entries=2))
+        assert reopened.get(_retrieve_request("b")) is None
+        assert reopened.get(_retrieve_request("a")).records[0].score == 0.9
+        assert reopened.invalidate("ds-1") == 2
+
+    def test_incomplete_backend(self):
+        """Test a backend missing methods fails when instantiated."""
+
+        class GetOnly(CacheBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError, match="abstract"):
+            GetOnly()
+
+    def test_memory_backend_ttl(self):
+        """Test expired entries count as misses."""
+        backend = MemoryCache(ttl=0)
+        backend.set("k", 1, namespace="ns")
+        assert backend.get("k") is None
+        assert backend.stats.misses == 1
+        assert len(backend) == 0
@@ -0,0 +1,91 @@
+"""Multi-dataset retrieval tests."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from dify_oapi.api.knowledge.v1.model.retrieval_record import RetrievalRecord
+from dify_oapi.api.knowledge.v1.model.retrieve_from_dataset_request_body import RetrieveFromDatasetRequestBody
+from dify_oapi.api.knowledge.v1.model.retrieve_from_dataset_response import RetrieveFromDatasetResponse
+from dify_oapi.api.knowledge.v1.resource.dataset import Dataset
+from dify_oapi.api.knowledge.v1.retrieval_merge import merge_retrieval_records
+
+
+def _record(segment_id: str, score: float) -> RetrievalRecord:
+    return RetrievalRecord.model_validate({"segment": {"id": segment_id}, "score": score})
+
+
+RESULTS = {
+    "ds-1": [_record("a", 0.9), _record("b", 0.5)],
+    "ds-2": [_record("c", 0.8), _record("a", 0.7)],
+    "ds-3": [_record("d", 0.95)],
+}
+
+
+def _fake_retrieve(request, request_option):
+    dataset_id = request.dataset_id
+    if dataset_id == "slow":
+        time.sleep(0.5)
+    if dataset_id == "broken":
+        raise RuntimeError("boom")
+    return RetrieveFromDatasetResponse(records=RESULTS[dataset_id])
+
+
+async def _fake_aretrieve(request, request_option):
+    if request.dataset_id == "slow":
+        await asyncio.sleep(0.5)
+    return _fake_retrieve(request, request_option)
+
+
+class TestRetrieveMany:
+    """Test Dataset.retrieve_many."""
+
+    @pytest.fixture
+    def dataset(self, mock_config):
+        """Create Dataset instance."""
+        return Dataset(mock_config)
+
+    @pytest.fixture
+    def body(self):
+        """Create retrieval request body."""
+        return RetrieveFromDatasetRequestBody.builder().query("hello").top_k(3).build()
+
+    def test_merge_by_score_deduplicates(self):
+        """Test score merge keeps the best copy of each segment."""
+        merged = merge_retrieval_records(RESULTS.values(), top_k=3)
+        assert [r.segment.id for r in merged] == ["d", "a", "c"]
+        assert merged[1].score == 0.9
+
+    def test_merge_by_rrf(self):
+        """Test reciprocal-rank fusion favours segments found by several datasets."""
+        merged = merge_retrieval_records(RESULTS.values(), strategy="rrf")
+        assert merged[0].segment.id == "a"
+        assert len(merged) == 4
+
+    def test_retrieve_many(self, dataset, body, request_option):
+        """Test fan-out merges every dataset."""
+        with patch.object(dataset, "retrieve", side_effect=_fake_retrieve):
+            result = dataset.retrieve_many(["ds-1", "ds-2", "ds-3"], body, request_option)
+        assert [r.segment.id for r in result.records] == ["d", "a", "c"]
+        assert result.completed_datasets == ["ds-1", "ds-2", "ds-3"]
+
+    def test_retrieve_many_partial(self, dataset, body, request_option):
+        """Test slow and failing datasets are reported while others are returned."""
+        with patch.object(dataset, "retrieve", side_effect=_fake_retrieve):
+            start = time.monotonic()
+            result = dataset.retrieve_many(["ds-1", "slow", "broken"], body, request_option, timeout=0.1)
+            assert time.monotonic() - start < 0.4
+        assert result.completed_datasets == ["ds-1"]
+        assert result.timed_out_datasets == ["slow"]
+        assert "boom" in result.failed_datasets["broken"]
+        assert [r.segment.id for r in result.records] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_aretrieve_many_partial(self, dataset, body, request_option):
+        """Test async fan-out honours the deadline."""
+        with patch.object(dataset, "aretrieve", side_effect=_fake_aretrieve):
+            result = await dataset.aretrieve_many(["ds-2", "slow"], body, request_option, timeout=0.1, top_k=1)
+        assert result.timed_out_datasets == ["slow"]
+        assert [r.segment.id for r in result.records] == ["c"]
@@ -0,0 +1,94 @@
+"""Segment writer tests."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from dify_oapi.api.knowledge.v1.model.create_segment_response import CreateSegmentResponse
+from dify_oapi.api.knowledge.v1.model.segment_content import SegmentContent
+from dify_oapi.api.knowledge.v1.segment_writer import SegmentWriter
+from dify_oapi.core.model.raw_response import RawResponse
+
+
+def _respond(request, option=None):
+    segments = json.loads(request.content)["segments"]
+    if any(segment["content"] == "big" for segment in segments) and len(segments) > 1:
+        return CreateSegmentResponse(code="request_too_large", msg="too large", raw=RawResponse(status_code=413))
+    if any(segment["content"] == "bad" for segment in segments):
+        return CreateSegmentResponse(code="invalid_param", msg="bad segment", raw=RawResponse(status_code=400))
+    if any(segment["content"] == "down" for segment in segments):
+        return CreateSegmentResponse(code="internal_server_error", msg="down", raw=RawResponse(status_code=503))
+    if any(segment["content"] == "lost" for segment in segments):
+        return CreateSegmentResponse.model_validate({"data": [{"id": s["content"]} for s in segments[1:]]})
+    return CreateSegmentResponse.model_validate({"data": [{"id": s["content"]} for s in segments]})
+
+
+class TestSegmentWriter:
+    """Test SegmentWriter."""
+
+    @pytest.fixture
+    def segment(self):
+        """Create mocked Segment resource."""
+        segment = MagicMock()
+        segment.create.side_effect = _respond
+        segment.acreate = AsyncMock(side_effect=_respond)
+        return segment
+
+    def _segments(self, count):
+        return (SegmentContent(content=f"s{i}", keywords=["k"]) for i in range(count))
+
+    def test_batches_respect_count_and_bytes(self, segment, request_option):
+        """Test segments are packed under both limits and sent as pre-encoded bodies."""
+        writer = SegmentWriter(segment, "ds-1", "doc-1", request_option, max_count=4, max_bytes=120)
+        result = writer.write(self._segments(10))
+
+        assert result.success
+        assert [info.id for info in result.segments] == [f"s{i}" for i in range(10)]
+        for call in segment.create.call_args_list:
+            request = call.args[0]
+            assert request.paths == {"dataset_id": "ds-1", "document_id": "doc-1"}
+            assert len(request.content) <= 120
+            assert len(json.loads(request.content)["segments"]) <= 4
+        assert result.requests == segment.create.call_count > 10 // 4
+
+    def test_too_large_batch_is_split(self, segment, request_option):
+        """Test a batch rejected as too large is retried in halves until it fits."""
+        segments = [SegmentContent(content=c) for c in ["a", "b", "big", "c"]]
+        result = SegmentWriter(segment, "ds-1", "doc-1", request_option, max_concurrency=1).write(segments)
+
+        assert result.success
+        assert [info.id for info in result.segments] == ["a", "b", "big", "c"]
+        assert result.requests == 5
+
+    @pytest.mark.parametrize("content", ["bad", "lost", "down"])
+    def test_failed_batch_is_not_resent(self, segment, request_option, content):
+        """Test a rejected or failed batch, or one with missing segments, is recorded as failed, not sent again."""
+        segments = [SegmentContent(content=c) for c in ["a", content, "b"]]
+        result = SegmentWriter(segment, "ds-1", "doc-1", request_option).write(segments)
+
+        assert set(result.errors) == {0, 1, 2}
+        assert result.segments == [None, None, None]
+        assert result.requests == 1
+
+    @pytest.mark.parametrize(
+        ("exc", "requests"), [(httpx.ConnectError("refused"), 3), (httpx.ReadTimeout("timed out"), 1)]
+    )
+    def test_errors_split_only_when_unsent(self, segment, request_option, exc, requests):
+        """Test only errors raised before the batch was sent split it, not timeouts once it was sent."""
+        segment.create.side_effect = exc
+        segments = [SegmentContent(content=c) for c in ["a", "b"]]
+        result = SegmentWriter(segment, "ds-1", "doc-1", request_option).write(segments)
+
+        assert set(result.errors) == {0, 1}
+        assert result.requests == requests
+
+    @pytest.mark.asyncio
+    async def test_awrite(self, segment, request_option):
+        """Test async writing keeps the input order."""
+        writer = SegmentWriter(segment, "ds-1", "doc-1", request_option, max_count=3)
+        result = await writer.awrite(self._segments(7))
+
+        assert [info.id for info in result.segments] == [f"s{i}" for i in range(7)]
+        assert segment.acreate.await_count == 3
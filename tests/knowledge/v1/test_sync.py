@@ -0,0 +1,79 @@
+"""Incremental document sync tests."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from dify_oapi.api.knowledge.v1.ingestion import IngestionSource
+from dify_oapi.api.knowledge.v1.model.create_document_by_file_response import CreateDocumentByFileResponse
+from dify_oapi.api.knowledge.v1.model.delete_document_response import DeleteDocumentResponse
+from dify_oapi.api.knowledge.v1.model.list_documents_response import ListDocumentsResponse
+from dify_oapi.api.knowledge.v1.model.update_document_by_file_response import UpdateDocumentByFileResponse
+from dify_oapi.api.knowledge.v1.sync import DocumentSync, SyncManifest
+
+
+class TestDocumentSync:
+    """Test DocumentSync."""
+
+    @pytest.fixture
+    def corpus(self, tmp_path):
+        """Create a directory of source files."""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        (docs / "a.txt").write_text("alpha")
+        (docs / "b.txt").write_text("beta")
+        return tmp_path
+
+    @pytest.fixture
+    def document(self):
+        """Create mocked Document resource."""
+        document = MagicMock()
+        document.create_by_file.side_effect = lambda req, opt: CreateDocumentByFileResponse.model_validate(
+            {"document": {"id": "doc-" + req.files["file"][0]}, "batch": "b"}
+        )
+        document.update_by_file.return_value = UpdateDocumentByFileResponse.model_validate({"document": {"id": "x"}})
+        document.delete.return_value = DeleteDocumentResponse()
+        document.list.return_value = ListDocumentsResponse(data=[], has_more=False)
+        return document
+
+    def _sync(self, document, request_option, corpus, **kwargs):
+        return DocumentSync(document, "ds-1", request_option, str(corpus / "manifest.db"), **kwargs)
+
+    def test_only_changes_are_sent(self, corpus, document, request_option):
+        """Test a second sync only updates modified, creates new and deletes removed sources."""
+        first = self._sync(document, request_option, corpus).run(str(corpus / "docs"))
+        assert (first.created, first.updated, first.deleted, first.unchanged) == (2, 0, 0, 0)
+
+        (corpus / "docs" / "a.txt").write_text("alpha v2")
+        (corpus / "docs" / "b.txt").unlink()
+        (corpus / "docs" / "c.txt").write_text("gamma")
+        document.create_by_file.reset_mock()
+
+        second = self._sync(document, request_option, corpus).run(str(corpus / "docs"))
+        assert (second.created, second.updated, second.deleted, second.unchanged) == (1, 1, 1, 0)
+        assert document.update_by_file.call_args.args[0].document_id == "doc-a.txt"
+        assert document.delete.call_args.args[0].document_id == "doc-b.txt"
+
+        third = self._sync(document, request_option, corpus).run(str(corpus / "docs"))
+        assert (third.created, third.updated, third.deleted, third.unchanged) == (0, 0, 0, 2)
+        entries = SyncManifest(str(corpus / "manifest.db")).entries("ds-1")
+        assert sorted(entries) == ["a.txt", "c.txt"]
+
+    def test_reconcile_without_manifest(self, corpus, document, request_option):
+        """Test existing remote documents are adopted by name when the manifest is missing."""
+        document.list.return_value = ListDocumentsResponse.model_validate(
+            {"data": [{"id": "remote-a", "name": "a.txt"}, {"id": "other", "name": "z.txt"}], "has_more": False}
+        )
+        report = self._sync(document, request_option, corpus, trust_existing=True).run(str(corpus / "docs"))
+
+        assert (report.created, report.updated, report.unchanged) == (1, 0, 1)
+        assert SyncManifest(str(corpus / "manifest.db")).entries("ds-1")["a.txt"].document_id == "remote-a"
+        document.delete.assert_not_called()
+
+    def test_text_sources_and_failures(self, corpus, document, request_option):
+        """Test failed operations are reported and not recorded in the manifest."""
+        document.create_by_text.return_value = CreateDocumentByFileResponse(code="quota", msg="quota exceeded")
+        sync = self._sync(document, request_option, corpus)
+        report = sync.run([IngestionSource(source_id="t1", name="t1", text="hello")])
+        assert report.failures == {"t1": "quota exceeded"}
+        assert sync.manifest.entries("ds-1") == {}